@@ -64,7 +64,8 @@ export default function AvatarUpdatePage() {
       if (data.success && data.url) {
         setUser((prev) => ({
           ...prev,
-          avatar_url: data.url + "?t=" + Date.now(),
+          // A new image always gets a new URL, no cache-busting needed
+          avatar_url: data.url,
         }));
         alert("Avatar updated successfully.");
         return navigate("/profile");
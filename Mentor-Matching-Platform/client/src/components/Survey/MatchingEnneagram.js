@@ -129,52 +129,40 @@ console.log("🔥 calculateResult sessionId + role:", sessionId, roleFromUrl);
     localStorage.setItem('enneagramResult', JSON.stringify(resultData));
 
 
+    const enneagram = {
+      topTypes: resultData.topTypes,
+      allScores: resultData.allScores,
+      answers: responses,
+    };
+
     try {
-      const enneagramRes = await fetch('/api/save-enneagram', {
+      // The preferences and lifestyle steps were saved by their own pages;
+      // submitting adds the Enneagram answers and marks the survey submitted
+      const submitRes = await fetch('/api/submit-survey', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
-        body: JSON.stringify({
-            sessionId: safeSessionId,
-            role: safeRole,
-            topTypes: resultData.topTypes,
-            allScores: resultData.allScores,
-            answers: responses,  
-        })
-    });
-    
-
-      const enneagramData = await enneagramRes.json();
-      if (!enneagramData.success) {
-        alert("⚠️ Failed to save Enneagram result.");
+        body: JSON.stringify({ sessionId: safeSessionId, role: safeRole, enneagram })
+      });
+      const submitData = await submitRes.json();
+      if (!submitData.success) {
+        alert(`⚠️ Failed to submit survey: ${submitData.error || 'please try again.'}`);
         return;
       }
 
-      const markRes = await fetch('/api/mark-submitted', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        credentials: 'include',
-        body: JSON.stringify({ sessionId: safeSessionId })
-      });
-      const markData = await markRes.json();
-
-      if (markData.success) {
-        fetch(`/api/match-mentee?sessionId=${safeSessionId}`, {
-          method: 'GET',
-          credentials: 'include'
+      fetch(`/api/match-mentee?sessionId=${safeSessionId}`, {
+        method: 'GET',
+        credentials: 'include'
+      })
+        .then(res => res.json())
+        .then(matchData => {
+          console.log("🧠 Mentor Matches:", matchData);
+          navigate('/survey/submitform');
         })
-          .then(res => res.json())
-          .then(matchData => {
-            console.log("🧠 Mentor Matches:", matchData);
-            navigate('/survey/submitform');
-          })
-          .catch(err => {
-            console.error("❌ Error fetching matches:", err);
-            navigate('/survey/submitform');
-          });
-      } else {
-        alert("⚠️ Failed to mark application as submitted.");
-      }      
+        .catch(err => {
+          console.error("❌ Error fetching matches:", err);
+          navigate('/survey/submitform');
+        });
     } catch (err) {
       console.error("❌ Error during submission:", err);
       alert("An error occurred while finalizing submission.");
@@ -42,6 +42,12 @@ beforeEach(() => {
         json: () => Promise.resolve({ success: true }),
       });
     }
+    if (url.includes('/api/submit-survey')) {
+      return Promise.resolve({
+        ok: true,
+        json: () => Promise.resolve({ success: true, applicationId: 1 }),
+      });
+    }
     if (url.includes('/api/mark-submitted')) {
       return Promise.resolve({
         ok: true,
@@ -80,8 +86,33 @@ test('renders sliders and submits when confirmed', async () => {
 
   await waitFor(() => {
     expect(global.fetch).toHaveBeenCalledWith(
-      expect.stringContaining('/api/save-enneagram'),
+      expect.stringContaining('/api/submit-survey'),
+      expect.objectContaining({ method: 'POST' })
+    );
+  });
+});
+
+test('submits only the Enneagram answers; earlier steps are already saved', async () => {
+  render(
+    <BrowserRouter>
+      <MatchingEnneagram />
+    </BrowserRouter>
+  );
+
+  await screen.findByText(/Enneagram Questionnaire/i);
+  fireEvent.click(screen.getByText(/Next ➔/i));
+  fireEvent.click(screen.getByRole('checkbox'));
+  fireEvent.click(screen.getByRole('button', { name: /submit/i }));
+
+  await waitFor(() => {
+    expect(global.fetch).toHaveBeenCalledWith(
+      expect.stringContaining('/api/submit-survey'),
       expect.objectContaining({ method: 'POST' })
     );
   });
+  const [, options] = global.fetch.mock.calls.find(([url]) => url.includes('/api/submit-survey'));
+  const body = JSON.parse(options.body);
+  expect(Object.keys(body).sort()).toEqual(['enneagram', 'role', 'sessionId']);
+  expect(body.enneagram.allScores).toBeDefined();
+  expect(global.fetch).not.toHaveBeenCalledWith(expect.stringContaining('/api/mark-submitted'), expect.anything());
 });
@@ -67,7 +67,7 @@ function AdminApplicationDetailPage() {
           if (!res.ok) throw new Error(`Search failed: ${res.status}`);
           return res.json();
         })
-        .then(data => setSearchResults(data))
+        .then(data => setSearchResults(data.mentors))
         .catch(err => {
           console.error('Search mentors error:', err);
           setSearchError(err);
@@ -1,26 +1,69 @@
 // src/pages/Admin/ParticipantsPage.jsx
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
 import { Link, useParams } from 'react-router-dom';
 import { Tabs, Tab } from '@mui/material';
 
+const ROLES = ['mentor', 'mentee'];
+// How long typing must pause before the search is sent
+const SEARCH_DELAY_MS = 300;
+
 export default function ParticipantPage() {
   const { sessionId } = useParams(); // Get sessionId from the route
-  console.log("Session ID:", sessionId);
   const [tabValue, setTabValue] = useState(0);
-  const [mentors, setMentors] = useState([]);
-  const [mentees, setMentees] = useState([]);
+  const [rows, setRows] = useState([]);
+  const [counts, setCounts] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [query, setQuery] = useState('');
+  const [matched, setMatched] = useState('');
+  const [loading, setLoading] = useState(false);
+  // The request in flight, aborted when a newer one replaces it
+  const request = useRef(null);
 
   useEffect(() => {
-    // Fetch both mentors and mentees for the session
-    fetch(`/api/admin/sessions/${sessionId}/participants`)
+    const timer = setTimeout(() => setQuery(search.trim()), SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [search]);
+
+  // One page of the current tab; the server filters, sorts and pages.
+  // Starting a request cancels the previous one, so a late reply for an
+  // older search, tab or page never lands in the table.
+  const loadPage = useCallback((cursor) => {
+    const params = new URLSearchParams({ role: ROLES[tabValue] });
+    if (query) params.set('q', query);
+    if (matched) params.set('matched', matched);
+    if (cursor) params.set('cursor', cursor);
+
+    if (request.current) request.current.abort();
+    const controller = new AbortController();
+    request.current = controller;
+
+    setLoading(true);
+    fetch(`/api/admin/sessions/${sessionId}/participants?${params}`, { signal: controller.signal })
       .then((res) => res.json())
       .then((data) => {
-        console.log("Participants data:", data);
-        setMentors(data.mentors);
-        setMentees(data.mentees);
+        if (controller.signal.aborted) return;
+        const page = data.participants || [];
+        setRows((prev) => (cursor ? [...prev, ...page] : page));
+        setNextCursor(data.nextCursor || null);
+        if (data.counts) setCounts(data.counts);
       })
-      .catch((err) => console.error("Failed to fetch participants:", err));
-  }, [sessionId]);
+      .catch((err) => {
+        if (err.name !== 'AbortError') console.error("Failed to fetch participants:", err);
+      })
+      .finally(() => {
+        if (request.current === controller) {
+          request.current = null;
+          setLoading(false);
+        }
+      });
+    return controller;
+  }, [sessionId, tabValue, query, matched]);
+
+  useEffect(() => {
+    const controller = loadPage(null);
+    return () => controller.abort();
+  }, [loadPage]);
 
   const renderTable = (data, columns) => (
     <div className="overflow-x-auto shadow rounded-lg">
@@ -97,15 +140,44 @@ export default function ParticipantPage() {
       <h1 className="text-2xl font-bold mb-4">Session Participants</h1>
 
       <Tabs value={tabValue} onChange={(e, v) => setTabValue(v)}>
-        <Tab label={`Mentors (${mentors.length})`} />
-        <Tab label={`Mentees (${mentees.length})`} />
+        <Tab label={counts ? `Mentors (${counts.mentor})` : 'Mentors'} />
+        <Tab label={counts ? `Mentees (${counts.mentee})` : 'Mentees'} />
       </Tabs>
 
+      <div className="mt-4 flex gap-4">
+        <input
+          type="search"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search by name"
+          className="border rounded px-3 py-2 text-sm"
+        />
+        <select
+          value={matched}
+          onChange={(e) => setMatched(e.target.value)}
+          className="border rounded px-3 py-2 text-sm"
+        >
+          <option value="">All</option>
+          <option value="true">Matched</option>
+          <option value="false">Unmatched</option>
+        </select>
+      </div>
+
       <div className="mt-4">
-        {tabValue === 0
-          ? renderTable(mentors, mentorColumns)
-          : renderTable(mentees, menteeColumns)}
+        {renderTable(rows, tabValue === 0 ? mentorColumns : menteeColumns)}
       </div>
+
+      {nextCursor && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={() => loadPage(nextCursor)}
+            disabled={loading}
+            className="px-4 py-2 text-sm text-blue-600 hover:text-blue-900"
+          >
+            {loading ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
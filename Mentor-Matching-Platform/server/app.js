@@ -3,10 +3,24 @@ const express = require("express");
 const path = require("path");
 const cors = require("cors");
 const session = require("express-session");
+const { SqliteSessionStore } = require("./utils/sessionStore");
+const { AVATAR_DIR, AVATAR_URL_PREFIX } = require("./utils/avatarStore");
+const metrics = require("./utils/metrics");
+
+const LOOPBACK = new Set(["127.0.0.1", "::1", "::ffff:127.0.0.1"]);
 
 // Middleware setup
 const app = express();
 app.disable("etag");
+app.use(metrics.requestMetrics);
+
+// Prometheus scrape endpoint, for the local machine only. Registered
+// before the session middleware so scrapes don't touch the session store.
+app.get("/metrics", (req, res) => {
+    if (!LOOPBACK.has(req.socket.remoteAddress)) return res.status(404).end();
+    res.type("text/plain; version=0.0.4").send(metrics.render());
+});
+
 app.use(express.json());
 app.use(
     cors({
@@ -17,6 +31,9 @@ app.use(
 app.use(
     session({
         name: "connect.sid",
+        // Kept in SQLite so logins survive restarts and are shared
+        // between server processes
+        store: new SqliteSessionStore(),
         secret: "someSuperSecretKey",
         resave: false,
         saveUninitialized: false,
@@ -29,6 +46,12 @@ app.use(
     })
 );
 
+// Avatar files are named by content hash, so a URL's content never changes
+app.use(
+    AVATAR_URL_PREFIX,
+    express.static(AVATAR_DIR, { immutable: true, maxAge: "365d", index: false })
+);
+
 // Mount public routes
 app.use("/api", require("./routes/auth"));
 app.use("/api", require("./routes/profile"));
@@ -0,0 +1,217 @@
+// cluster.js
+// Production entry point: one HTTP worker process per core.
+//
+// The primary migrates and seeds the database once, runs the background
+// job queue, then forks the workers. SIGHUP restarts the workers one at a
+// time, each replacement listening before its predecessor drains, so the
+// port never goes dark. SIGTERM / SIGINT drain every process and close the
+// database once in-flight writes have finished.
+//
+// Workers share nothing but the database. The session store and the
+// latest-survey lookup skip their in-memory caches in a worker, and the
+// per-session score state is checked against recommendation_versions.
+//
+//   node cluster.js             (WEB_CONCURRENCY overrides the worker count)
+//   kill -HUP <primary pid>     (rolling restart, e.g. after a deploy)
+const cluster = require("cluster");
+const os = require("os");
+const { once } = require("events");
+const logger = require("./utils/logger");
+
+const PORT = process.env.PORT || 3001;
+const WORKER_COUNT = Number(process.env.WEB_CONCURRENCY) || os.cpus().length;
+// A process still draining after this long is stopped anyway
+const SHUTDOWN_TIMEOUT_MS = Number(process.env.SHUTDOWN_TIMEOUT_MS) || 30000;
+// A worker that dies sooner than this after starting is respawned after
+// a pause instead of straight away, so a crash on boot cannot spin
+const MIN_UPTIME_MS = 5000;
+const RESPAWN_DELAY_MS = 1000;
+
+/**
+ * Stops the HTTP server, waits for in-flight requests, then closes the
+ * worker thread pool and the database (which lets queued statements run).
+ */
+async function drain(server) {
+  const db = require("./db");
+  const { closeMatchPool } = require("./utils/matchPool");
+  if (server) {
+    await new Promise((resolve) => {
+      server.close(() => resolve());
+      // Keep-alive sockets with no request in flight would hold close() open
+      if (server.closeIdleConnections) server.closeIdleConnections();
+    });
+  }
+  await closeMatchPool();
+  await db.closeAsync();
+}
+
+function exitWithin(ms) {
+  setTimeout(() => {
+    logger.error(`❌ Shutdown took longer than ${ms} ms, exiting`);
+    process.exit(1);
+  }, ms).unref();
+}
+
+function listening(worker) {
+  return new Promise((resolve, reject) => {
+    const onExit = () => reject(new Error(`Worker ${worker.process.pid} exited before listening`));
+    worker.once("exit", onExit);
+    worker.once("listening", () => {
+      worker.off("exit", onExit);
+      resolve();
+    });
+  });
+}
+
+async function seedDatabase() {
+  const db = require("./db");
+  const seedSessions = require("./scripts/seedSessions");
+  const seedAdmin = require("./scripts/seedAdmin");
+  const seedTestUsers = require("./scripts/seedTestUsers");
+
+  await db.migrated;
+  seedSessions();
+  await seedAdmin();
+  await seedTestUsers();
+  // seedSessions does not report back; a serialized statement runs after
+  // everything queued before it
+  await new Promise((resolve, reject) => {
+    db.serialize(() => db.get("SELECT 1", (err) => (err ? reject(err) : resolve())));
+  });
+}
+
+/**
+ * Primary process: seeds, runs the job queue and supervises the workers.
+ * @param {object} [options]
+ * @param {number} [options.workers] worker processes to keep running
+ * @returns {Promise<{rollingRestart: () => Promise<void>, shutdown: () => Promise<void>}>}
+ */
+async function startPrimary({ workers = WORKER_COUNT } = {}) {
+  const jobQueue = require("./utils/jobQueue");
+
+  await seedDatabase();
+
+  // Jobs run here only, so two workers never claim the same queue. The
+  // match-session job type is registered by the admin routes.
+  require("./routes/admin");
+  await jobQueue.start();
+
+  // Workers being replaced or stopped on purpose, which must not respawn
+  const retiring = new Set();
+  let stopping = false;
+  let restarting = null;
+
+  function fork() {
+    const worker = cluster.fork();
+    worker.startedAt = Date.now();
+    return worker;
+  }
+
+  function retire(worker) {
+    if (worker.isDead()) return Promise.resolve();
+    retiring.add(worker.id);
+    const exited = once(worker, "exit");
+    // A worker hit by the same Ctrl+C may already have disconnected
+    if (worker.isConnected()) worker.send("shutdown");
+    return exited;
+  }
+
+  cluster.on("exit", (worker, code, signal) => {
+    if (retiring.delete(worker.id) || stopping) return;
+    logger.error(`❌ Worker ${worker.process.pid} died (${signal || code}), starting a new one`);
+    const delay = Date.now() - worker.startedAt < MIN_UPTIME_MS ? RESPAWN_DELAY_MS : 0;
+    setTimeout(() => {
+      if (!stopping) fork();
+    }, delay);
+  });
+
+  function rollingRestart() {
+    if (restarting) return restarting;
+    restarting = (async () => {
+      logger.info("🔄 Rolling restart of workers");
+      for (const worker of Object.values(cluster.workers)) {
+        if (stopping) break;
+        const replacement = fork();
+        await listening(replacement);
+        await retire(worker);
+      }
+      logger.info("✅ Rolling restart finished");
+    })().finally(() => {
+      restarting = null;
+    });
+    return restarting;
+  }
+
+  let stopped = null;
+  function shutdown() {
+    if (stopped) return stopped;
+    stopping = true;
+    exitWithin(SHUTDOWN_TIMEOUT_MS);
+    stopped = (async () => {
+      logger.info("🛑 Shutting down workers");
+      await Promise.all(Object.values(cluster.workers).map(retire));
+      await jobQueue.stop();
+      await drain(null);
+      logger.info("✅ Shutdown complete");
+    })();
+    return stopped;
+  }
+
+  for (let i = 0; i < workers; i++) fork();
+  logger.info(`✅ Primary ${process.pid} started ${workers} workers on port ${PORT}`);
+
+  return { rollingRestart, shutdown };
+}
+
+/**
+ * Worker process: serves HTTP until told to shut down.
+ */
+function startWorker() {
+  const app = require("./app");
+  const server = app.listen(PORT, () => {
+    logger.info(`✅ Worker ${process.pid} listening on http://localhost:${PORT}`);
+  });
+
+  let draining = null;
+  function shutdown() {
+    if (draining) return draining;
+    exitWithin(SHUTDOWN_TIMEOUT_MS);
+    draining = drain(server)
+      .then(() => process.exit(0))
+      .catch((err) => {
+        logger.error("❌ Worker shutdown failed:", err.message);
+        process.exit(1);
+      });
+    return draining;
+  }
+
+  process.on("message", (message) => {
+    if (message === "shutdown") shutdown();
+  });
+  // Ctrl+C and `kill` of the process group reach the workers directly
+  process.on("SIGINT", shutdown);
+  process.on("SIGTERM", shutdown);
+  return { server, shutdown };
+}
+
+if (require.main === module) {
+  if (cluster.isPrimary) {
+    startPrimary()
+      .then(({ rollingRestart, shutdown }) => {
+        process.on("SIGHUP", () => {
+          rollingRestart().catch((err) => logger.error("❌ Rolling restart failed:", err.message));
+        });
+        const stop = () => shutdown().then(() => process.exit(0), () => process.exit(1));
+        process.on("SIGINT", stop);
+        process.on("SIGTERM", stop);
+      })
+      .catch((err) => {
+        logger.error("❌ Failed to start primary:", err.message);
+        process.exit(1);
+      });
+  } else {
+    startWorker();
+  }
+}
+
+module.exports = { startPrimary, startWorker, seedDatabase };
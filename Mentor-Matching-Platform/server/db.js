@@ -1,29 +1,71 @@
 // ./server/db.js
 const sqlite3 = require("sqlite3").verbose();
 const path = require("path");
-const { promisify } = require("util");
+const { SqliteAccess } = require("./utils/sqliteAccess");
+const { runMigrations } = require("./migrations");
+const logger = require("./utils/logger");
+const { sqliteQueryDuration } = require("./utils/metrics");
 
+// SQLITE_FILE points scripts and tests at another database file
+const DB_FILE = process.env.SQLITE_FILE || path.join(__dirname, "data", "survey.db");
+// Read-only connections serving getAsync/allAsync; 0 sends reads to the writer
+const READER_COUNT = Number(process.env.SQLITE_READERS ?? 2);
+const BUSY_TIMEOUT_MS = 5000;
 
 // Create or open the database file in ./data/survey.db
-const db = new sqlite3.Database(path.join(__dirname, "data", "survey.db"), (err) => {
+const db = new sqlite3.Database(DB_FILE, (err) => {
   if (err) {
-    console.error("❌ Error opening database:", err);
+    logger.error("❌ Error opening database:", err);
   } else {
-    console.log("✅ Connected to SQLite database");
+    logger.info("✅ Connected to SQLite database");
   }
 });
 
-db.getAsync = promisify(db.get).bind(db);
-db.allAsync = promisify(db.all).bind(db);
-db.runAsync = function(sql, params) {
-  return new Promise((resolve, reject) => {
-    db.run(sql, params, function(err) {
-      if (err) return reject(err);
-      resolve({ lastID: this.lastID, changes: this.changes });
-    });
+// Wait for a lock instead of failing with SQLITE_BUSY straight away
+db.configure("busyTimeout", BUSY_TIMEOUT_MS);
+// WAL lets readers run alongside the writer. With synchronous = NORMAL a
+// commit survives an app crash; only a power loss can drop the last ones.
+db.run("PRAGMA journal_mode = WAL");
+db.run("PRAGMA synchronous = NORMAL", (err) => {
+  if (err || READER_COUNT <= 0) return;
+  access.openReaders(DB_FILE, READER_COUNT, { busyTimeout: BUSY_TIMEOUT_MS }).catch((openErr) => {
+    logger.warn("⚠️ Read connections unavailable, reading from the main connection:", openErr.message);
   });
+});
+
+// getAsync/allAsync/runAsync use cached prepared statements; plain reads go
+// to the read-only connections. The callback API (db.get/all/run) is the
+// writer connection itself.
+const access = new SqliteAccess(db);
+// Each is timed in the sqlite_query_duration_seconds metric.
+db.getAsync = (sql, params) => sqliteQueryDuration.time({ op: "get" }, () => access.get(sql, params));
+db.allAsync = (sql, params) => sqliteQueryDuration.time({ op: "all" }, () => access.all(sql, params));
+db.runAsync = (sql, params) => sqliteQueryDuration.time({ op: "run" }, () => access.run(sql, params));
+// db.transaction(async (tx) => { await tx.run(...); ... }) runs several
+// statements atomically on a connection of its own (see SqliteAccess)
+db.transaction = (work) => sqliteQueryDuration.time({ op: "transaction" }, () => access.transaction(work));
+access.openTransactions(DB_FILE, { busyTimeout: BUSY_TIMEOUT_MS }).catch((err) => {
+  logger.error("❌ Error opening the transaction connection:", err.message);
+});
+db.closeAsync = async () => {
+  await access.close();
+  await new Promise((resolve, reject) => db.close((err) => (err ? reject(err) : resolve())));
 };
 
+// Adds a column that older survey.db files were created without. An empty
+// table_info means the table is being created with the column already.
+function addColumnIfMissing(table, column, definition) {
+  db.all(`PRAGMA table_info(${table})`, (err, columns) => {
+    if (err) {
+      logger.error(`❌ Error reading ${table} schema:`, err.message);
+      return;
+    }
+    if (columns.length === 0 || columns.some((c) => c.name === column)) return;
+    db.run(`ALTER TABLE ${table} ADD COLUMN ${column} ${definition}`, (alterErr) => {
+      if (alterErr) logger.error(`❌ Error adding ${table}.${column}:`, alterErr.message);
+    });
+  });
+}
 
 // Users table
 db.run(`
@@ -66,23 +108,37 @@ db.run(`
 
 
 // Mentorship preferences table
-db.run(`
-  CREATE TABLE IF NOT EXISTS mentorship_preferences (
-    application_id INTEGER PRIMARY KEY,
-    user_id INTEGER NOT NULL,
-    role TEXT CHECK (role IN ('mentor', 'mentee')),
-    transplant_type TEXT,
-    session_role TEXT,
-    transplant_year TEXT,
-    goals TEXT,
-    meeting_preference TEXT,
-    sports_activities TEXT,
-    submitted BOOLEAN NOT NULL DEFAULT 0,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-  )
-`);
+// The *_mask, *_count and transplant_code columns encode the JSON answers
+// for matching (see utils/surveyCodes.js); NULL on rows saved before them
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS mentorship_preferences (
+      application_id INTEGER PRIMARY KEY,
+      user_id INTEGER NOT NULL,
+      role TEXT CHECK (role IN ('mentor', 'mentee')),
+      transplant_type TEXT,
+      session_role TEXT,
+      transplant_year TEXT,
+      goals TEXT,
+      meeting_preference TEXT,
+      sports_activities TEXT,
+      goals_mask INTEGER,
+      goals_count INTEGER,
+      sports_mask INTEGER,
+      sports_count INTEGER,
+      transplant_code INTEGER,
+      submitted BOOLEAN NOT NULL DEFAULT 0,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE,
+      FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+  `);
+  addColumnIfMissing("mentorship_preferences", "goals_mask", "INTEGER");
+  addColumnIfMissing("mentorship_preferences", "goals_count", "INTEGER");
+  addColumnIfMissing("mentorship_preferences", "sports_mask", "INTEGER");
+  addColumnIfMissing("mentorship_preferences", "sports_count", "INTEGER");
+  addColumnIfMissing("mentorship_preferences", "transplant_code", "INTEGER");
+});
 
 
 
@@ -108,18 +164,26 @@ db.run(`
 `);
 
 
-db.run(`
-  CREATE TABLE IF NOT EXISTS enneagram_answers (
-    application_id INTEGER PRIMARY KEY,
-    user_id INTEGER NOT NULL,
-    top_type TEXT,
-    scores TEXT,
-    answers TEXT, 
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-  )
-`);
+// top_type_primary is the first top type, top_type_mask has bit t set for
+// every top type t; NULL on rows saved before these columns existed
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS enneagram_answers (
+      application_id INTEGER PRIMARY KEY,
+      user_id INTEGER NOT NULL,
+      top_type TEXT,
+      top_type_primary INTEGER,
+      top_type_mask INTEGER,
+      scores TEXT,
+      answers TEXT, 
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE,
+      FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+  `);
+  addColumnIfMissing("enneagram_answers", "top_type_primary", "INTEGER");
+  addColumnIfMissing("enneagram_answers", "top_type_mask", "INTEGER");
+});
 
 
 // Sessions table
@@ -140,32 +204,60 @@ db.run(`
 `);
 
 // Applications table
-db.run(`
-  CREATE TABLE IF NOT EXISTS applications (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    session_id INTEGER NOT NULL,
-    user_id INTEGER,
-    role TEXT NOT NULL CHECK (role IN ('mentor', 'mentee')),
-    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'onhold')),
-    application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    assigned_mentor_id INTEGER,
-    UNIQUE (session_id, user_id),
-    FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-    FOREIGN KEY (assigned_mentor_id) REFERENCES users (id) ON DELETE CASCADE
-  )
-`);
+// mentee_capacity is how many mentees a mentor takes in the session; NULL means no limit set
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS applications (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      session_id INTEGER NOT NULL,
+      user_id INTEGER,
+      role TEXT NOT NULL CHECK (role IN ('mentor', 'mentee')),
+      status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'onhold')),
+      application_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      assigned_mentor_id INTEGER,
+      mentee_capacity INTEGER,
+      UNIQUE (session_id, user_id),
+      FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE,
+      FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+      FOREIGN KEY (assigned_mentor_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+  `);
+  addColumnIfMissing("applications", "mentee_capacity", "INTEGER");
+});
+
+// Mentor recommendations table (cached top-N per mentee application)
+// version is the session's recommendation_versions value when the row was computed
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS mentor_recommendations (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      application_id INTEGER NOT NULL,
+      recommended_mentor_id INTEGER,
+      score REAL,
+      rank INTEGER,
+      version INTEGER NOT NULL DEFAULT 0,
+      recommended_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      UNIQUE (application_id, recommended_mentor_id),
+      FOREIGN KEY (application_id) REFERENCES applications (id) ON DELETE CASCADE,
+      FOREIGN KEY (recommended_mentor_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+  `);
+  addColumnIfMissing("mentor_recommendations", "score", "REAL");
+  addColumnIfMissing("mentor_recommendations", "rank", "INTEGER");
+  addColumnIfMissing("mentor_recommendations", "version", "INTEGER NOT NULL DEFAULT 0");
+  db.run(`
+    CREATE INDEX IF NOT EXISTS idx_mentor_recommendations_mentor_id
+    ON mentor_recommendations (recommended_mentor_id)
+  `);
+});
 
-// Mentor recommendations table
+// Recommendation versions table: bumped on every cache invalidation in a
+// session so an in-flight scoring run cannot store an outdated list
 db.run(`
-  CREATE TABLE IF NOT EXISTS mentor_recommendations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    application_id INTEGER NOT NULL,
-    recommended_mentor_id INTEGER,
-    recommended_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE (application_id, recommended_mentor_id),
-    FOREIGN KEY (application_id) REFERENCES applications (id) ON DELETE CASCADE,
-    FOREIGN KEY (recommended_mentor_id) REFERENCES users (id) ON DELETE CASCADE
+  CREATE TABLE IF NOT EXISTS recommendation_versions (
+    session_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
   )
 `);
 
@@ -215,6 +307,58 @@ db.run(`
   )
 `);
 
+// Background jobs table (see utils/jobQueue.js). params and result are JSON.
+// At most one queued or running job per type and session.
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS jobs (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      type TEXT NOT NULL,
+      session_id INTEGER,
+      params TEXT,
+      status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+      progress REAL NOT NULL DEFAULT 0,
+      result TEXT,
+      error TEXT,
+      attempts INTEGER NOT NULL DEFAULT 0,
+      created_by INTEGER,
+      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      started_at TIMESTAMP,
+      finished_at TIMESTAMP,
+      FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
+    )
+  `);
+  db.run(`
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active
+    ON jobs (type, session_id) WHERE status IN ('queued', 'running')
+  `);
+  db.run(`CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)`);
+});
+
+// Login sessions for express-session (see utils/sessionStore.js). sess is
+// the JSON session, expires is in ms since the epoch.
+db.serialize(() => {
+  db.run(`
+    CREATE TABLE IF NOT EXISTS http_sessions (
+      sid TEXT PRIMARY KEY,
+      sess TEXT NOT NULL,
+      expires INTEGER NOT NULL
+    )
+  `);
+  db.run(`CREATE INDEX IF NOT EXISTS idx_http_sessions_expires ON http_sessions (expires)`);
+});
+
+// Versioned indexes and schema changes (see migrations.js). Inside
+// serialize() the first migration statement waits for the tables above.
+db.serialize(() => {
+  db.migrated = runMigrations(db).catch((err) => {
+    logger.error("❌ Error running migrations:", err.message);
+    throw err;
+  });
+  // Callers that need the schema await db.migrated; the server keeps
+  // starting without it, as it does when a CREATE TABLE fails
+  db.migrated.catch(() => {});
+});
 
 async function getApplicationIdForUser(userId, sessionId) {
   if (!sessionId) {
@@ -225,7 +369,7 @@ async function getApplicationIdForUser(userId, sessionId) {
     [userId, sessionId]
   );
   if (!row) {
-    console.warn(`⚠️ No application found for user ${userId} in session ${sessionId}`);
+    logger.warn(`⚠️ No application found for user ${userId} in session ${sessionId}`);
   }
   return row?.id;
 }
@@ -244,7 +388,7 @@ db.ensureApplicationExists = async (userId, sessionId, role) => {
   );
 
   if (!existing) {
-    console.log(`➕ Inserting new application for user ${userId} in session ${sessionId} with role ${role}`);
+    logger.info(`➕ Inserting new application for user ${userId} in session ${sessionId} with role ${role}`);
     await db.runAsync(
       `INSERT INTO applications (user_id, session_id, role) VALUES (?, ?, ?)`,
       [userId, sessionId, role]
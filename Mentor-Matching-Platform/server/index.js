@@ -3,14 +3,21 @@ const app = require("./app");
 const seedSessions = require("./scripts/seedSessions");
 const seedAdmin = require("./scripts/seedAdmin");
 const seedTestUsers = require("./scripts/seedTestUsers");
+const jobQueue = require("./utils/jobQueue");
+const logger = require("./utils/logger");
 
 // Seed the database
 seedSessions();
 seedAdmin();
 seedTestUsers();
 
+// Resume background jobs left over from the last run
+jobQueue.start().catch((err) => {
+    logger.error("❌ Failed to start job queue:", err.message);
+});
+
 // Start the server
 const PORT = process.env.PORT || 3001;
 app.listen(PORT, () => {
-    console.log(`✅ Server listening on http://localhost:${PORT}`);
+    logger.info(`✅ Server listening on http://localhost:${PORT}`);
 });
@@ -1,3 +1,5 @@
+const logger = require("../utils/logger");
+
 /**
  * ensureAuthenticated middleware
  * Verifies that the user is logged in before allowing access to protected routes.
@@ -16,7 +18,7 @@ function ensureAuthenticated(req, res, next) {
  */
 function ensureAdmin(req, res, next) {
 
-    console.log("👀 Session check:", req.session?.user);
+    logger.debug("👀 Session check:", req.session?.user);
     if (req.session && req.session.user && req.session.user.account_type === 1) {
         req.user = req.session.user;
         return next();
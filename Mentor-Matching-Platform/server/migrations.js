@@ -0,0 +1,284 @@
+// ./server/migrations.js
+// Versioned schema changes applied on startup, after the CREATE TABLE
+// statements in db.js. Each migration runs once, in its own transaction,
+// and is recorded in schema_migrations. Append new versions at the end;
+// never edit one that has already shipped.
+
+const logger = require("./utils/logger");
+
+const MIGRATIONS = [
+  {
+    version: 1,
+    name: "lookup indexes",
+    // applications (session_id, user_id), users (email) and the per-survey
+    // tables keyed by application_id are already served by their UNIQUE
+    // and PRIMARY KEY indexes
+    sql: `
+      -- my-sessions and latest-survey: a user's applications, newest first
+      CREATE INDEX IF NOT EXISTS idx_applications_user_id
+        ON applications (user_id, application_date);
+      -- admin participant preferences
+      CREATE INDEX IF NOT EXISTS idx_mentorship_preferences_user_id
+        ON mentorship_preferences (user_id);
+      -- comments on a participant in a session
+      CREATE INDEX IF NOT EXISTS idx_comments_target_user_id
+        ON comments (target_user_id, session_id);
+      -- a participant's mentees / mentor; the UNIQUE index leads with session_id
+      CREATE INDEX IF NOT EXISTS idx_matching_pairs_mentor_id
+        ON matching_pairs (mentor_id, session_id);
+      CREATE INDEX IF NOT EXISTS idx_matching_pairs_mentee_id
+        ON matching_pairs (mentee_id, session_id);
+      -- session browser
+      CREATE INDEX IF NOT EXISTS idx_sessions_status
+        ON sessions (status);
+    `
+  },
+  {
+    version: 2,
+    name: "profile picture index",
+    // Avatar clean-up checks whether any profile still uses a picture
+    sql: `
+      CREATE INDEX IF NOT EXISTS idx_profiles_picture_url
+        ON profiles (profile_picture_url);
+    `
+  },
+  {
+    version: 3,
+    name: "participant pair counts",
+    // applications.pair_count is how many matching_pairs rows the applicant
+    // is in for that session: a mentor's mentees, or a mentee's mentor.
+    // Triggers keep it current for every writer, so the admin participant
+    // list reads it instead of counting pairs on each request.
+    sql: `
+      ALTER TABLE applications ADD COLUMN pair_count INTEGER NOT NULL DEFAULT 0;
+      UPDATE applications SET pair_count = (
+        SELECT COUNT(*) FROM matching_pairs mp
+        WHERE mp.session_id = applications.session_id
+          AND applications.user_id IN (mp.mentor_id, mp.mentee_id)
+      );
+      CREATE TRIGGER IF NOT EXISTS trg_matching_pairs_count_insert
+      AFTER INSERT ON matching_pairs
+      BEGIN
+        UPDATE applications SET pair_count = pair_count + 1
+        WHERE session_id = NEW.session_id AND user_id IN (NEW.mentor_id, NEW.mentee_id);
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_matching_pairs_count_delete
+      AFTER DELETE ON matching_pairs
+      BEGIN
+        UPDATE applications SET pair_count = pair_count - 1
+        WHERE session_id = OLD.session_id AND user_id IN (OLD.mentor_id, OLD.mentee_id);
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_matching_pairs_count_update
+      AFTER UPDATE OF session_id, mentor_id, mentee_id ON matching_pairs
+      BEGIN
+        UPDATE applications SET pair_count = pair_count - 1
+        WHERE session_id = OLD.session_id AND user_id IN (OLD.mentor_id, OLD.mentee_id);
+        UPDATE applications SET pair_count = pair_count + 1
+        WHERE session_id = NEW.session_id AND user_id IN (NEW.mentor_id, NEW.mentee_id);
+      END;
+      -- admin participant list: one role's approved applicants, newest first
+      CREATE INDEX IF NOT EXISTS idx_applications_roster
+        ON applications (session_id, status, role, application_date, user_id);
+    `
+  },
+  {
+    version: 4,
+    name: "mentor search index",
+    // Full-text index behind GET /api/mentors, one row per profile with
+    // rowid = user_id, kept in step with profiles and mentorship_preferences
+    // by triggers. Inserts replace the whole row and sports is recomputed
+    // from all of the user's preferences, so INSERT OR REPLACE writers
+    // (whose implicit delete fires no trigger) stay correct.
+    sql: `
+      CREATE VIRTUAL TABLE IF NOT EXISTS mentor_search USING fts5 (
+        name, bio, city_suburb, sports,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3'
+      );
+      -- bm25 column weights: a name hit outranks one in the bio
+      INSERT INTO mentor_search (mentor_search, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0, 2.0)');
+      INSERT INTO mentor_search (rowid, name, bio, city_suburb, sports)
+        SELECT p.user_id,
+               COALESCE(p.first_name, '') || ' ' || COALESCE(p.last_name, ''),
+               p.bio,
+               p.city_suburb,
+               (SELECT group_concat(mp.sports_activities, ' ') FROM mentorship_preferences mp WHERE mp.user_id = p.user_id)
+        FROM profiles p;
+      CREATE TRIGGER IF NOT EXISTS trg_profiles_search_insert
+      AFTER INSERT ON profiles
+      BEGIN
+        DELETE FROM mentor_search WHERE rowid = NEW.user_id;
+        INSERT INTO mentor_search (rowid, name, bio, city_suburb, sports) VALUES (
+          NEW.user_id,
+          COALESCE(NEW.first_name, '') || ' ' || COALESCE(NEW.last_name, ''),
+          NEW.bio,
+          NEW.city_suburb,
+          (SELECT group_concat(sports_activities, ' ') FROM mentorship_preferences WHERE user_id = NEW.user_id)
+        );
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_profiles_search_update
+      AFTER UPDATE OF first_name, last_name, bio, city_suburb ON profiles
+      BEGIN
+        UPDATE mentor_search SET
+          name = COALESCE(NEW.first_name, '') || ' ' || COALESCE(NEW.last_name, ''),
+          bio = NEW.bio,
+          city_suburb = NEW.city_suburb
+        WHERE rowid = NEW.user_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_profiles_search_delete
+      AFTER DELETE ON profiles
+      BEGIN
+        DELETE FROM mentor_search WHERE rowid = OLD.user_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_preferences_search_insert
+      AFTER INSERT ON mentorship_preferences
+      BEGIN
+        UPDATE mentor_search
+        SET sports = (SELECT group_concat(sports_activities, ' ') FROM mentorship_preferences WHERE user_id = NEW.user_id)
+        WHERE rowid = NEW.user_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_preferences_search_update
+      AFTER UPDATE OF sports_activities ON mentorship_preferences
+      BEGIN
+        UPDATE mentor_search
+        SET sports = (SELECT group_concat(sports_activities, ' ') FROM mentorship_preferences WHERE user_id = NEW.user_id)
+        WHERE rowid = NEW.user_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_preferences_search_delete
+      AFTER DELETE ON mentorship_preferences
+      BEGIN
+        UPDATE mentor_search
+        SET sports = (SELECT group_concat(sports_activities, ' ') FROM mentorship_preferences WHERE user_id = OLD.user_id)
+        WHERE rowid = OLD.user_id;
+      END;
+    `
+  },
+  {
+    version: 5,
+    name: "survey completion flags",
+    // applications.survey_sections has bit 1 set when the application has
+    // mentorship preferences, 2 for lifestyle answers and 4 for Enneagram
+    // answers; 7 is a complete survey. Triggers keep it current for every
+    // writer (application_id is the primary key of the answer tables and
+    // is never updated), so latest-survey reads one partial index instead
+    // of probing the three tables for each application.
+    sql: `
+      ALTER TABLE applications ADD COLUMN survey_sections INTEGER NOT NULL DEFAULT 0;
+      UPDATE applications SET survey_sections =
+        (CASE WHEN EXISTS (SELECT 1 FROM mentorship_preferences WHERE application_id = applications.id) THEN 1 ELSE 0 END)
+        | (CASE WHEN EXISTS (SELECT 1 FROM lifestyle_answers WHERE application_id = applications.id) THEN 2 ELSE 0 END)
+        | (CASE WHEN EXISTS (SELECT 1 FROM enneagram_answers WHERE application_id = applications.id) THEN 4 ELSE 0 END);
+      CREATE TRIGGER IF NOT EXISTS trg_preferences_section_insert
+      AFTER INSERT ON mentorship_preferences
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections | 1 WHERE id = NEW.application_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_preferences_section_delete
+      AFTER DELETE ON mentorship_preferences
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections & ~1 WHERE id = OLD.application_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_lifestyle_section_insert
+      AFTER INSERT ON lifestyle_answers
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections | 2 WHERE id = NEW.application_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_lifestyle_section_delete
+      AFTER DELETE ON lifestyle_answers
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections & ~2 WHERE id = OLD.application_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_enneagram_section_insert
+      AFTER INSERT ON enneagram_answers
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections | 4 WHERE id = NEW.application_id;
+      END;
+      CREATE TRIGGER IF NOT EXISTS trg_enneagram_section_delete
+      AFTER DELETE ON enneagram_answers
+      BEGIN
+        UPDATE applications SET survey_sections = survey_sections & ~4 WHERE id = OLD.application_id;
+      END;
+      -- latest-survey: a user's complete surveys, newest first
+      CREATE INDEX IF NOT EXISTS idx_applications_complete_survey
+        ON applications (user_id, application_date) WHERE survey_sections = 7;
+    `
+  },
+  {
+    version: 6,
+    name: "foreign key indexes",
+    // The rest of the indexes database_schema.sql declares. Deleting an
+    // application or a user looks up the rows that reference it, which
+    // scanned participants and comments without these.
+    sql: `
+      CREATE INDEX IF NOT EXISTS idx_participants_application_id
+        ON participants (application_id);
+      CREATE INDEX IF NOT EXISTS idx_comments_commenter_id
+        ON comments (commenter_id);
+    `
+  }
+];
+
+function exec(db, sql) {
+  return new Promise((resolve, reject) => {
+    db.exec(sql, (err) => (err ? reject(err) : resolve()));
+  });
+}
+
+function appliedVersions(db) {
+  return new Promise((resolve, reject) => {
+    db.all(`SELECT version FROM schema_migrations`, (err, rows) => {
+      if (err) return reject(err);
+      resolve(new Set(rows.map((row) => row.version)));
+    });
+  });
+}
+
+/**
+ * Applies every migration not yet recorded in schema_migrations, in
+ * version order.
+ *
+ * Call it synchronously inside db.serialize() so its first statement
+ * waits for the schema statements queued before it. Each migration and its
+ * schema_migrations row are sent as one exec batch, so no other statement
+ * on the connection can end up inside its transaction.
+ * @param {sqlite3.Database} db
+ * @param {Array<{version: number, name: string, sql: string}>} [migrations]
+ * @returns {Promise<number[]>} the versions applied by this call
+ */
+async function runMigrations(db, migrations = MIGRATIONS) {
+  await exec(db, `
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version INTEGER PRIMARY KEY,
+      name TEXT NOT NULL,
+      applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+  `);
+
+  let applied = await appliedVersions(db);
+  const ran = [];
+  const pending = [...migrations].sort((a, b) => a.version - b.version);
+  for (const migration of pending) {
+    if (applied.has(migration.version)) continue;
+    const name = migration.name.replace(/'/g, "''");
+    try {
+      // IMMEDIATE takes the write lock up front, so a second server process
+      // waits here and then finds the version already recorded
+      await exec(db, `
+        BEGIN IMMEDIATE;
+        ${migration.sql};
+        INSERT INTO schema_migrations (version, name) VALUES (${Number(migration.version)}, '${name}');
+        COMMIT;
+      `);
+    } catch (err) {
+      await exec(db, "ROLLBACK").catch(() => {});
+      applied = await appliedVersions(db);
+      if (applied.has(migration.version)) continue;
+      throw new Error(`Migration ${migration.version} (${migration.name}) failed: ${err.message}`);
+    }
+    logger.info(`🗂️ Applied migration ${migration.version}: ${migration.name}`);
+    ran.push(migration.version);
+  }
+  return ran;
+}
+
+module.exports = { MIGRATIONS, runMigrations };
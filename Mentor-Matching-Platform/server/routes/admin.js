@@ -2,6 +2,32 @@ const express = require("express");
 const router = express.Router();
 const db = require("../db");
 const { ensureAdmin } = require("../middlewares/auth"); // Middleware to restrict access to admins only
+const { scoreSession, topMentorsForRow, roundScore } = require("../utils/matchAlgorithm");
+const { parseAssignmentOptions, assignSessionMentors } = require("../utils/sessionAssignment");
+const recommendationCache = require("../utils/recommendationCache");
+const jobQueue = require("../utils/jobQueue");
+const { encodeCursor, decodeCursor } = require("../utils/pageCursor");
+const logger = require("../utils/logger");
+
+const MATCH_SESSION_JOB = "match-session";
+
+jobQueue.registerJobType(MATCH_SESSION_JOB, ({ sessionId, params }, onProgress) =>
+  assignSessionMentors(sessionId, params, { onProgress })
+);
+
+// Aborts scoring still running on the worker pool once the client has gone
+function requestSignal(res) {
+  const controller = new AbortController();
+  res.on("close", () => {
+    if (!res.writableEnded) controller.abort();
+  });
+  return controller.signal;
+}
+
+// 503 when the matching worker pool is saturated, so clients can retry
+function scoringErrorStatus(err) {
+  return err.code === "POOL_QUEUE_FULL" ? 503 : 500;
+}
 
 /**
  * GET /api/admin/sessions
@@ -31,7 +57,7 @@ router.get("/sessions", ensureAdmin, (req, res) => {
 
   db.all(sql, [], (err, rows) => {
     if (err) {
-      console.error(err);
+      logger.error(err);
       return res.status(500).json({ error: "Internal Server Error" });
     }
 
@@ -73,7 +99,7 @@ router.get("/sessions/:id/applications", ensureAdmin, (req, res) => {
     `;
   db.all(sql, [sessionId], (err, rows) => {
     if (err) {
-      console.error("Failed to load applications:", err);
+      logger.error("Failed to load applications:", err);
       return res.status(500).json({ error: "Internal Server Error" });
     }
     res.json(rows);
@@ -100,7 +126,7 @@ router.get("/sessions/:sessionId/applications/:id", ensureAdmin, (req, res) => {
     `;
   db.get(sql, [sessionId, id], (err, row) => {
     if (err) {
-      console.error(err);
+      logger.error(err);
       return res.status(500).json({ error: "Internal Server Error" });
     }
     if (!row) return res.status(404).json({ error: "Application not found" });
@@ -110,12 +136,14 @@ router.get("/sessions/:sessionId/applications/:id", ensureAdmin, (req, res) => {
 
 /**
  * PATCH /api/admin/sessions/:sessionId/applications/:id
- * Updates the application status (to 'approved', 'onhold', or 'pending')
+ * Updates the application status (to 'approved', 'onhold', or 'pending').
+ * An approved applicant joins the session's participants and leaves them
+ * again when moved back to 'onhold' or 'pending'.
  */
 router.patch(
   "/sessions/:sessionId/applications/:id",
   ensureAdmin,
-  (req, res) => {
+  async (req, res) => {
     const { id } = req.params;
     const { status } = req.body;
     const allowed = ["approved", "onhold", "pending"];
@@ -124,91 +152,349 @@ router.patch(
       return res.status(400).json({ error: "Invalid status" });
     }
 
-    const sql = `
-        UPDATE applications
-        SET status = ?
-        WHERE id = ?
-    `;
-    db.run(sql, [status, id], function (err) {
-      if (err) {
-        console.error("Failed to update status:", err);
-        return res.status(500).json({ error: "Internal Server Error" });
-      }
-      if (this.changes === 0) {
+    try {
+      const application = await db.transaction(async (tx) => {
+        const row = await tx.get(`SELECT session_id, user_id FROM applications WHERE id = ?`, [id]);
+        if (!row) return null;
+        await tx.run(`UPDATE applications SET status = ? WHERE id = ?`, [status, id]);
+        const membership = status === "approved"
+          ? await tx.run(
+              `INSERT OR IGNORE INTO participants (session_id, user_id, application_id) VALUES (?, ?, ?)`,
+              [row.session_id, row.user_id, id]
+            )
+          : await tx.run(
+              `DELETE FROM participants WHERE session_id = ? AND user_id = ?`,
+              [row.session_id, row.user_id]
+            );
+        return { ...row, joinedOrLeft: membership.changes > 0 };
+      });
+      if (!application) {
         return res.status(404).json({ error: "Application not found" });
       }
+
+      if (application.joinedOrLeft) {
+        // The status change is committed; a failure here must not report it failed
+        try {
+          await recommendationCache.invalidateApplicant(application.user_id, application.session_id);
+        } catch (err) {
+          logger.warn("⚠️ Failed to invalidate recommendations:", err.message);
+        }
+      }
       res.json({ message: "Status updated", status });
-    });
+    } catch (err) {
+      logger.error("Failed to update status:", err);
+      res.status(500).json({ error: "Internal Server Error" });
+    }
   }
 );
 
+/**
+ * PATCH /api/admin/sessions/:sessionId/applications/:id/capacity
+ * Sets how many mentees a mentor can take in this session. Body:
+ *  - menteeCapacity: a non-negative integer, or null for no limit
+ */
+router.patch("/sessions/:sessionId/applications/:id/capacity", ensureAdmin, async (req, res) => {
+  const { sessionId, id } = req.params;
+  const { menteeCapacity } = req.body || {};
+
+  if (menteeCapacity !== null && !(Number.isInteger(menteeCapacity) && menteeCapacity >= 0)) {
+    return res.status(400).json({ success: false, message: "menteeCapacity must be a non-negative integer or null" });
+  }
+
+  try {
+    const application = await db.getAsync(
+      `SELECT user_id FROM applications WHERE id = ? AND session_id = ?`,
+      [id, sessionId]
+    );
+    if (!application) {
+      return res.status(404).json({ success: false, message: "Application not found" });
+    }
+
+    await db.runAsync(`UPDATE applications SET mentee_capacity = ? WHERE id = ?`, [menteeCapacity, id]);
+    await recommendationCache.invalidateApplicant(application.user_id, sessionId);
+    res.json({ success: true, menteeCapacity });
+  } catch (err) {
+    logger.error("Error updating mentee capacity:", err.message);
+    res.status(500).json({ success: false, error: "Failed to update capacity" });
+  }
+});
+
+// Participant list sort orders: the ORDER BY key and its default direction
+const PARTICIPANT_SORTS = {
+  joined: { key: "a.application_date", order: "DESC" },
+  name: { key: "(COALESCE(pr.first_name, '') || ' ' || COALESCE(pr.last_name, '') COLLATE NOCASE)", order: "ASC" },
+};
+const PARTICIPANT_PAGE_SIZE = 50;
+const MAX_PARTICIPANT_PAGE_SIZE = 200;
+
+// Escapes LIKE wildcards so a name prefix matches literally
+function likePrefix(text) {
+  return `${text.replace(/[\\%_]/g, (c) => `\\${c}`)}%`;
+}
 
 /**
- * GET /api/admin/sessions/:sessionId/participants
- * Returns both mentors and mentees for a session
+ * Reads and validates the participant list query string.
+ * @returns {{error: string} | {role, matched, prefix, sort, order, limit, after}}
  */
-router.get("/sessions/:sessionId/participants", (req, res) => {
-  const { sessionId } = req.params;
+function parseParticipantQuery(query) {
+  const { role, matched, q, sort = "joined", order, limit, cursor } = query;
+  if (role !== undefined && role !== "mentor" && role !== "mentee") {
+    return { error: "role must be 'mentor' or 'mentee'" };
+  }
+  if (matched !== undefined && matched !== "true" && matched !== "false") {
+    return { error: "matched must be 'true' or 'false'" };
+  }
+  if (!PARTICIPANT_SORTS[sort]) {
+    return { error: `sort must be one of: ${Object.keys(PARTICIPANT_SORTS).join(", ")}` };
+  }
+  if (order !== undefined && order !== "asc" && order !== "desc") {
+    return { error: "order must be 'asc' or 'desc'" };
+  }
+  const size = limit === undefined ? PARTICIPANT_PAGE_SIZE : Number(limit);
+  if (!Number.isInteger(size) || size < 1) {
+    return { error: "limit must be a positive integer" };
+  }
+  const after = cursor === undefined ? null : decodeCursor(cursor);
+  if (cursor !== undefined && !after) {
+    return { error: "Invalid cursor" };
+  }
+  return {
+    role,
+    matched: matched === undefined ? undefined : matched === "true",
+    prefix: typeof q === "string" && q.trim() ? q.trim() : null,
+    sort: PARTICIPANT_SORTS[sort],
+    order: order ? order.toUpperCase() : PARTICIPANT_SORTS[sort].order,
+    limit: Math.min(size, MAX_PARTICIPANT_PAGE_SIZE),
+    after,
+  };
+}
 
-  // SQL query for mentors
-  const mentorsSql = `
-    SELECT
-      p.user_id AS id,
-      u.email,
-      pr.first_name || ' ' || pr.last_name AS name,
-      COUNT(mp.mentee_id) AS assigned_mentees,
-      a.application_date AS join_date
-    FROM participants p
-    JOIN applications a ON p.application_id = a.id
-    JOIN users u ON p.user_id = u.id
-    LEFT JOIN profiles pr ON u.id = pr.user_id
-    LEFT JOIN matching_pairs mp ON p.user_id = mp.mentor_id AND p.session_id = mp.session_id
-    WHERE p.session_id = ? AND a.role = 'mentor' AND a.status = 'approved'
-    GROUP BY p.user_id
-    ORDER BY a.application_date DESC
-  `;
+/**
+ * The participant list query for one page, from parseParticipantQuery's
+ * options.
+ * @returns {{sql: string, params: Array}}
+ */
+function participantListQuery(sessionId, { role, matched, prefix, sort, order, limit, after }) {
+  const conditions = [];
+  const params = [sessionId];
+  if (role) {
+    conditions.push("a.role = ?");
+    params.push(role);
+  }
+  if (matched !== undefined) {
+    conditions.push(matched ? "a.pair_count > 0" : "a.pair_count = 0");
+  }
+  if (prefix) {
+    conditions.push("(pr.first_name LIKE ? ESCAPE '\\' OR pr.last_name LIKE ? ESCAPE '\\')");
+    params.push(likePrefix(prefix), likePrefix(prefix));
+  }
+  if (after) {
+    conditions.push(`(${sort.key}, a.user_id) ${order === "DESC" ? "<" : ">"} (?, ?)`);
+    params.push(...after);
+  }
+  // One row more than the page tells whether there is a next page
+  params.push(limit + 1);
 
-  // SQL query for mentees
-  const menteesSql = `
+  // A mentee's mentor comes from their earliest pair in the session
+  const sql = `
     SELECT
-      p.user_id AS id,
+      a.user_id AS id,
       u.email,
+      a.role,
       pr.first_name || ' ' || pr.last_name AS name,
+      a.application_date AS join_date,
+      a.pair_count,
       mp.created_at AS matched_date,
       mentor_pr.first_name || ' ' || mentor_pr.last_name AS assigned_mentor,
-      a.application_date
-    FROM participants p
-    JOIN applications a ON p.application_id = a.id
-    JOIN users u ON p.user_id = u.id
-    LEFT JOIN profiles pr ON u.id = pr.user_id
-    LEFT JOIN matching_pairs mp ON p.user_id = mp.mentee_id AND p.session_id = mp.session_id
-    LEFT JOIN users mentor_u ON mp.mentor_id = mentor_u.id
-    LEFT JOIN profiles mentor_pr ON mentor_u.id = mentor_pr.user_id
-    WHERE p.session_id = ? AND a.role = 'mentee' AND a.status = 'approved'
-    GROUP BY p.user_id
-    ORDER BY a.application_date DESC
+      ${sort.key} AS sort_key
+    FROM applications a
+    JOIN participants p ON p.session_id = a.session_id AND p.user_id = a.user_id
+    JOIN users u ON u.id = a.user_id
+    LEFT JOIN profiles pr ON pr.user_id = a.user_id
+    LEFT JOIN matching_pairs mp ON a.role = 'mentee' AND mp.id = (
+      SELECT id FROM matching_pairs
+      WHERE mentee_id = a.user_id AND session_id = a.session_id
+      ORDER BY id
+      LIMIT 1
+    )
+    LEFT JOIN profiles mentor_pr ON mentor_pr.user_id = mp.mentor_id
+    WHERE a.session_id = ? AND a.status = 'approved'
+      ${conditions.map((condition) => `AND ${condition}`).join("\n      ")}
+    ORDER BY ${sort.key} ${order}, a.user_id ${order}
+    LIMIT ?
   `;
+  return { sql, params };
+}
 
-  // Execute both queries
-  db.all(mentorsSql, [sessionId], (err, mentors) => {
-    if (err) return res.status(500).json({ error: "Failed to fetch mentors" });
-
-    db.all(menteesSql, [sessionId], (err, mentees) => {
-      if (err) return res.status(500).json({ error: "Failed to fetch mentees" });
-
-      // Combine results and send response
-      res.json({
-        mentors: mentors.map((r) => ({
-          ...r,
-          assigned_mentees: r.assigned_mentees || 0,
-        })),
-        mentees: mentees.map((r) => ({
-          ...r,
-          assigned_mentor: r.assigned_mentor || "Not assigned",
-        })),
-      });
+/**
+ * GET /api/admin/sessions/:sessionId/participants
+ * Returns one page of the session's approved participants, mentors and
+ * mentees together. Query:
+ *  - role: 'mentor' or 'mentee' (default both)
+ *  - matched: 'true' for participants with a pair, 'false' for those without
+ *  - q: name prefix, matched against first or last name
+ *  - sort: 'joined' (default, newest first) or 'name' (A to Z)
+ *  - order: 'asc' or 'desc' to reverse the sort's default direction
+ *  - limit: page size (default 50, at most 200)
+ *  - cursor: nextCursor from the previous page
+ * The first page also carries counts: { mentor, mentee }, the number of
+ * approved participants in each role whatever the filters, counted off
+ * idx_applications_roster without reading the table.
+ * Each page costs the same however large the session is: pair counts come
+ * from applications.pair_count, and with a role the joined order is read
+ * straight off idx_applications_roster.
+ */
+router.get("/sessions/:sessionId/participants", ensureAdmin, async (req, res) => {
+  const { sessionId } = req.params;
+  const options = parseParticipantQuery(req.query);
+  if (options.error) return res.status(400).json({ error: options.error });
+
+  const { limit } = options;
+  const { sql, params } = participantListQuery(sessionId, options);
+
+  try {
+    const [rows, counts] = await Promise.all([
+      db.allAsync(sql, params),
+      options.after ? null : db.getAsync(`
+        SELECT
+          COALESCE(SUM(a.role = 'mentor'), 0) AS mentor,
+          COALESCE(SUM(a.role = 'mentee'), 0) AS mentee
+        FROM applications a
+        JOIN participants p ON p.session_id = a.session_id AND p.user_id = a.user_id
+        WHERE a.session_id = ? AND a.status = 'approved'
+      `, [sessionId]),
+    ]);
+    const page = rows.slice(0, limit);
+    const last = page[page.length - 1];
+    res.json({
+      ...(counts && { counts: { mentor: counts.mentor, mentee: counts.mentee } }),
+      participants: page.map((r) => {
+        const participant = { id: r.id, email: r.email, name: r.name, role: r.role, join_date: r.join_date };
+        if (r.role === "mentor") {
+          participant.assigned_mentees = r.pair_count || 0;
+        } else {
+          participant.assigned_mentor = r.assigned_mentor || "Not assigned";
+          participant.matched_date = r.matched_date;
+        }
+        return participant;
+      }),
+      nextCursor: rows.length > limit ? encodeCursor(last.sort_key, last.id) : null,
     });
-  });
+  } catch (err) {
+    logger.error("Failed to fetch participants:", err);
+    res.status(500).json({ error: "Failed to fetch participants" });
+  }
+});
+
+/**
+ * GET /api/admin/sessions/:sessionId/match-scores
+ * Scores every mentee in the session against every mentor in one pass.
+ * Query: top - number of recommendations returned per mentee (default 3)
+ * Returns the mentor list, each mentee with its top recommendations, and
+ * the full score matrix (one row per mentee, columns in mentor order)
+ */
+router.get("/sessions/:sessionId/match-scores", ensureAdmin, async (req, res) => {
+  const { sessionId } = req.params;
+  const top = Math.max(1, parseInt(req.query.top, 10) || 3);
+
+  try {
+    const result = await scoreSession(sessionId, { signal: requestSignal(res) });
+    const cols = result.mentors.length;
+    const scores = [];
+    for (let i = 0; i < result.mentees.length; i++) {
+      scores.push(Array.from(result.scores.subarray(i * cols, (i + 1) * cols), roundScore));
+    }
+
+    res.json({
+      success: true,
+      sessionId: Number(sessionId),
+      mentors: result.mentors.map((m) => ({
+        id: m.user_id,
+        name: `${m.first_name} ${m.last_name}`,
+        email: m.email,
+      })),
+      mentees: result.mentees.map((m, i) => ({
+        id: m.user_id,
+        name: `${m.first_name} ${m.last_name}`,
+        email: m.email,
+        recommendations: topMentorsForRow(result, i, top),
+      })),
+      scores,
+    });
+  } catch (err) {
+    logger.error("Error scoring session:", err.message);
+    res.status(scoringErrorStatus(err)).json({ success: false, error: "Failed to score session" });
+  }
+});
+
+/**
+ * POST /api/admin/sessions/:sessionId/assign-mentors
+ * Pairs every unpaired mentee in the session with a mentor so that the total
+ * match score is as high as possible, respecting each mentor's capacity.
+ * Existing pairs are kept and count against their mentor's capacity, and
+ * pairs with incompatible meeting preferences are never made. A capacity
+ * set on the mentor's application takes precedence over the body.
+ * Body:
+ *  - capacity: default number of mentees per mentor (default 1)
+ *  - capacities: optional { [mentorId]: capacity } overrides
+ *  - minScore: pairs scoring below this are never made (default 0)
+ *  - dryRun: when true, returns the pairing without saving it
+ */
+router.post("/sessions/:sessionId/assign-mentors", ensureAdmin, async (req, res) => {
+  const { sessionId } = req.params;
+  const { options, error } = parseAssignmentOptions(req.body);
+  if (error) return res.status(400).json({ success: false, message: error });
+
+  try {
+    const result = await assignSessionMentors(sessionId, options, { signal: requestSignal(res) });
+    res.json({ success: true, ...result });
+  } catch (err) {
+    logger.error("Error assigning mentors:", err.message);
+    res.status(scoringErrorStatus(err)).json({ success: false, error: "Failed to assign mentors" });
+  }
+});
+
+/**
+ * POST /api/admin/sessions/:sessionId/match-jobs
+ * Queues the assign-mentors run for a session as a background job and
+ * returns it right away (202). Takes the same body as assign-mentors. If a
+ * run for the session is already queued or running, that job is returned
+ * instead (200, deduplicated: true).
+ */
+router.post("/sessions/:sessionId/match-jobs", ensureAdmin, async (req, res) => {
+  const { sessionId } = req.params;
+  const { options, error } = parseAssignmentOptions(req.body);
+  if (error) return res.status(400).json({ success: false, message: error });
+
+  try {
+    const { job, deduplicated } = await jobQueue.enqueue(
+      MATCH_SESSION_JOB,
+      Number(sessionId),
+      options,
+      req.session?.user?.id ?? null
+    );
+    res.status(deduplicated ? 200 : 202)
+      .location(`/api/admin/jobs/${job.id}`)
+      .json({ success: true, deduplicated, job });
+  } catch (err) {
+    logger.error("Error queueing match job:", err.message);
+    res.status(500).json({ success: false, error: "Failed to queue matching job" });
+  }
+});
+
+/**
+ * GET /api/admin/jobs/:id
+ * Status, progress (0-1) and, once succeeded, the result of a background job
+ */
+router.get("/jobs/:id", ensureAdmin, async (req, res) => {
+  try {
+    const job = await jobQueue.getJob(req.params.id);
+    if (!job) return res.status(404).json({ success: false, message: "Job not found" });
+    res.json({ success: true, job });
+  } catch (err) {
+    logger.error("Error fetching job:", err.message);
+    res.status(500).json({ success: false, error: "Failed to fetch job" });
+  }
 });
 
 /**
@@ -229,7 +515,7 @@ router.get("/participants/:userId/profile", ensureAdmin, (req, res) => {
 
     db.get(query, [userId], (err, row) => {
         if (err) {
-            console.error("DB error:", err);
+            logger.error("DB error:", err);
             return res.status(500).json({ success: false, message: "Database error" });
         }
         if (!row) {
@@ -260,7 +546,7 @@ router.get("/participants/:userId/preferences", ensureAdmin, async (req, res) =>
 
         res.json({ success: true, preferences });
     } catch (err) {
-        console.error("Error fetching preferences:", err.message);
+        logger.error("Error fetching preferences:", err.message);
         res.status(500).json({ success: false, error: "Failed to fetch preferences" });
     }
 });
@@ -273,40 +559,45 @@ router.get("/participants/:userId/match", ensureAdmin, async (req, res) => {
     const { userId } = req.params;
 
     try {
-        // Check if the user is a mentor
-        const mentorMatch = await db.allAsync(`
-            SELECT 
+        // The user's mentees (as a mentor) and mentor (as a mentee) in one query
+        const rows = await db.allAsync(`
+            SELECT
+                'mentor' AS role,
                 mp.mentee_id AS user_id,
                 mentee_pr.first_name || ' ' || mentee_pr.last_name AS name
             FROM matching_pairs mp
             LEFT JOIN profiles mentee_pr ON mp.mentee_id = mentee_pr.user_id
             WHERE mp.mentor_id = ?
-        `, [userId]);
-
-        // Check if the user is a mentee
-        const menteeMatch = await db.getAsync(`
-            SELECT 
-                mp.mentor_id AS user_id,
-                mentor_pr.first_name || ' ' || mentor_pr.last_name AS name
+            UNION ALL
+            SELECT
+                'mentee',
+                mp.mentor_id,
+                mentor_pr.first_name || ' ' || mentor_pr.last_name
             FROM matching_pairs mp
             LEFT JOIN profiles mentor_pr ON mp.mentor_id = mentor_pr.user_id
             WHERE mp.mentee_id = ?
-        `, [userId]);
+        `, [userId, userId]);
+
+        const mentees = rows.filter((row) => row.role === "mentor").map(({ user_id, name }) => ({ user_id, name }));
+        const mentor = rows.find((row) => row.role === "mentee");
 
-        if (mentorMatch.length > 0) {
+        if (mentees.length > 0) {
             // User is a mentor, return their mentees
-            return res.json({ success: true, role: "mentor", mentees: mentorMatch });
-        } else if (menteeMatch) {
+            return res.json({ success: true, role: "mentor", mentees });
+        } else if (mentor) {
             // User is a mentee, return their mentor
-            return res.json({ success: true, role: "mentee", mentor: menteeMatch });
+            return res.json({ success: true, role: "mentee", mentor: { user_id: mentor.user_id, name: mentor.name } });
         } else {
             return res.status(404).json({ success: false, message: "No match found" });
         }
     } catch (err) {
-        console.error("Error fetching match:", err.message);
+        logger.error("Error fetching match:", err.message);
         res.status(500).json({ success: false, error: "Failed to fetch match" });
     }
 });
 
 module.exports = router;
+// For scripts/checkQueryPlans.js
+module.exports.PARTICIPANT_SORTS = PARTICIPANT_SORTS;
+module.exports.participantListQuery = participantListQuery;
 
@@ -4,10 +4,22 @@
  */
 
 const express = require("express");
-const bcrypt = require("bcrypt");
 const db = require("../db");
+const passwords = require("../utils/passwordHasher");
+const logger = require("../utils/logger");
 const router = express.Router();
 
+// Re-hashes a password stored with an outdated bcrypt cost. Runs after the
+// login response; the update is skipped if the hash changed meanwhile.
+async function rehashPassword(user, password) {
+    if (!passwords.needsRehash(user.password_hash)) return;
+    const newHash = await passwords.hash(password);
+    await db.runAsync(
+        `UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?`,
+        [newHash, user.id, user.password_hash]
+    );
+}
+
 /**
  * @route POST /register
  * @group Auth - Operations about user authentication
@@ -19,6 +31,7 @@ const router = express.Router();
  * @returns {object} 200 - Success with created user ID
  * @returns {object} 400 - Validation error
  * @returns {object} 500 - Database or server error
+ * @returns {object} 503 - Too many passwords being hashed, retry shortly
  */
 router.post("/register", async (req, res) => {
     const { email, password, securityQuestion, securityAnswer } = req.body;
@@ -30,7 +43,7 @@ router.post("/register", async (req, res) => {
     try {
         db.get("SELECT * FROM users WHERE email = ?", [email], async (err, row) => {
             if (err) {
-                console.error("DB error:", err);
+                logger.error("DB error:", err);
                 return res.status(500).json({ success: false, message: "Database error." });
             }
 
@@ -38,8 +51,15 @@ router.post("/register", async (req, res) => {
                 return res.status(400).json({ success: false, message: "Email already registered." });
             }
 
-            const hashedPassword = await bcrypt.hash(password, 10);
-            const hashedAnswer = await bcrypt.hash(securityAnswer, 10);
+            let hashedPassword, hashedAnswer;
+            try {
+                [hashedPassword, hashedAnswer] = await Promise.all([
+                    passwords.hash(password),
+                    passwords.hash(securityAnswer),
+                ]);
+            } catch (hashErr) {
+                return passwords.sendHashError(res, hashErr);
+            }
 
             const stmt = `
                 INSERT INTO users (email, password_hash, security_question, security_answer_hash)
@@ -48,7 +68,7 @@ router.post("/register", async (req, res) => {
 
             db.run(stmt, [email, hashedPassword, securityQuestion, hashedAnswer], function (err) {
                 if (err) {
-                    console.error("Insert error:", err.message);
+                    logger.error("Insert error:", err.message);
                     return res.status(500).json({ success: false, message: "Failed to register user." });
                 }
 
@@ -56,7 +76,7 @@ router.post("/register", async (req, res) => {
             });
         });
     } catch (err) {
-        console.error("Server error:", err);
+        logger.error("Server error:", err);
         return res.status(500).json({ success: false, message: "Internal server error." });
     }
 });
@@ -70,6 +90,7 @@ router.post("/register", async (req, res) => {
  * @returns {object} 200 - Login successful
  * @returns {object} 401 - Invalid credentials
  * @returns {object} 500 - Server or database error
+ * @returns {object} 503 - Too many passwords being checked, retry shortly
  */
 router.post("/login", (req, res) => {
     const { email, password } = req.body;
@@ -83,7 +104,7 @@ router.post("/login", (req, res) => {
     const query = `SELECT * FROM users WHERE email = ?`;
     db.get(query, [email], async (err, row) => {
       if (err) {
-        console.error(err);
+        logger.error(err);
         return res
           .status(500)
           .json({ success: false, message: "Database error." });
@@ -94,12 +115,21 @@ router.post("/login", (req, res) => {
           .json({ success: false, message: "Invalid email or password." });
       }
   
-      const match = await bcrypt.compare(password, row.password_hash);
+      let match;
+      try {
+        match = await passwords.compare(password, row.password_hash);
+      } catch (hashErr) {
+        return passwords.sendHashError(res, hashErr);
+      }
       if (!match) {
         return res
           .status(401)
           .json({ success: false, message: "Invalid email or password." });
       }
+
+      rehashPassword(row, password).catch((rehashErr) => {
+        logger.error("Rehash error:", rehashErr.message);
+      });
   
       // ✅ Fetch profile_picture_url from the profiles table
       const profileQuery = `
@@ -109,7 +139,7 @@ router.post("/login", (req, res) => {
       `;
       db.get(profileQuery, [row.id], (err2, profileRow) => {
         if (err2) {
-          console.error(err2);
+          logger.error(err2);
           return res
             .status(500)
             .json({ success: false, message: "Failed to fetch profile info." });
@@ -145,6 +175,7 @@ router.post("/login", (req, res) => {
  * @returns {object} 403 - Security answer mismatch
  * @returns {object} 404 - User not found
  * @returns {object} 500 - Server or database error
+ * @returns {object} 503 - Too many passwords being hashed, retry shortly
  */
 router.post("/forgot-password", (req, res) => {
     const { email, securityAnswer, newPassword } = req.body;
@@ -156,7 +187,7 @@ router.post("/forgot-password", (req, res) => {
     const query = `SELECT * FROM users WHERE email = ?`;
     db.get(query, [email], async (err, row) => {
         if (err) {
-            console.error("DB error:", err);
+            logger.error("DB error:", err);
             return res.status(500).json({ success: false, message: "Database error." });
         }
 
@@ -164,17 +195,21 @@ router.post("/forgot-password", (req, res) => {
             return res.status(404).json({ success: false, message: "No user found with that email." });
         }
 
-        const answerMatch = await bcrypt.compare(securityAnswer, row.security_answer_hash);
-        if (!answerMatch) {
-            return res.status(403).json({ success: false, message: "Security answer does not match." });
+        let newHash;
+        try {
+            const answerMatch = await passwords.compare(securityAnswer, row.security_answer_hash);
+            if (!answerMatch) {
+                return res.status(403).json({ success: false, message: "Security answer does not match." });
+            }
+            newHash = await passwords.hash(newPassword);
+        } catch (hashErr) {
+            return passwords.sendHashError(res, hashErr);
         }
-
-        const newHash = await bcrypt.hash(newPassword, 10);
         const updateStmt = `UPDATE users SET password_hash = ? WHERE email = ?`;
 
         db.run(updateStmt, [newHash, email], function (err) {
             if (err) {
-                console.error("Update error:", err);
+                logger.error("Update error:", err);
                 return res.status(500).json({ success: false, message: "Failed to reset password." });
             }
 
@@ -203,7 +238,7 @@ router.get("/me", (req, res) => {
 
     db.get(query, [userId], (err, row) => {
         if (err || !row) {
-            console.error("DB error in /api/me:", err);
+            logger.error("DB error in /api/me:", err);
             return res.status(500).json({ success: false });
         }
 
@@ -1,91 +1,113 @@
 // server/routes/avatar.js
 const express = require("express");
 const multer = require("multer");
-const path = require("path");
 const db = require("../db.js"); // SQLite3 database instance
 const { ensureAuthenticated } = require("../middlewares/auth"); // Authentication middleware
+const avatarStore = require("../utils/avatarStore");
+const logger = require("../utils/logger");
 
 const router = express.Router();
 
-// Configure multer storage: save uploaded files to client/public/images
-const storage = multer.diskStorage({
-    destination: (req, file, cb) => {
-        // __dirname is server/routes, go up two levels to project root
-        cb(
-            null,
-            path.join(__dirname, "..", "..", "client", "public", "images")
-        );
-    },
-    filename: (req, file, cb) => {
-        // Generate filename: original name (sanitized) + timestamp + extension
-        const origExt = path.extname(file.originalname);
-        const ext = origExt || ".jpg";
-        const base = path
-            .basename(file.originalname, origExt)
-            .replace(/\s+/g, "_")
-            .toLowerCase();
-        cb(null, `${base}-${Date.now()}${ext}`);
-    },
+// Stream the upload to a temporary file, hashing it on the way; anything
+// over the size cap is cut off and rejected
+const upload = multer({
+    storage: new avatarStore.AvatarUploadStorage(),
+    limits: { fileSize: avatarStore.MAX_UPLOAD_BYTES, files: 1 },
+    fileFilter: (req, file, cb) => cb(null, /^image\//.test(file.mimetype)),
 });
 
-const upload = multer({ storage });
+// Runs the upload middleware, answering multer's limit errors as JSON
+function receiveAvatar(req, res, next) {
+    upload.single("avatar")(req, res, (err) => {
+        if (!err) return next();
+        if (err.code === "LIMIT_FILE_SIZE") {
+            const maxMb = Math.round(avatarStore.MAX_UPLOAD_BYTES / (1024 * 1024));
+            return res.status(413).json({ success: false, message: `Image must be ${maxMb} MB or smaller` });
+        }
+        if (err instanceof multer.MulterError) {
+            return res.status(400).json({ success: false, message: err.message });
+        }
+        return next(err);
+    });
+}
+
+// Points the user's profile at a new picture, creating the profile row if needed
+function setProfilePicture(userId, url) {
+    return new Promise((resolve, reject) => {
+        db.run(
+            "UPDATE profiles SET profile_picture_url = ? WHERE user_id = ?",
+            [url, userId],
+            function (err) {
+                if (err) return reject(err);
+                // If no rows updated, insert a new profile record
+                if (this.changes === 0) {
+                    db.run(
+                        "INSERT INTO profiles (user_id, profile_picture_url) VALUES (?, ?)",
+                        [userId, url],
+                        (insertErr) => {
+                            if (insertErr) return reject(insertErr);
+                            resolve();
+                        }
+                    );
+                } else {
+                    resolve();
+                }
+            }
+        );
+    });
+}
 
 /**
  * POST /api/profile/avatar
  * Middleware: ensureAuthenticated
- * - Uploads a single file from field 'avatar'
- * - Saves file to public/images
- * - Updates or inserts into profiles table
+ * - Uploads a single image from field 'avatar' (AVATAR_MAX_BYTES, default 5 MB)
+ * - Stores 64/128/256 px WebP variants named by content hash
+ * - Points the profile at the 256 px variant and deletes the previous
+ *   avatar's files if nobody else uses them
+ * Responds with { success, url, variants: { 64, 128, 256 } }
  */
 router.post(
     "/profile/avatar",
     ensureAuthenticated,
-    upload.single("avatar"),
+    receiveAvatar,
     async (req, res) => {
-        console.log("▶ avatar upload hit");
-        console.log("  req.file =", req.file);
-        console.log("  req.user =", req.user);
-
         // Check that file was uploaded
         if (!req.file) {
             return res.status(400).json({ success: false, message: "No file uploaded" });
         }
 
-        const publicUrl = `/images/${req.file.filename}`;
         const userId = req.user.id;
 
         try {
-            // Attempt to update existing profile
-            await new Promise((resolve, reject) => {
-                db.run(
-                    "UPDATE profiles SET profile_picture_url = ? WHERE user_id = ?",
-                    [publicUrl, userId],
-                    function (err) {
-                        if (err) return reject(err);
-                        // If no rows updated, insert a new profile record
-                        if (this.changes === 0) {
-                            db.run(
-                                "INSERT INTO profiles (user_id, profile_picture_url) VALUES (?, ?)",
-                                [userId, publicUrl],
-                                (insertErr) => {
-                                    if (insertErr) return reject(insertErr);
-                                    resolve();
-                                }
-                            );
-                        } else {
-                            resolve();
-                        }
-                    }
-                );
-            });
+            const previous = await db.getAsync(
+                "SELECT profile_picture_url FROM profiles WHERE user_id = ?",
+                [userId]
+            );
+            const avatar = await avatarStore.storeAvatar(req.file, ({ url }) => setProfilePicture(userId, url));
+
+            const previousUrl = previous && previous.profile_picture_url;
+            if (previousUrl && previousUrl !== avatar.url) {
+                avatarStore.releaseAvatar(previousUrl).catch((err) => {
+                    logger.error("Avatar clean-up error:", err.message);
+                });
+            }
 
-            // Respond with the new avatar URL
-            return res.json({ success: true, url: publicUrl });
+            // Respond with the new avatar URLs
+            return res.json({ success: true, url: avatar.url, variants: avatar.variants });
         } catch (err) {
-            console.error("Database update error:", err);
+            if (err.code === "INVALID_IMAGE") {
+                return res.status(400).json({ success: false, message: "The file is not a supported image" });
+            }
+            if (err.code === "IMAGE_PROCESSING_UNAVAILABLE") {
+                logger.error("Avatar update error:", err.message);
+                return res.status(503).json({ success: false, message: "Avatar uploads are unavailable" });
+            }
+            logger.error("Avatar update error:", err);
             return res
                 .status(500)
                 .json({ success: false, message: "Database update failed" });
+        } finally {
+            avatarStore.discardUpload(req.file).catch(() => {});
         }
     }
 );
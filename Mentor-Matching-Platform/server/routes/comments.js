@@ -1,6 +1,8 @@
 const express = require('express');
 const router = express.Router();
 const db = require('../db');
+const { users } = require('../utils/batchLoader');
+const logger = require('../utils/logger');
 
 // Fetch comments for a specific user and session
 router.get("/:userId", (req, res) => {
@@ -20,7 +22,7 @@ router.get("/:userId", (req, res) => {
 
   db.all(sql, [userId, sessionId], (err, rows) => {
     if (err) {
-      console.error("Error fetching comments:", err);
+      logger.error("Error fetching comments:", err);
       return res.status(500).json({ error: "Failed to fetch comments" });
     }
     res.json(rows);
@@ -32,37 +34,34 @@ router.post('/:userId', async (req, res) => {
     const { userId } = req.params;
     const { commenterId, content, sessionId } = req.body;
 
-    console.log("Incoming request:", { userId, commenterId, content, sessionId });
+    logger.debug("Incoming request:", { userId, commenterId, content, sessionId });
 
     if (!commenterId || !content || !sessionId) {
-        console.error("Validation failed: Missing required fields");
+        logger.error("Validation failed: Missing required fields");
         return res.status(400).json({ error: 'Commenter ID, content, and session ID are required' });
     }
 
     try {
-        // Validate that the target user exists
-        const targetUser = await db.getAsync(`SELECT id FROM users WHERE id = ?`, [userId]);
+        // Validate that the target user and the commenter exist (one query)
+        const [targetUser, commenter] = await Promise.all([users.load(userId), users.load(commenterId)]);
         if (!targetUser) {
-            console.error("Target user not found:", userId);
+            logger.error("Target user not found:", userId);
             return res.status(404).json({ error: 'Target user not found' });
         }
-
-        // Validate that the commenter exists
-        const commenter = await db.getAsync(`SELECT id FROM users WHERE id = ?`, [commenterId]);
         if (!commenter) {
-            console.error("Commenter not found:", commenterId);
+            logger.error("Commenter not found:", commenterId);
             return res.status(404).json({ error: 'Commenter not found' });
         }
 
         // Insert the comment into the database
-        console.log("Insert params:", sessionId, userId, commenterId, content);
+        logger.debug("Insert params:", sessionId, userId, commenterId, content);
         const result = await db.runAsync(
             `INSERT INTO comments (session_id, target_user_id, commenter_id, content, created_at)
              VALUES (?, ?, ?, ?, datetime('now'))`,
             [sessionId, userId, commenterId, content]
         );
 
-        console.log("Comment insert result:", result);
+        logger.debug("Comment insert result:", result);
 
         if (result && result.lastID) {
             // Fetch the inserted comment with the correct created_at value and commenter name
@@ -86,7 +85,7 @@ router.post('/:userId', async (req, res) => {
             throw new Error('Failed to insert comment');
         }
     } catch (err) {
-        console.error("Error adding comment:", err);
+        logger.error("Error adding comment:", err);
         res.status(500).json({ error: 'Failed to add comment' });
     }
 });
@@ -2,14 +2,15 @@ const express = require("express");
 const router = express.Router();
 
 const getTopMentorMatchesForMentee = require("../utils/matchAlgorithm");
+const logger = require("../utils/logger");
 
 router.get("", async (req, res) => {
   const menteeId  = req.query.menteeId;
   const sessionId = req.query.sessionId; 
 
   // print the menteeId and sessionId/match-mentee for debugging
-  console.log("Mentee ID:", menteeId);
-  console.log("Session ID:", sessionId);
+  logger.debug("Mentee ID:", menteeId);
+  logger.debug("Session ID:", sessionId);
   // Check if menteeId and sessionId are provided
 
 
@@ -22,7 +23,7 @@ router.get("", async (req, res) => {
     const matches = await getTopMentorMatchesForMentee(menteeId, sessionId);
     res.json({ success: true, matches });
   } catch (error) {
-    console.error("Matching error:", error);
+    logger.error("Matching error:", error);
     res.status(500).json({ success: false, error: "Matching failed." });
   }
 });
@@ -55,64 +56,40 @@ const { ensureAuthenticated } = require('../middlewares/auth');
 router.get(
   '/sessions/:sessionId/matches',
   ensureAuthenticated,
-  (req, res) => {
+  async (req, res) => {
     const userId = req.user.id;
     const sessionId = Number(req.params.sessionId);
 
-    // Find the matching record where the current user is mentor or mentee
-    const findPairsSql = `
-      SELECT *
-      FROM matching_pairs
-      WHERE session_id = ?
-        AND (mentor_id = ? OR mentee_id = ?)
-        AND mentor_id IS NOT NULL
-        AND mentee_id IS NOT NULL
+    // The user's pairs as mentor, then as mentee, each joined to the other
+    // user. Each half is one index lookup; pairs whose other user is gone
+    // drop out of the join.
+    const pairsSql = `
+      SELECT mp.id AS pairId, mp.session_id AS sessionId, 'mentor' AS role,
+             u.id AS otherId, u.email AS otherEmail, mp.created_at AS createdAt
+      FROM matching_pairs mp
+      JOIN users u ON u.id = mp.mentee_id
+      WHERE mp.session_id = ? AND mp.mentor_id = ?
+      UNION ALL
+      SELECT mp.id, mp.session_id, 'mentee', u.id, u.email, mp.created_at
+      FROM matching_pairs mp
+      JOIN users u ON u.id = mp.mentor_id
+      WHERE mp.session_id = ? AND mp.mentee_id = ?
+      ORDER BY pairId
     `;
 
-    db.all(findPairsSql, [sessionId, userId, userId], (err, pairs) => {
-      if (err) {
-        console.error("Database error fetching pairs:", err);
-        return res.status(500).json({ error: "Database error" });
-      }
-      console.log("Pairs found:", pairs);
-      if (!pairs || pairs.length === 0) {
-        return res.json([]);
-      }
-
-      // For each pair, fetch the "other" user's info
-      const otherFetches = pairs.map(pair => {
-        const otherId = pair.mentor_id === userId
-          ? pair.mentee_id
-          : pair.mentor_id;
-        return new Promise((resolve, reject) => {
-          db.get(
-            `SELECT id, email FROM users WHERE id = ?`,
-            [otherId],
-            (err, other) => {
-              if (err) return reject(err);
-              if (!other) return resolve(null);
-              resolve({
-                pairId: pair.id,
-                sessionId: pair.session_id,
-                role: pair.mentor_id === userId ? "mentor" : "mentee",
-                other,
-                createdAt: pair.created_at
-              });
-            }
-          );
-        });
-      });
-
-      Promise.all(otherFetches)
-        .then(results => {
-          const filtered = results.filter(Boolean);
-          res.json(filtered);
-        })
-        .catch(err => {
-          console.error("Error fetching paired users:", err);
-          res.status(500).json({ error: "Database error" });
-        });
-    });
+    try {
+      const rows = await db.allAsync(pairsSql, [sessionId, userId, sessionId, userId]);
+      res.json(rows.map((row) => ({
+        pairId: row.pairId,
+        sessionId: row.sessionId,
+        role: row.role,
+        other: { id: row.otherId, email: row.otherEmail },
+        createdAt: row.createdAt
+      })));
+    } catch (err) {
+      logger.error("Database error fetching pairs:", err);
+      res.status(500).json({ error: "Database error" });
+    }
   }
 );
 
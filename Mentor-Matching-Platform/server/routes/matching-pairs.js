@@ -2,6 +2,18 @@
 const express = require('express');
 const router = express.Router();
 const db = require('../db'); // adjust this path to your DB instance
+const recommendationCache = require('../utils/recommendationCache');
+const logger = require('../utils/logger');
+
+// A new pair uses up mentor capacity, which changes who can be recommended.
+// A failure here must not fail the insert itself.
+async function invalidateRecommendations(mentorId, sessionId) {
+  try {
+    await recommendationCache.invalidateApplicant(mentorId, sessionId);
+  } catch (err) {
+    logger.warn('⚠️ Failed to invalidate recommendations:', err.message);
+  }
+}
 
 
 router.post('/matching-pairs', (req, res) => {
@@ -22,11 +34,12 @@ router.post('/matching-pairs', (req, res) => {
     `;
     db.run(insertSql, [sessionId, mentorId, menteeId], function(err) {
       if (err) {
-        console.error('Error inserting matching pair:', err);
+        logger.error('Error inserting matching pair:', err);
         return res.status(500).json({ error: err.message });
       }
+      invalidateRecommendations(mentorId, sessionId);
 
-      console.log('Inserted matching pair:', {
+      logger.debug('Inserted matching pair:', {
         sessionId,
         mentorId,
         menteeId,
@@ -2,32 +2,86 @@
 const express = require('express');
 const router = express.Router();
 const db = require('../db'); // adjust this path to your DB instance
+const { encodeCursor, decodeCursor } = require('../utils/pageCursor');
+const logger = require('../utils/logger');
+
+const PAGE_SIZE = 20;
+const MAX_PAGE_SIZE = 50;
+// Words of the search box used in the query; the rest are ignored
+const MAX_TERMS = 8;
 
 /**
- * GET /api/mentors?search=term
- * Search mentors by name, pulling name and avatar from the profiles table.
- * Returns an array of { id, name, avatar }.
+ * Turns search box text into an FTS5 query: every word must match the
+ * start of a word in the mentor's name, bio, suburb or sports.
+ * @returns {string} empty when the text has no searchable words
+ */
+function matchQuery(search) {
+  const words = search.match(/[\p{L}\p{N}]+/gu) || [];
+  return words.slice(0, MAX_TERMS).map((word) => `"${word}"*`).join(' ');
+}
+
+/**
+ * The search query for one page of results.
+ * @param {string} match FTS5 query from matchQuery
+ * @param {Array|null} after decoded cursor of the previous page
+ * @returns {{sql: string, params: Array}}
  */
-router.get('/', (req, res) => {
-  const term = `%${req.query.search || ''}%`;
+function mentorSearchQuery(match, after, size) {
+  // Mentors are users who have applied as one. rank is bm25, lower is better.
   const sql = `
-    SELECT 
+    SELECT
       u.id,
       p.first_name || ' ' || p.last_name AS name,
-      p.profile_picture_url AS avatar
-    FROM users u
-    JOIN profiles p ON p.user_id = u.id
-    WHERE u.account_type = 'mentor'
-      AND (p.first_name || ' ' || p.last_name) LIKE ?
-    LIMIT 20
+      p.profile_picture_url AS avatar,
+      s.rank
+    FROM mentor_search s
+    JOIN users u ON u.id = s.rowid
+    JOIN profiles p ON p.user_id = s.rowid
+    WHERE s.mentor_search MATCH ?
+      AND EXISTS (SELECT 1 FROM applications a WHERE a.user_id = u.id AND a.role = 'mentor')
+      ${after ? 'AND (s.rank, s.rowid) > (?, ?)' : ''}
+    ORDER BY s.rank, s.rowid
+    LIMIT ?
   `;
-  db.all(sql, [term], (err, rows) => {
-    if (err) {
-      console.error('Search mentors failed:', err);
-      return res.status(500).json({ error: err.message });
-    }
-    res.json(rows);
-  });
+  const params = after ? [match, ...after, size + 1] : [match, size + 1];
+  return { sql, params };
+}
+
+/**
+ * GET /api/mentors?search=term
+ * Type-ahead mentor search over the mentor_search full-text index (name,
+ * bio, suburb and sports), best matches first. Query:
+ *  - search: words to match by prefix
+ *  - limit: page size (default 20, at most 50)
+ *  - cursor: nextCursor from the previous page
+ * Returns { mentors: [{ id, name, avatar }], nextCursor }.
+ */
+router.get('/', async (req, res) => {
+  const { search = '', limit, cursor } = req.query;
+  const after = cursor === undefined ? null : decodeCursor(cursor);
+  if (cursor !== undefined && !after) {
+    return res.status(400).json({ error: 'Invalid cursor' });
+  }
+  const size = Math.min(Math.max(parseInt(limit, 10) || PAGE_SIZE, 1), MAX_PAGE_SIZE);
+  const match = matchQuery(String(search));
+  if (!match) return res.json({ mentors: [], nextCursor: null });
+
+  const { sql, params } = mentorSearchQuery(match, after, size);
+
+  try {
+    const rows = await db.allAsync(sql, params);
+    const page = rows.slice(0, size);
+    const last = page[page.length - 1];
+    res.json({
+      mentors: page.map(({ id, name, avatar }) => ({ id, name, avatar })),
+      nextCursor: rows.length > size ? encodeCursor(last.rank, last.id) : null,
+    });
+  } catch (err) {
+    logger.error('Search mentors failed:', err);
+    res.status(500).json({ error: err.message });
+  }
 });
 
-module.exports = router;
\ No newline at end of file
+module.exports = router;
+// For scripts/checkQueryPlans.js
+module.exports.mentorSearchQuery = mentorSearchQuery;
@@ -5,6 +5,7 @@
 
 const express = require("express");
 const db = require("../db");
+const logger = require("../utils/logger");
 const router = express.Router();
 
 /**
@@ -60,7 +61,7 @@ router.get("/profile", isAuthenticated, (req, res) => {
 
     db.get(query, [userId], (err, row) => {
         if (err) {
-            console.error("DB error:", err);
+            logger.error("DB error:", err);
             return res.status(500).json({ success: false, message: "Database error" });
         }
         if (!row || !isProfileComplete(row)) {
@@ -110,7 +111,7 @@ router.post("/profile", isAuthenticated, (req, res) => {
 
     db.get("SELECT * FROM profiles WHERE user_id = ?", [userId], (err, row) => {
         if (err) {
-            console.error("DB error:", err);
+            logger.error("DB error:", err);
             return res.status(500).json({ success: false, message: "Database error" });
         }
 
@@ -126,7 +127,7 @@ router.post("/profile", isAuthenticated, (req, res) => {
             `;
             db.run(updateQuery, values, function (err) {
                 if (err) {
-                    console.error("Update error:", err);
+                    logger.error("Update error:", err);
                     return res.status(500).json({ success: false, message: "Failed to update profile." });
                 }
                 return res.json({ success: true });
@@ -142,7 +143,7 @@ router.post("/profile", isAuthenticated, (req, res) => {
             `;
             db.run(insertQuery, values, function (err) {
                 if (err) {
-                    console.error("Insert error:", err);
+                    logger.error("Insert error:", err);
                     return res.status(500).json({ success: false, message: "Failed to create profile." });
                 }
                 return res.json({ success: true });
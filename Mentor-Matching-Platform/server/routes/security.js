@@ -4,8 +4,9 @@
  */
 
 const express = require("express");
-const bcrypt = require("bcrypt");
 const db = require("../db");
+const passwords = require("../utils/passwordHasher");
+const logger = require("../utils/logger");
 
 const router = express.Router();
 
@@ -36,7 +37,7 @@ router.get("/security-question", isAuthenticated, (req, res) => {
     const userId = req.session.user.id;
     db.get("SELECT security_question FROM users WHERE id = ?", [userId], (err, row) => {
         if (err) {
-            console.error("DB error:", err);
+            logger.error("DB error:", err);
             return res.status(500).json({ success: false, message: "Database error" });
         }
 
@@ -60,6 +61,7 @@ router.get("/security-question", isAuthenticated, (req, res) => {
  * @returns {object} 403 - Incorrect current password or security answer
  * @returns {object} 401 - Unauthorized
  * @returns {object} 500 - Server or database error
+ * @returns {object} 503 - Too many passwords being hashed, retry shortly
  */
 router.post("/update-password", isAuthenticated, async (req, res) => {
     const userId = req.session.user.id;
@@ -71,33 +73,38 @@ router.post("/update-password", isAuthenticated, async (req, res) => {
 
     db.get("SELECT * FROM users WHERE id = ?", [userId], async (err, user) => {
         if (err || !user) {
-            console.error("User fetch error:", err);
+            logger.error("User fetch error:", err);
             return res.status(500).json({ success: false, message: "User not found." });
         }
 
-        // Check if the security answer is correct
-        const isAnswerCorrect = await bcrypt.compare(securityAnswer, user.security_answer_hash);
-        if (!isAnswerCorrect) {
-            return res.status(403).json({ success: false, message: "Incorrect security answer." });
-        }
+        let newHash;
+        try {
+            // Check if the security answer is correct
+            const isAnswerCorrect = await passwords.compare(securityAnswer, user.security_answer_hash);
+            if (!isAnswerCorrect) {
+                return res.status(403).json({ success: false, message: "Incorrect security answer." });
+            }
 
-        // Check if the current password is correct
-        const isPasswordCorrect = await bcrypt.compare(currentPassword, user.password_hash);
-        if (!isPasswordCorrect) {
-            return res.status(403).json({ success: false, message: "Incorrect current password." });
-        }
+            // Check if the current password is correct
+            const isPasswordCorrect = await passwords.compare(currentPassword, user.password_hash);
+            if (!isPasswordCorrect) {
+                return res.status(403).json({ success: false, message: "Incorrect current password." });
+            }
 
-        // Prevent reuse of the same password
-        const isSamePassword = await bcrypt.compare(newPassword, user.password_hash);
-        if (isSamePassword) {
-            return res.status(400).json({ success: false, message: "New password must be different from the current password." });
-        }
+            // Prevent reuse of the same password
+            const isSamePassword = await passwords.compare(newPassword, user.password_hash);
+            if (isSamePassword) {
+                return res.status(400).json({ success: false, message: "New password must be different from the current password." });
+            }
 
-        // Hash the new password and update the database
-        const newHash = await bcrypt.hash(newPassword, 10);
+            // Hash the new password and update the database
+            newHash = await passwords.hash(newPassword);
+        } catch (hashErr) {
+            return passwords.sendHashError(res, hashErr);
+        }
         db.run("UPDATE users SET password_hash = ? WHERE id = ?", [newHash, userId], (err) => {
             if (err) {
-                console.error("Update error:", err);
+                logger.error("Update error:", err);
                 return res.status(500).json({ success: false, message: "Failed to update password." });
             }
             return res.json({ success: true, message: "Password updated successfully." });
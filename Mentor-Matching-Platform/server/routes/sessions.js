@@ -3,6 +3,8 @@ const express = require('express');
 const router = express.Router();
 const { ensureAuthenticated } = require('../middlewares/auth');
 const db = require('../db'); // sqlite3.Database instance
+const recommendationCache = require('../utils/recommendationCache');
+const logger = require('../utils/logger');
 
 
 /**
@@ -26,7 +28,7 @@ router.get('/my-sessions', ensureAuthenticated, (req, res) => {
   `;
   db.all(sql, [userId], (err, rows) => {
     if (err) {
-      console.error(err);
+      logger.error(err);
       return res.status(500).json({ error: 'Internal Server Error' });
     }
     res.json(rows);
@@ -49,7 +51,7 @@ router.get('/sessions', (req, res) => {
     `;
     db.all(sql, [], (err, rows) => {
         if (err) {
-        console.error(err);
+        logger.error(err);
         return res.status(500).json({ error: 'Internal Server Error' });
         }
         res.json(rows);
@@ -75,7 +77,7 @@ router.get('/sessions/:id', ensureAuthenticated, (req, res) => {
   `;
   db.get(sql, [id], (err, row) => {
     if (err) {
-      console.error(err);
+      logger.error(err);
       return res.status(500).json({ error: 'Internal Server Error' });
     }
     if (!row) {
@@ -100,7 +102,7 @@ router.post('/sessions/:id/apply', ensureAuthenticated, (req, res) => {
   `;
   db.get(checkSql, [userId, sessionId], (err, row) => {
     if (err) {
-      console.error(err);
+      logger.error(err);
       return res.status(500).json({ error: 'Internal Server Error' });
     }
     if (row) {
@@ -118,7 +120,7 @@ router.post('/sessions/:id/apply', ensureAuthenticated, (req, res) => {
     `;
     db.run(insertSql, [userId, sessionId, role], function(err) {
       if (err) {
-        console.error(err);
+        logger.error(err);
         return res.status(500).json({ error: 'Internal Server Error' });
       }
       res.status(201).json({ message: 'Applied successfully', sessionId });
@@ -130,24 +132,32 @@ router.post('/sessions/:id/apply', ensureAuthenticated, (req, res) => {
  * DELETE /api/sessions/:id/apply
  * Cancel the user's application
  */
-router.delete('/sessions/:id/apply', ensureAuthenticated, (req, res) => {
+router.delete('/sessions/:id/apply', ensureAuthenticated, async (req, res) => {
   const userId = req.user.id;
   const sessionId = req.params.id;
 
-  const deleteSql = `
-    DELETE FROM applications
-    WHERE user_id = ? AND session_id = ?
-  `;
-  db.run(deleteSql, [userId, sessionId], function(err) {
-    if (err) {
-      console.error(err);
-      return res.status(500).json({ error: 'Internal Server Error' });
-    }
-    if (this.changes === 0) {
+  // The cached lists the application affects are dropped in the same
+  // transaction as the application, so no scoring run in between can
+  // store a list that still counts it
+  try {
+    const cancelled = await db.transaction(async (tx) => {
+      const application = await tx.get(
+        `SELECT id, user_id, role FROM applications WHERE user_id = ? AND session_id = ?`,
+        [userId, sessionId]
+      );
+      if (!application) return false;
+      await recommendationCache.invalidateCancelledApplication(tx, application, sessionId);
+      await tx.run(`DELETE FROM applications WHERE id = ?`, [application.id]);
+      return true;
+    });
+    if (!cancelled) {
       return res.status(404).json({ error: 'Not applied or not found' });
     }
     return res.status(200).json({ message: 'Application cancelled successfully', sessionId });
-  });
+  } catch (err) {
+    logger.error(err);
+    return res.status(500).json({ error: 'Internal Server Error' });
+  }
 });
 
 module.exports = router;
@@ -1,7 +1,12 @@
 const express = require("express");
 const router = express.Router();
 const db = require("../db");
-const matchMentorsForMentee = require("../utils/matchAlgorithm");
+const recommendationCache = require("../utils/recommendationCache");
+const { preferenceCodes, enneagramCodes } = require("../utils/surveyCodes");
+const { LIFESTYLE_FIELDS } = require("../utils/matchScoring");
+const { DraftSaver } = require("../utils/draftSaver");
+const { getLatestSurvey, invalidateLatestSurvey } = require("../utils/latestSurvey");
+const logger = require("../utils/logger");
 
 // Middleware: Check if user is logged in
 function isAuthenticated(req, res, next) {
@@ -9,51 +14,160 @@ function isAuthenticated(req, res, next) {
   return res.status(401).json({ success: false, message: "Unauthorized" });
 }
 
-// Save mentorship preferences 
+// Drop the user's cached survey and the cached recommendations affected by
+// changed answers. A failure here must not fail the save itself.
+async function invalidateRecommendations(userId, sessionId) {
+  invalidateLatestSurvey(userId);
+  try {
+    await recommendationCache.invalidateApplicant(userId, sessionId);
+  } catch (err) {
+    logger.warn("⚠️ Failed to invalidate recommendations:", err.message);
+  }
+}
+
+// Upserts for the three survey steps; the Enneagram one is also the last
+// write of the submit
+const PREFERENCES_SQL = `
+  INSERT OR REPLACE INTO mentorship_preferences
+  (application_id, user_id, role, session_role, transplant_type, transplant_year, goals, meeting_preference, sports_activities,
+   goals_mask, goals_count, sports_mask, sports_count, transplant_code, submitted)
+  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+`;
+
+const LIFESTYLE_SQL = `
+  INSERT OR REPLACE INTO lifestyle_answers (
+    application_id, user_id, ${LIFESTYLE_FIELDS.join(", ")}
+  ) VALUES (?, ?, ${LIFESTYLE_FIELDS.map(() => "?").join(", ")})
+`;
+
+const ENNEAGRAM_SQL = `
+  INSERT OR REPLACE INTO enneagram_answers (
+    application_id, user_id, top_type, top_type_primary, top_type_mask, scores, answers
+  ) VALUES (?, ?, ?, ?, ?, ?, ?)
+`;
+
+const SURVEY_STEPS = {
+  preferences: PREFERENCES_SQL,
+  lifestyle: LIFESTYLE_SQL,
+  enneagram: ENNEAGRAM_SQL
+};
+
+function preferenceParams(applicationId, userId, role, prefs, submitted) {
+  const { session_role, transplantType, transplantYear, goals, meetingPref, sportsInterest } = prefs;
+  const codes = preferenceCodes(transplantType, goals, sportsInterest);
+  return [
+    applicationId,
+    userId,
+    role,
+    session_role,
+    JSON.stringify(transplantType),
+    transplantYear,
+    JSON.stringify(goals),
+    meetingPref,
+    JSON.stringify(sportsInterest),
+    codes.goals_mask,
+    codes.goals_count,
+    codes.sports_mask,
+    codes.sports_count,
+    codes.transplant_code,
+    submitted ? 1 : 0,
+  ];
+}
+
+// The lifestyle step's dropdowns start out as '' and may be left unset
+const isUnset = (value) => value === "" || value === null || value === undefined;
+
+function lifestyleParams(applicationId, userId, answers) {
+  return [
+    applicationId,
+    userId,
+    ...LIFESTYLE_FIELDS.map((field) => (isUnset(answers[field]) ? null : answers[field])),
+  ];
+}
+
+function enneagramParams(applicationId, userId, { topTypes, allScores, answers }) {
+  const codes = enneagramCodes(topTypes);
+  return [
+    applicationId,
+    userId,
+    JSON.stringify(topTypes),
+    codes.top_type_primary,
+    codes.top_type_mask,
+    JSON.stringify(allScores),
+    JSON.stringify(answers),
+  ];
+}
+
+function runStatement(sql, params) {
+  return new Promise((resolve, reject) => {
+    db.run(sql, params, (err) => (err ? reject(err) : resolve()));
+  });
+}
+
+// The per-step endpoints are draft autosaves: a burst of saves of one step
+// by one user is written once, with the latest answers
+const drafts = new DraftSaver();
+
+function draftKey(userId, sessionId, step) {
+  return `${userId}:${sessionId}:${step}`;
+}
+
+/**
+ * Saves one survey step as a draft once the user's saves of it settle.
+ * @param {(applicationId: number) => Array} buildParams the step's upsert parameters
+ * @returns {Promise<number|undefined>} the application id; undefined when a
+ *   submit replaced the draft before it was written
+ */
+function saveDraft(step, userId, sessionId, role, buildParams) {
+  return drafts.save(draftKey(userId, sessionId, step), async () => {
+    await db.ensureApplicationExists(userId, sessionId, role);
+    const applicationId = await db.getApplicationIdForUser(userId, sessionId);
+    await runStatement(SURVEY_STEPS[step], buildParams(applicationId));
+    await invalidateRecommendations(userId, sessionId);
+    return applicationId;
+  });
+}
+
+const isObject = (value) => value !== null && typeof value === "object" && !Array.isArray(value);
+
+/**
+ * Checks a survey submission before anything is written.
+ * @returns {string|null} what is wrong, or null when it can be saved
+ */
+function validateSurvey({ sessionId, enneagram } = {}) {
+  if (!sessionId) return "Missing sessionId";
+  if (!isObject(enneagram)) return "Missing Enneagram data";
+  const topTypes = [].concat(enneagram.topTypes ?? []);
+  if (topTypes.length === 0 || !topTypes.every((type) => Number.isInteger(type) && type >= 1 && type <= 9)) {
+    return "enneagram.topTypes must be Enneagram types 1-9";
+  }
+  if (!isObject(enneagram.allScores)) return "Missing enneagram.allScores";
+  return null;
+}
+
+// Save mentorship preferences (draft)
 router.post("/save-preferences", isAuthenticated, async (req, res) => {
   const userId = req.session.user.id;
-  const { sessionId, role, session_role, transplantType, transplantYear, goals, meetingPref, sportsInterest } = req.body;
+  const { sessionId, role } = req.body;
 
   if (!sessionId || !role) {
     return res.status(400).json({ success: false, error: 'Missing sessionId or role' });
   }
-  console.log("🟡 Incoming /save-preferences payload:", req.body);
-  // 🔄 Ensure application exists
-  await db.ensureApplicationExists(userId, sessionId, role);
-  const applicationId = await db.getApplicationIdForUser(userId, sessionId);
+  logger.debug("🟡 Incoming /save-preferences payload:", req.body);
 
-  console.log("🔸 /save-preferences hit", { userId, applicationId, role, transplantType, transplantYear });
-
-  db.run(
-    `
-    INSERT OR REPLACE INTO mentorship_preferences 
-    (application_id, user_id, role, session_role, transplant_type, transplant_year, goals, meeting_preference, sports_activities)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    `,
-    [
-      applicationId,
-      userId,
-      role,
-      session_role,
-      JSON.stringify(transplantType),
-      transplantYear,
-      JSON.stringify(goals),
-      meetingPref,
-      JSON.stringify(sportsInterest),
-      
-    ],
-    function (err) {
-      if (err) {
-        console.error("❌ Error saving preferences:", err.message);
-        return res.status(500).json({ success: false, error: err.message });
-      }
-      console.log("✅ Preferences saved for application:", applicationId);
-      res.json({ success: true });
-    }
-  );
+  try {
+    const applicationId = await saveDraft("preferences", userId, sessionId, role, (id) =>
+      preferenceParams(id, userId, role, req.body, false)
+    );
+    logger.info("✅ Preferences saved for application:", applicationId);
+    res.json({ success: true });
+  } catch (err) {
+    logger.error("❌ Error saving preferences:", err.message);
+    res.status(500).json({ success: false, error: err.message });
+  }
 });
 
-// Save lifestyle answers
+// Save lifestyle answers (draft)
 router.post("/save-lifestyle", isAuthenticated, async (req, res) => {
   const userId = req.session.user.id;
   const { sessionId, answers, role } = req.body;
@@ -63,93 +177,95 @@ router.post("/save-lifestyle", isAuthenticated, async (req, res) => {
     return res.status(400).json({ success: false, error: 'Missing sessionId, role, or answers' });
   }
 
-  // ✅ Ensure application exists with session and role
-  await db.ensureApplicationExists(userId, sessionId, role);
-  const applicationId = await db.getApplicationIdForUser(userId, sessionId);
-
-  console.log("🔸 /save-lifestyle hit", { userId, applicationId, answers });
-
-  const values = [
-    applicationId,
-    userId,
-    answers.physicalExerciseFrequency,
-    answers.likeAnimals,
-    answers.likeCooking,
-    answers.travelImportance,
-    answers.freeTimePreference,
-    answers.feelOverwhelmed,
-    answers.activityBarriers,
-    answers.longTermGoals,
-    answers.stressHandling,
-    answers.motivationLevel,
-    answers.hadMentor
-  ];
-
-  db.run(`
-    INSERT OR REPLACE INTO lifestyle_answers (
-      application_id,
-      user_id,
-      physicalExerciseFrequency,
-      likeAnimals,
-      likeCooking,
-      travelImportance,
-      freeTimePreference,
-      feelOverwhelmed,
-      activityBarriers,
-      longTermGoals,
-      stressHandling,
-      motivationLevel,
-      hadMentor
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-  `, values,
-    function (err) {
-      if (err) {
-        console.error("❌ Error saving lifestyle answers:", err.message);
-        return res.status(500).json({ success: false, error: err.message });
-      }
-      console.log("✅ Lifestyle answers saved for application:", applicationId);
-      res.json({ success: true });
-    }
-  );
+  try {
+    const applicationId = await saveDraft("lifestyle", userId, sessionId, role, (id) =>
+      lifestyleParams(id, userId, answers)
+    );
+    logger.info("✅ Lifestyle answers saved for application:", applicationId);
+    res.json({ success: true });
+  } catch (err) {
+    logger.error("❌ Error saving lifestyle answers:", err.message);
+    res.status(500).json({ success: false, error: err.message });
+  }
 });
 
 
-// Save Enneagram answers
+// Save Enneagram answers (draft)
 router.post("/save-enneagram", isAuthenticated, async (req, res) => {
   const userId = req.session.user.id;
-  const { sessionId, role, topTypes, allScores, answers } = req.body;  
-
+  const { sessionId, role, topTypes, allScores } = req.body;
 
   if (!sessionId || !role || !topTypes || !allScores) {
     return res.status(400).json({ success: false, error: 'Missing sessionId, role, or Enneagram data' });
   }
 
-  await db.ensureApplicationExists(userId, sessionId, role);
-  const applicationId = await db.getApplicationIdForUser(userId, sessionId);
+  try {
+    const applicationId = await saveDraft("enneagram", userId, sessionId, role, (id) =>
+      enneagramParams(id, userId, req.body)
+    );
+    logger.info("✅ Enneagram saved for application:", applicationId);
+    res.json({ success: true });
+  } catch (err) {
+    logger.error("❌ Error saving enneagram:", err.message);
+    res.status(500).json({ success: false, error: err.message });
+  }
+});
 
-  console.log("🔸 /save-enneagram hit", { userId, applicationId, topTypes, answers });
-
-  db.run(`
-    INSERT OR REPLACE INTO enneagram_answers (
-      application_id, user_id, top_type, scores, answers
-    ) VALUES (?, ?, ?, ?, ?)
-  `,
-    [
-      applicationId,
-      userId,
-      JSON.stringify(topTypes),
-      JSON.stringify(allScores),
-      JSON.stringify(answers),  
-    ],
-    function (err) {
-      if (err) {
-        console.error("❌ Error saving enneagram:", err.message);
-        return res.status(500).json({ success: false, error: err.message });
-      }
-      console.log("✅ Enneagram saved for application:", applicationId);
-      res.json({ success: true });
+/**
+ * POST /api/submit-survey
+ * Submits the survey: the Enneagram answers and the submitted flag, in one
+ * transaction. The preferences and lifestyle steps are not sent again; the
+ * answers their own saves wrote are the ones submitted.
+ * Body: { sessionId, enneagram }, where enneagram carries the fields of
+ * /save-enneagram.
+ */
+router.post("/submit-survey", isAuthenticated, async (req, res) => {
+  const userId = req.session.user.id;
+  const error = validateSurvey(req.body);
+  if (error) {
+    return res.status(400).json({ success: false, error });
+  }
+  const { sessionId, enneagram } = req.body;
+
+  try {
+    // Earlier steps' saves still waiting are written first; an Enneagram
+    // autosave still waiting is older than this submission
+    await Promise.all([
+      drafts.settle(draftKey(userId, sessionId, "preferences")),
+      drafts.settle(draftKey(userId, sessionId, "lifestyle")),
+      drafts.supersede(draftKey(userId, sessionId, "enneagram")),
+    ]);
+
+    const applicationId = await db.transaction(async (tx) => {
+      const saved = await tx.get(
+        `SELECT a.id,
+                EXISTS (SELECT 1 FROM mentorship_preferences WHERE application_id = a.id) AS has_preferences,
+                EXISTS (SELECT 1 FROM lifestyle_answers WHERE application_id = a.id) AS has_lifestyle
+         FROM applications a
+         WHERE a.user_id = ? AND a.session_id = ?`,
+        [userId, sessionId]
+      );
+      if (!saved?.has_preferences || !saved.has_lifestyle) return null;
+
+      await tx.run(`UPDATE mentorship_preferences SET submitted = 1 WHERE application_id = ?`, [saved.id]);
+      await tx.run(ENNEAGRAM_SQL, enneagramParams(saved.id, userId, enneagram));
+      return saved.id;
+    });
+
+    if (!applicationId) {
+      return res.status(400).json({
+        success: false,
+        error: "Save the preferences and lifestyle steps before submitting",
+      });
     }
-  );
+
+    logger.info("✅ Survey submitted for application:", applicationId);
+    await invalidateRecommendations(userId, sessionId);
+    res.json({ success: true, applicationId });
+  } catch (err) {
+    logger.error("❌ Error submitting survey:", err.message);
+    res.status(500).json({ success: false, error: err.message });
+  }
 });
 
 router.get("/match-mentee", isAuthenticated, async (req, res) => {
@@ -157,15 +273,15 @@ router.get("/match-mentee", isAuthenticated, async (req, res) => {
     const menteeId = req.query.menteeId;
     const sessionId = req.query.sessionId; 
     // print the menteeId and sessionId for debugging
-    console.log("Mentee ID:", menteeId);
-    console.log("Session ID:", sessionId);
+    logger.debug("Mentee ID:", menteeId);
+    logger.debug("Session ID:", sessionId);
 
     if (!sessionId) {
       return res.status(400).json({ success: false, message: "Missing sessionId" });
     }
 
-    console.log("✅ Incoming match request:", { menteeId, sessionId });
-    const matches = await matchMentorsForMentee(menteeId, sessionId); 
+    logger.debug("✅ Incoming match request:", { menteeId, sessionId });
+    const matches = await recommendationCache.getRecommendations(menteeId, sessionId);
 
     const formatted = matches.map(m => ({
       mentor_id: m.mentor_id,
@@ -176,8 +292,9 @@ router.get("/match-mentee", isAuthenticated, async (req, res) => {
 
     res.json({ success: true, recommendations: formatted });
   } catch (err) {
-    console.error("❌ Match error:", err.message);
-    res.status(500).json({ success: false, error: err.message });
+    logger.error("❌ Match error:", err.message);
+    // The matching worker pool is saturated; the client can retry
+    res.status(err.code === "POOL_QUEUE_FULL" ? 503 : 500).json({ success: false, error: err.message });
   }
 });
 
@@ -205,10 +322,11 @@ if (!sessionId) {
       `UPDATE mentorship_preferences SET submitted = 1 WHERE application_id = ?`,
       [row.id]
     );
+    invalidateLatestSurvey(userId);
 
     return res.json({ success: true });
   } catch (err) {
-    console.error("❌ Error marking submission:", err.message);
+    logger.error("❌ Error marking submission:", err.message);
     return res.status(500).json({ success: false });
   }
 });
@@ -218,49 +336,10 @@ router.get("/latest-survey", isAuthenticated, async (req, res) => {
   const userId = req.session.user.id;
 
   try {
-    const latestApp = await db.getAsync(
-      `SELECT id, session_id 
-FROM applications 
-WHERE user_id = ? 
-AND id IN (
-  SELECT application_id FROM mentorship_preferences
-  INTERSECT
-  SELECT application_id FROM lifestyle_answers
-  INTERSECT
-  SELECT application_id FROM enneagram_answers
-)
-ORDER BY application_date DESC 
-LIMIT 1
-`,
-      [userId]
-    );
-
-    if (!latestApp) {
-      return res.json({ success: true, data: null });
-    }
-
-    const [prefs, lifestyle, enneagram] = await Promise.all([
-      db.getAsync(`SELECT * FROM mentorship_preferences WHERE application_id = ?`, [latestApp.id]),
-      db.getAsync(`SELECT * FROM lifestyle_answers WHERE application_id = ?`, [latestApp.id]),
-      db.getAsync(`SELECT * FROM enneagram_answers WHERE application_id = ?`, [latestApp.id]),
-    ]);
-
-    console.log("✅ PREFS:", prefs);
-    console.log("✅ LIFESTYLE:", lifestyle);
-    console.log("✅ ENNEAGRAM:", enneagram);
-
-    res.json({
-      success: true,
-      data: {
-        applicationId: latestApp.id,
-        sessionId: latestApp.session_id,
-        preferences: prefs,
-        lifestyle,
-        enneagram,
-      },
-    });
+    const data = await getLatestSurvey(userId);
+    res.json({ success: true, data });
   } catch (err) {
-    console.error("❌ Error fetching latest survey:", err.message);
+    logger.error("❌ Error fetching latest survey:", err.message);
     res.status(500).json({ success: false, error: err.message });
   }
 });
@@ -280,7 +359,7 @@ if (!sessionId) {
 
   db.get(`SELECT submitted FROM mentorship_preferences WHERE application_id = ?`, [applicationId], (err, row) => {
     if (err) {
-      console.error("❌ Failed to check form status:", err.message);
+      logger.error("❌ Failed to check form status:", err.message);
       return res.status(500).json({ success: false });
     }
     res.json({ success: true, submitted: row?.submitted === 1 });
@@ -315,7 +394,7 @@ router.post("/account-save-preferences", isAuthenticated, async (req, res) => {
                   userId
               ]
           );
-          console.log(`✅ Updated account-level mentorship preferences for user ${userId}`);
+          logger.info(`✅ Updated account-level mentorship preferences for user ${userId}`);
       } else {
           // Insert new
           await db.run(
@@ -332,15 +411,17 @@ router.post("/account-save-preferences", isAuthenticated, async (req, res) => {
                   JSON.stringify(sportsInterest),
               ]
           );
-          console.log(`✅ Inserted new account-level mentorship preferences for user ${userId}`);
+          logger.info(`✅ Inserted new account-level mentorship preferences for user ${userId}`);
       }
 
       return res.json({ success: true });
   } catch (err) {
-      console.error("❌ Error saving account-level preferences:", err.message);
+      logger.error("❌ Error saving account-level preferences:", err.message);
       res.status(500).json({ success: false, error: err.message });
   }
 });
 
 
 module.exports = router;
+// For scripts/checkQueryPlans.js
+module.exports.SURVEY_STEPS = SURVEY_STEPS;
@@ -0,0 +1,137 @@
+// scripts/benchLogin.js
+// Login throughput benchmark: runs the app in-process against a scratch
+// database and fires POST /api/login at increasing concurrency, printing
+// logins/sec, p50/p99 latency and how many requests were shed with a 503.
+//
+//   node scripts/benchLogin.js [--levels 1,4,16,64] [--duration 5000] [--users 50]
+//
+// BCRYPT_COST, HASH_CONCURRENCY, HASH_QUEUE_LIMIT and UV_THREADPOOL_SIZE
+// are read as in production, so their effect can be compared run to run.
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const http = require('http');
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : process.argv[index + 1];
+}
+
+const LEVELS = option('levels', '1,2,4,8,16,32,64').split(',').map(Number);
+const DURATION_MS = Number(option('duration', 5000));
+const USERS = Number(option('users', 50));
+const PASSWORD = 'BenchPassword123!';
+
+// A scratch database, unless SQLITE_FILE says otherwise
+const scratchDir = process.env.SQLITE_FILE ? null : fs.mkdtempSync(path.join(os.tmpdir(), 'bench-login-'));
+if (scratchDir) process.env.SQLITE_FILE = path.join(scratchDir, 'bench.db');
+
+const app = require('../app');
+const db = require('../db');
+const passwords = require('../utils/passwordHasher');
+
+async function createUsers() {
+  // One hash shared by every user; only the logins are being measured
+  const hash = await passwords.hash(PASSWORD);
+  const emails = [];
+  for (let i = 0; i < USERS; i++) {
+    const email = `bench-${i}@example.com`;
+    await db.runAsync(
+      `INSERT OR IGNORE INTO users (email, password_hash, security_question, security_answer_hash)
+       VALUES (?, ?, 'bench', ?)`,
+      [email, hash, hash]
+    );
+    emails.push(email);
+  }
+  return emails;
+}
+
+function login(port, agent, email) {
+  const body = JSON.stringify({ email, password: PASSWORD });
+  return new Promise((resolve) => {
+    const started = process.hrtime.bigint();
+    const req = http.request(
+      {
+        port,
+        path: '/api/login',
+        method: 'POST',
+        agent,
+        headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+      },
+      (res) => {
+        res.resume();
+        res.on('end', () => resolve({ status: res.statusCode, ms: Number(process.hrtime.bigint() - started) / 1e6 }));
+      }
+    );
+    req.on('error', () => resolve({ status: 0, ms: Number(process.hrtime.bigint() - started) / 1e6 }));
+    req.end(body);
+  });
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1)];
+}
+
+async function runLevel(port, emails, concurrency) {
+  const agent = new http.Agent({ keepAlive: true, maxSockets: concurrency });
+  const latencies = [];
+  const statuses = {};
+  const deadline = Date.now() + DURATION_MS;
+  let next = 0;
+
+  const client = async () => {
+    while (Date.now() < deadline) {
+      const { status, ms } = await login(port, agent, emails[next++ % emails.length]);
+      statuses[status] = (statuses[status] || 0) + 1;
+      if (status === 200) latencies.push(ms);
+    }
+  };
+  const started = Date.now();
+  await Promise.all(Array.from({ length: concurrency }, client));
+  const elapsed = (Date.now() - started) / 1000;
+  agent.destroy();
+
+  latencies.sort((a, b) => a - b);
+  return {
+    concurrency,
+    loginsPerSec: latencies.length / elapsed,
+    p50: percentile(latencies, 50),
+    p99: percentile(latencies, 99),
+    shed: statuses[503] || 0,
+    failed: Object.entries(statuses)
+      .filter(([status]) => status !== '200' && status !== '503')
+      .reduce((sum, [, count]) => sum + count, 0)
+  };
+}
+
+async function main() {
+  await db.migrated;
+  const emails = await createUsers();
+  const server = app.listen(0);
+  await new Promise((resolve) => server.once('listening', resolve));
+  const { port } = server.address();
+
+  console.log(`bcrypt cost ${passwords.COST}, ${passwords.pool.concurrency} hashing slots, queue limit ${passwords.pool.maxQueue}`);
+  console.log('concurrency  logins/s    p50 ms    p99 ms   503s  errors');
+  for (const level of LEVELS) {
+    const r = await runLevel(port, emails, level);
+    console.log(
+      `${String(r.concurrency).padStart(11)}  ${r.loginsPerSec.toFixed(1).padStart(8)}  ` +
+      `${r.p50.toFixed(1).padStart(8)}  ${r.p99.toFixed(1).padStart(8)}  ` +
+      `${String(r.shed).padStart(5)}  ${String(r.failed).padStart(6)}`
+    );
+  }
+
+  await new Promise((resolve) => server.close(resolve));
+  await db.closeAsync();
+}
+
+main()
+  .catch((err) => {
+    console.error('❌ Benchmark failed:', err);
+    process.exitCode = 1;
+  })
+  .finally(() => {
+    if (scratchDir) fs.rmSync(scratchDir, { recursive: true, force: true });
+  });
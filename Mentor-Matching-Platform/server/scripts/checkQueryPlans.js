@@ -0,0 +1,192 @@
+// scripts/checkQueryPlans.js
+// Runs EXPLAIN QUERY PLAN for every SQL statement in the routes,
+// middlewares and utils and reports the ones that scan a whole table.
+// Statements with ${...} interpolations are checked through their real
+// variants, listed in builtQueries().
+//
+//   node scripts/checkQueryPlans.js
+//
+// Set SQLITE_FILE to check against a database other than data/survey.db.
+const fs = require('fs');
+const path = require('path');
+
+const SERVER_DIR = path.join(__dirname, '..');
+const SOURCE_DIRS = ['routes', 'middlewares', 'utils'];
+
+// Full scans that are intended, by file and the plan's SCAN detail
+const ALLOWED_SCANS = [
+  { file: 'routes/admin.js', scan: /^SCAN s\b/, reason: 'the session overview lists every session' }
+];
+
+// Interpolated statements whose variants differ only in how many bind
+// parameters they take, which does not change the plan
+const ALLOWED_DYNAMIC = [
+  { file: 'utils/recommendationCache.js', text: /FROM \(VALUES \$\{values\}\)/, reason: 'one VALUES row per recommendation' },
+  { file: 'utils/recommendationCache.js', text: /IN \(\$\{affected\.map/, reason: 'one bind parameter per affected list' }
+];
+
+// Statements built from constants or assembled per request can't be read
+// out of the source text, so they are built here as the code builds them
+function builtQueries() {
+  const { PARTICIPANT_FEATURES_SQL, MENTOR_CANDIDATES_SQL } = require('../utils/matchAlgorithm');
+  const { LATEST_SURVEY_SQL } = require('../utils/latestSurvey');
+  const { SURVEY_STEPS } = require('../routes/survey');
+  const { mentorSearchQuery } = require('../routes/mentors');
+  const { PARTICIPANT_SORTS, participantListQuery } = require('../routes/admin');
+
+  const queries = [
+    { file: 'utils/matchAlgorithm.js', sql: PARTICIPANT_FEATURES_SQL },
+    { file: 'utils/matchAlgorithm.js', sql: MENTOR_CANDIDATES_SQL },
+    { file: 'utils/latestSurvey.js', sql: LATEST_SURVEY_SQL },
+    ...Object.values(SURVEY_STEPS).map(sql => ({ file: 'routes/survey.js', sql })),
+    // First page and later pages
+    ...[null, [-1.5, 7]].map(after => ({ file: 'routes/mentors.js', sql: mentorSearchQuery('"ann"*', after, 20).sql }))
+  ];
+  // Every combination of the participant list's filters, sort and cursor
+  for (const sort of Object.values(PARTICIPANT_SORTS)) {
+    for (const order of ['ASC', 'DESC']) {
+      for (const role of [undefined, 'mentee']) {
+        for (const matched of [undefined, true, false]) {
+          for (const prefix of [null, 'ann']) {
+            for (const after of [null, ['2024-01-01', 7]]) {
+              const { sql } = participantListQuery(1, { role, matched, prefix, sort, order, limit: 50, after });
+              queries.push({ file: 'routes/admin.js', sql });
+            }
+          }
+        }
+      }
+    }
+  }
+  return queries.map(query => ({ line: 0, ...query }));
+}
+
+const LITERAL = /`([^`]*)`|"([^"\n]*)"|'([^'\n]*)'/g;
+// SQL in this codebase is written with upper-case keywords
+const STATEMENT = /^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b/;
+
+// A ${...} interpolation, or one cut short by a template literal nested in it
+const INTERPOLATION = /\$\{[^}]*\}|\$\{[\s\S]*$/g;
+
+function normalize(sql) {
+  return sql.replace(/\s+/g, ' ').trim();
+}
+
+/**
+ * SQL statements written as string literals in the server sources.
+ * @returns {Array<{file: string, line: number, sql: string, dynamic: boolean}>}
+ *   dynamic: the literal has interpolations, so `sql` is only its text
+ */
+function sourceQueries() {
+  const queries = [];
+  for (const dir of SOURCE_DIRS) {
+    const files = fs.readdirSync(path.join(SERVER_DIR, dir)).filter(name => name.endsWith('.js'));
+    for (const name of files) {
+      const file = `${dir}/${name}`;
+      const source = fs.readFileSync(path.join(SERVER_DIR, file), 'utf8');
+      for (const match of source.matchAll(LITERAL)) {
+        const text = match[1] ?? match[2] ?? match[3];
+        if (!STATEMENT.test(text)) continue;
+        queries.push({
+          file,
+          line: source.slice(0, match.index).split('\n').length,
+          sql: text,
+          dynamic: text.includes('${')
+        });
+      }
+    }
+  }
+  return queries;
+}
+
+function explain(db, sql) {
+  const params = new Array((sql.match(/\?/g) || []).length).fill(null);
+  return new Promise((resolve, reject) => {
+    db.all(`EXPLAIN QUERY PLAN ${sql}`, params, (err, rows) => (err ? reject(err) : resolve(rows)));
+  });
+}
+
+// Whether `sql` is a variant of the interpolated literal `text`: it has
+// the literal's fixed parts, in order
+function isVariantOf(sql, text) {
+  const statement = normalize(sql);
+  let from = 0;
+  for (const part of text.split(INTERPOLATION).map(normalize).filter(Boolean)) {
+    const at = statement.indexOf(part, from);
+    if (at === -1) return false;
+    from = at + part.length;
+  }
+  return true;
+}
+
+function isTableScan(detail) {
+  return /^SCAN /.test(detail) && !/CONSTANT ROW|VIRTUAL TABLE/.test(detail);
+}
+
+/**
+ * Explains every query against `db`, which should have the full schema
+ * and migrations applied.
+ * @param {sqlite3.Database} db
+ * @returns {Promise<{checked: number, scans: object[], unchecked: object[]}>}
+ *   scans: unexpected full scans; unchecked: statements that could not be
+ *   prepared, and interpolated ones with no variant in builtQueries()
+ */
+async function checkQueryPlans(db) {
+  const report = { checked: 0, scans: [], unchecked: [] };
+  const built = builtQueries();
+  const queries = [];
+  for (const query of sourceQueries()) {
+    if (!query.dynamic) {
+      queries.push(query);
+    } else if (
+      !built.some(variant => variant.file === query.file && isVariantOf(variant.sql, query.sql)) &&
+      !ALLOWED_DYNAMIC.some(allowed => allowed.file === query.file && allowed.text.test(query.sql))
+    ) {
+      report.unchecked.push({ file: query.file, line: query.line, error: 'assembled at runtime; add its variants to builtQueries()' });
+    }
+  }
+
+  for (const query of [...queries, ...built]) {
+    let plan;
+    try {
+      plan = await explain(db, query.sql);
+    } catch (err) {
+      report.unchecked.push({ file: query.file, line: query.line, error: err.message });
+      continue;
+    }
+    report.checked++;
+    for (const { detail } of plan) {
+      if (!isTableScan(detail)) continue;
+      if (ALLOWED_SCANS.some(allowed => allowed.file === query.file && allowed.scan.test(detail))) continue;
+      report.scans.push({
+        file: query.file,
+        line: query.line,
+        detail,
+        sql: query.sql.replace(/\s+/g, ' ').trim()
+      });
+    }
+  }
+  return report;
+}
+
+module.exports = { checkQueryPlans, sourceQueries, isVariantOf, ALLOWED_SCANS, ALLOWED_DYNAMIC };
+
+if (require.main === module) {
+  const db = require('../db');
+  db.migrated
+    .then(() => checkQueryPlans(db))
+    .then((report) => {
+      for (const { file, line, error } of report.unchecked) {
+        console.warn(`⚠️ ${file}:${line} not checked: ${error}`);
+      }
+      for (const { file, line, detail, sql } of report.scans) {
+        console.error(`❌ ${file}:${line} ${detail}\n   ${sql}`);
+      }
+      console.log(`✅ Checked ${report.checked} queries, ${report.scans.length} unexpected full scan(s)`);
+      process.exitCode = report.scans.length + report.unchecked.length > 0 ? 1 : 0;
+    })
+    .catch((err) => {
+      console.error('❌ Query plan check failed:', err.message);
+      process.exitCode = 1;
+    })
+    .finally(() => db.closeAsync());
+}
@@ -2,12 +2,16 @@
 
 // 1. Mock modules before loading the app
 jest.mock('../db');
+jest.mock('../utils/recommendationCache');
+jest.mock('../utils/jobQueue');
 jest.mock('../middlewares/auth', () => ({
     ensureAdmin: (req, res, next) => next(),
     ensureAuthenticated: (req, res, next) => next(),
 }));
 
 const db = require('../db');
+const recommendationCache = require('../utils/recommendationCache');
+const jobQueue = require('../utils/jobQueue');
 const request = require('supertest');
 const app = require('../app');
 
@@ -103,14 +107,67 @@ describe('Admin API Routes', () => {
     });
 
     describe('PATCH /api/admin/sessions/:sessionId/applications/:id', () => {
+        let tx;
+
+        beforeEach(() => {
+            tx = {
+                get: jest.fn().mockResolvedValue({ session_id: 1, user_id: 7 }),
+                run: jest.fn().mockResolvedValue({ changes: 1 }),
+            };
+            db.transaction = jest.fn(async (work) => work(tx));
+        });
+
         it('should update status when valid', async () => {
-            db.run.mockImplementation((sql, params, cb) => cb(null, { changes: 1 }));
             const res = await request(app)
                 .patch('/api/admin/sessions/1/applications/2')
                 .send({ status: 'approved' });
 
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ message: 'Status updated', status: 'approved' });
+            expect(tx.run).toHaveBeenCalledWith(expect.stringContaining('SET status'), ['approved', '2']);
+        });
+
+        it('adds an approved applicant to the session\'s participants', async () => {
+            await request(app)
+                .patch('/api/admin/sessions/1/applications/2')
+                .send({ status: 'approved' });
+
+            const joins = tx.run.mock.calls.filter(([sql]) => sql.includes('INTO participants'));
+            expect(joins).toHaveLength(1);
+            expect(joins[0][1]).toEqual([1, 7, '2']);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(7, 1);
+        });
+
+        it('removes an applicant moved back from approved from the participants', async () => {
+            await request(app)
+                .patch('/api/admin/sessions/1/applications/2')
+                .send({ status: 'onhold' });
+
+            const leaves = tx.run.mock.calls.filter(([sql]) => sql.includes('DELETE FROM participants'));
+            expect(leaves).toHaveLength(1);
+            expect(leaves[0][1]).toEqual([1, 7]);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(7, 1);
+        });
+
+        it('leaves the cache alone when the participants do not change', async () => {
+            tx.run.mockResolvedValue({ changes: 0 });
+            const res = await request(app)
+                .patch('/api/admin/sessions/1/applications/2')
+                .send({ status: 'pending' });
+
+            expect(res.status).toBe(200);
+            expect(recommendationCache.invalidateApplicant).not.toHaveBeenCalled();
+        });
+
+        it('404 when the application does not exist', async () => {
+            tx.get.mockResolvedValue(undefined);
+            const res = await request(app)
+                .patch('/api/admin/sessions/1/applications/2')
+                .send({ status: 'approved' });
+
+            expect(res.status).toBe(404);
+            expect(res.body).toEqual({ error: 'Application not found' });
+            expect(tx.run).not.toHaveBeenCalled();
         });
 
         it('should reject invalid status', async () => {
@@ -121,10 +178,8 @@ describe('Admin API Routes', () => {
             expect(res.body).toEqual({ error: 'Invalid status' });
         });
 
-        
-
         it('should handle db errors', async () => {
-            db.run.mockImplementation((sql, params, cb) => cb(new Error('fail')));
+            db.transaction.mockRejectedValue(new Error('fail'));
             const res = await request(app)
                 .patch('/api/admin/sessions/1/applications/2')
                 .send({ status: 'approved' });
@@ -134,37 +189,267 @@ describe('Admin API Routes', () => {
     });
 
     describe('GET /api/admin/sessions/:sessionId/participants', () => {
-        it('should return mentors and mentees', async () => {
-            db.all
-                .mockImplementationOnce((sql, params, cb) => cb(null, [
-                    { id: 1, email: 'm@x.com', name: 'Mentor One', assigned_mentees: 2, join_date: '2025-01-01' }
-                ]))
-                .mockImplementationOnce((sql, params, cb) => cb(null, [
-                    { id: 2, email: 't@x.com', name: 'Mentee One', matched_date: '2025-01-05', assigned_mentor: 'Mentor One', application_date: '2025-01-02' }
-                ]));
+        const mentorRow = { id: 1, email: 'm@x.com', role: 'mentor', name: 'Mentor One', join_date: '2025-01-01', pair_count: 2, matched_date: null, assigned_mentor: null, sort_key: '2025-01-01' };
+        const menteeRow = { id: 2, email: 't@x.com', role: 'mentee', name: 'Mentee One', join_date: '2025-01-02', pair_count: 0, matched_date: null, assigned_mentor: null, sort_key: '2025-01-02' };
+
+        it('should return one page of mentors and mentees', async () => {
+            db.allAsync = jest.fn().mockResolvedValue([mentorRow, menteeRow]);
+            db.getAsync = jest.fn().mockResolvedValue({ mentor: 4, mentee: 9 });
 
             const res = await request(app).get('/api/admin/sessions/7/participants');
             expect(res.status).toBe(200);
             expect(res.body).toEqual({
-                mentors: [{ id: 1, email: 'm@x.com', name: 'Mentor One', assigned_mentees: 2, join_date: '2025-01-01' }],
-                mentees: [{ id: 2, email: 't@x.com', name: 'Mentee One', matched_date: '2025-01-05', assigned_mentor: 'Mentor One', application_date: '2025-01-02' }],
+                counts: { mentor: 4, mentee: 9 },
+                participants: [
+                    { id: 1, email: 'm@x.com', role: 'mentor', name: 'Mentor One', join_date: '2025-01-01', assigned_mentees: 2 },
+                    { id: 2, email: 't@x.com', role: 'mentee', name: 'Mentee One', join_date: '2025-01-02', assigned_mentor: 'Not assigned', matched_date: null },
+                ],
+                nextCursor: null,
             });
+            const [sql, params] = db.allAsync.mock.calls[0];
+            expect(sql).toContain('a.pair_count');
+            expect(sql).not.toContain('COUNT(');
+            expect(params).toEqual(['7', 51]);
+            expect(db.getAsync).toHaveBeenCalledWith(expect.stringContaining("a.status = 'approved'"), ['7']);
         });
 
-        it('should handle mentor query error', async () => {
-            db.all.mockImplementation((sql, params, cb) => cb(new Error('mentor fail')));
+        it('should filter and continue from a cursor', async () => {
+            db.allAsync = jest.fn().mockResolvedValue([menteeRow, { ...menteeRow, id: 3 }]);
+            db.getAsync = jest.fn().mockResolvedValue({ mentor: 4, mentee: 9 });
+
+            const res = await request(app)
+                .get('/api/admin/sessions/7/participants')
+                .query({ role: 'mentee', matched: 'false', q: 'Men_', limit: 1 });
+            expect(res.status).toBe(200);
+            expect(res.body.participants).toHaveLength(1);
+            expect(res.body.nextCursor).toEqual(expect.any(String));
+            expect(db.allAsync.mock.calls[0][1]).toEqual(['7', 'mentee', 'Men\\_%', 'Men\\_%', 2]);
+            expect(db.allAsync.mock.calls[0][0]).toContain('a.pair_count = 0');
+
+            await request(app)
+                .get('/api/admin/sessions/7/participants')
+                .query({ role: 'mentee', cursor: res.body.nextCursor });
+            const [sql, params] = db.allAsync.mock.calls[1];
+            expect(sql).toContain('(a.application_date, a.user_id) < (?, ?)');
+            expect(params).toEqual(['7', 'mentee', '2025-01-02', 2, 51]);
+            // Later pages leave the counts out
+            expect(db.getAsync).toHaveBeenCalledTimes(1);
+        });
+
+        it('should reject invalid query parameters', async () => {
+            db.allAsync = jest.fn();
+            for (const query of [{ role: 'admin' }, { matched: 'yes' }, { sort: 'email' }, { limit: 0 }, { cursor: 'nope' }]) {
+                const res = await request(app).get('/api/admin/sessions/7/participants').query(query);
+                expect(res.status).toBe(400);
+            }
+            expect(db.allAsync).not.toHaveBeenCalled();
+        });
+
+        it('should handle db errors', async () => {
+            db.allAsync = jest.fn().mockRejectedValue(new Error('fail'));
             const res = await request(app).get('/api/admin/sessions/7/participants');
             expect(res.status).toBe(500);
-            expect(res.body).toEqual({ error: 'Failed to fetch mentors' });
+            expect(res.body).toEqual({ error: 'Failed to fetch participants' });
         });
+    });
 
-        it('should handle mentee query error', async () => {
-            db.all
-                .mockImplementationOnce((sql, params, cb) => cb(null, []))
-                .mockImplementationOnce((sql, params, cb) => cb(new Error('mentee fail')));
-            const res = await request(app).get('/api/admin/sessions/7/participants');
+    const lifestyle = {
+        physicalExerciseFrequency: 3, likeAnimals: 3, likeCooking: 3, travelImportance: 3,
+        freeTimePreference: 3, feelOverwhelmed: 3, activityBarriers: 3, longTermGoals: 3,
+        stressHandling: 3, motivationLevel: 3, hadMentor: 1,
+    };
+    const rows = [
+        { user_id: 1, application_id: 11, role: 'mentor', email: 'a@x.com', first_name: 'Ann', last_name: 'A',
+          has_profile: 1, transplant_type: '["Kidney"]', goals: '["Peer Support"]',
+          sports_activities: '["Running"]', top_type: '3', ...lifestyle },
+        { user_id: 2, application_id: 12, role: 'mentor', email: 'b@x.com', first_name: 'Ben', last_name: 'B',
+          has_profile: 1, transplant_type: '["Liver"]', goals: '[]',
+          sports_activities: '[]', top_type: '1', ...lifestyle, likeAnimals: 1 },
+        { user_id: 3, application_id: 13, role: 'mentee', email: 'c@x.com', first_name: 'Cat', last_name: 'C',
+          has_profile: 1, transplant_type: '["Kidney"]', goals: '["Peer Support"]',
+          sports_activities: '["Running"]', top_type: '[6,8]', ...lifestyle },
+    ];
+
+    describe('GET /api/admin/sessions/:sessionId/match-scores', () => {
+        it('should return the score matrix and top recommendations', async () => {
+            db.allAsync = jest.fn().mockResolvedValue(rows);
+            const res = await request(app).get('/api/admin/sessions/4/match-scores?top=1');
+            expect(res.status).toBe(200);
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][1]).toEqual(['4']);
+            expect(res.body.mentors.map((m) => m.id)).toEqual([1, 2]);
+            expect(res.body.scores).toEqual([[1, 0.192]]);
+            expect(res.body.mentees).toEqual([{
+                id: 3, name: 'Cat C', email: 'c@x.com',
+                recommendations: [{ mentor_id: 1, first_name: 'Ann', last_name: 'A', email: 'a@x.com', finalScore: 1 }],
+            }]);
+        });
+
+        it('should handle errors', async () => {
+            db.allAsync = jest.fn().mockRejectedValue(new Error('fail'));
+            const res = await request(app).get('/api/admin/sessions/4/match-scores');
+            expect(res.status).toBe(500);
+            expect(res.body).toEqual({ success: false, error: 'Failed to score session' });
+        });
+    });
+
+    describe('POST /api/admin/sessions/:sessionId/assign-mentors', () => {
+        const mockSession = (pairs) => {
+            db.allAsync = jest.fn((sql) => Promise.resolve(sql.includes('SELECT mentor_id, mentee_id FROM matching_pairs') ? pairs : rows));
+            db.runAsync = jest.fn().mockResolvedValue({ changes: 1 });
+        };
+
+        it('should pair mentees with their best mentor and save in one statement', async () => {
+            mockSession([]);
+            const res = await request(app).post('/api/admin/sessions/4/assign-mentors').send({});
+            expect(res.status).toBe(200);
+            expect(res.body).toEqual({
+                success: true,
+                sessionId: 4,
+                pairs: [{ mentorId: 1, menteeId: 3, score: 1 }],
+                unassigned: [],
+                totalScore: 1,
+                inserted: 1,
+            });
+            expect(db.runAsync).toHaveBeenCalledTimes(1);
+            expect(db.runAsync.mock.calls[0][1]).toEqual(['4', '[[1,3]]']);
+            expect(recommendationCache.invalidateSession).toHaveBeenCalledWith('4');
+        });
+
+        it('should never pair incompatible meeting preferences', async () => {
+            mockSession([]);
+            rows[0].meeting_preference = 'Phone';
+            rows[2].meeting_preference = 'Online';
+            try {
+                const res = await request(app).post('/api/admin/sessions/4/assign-mentors').send({ dryRun: true });
+                expect(res.body.pairs).toEqual([{ mentorId: 2, menteeId: 3, score: 0.192 }]);
+            } finally {
+                delete rows[0].meeting_preference;
+                delete rows[2].meeting_preference;
+            }
+        });
+
+        it('should prefer the capacity saved on the mentor application', async () => {
+            mockSession([]);
+            rows[0].mentee_capacity = 0;
+            try {
+                const res = await request(app)
+                    .post('/api/admin/sessions/4/assign-mentors')
+                    .send({ capacities: { 1: 5 }, dryRun: true });
+                expect(res.body.pairs).toEqual([{ mentorId: 2, menteeId: 3, score: 0.192 }]);
+            } finally {
+                delete rows[0].mentee_capacity;
+            }
+        });
+
+        it('should count existing pairs against mentor capacity', async () => {
+            mockSession([{ mentor_id: 1, mentee_id: 9 }]);
+            const res = await request(app).post('/api/admin/sessions/4/assign-mentors').send({ dryRun: true });
+            expect(res.status).toBe(200);
+            expect(res.body.pairs).toEqual([{ mentorId: 2, menteeId: 3, score: 0.192 }]);
+            expect(res.body.inserted).toBe(0);
+            expect(db.runAsync).not.toHaveBeenCalled();
+        });
+
+        it('should leave mentees unassigned when no pair reaches minScore', async () => {
+            mockSession([]);
+            const res = await request(app)
+                .post('/api/admin/sessions/4/assign-mentors')
+                .send({ capacities: { 1: 0 }, minScore: 0.5 });
+            expect(res.status).toBe(200);
+            expect(res.body.pairs).toEqual([]);
+            expect(res.body.unassigned).toEqual([3]);
+            expect(db.runAsync).not.toHaveBeenCalled();
+        });
+
+        it('should reject an invalid capacity', async () => {
+            const res = await request(app).post('/api/admin/sessions/4/assign-mentors').send({ capacity: -1 });
+            expect(res.status).toBe(400);
+        });
+
+        it('should handle errors', async () => {
+            db.allAsync = jest.fn().mockRejectedValue(new Error('fail'));
+            const res = await request(app).post('/api/admin/sessions/4/assign-mentors').send({});
             expect(res.status).toBe(500);
-            expect(res.body).toEqual({ error: 'Failed to fetch mentees' });
+            expect(res.body).toEqual({ success: false, error: 'Failed to assign mentors' });
+        });
+    });
+
+    describe('POST /api/admin/sessions/:sessionId/match-jobs', () => {
+        const job = { id: 12, type: 'match-session', sessionId: 4, status: 'queued', progress: 0 };
+
+        it('should queue a matching job and return it immediately', async () => {
+            jobQueue.enqueue.mockResolvedValue({ job, deduplicated: false });
+            const res = await request(app).post('/api/admin/sessions/4/match-jobs').send({ capacity: 2 });
+            expect(res.status).toBe(202);
+            expect(res.headers.location).toBe('/api/admin/jobs/12');
+            expect(res.body).toEqual({ success: true, deduplicated: false, job });
+            expect(jobQueue.enqueue).toHaveBeenCalledWith(
+                'match-session', 4, { capacity: 2, capacities: {}, minScore: 0, dryRun: false }, null
+            );
+        });
+
+        it('should return the job already running for the session', async () => {
+            jobQueue.enqueue.mockResolvedValue({ job: { ...job, status: 'running' }, deduplicated: true });
+            const res = await request(app).post('/api/admin/sessions/4/match-jobs').send({});
+            expect(res.status).toBe(200);
+            expect(res.body.deduplicated).toBe(true);
+        });
+
+        it('should reject an invalid capacity', async () => {
+            const res = await request(app).post('/api/admin/sessions/4/match-jobs').send({ capacity: 'x' });
+            expect(res.status).toBe(400);
+            expect(jobQueue.enqueue).not.toHaveBeenCalled();
+        });
+    });
+
+    describe('GET /api/admin/jobs/:id', () => {
+        it('should return the job', async () => {
+            const job = { id: 12, status: 'succeeded', progress: 1, result: { inserted: 3 } };
+            jobQueue.getJob.mockResolvedValue(job);
+            const res = await request(app).get('/api/admin/jobs/12');
+            expect(res.status).toBe(200);
+            expect(res.body).toEqual({ success: true, job });
+        });
+
+        it('should 404 for an unknown job', async () => {
+            jobQueue.getJob.mockResolvedValue(null);
+            const res = await request(app).get('/api/admin/jobs/99');
+            expect(res.status).toBe(404);
+        });
+    });
+
+    describe('PATCH /api/admin/sessions/:sessionId/applications/:id/capacity', () => {
+        const url = '/api/admin/sessions/4/applications/11/capacity';
+
+        it('should save the capacity and refresh the mentor\'s recommendations', async () => {
+            db.getAsync = jest.fn().mockResolvedValue({ user_id: 1 });
+            db.runAsync = jest.fn().mockResolvedValue({ changes: 1 });
+            const res = await request(app).patch(url).send({ menteeCapacity: 2 });
+            expect(res.status).toBe(200);
+            expect(res.body).toEqual({ success: true, menteeCapacity: 2 });
+            expect(db.getAsync.mock.calls[0][1]).toEqual(['11', '4']);
+            expect(db.runAsync.mock.calls[0][1]).toEqual([2, '11']);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(1, '4');
+        });
+
+        it('should accept null to remove the limit', async () => {
+            db.getAsync = jest.fn().mockResolvedValue({ user_id: 1 });
+            db.runAsync = jest.fn().mockResolvedValue({ changes: 1 });
+            const res = await request(app).patch(url).send({ menteeCapacity: null });
+            expect(res.status).toBe(200);
+            expect(db.runAsync.mock.calls[0][1]).toEqual([null, '11']);
+        });
+
+        it('should reject an invalid capacity', async () => {
+            const res = await request(app).patch(url).send({ menteeCapacity: -1 });
+            expect(res.status).toBe(400);
+        });
+
+        it('should 404 if the application is not in the session', async () => {
+            db.getAsync = jest.fn().mockResolvedValue(undefined);
+            const res = await request(app).patch(url).send({ menteeCapacity: 1 });
+            expect(res.status).toBe(404);
         });
     });
 
@@ -216,16 +501,16 @@ describe('Admin API Routes', () => {
 
     describe('GET /api/admin/participants/:userId/match', () => {
         it('should return mentees for a mentor', async () => {
-            db.allAsync = jest.fn().mockResolvedValue([{ user_id: 10, name: 'Trainee' }]);
-            db.getAsync = jest.fn().mockResolvedValue(null);
+            db.allAsync = jest.fn().mockResolvedValue([{ role: 'mentor', user_id: 10, name: 'Trainee' }]);
             const res = await request(app).get('/api/admin/participants/1/match');
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ success: true, role: 'mentor', mentees: [{ user_id: 10, name: 'Trainee' }] });
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][1]).toEqual(['1', '1']);
         });
 
         it('should return mentor for a mentee', async () => {
-            db.allAsync = jest.fn().mockResolvedValue([]);
-            db.getAsync = jest.fn().mockResolvedValue({ user_id: 2, name: 'MentorName' });
+            db.allAsync = jest.fn().mockResolvedValue([{ role: 'mentee', user_id: 2, name: 'MentorName' }]);
             const res = await request(app).get('/api/admin/participants/2/match');
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ success: true, role: 'mentee', mentor: { user_id: 2, name: 'MentorName' } });
@@ -233,7 +518,6 @@ describe('Admin API Routes', () => {
 
         it('should 404 if no match', async () => {
             db.allAsync = jest.fn().mockResolvedValue([]);
-            db.getAsync = jest.fn().mockResolvedValue(null);
             const res = await request(app).get('/api/admin/participants/3/match');
             expect(res.status).toBe(404);
             expect(res.body).toEqual({ success: false, message: 'No match found' });
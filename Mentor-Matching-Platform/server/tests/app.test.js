@@ -31,4 +31,14 @@ describe('app.js', () => {
         expect(res.status).toBe(401);
         expect(res.body).toEqual({ success: false, message: 'Unauthorized' });
     });
+
+    it('serves request metrics in the Prometheus text format', async () => {
+        await request(app).get('/');
+        const res = await request(app).get('/metrics');
+        expect(res.status).toBe(200);
+        expect(res.headers['content-type']).toMatch(/^text\/plain/);
+        expect(res.text).toContain('# TYPE http_request_duration_seconds histogram');
+        expect(res.text).toMatch(/http_request_duration_seconds_count\{method="GET",route="\/",status="200"\} \d+/);
+        expect(res.text).toContain('# TYPE sqlite_query_duration_seconds histogram');
+    });
 });
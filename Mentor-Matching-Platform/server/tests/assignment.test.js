@@ -0,0 +1,104 @@
+// tests/assignment.test.js
+
+const { solveAssignment } = require('../utils/assignment');
+
+// Deterministic pseudo-random numbers so failures are reproducible
+function makeRandom(seed) {
+    return () => {
+        seed = (seed * 1103515245 + 12345) & 0x7fffffff;
+        return seed / 0x7fffffff;
+    };
+}
+
+// Best total by trying every capacity-respecting assignment
+function bruteForceBest(scores, rows, cols, capacities, minScore) {
+    const load = new Array(cols).fill(0);
+    let best = 0;
+    const visit = (i, total) => {
+        if (i === rows) {
+            best = Math.max(best, total);
+            return;
+        }
+        visit(i + 1, total);
+        for (let j = 0; j < cols; j++) {
+            const score = scores[i * cols + j];
+            if (load[j] < capacities[j] && score >= minScore) {
+                load[j]++;
+                visit(i + 1, total + score);
+                load[j]--;
+            }
+        }
+    };
+    visit(0, 0);
+    return best;
+}
+
+function checkAssignment(assignment, scores, cols, capacities, minScore = -Infinity) {
+    const load = new Array(cols).fill(0);
+    let total = 0;
+    assignment.forEach((col, row) => {
+        if (col === -1) return;
+        load[col]++;
+        total += scores[row * cols + col];
+        expect(scores[row * cols + col]).toBeGreaterThanOrEqual(minScore);
+    });
+    load.forEach((count, col) => expect(count).toBeLessThanOrEqual(capacities[col]));
+    return total;
+}
+
+describe('solveAssignment', () => {
+    it('prefers the globally best pairing over greedy choices', () => {
+        // Greedy would give mentee 0 mentor 0 (0.9) and leave mentee 1 with 0.1
+        const scores = [
+            0.9, 0.8,
+            0.85, 0.1,
+        ];
+        expect(Array.from(solveAssignment(scores, 2, 2, [1, 1]))).toEqual([1, 0]);
+    });
+
+    it('fills a mentor up to their capacity', () => {
+        const scores = [
+            0.9, 0.2,
+            0.8, 0.3,
+            0.7, 0.4,
+        ];
+        expect(Array.from(solveAssignment(scores, 3, 2, [2, 1]))).toEqual([0, 0, 1]);
+    });
+
+    it('leaves mentees unassigned when capacity or minScore runs out', () => {
+        const scores = [
+            0.9, 0.2,
+            0.8, 0.3,
+        ];
+        expect(Array.from(solveAssignment(scores, 2, 2, [1, 0]))).toEqual([0, -1]);
+        expect(Array.from(solveAssignment(scores, 2, 2, [1, 1], { minScore: 0.5 }))).toEqual([0, -1]);
+    });
+
+    it('matches a brute-force search on small random sessions', () => {
+        const random = makeRandom(7);
+        for (let t = 0; t < 500; t++) {
+            const rows = 1 + Math.floor(random() * 6);
+            const cols = 1 + Math.floor(random() * 4);
+            const scores = Float64Array.from({ length: rows * cols }, () => Math.round(random() * 100) / 100);
+            const capacities = Array.from({ length: cols }, () => Math.floor(random() * 3));
+            const minScore = t % 3 === 0 ? 0.5 : 0;
+
+            const assignment = solveAssignment(scores, rows, cols, capacities, { minScore });
+            const total = checkAssignment(assignment, scores, cols, capacities, minScore);
+            expect(total).toBeCloseTo(bruteForceBest(scores, rows, cols, capacities, minScore), 9);
+        }
+    });
+
+    it('handles a thousand-participant session', () => {
+        const random = makeRandom(11);
+        const rows = 800;
+        const cols = 300;
+        const capacities = new Array(cols).fill(3);
+        const scores = Float64Array.from({ length: rows * cols }, random);
+
+        const assignment = solveAssignment(scores, rows, cols, capacities);
+
+        checkAssignment(assignment, scores, cols, capacities);
+        expect(Array.from(assignment).every((col) => col !== -1)).toBe(true);
+    });
+});
@@ -113,6 +113,39 @@ describe('AuthRoutes', () => {
                 avatar_url: 'http://img.url/pic.png',
             });
         });
+        it('re-hashes a password stored with an outdated cost', async () => {
+            const oldHash = '$2b$04$abcdefghijklmnopqrstuuABCDEFGHIJKLMNOPQRSTUVWXYZ01234';
+            db.get
+                .mockImplementationOnce((sql, params, cb) =>
+                    cb(null, { id: 1, email: creds.email, password_hash: oldHash, account_type: 'standard' })
+                )
+                .mockImplementationOnce((sql, params, cb) => cb(null, {}));
+            bcrypt.compare.mockResolvedValue(true);
+            bcrypt.hash.mockResolvedValue('newHash');
+            db.runAsync.mockResolvedValue({ changes: 1 });
+
+            const res = await request(app).post('/api/login').send(creds);
+            await new Promise((resolve) => setImmediate(resolve));
+
+            expect(res.status).toBe(200);
+            expect(bcrypt.hash).toHaveBeenCalledWith(creds.password, 10);
+            expect(db.runAsync).toHaveBeenCalledWith(
+                expect.stringContaining('UPDATE users SET password_hash'),
+                ['newHash', 1, oldHash]
+            );
+        });
+
+        it('returns 503 when password checks are overloaded', async () => {
+            db.get.mockImplementation((sql, params, cb) =>
+                cb(null, { id: 1, email: creds.email, password_hash: 'hash', account_type: 'standard' })
+            );
+            bcrypt.compare.mockRejectedValue(Object.assign(new Error('full'), { code: 'POOL_QUEUE_FULL' }));
+
+            const res = await request(app).post('/api/login').send(creds);
+
+            expect(res.status).toBe(503);
+            expect(res.headers['retry-after']).toBe('1');
+        });
     });
 
     describe('POST /api/forgot-password', () => {
@@ -1,8 +1,9 @@
 // tests/avatar.test.js
 
-// 1. Mock db, auth middleware, and multer before loading the app
+// 1. Mock db, auth middleware, multer and the avatar store before loading the app
 jest.resetModules();
 jest.mock('../db');
+jest.mock('../utils/avatarStore');
 jest.mock('../middlewares/auth', () => ({
     ensureAuthenticated: (req, res, next) => {
         req.user = { id: 42 };
@@ -12,20 +13,26 @@ jest.mock('../middlewares/auth', () => ({
 jest.mock('multer', () => {
     const multer = () => ({
         single: () => (req, res, next) => {
-            // simulate file upload
-            req.file = { filename: 'test-avatar.jpg' };
+            // simulate a streamed upload
+            req.file = { path: '/tmp/upload', hash: 'abc', size: 10 };
             next();
         },
     });
-    multer.diskStorage = () => {}; // stub out storage
+    multer.MulterError = class MulterError extends Error {};
     return multer;
 });
 
 const db = require('../db');
+const avatarStore = require('../utils/avatarStore');
 const request = require('supertest');
 const express = require('express');
 const avatarRouter = require('../routes/avatar');
 
+const AVATAR = {
+    url: '/avatars/abc-256.webp',
+    variants: { 64: '/avatars/abc-64.webp', 128: '/avatars/abc-128.webp', 256: '/avatars/abc-256.webp' },
+};
+
 describe('Avatar Routes', () => {
     let app;
 
@@ -38,10 +45,15 @@ describe('Avatar Routes', () => {
     beforeEach(() => {
         jest.clearAllMocks();
         jest.spyOn(console, 'error').mockImplementation(() => {});
+        db.getAsync.mockResolvedValue({ profile_picture_url: null });
+        avatarStore.storeAvatar.mockImplementation(async (upload, save) => {
+            await save(AVATAR);
+            return AVATAR;
+        });
+        avatarStore.releaseAvatar.mockResolvedValue(true);
+        avatarStore.discardUpload.mockResolvedValue();
     });
 
-
-
     it('should update existing profile when db.run changes > 0', async () => {
         // First run: update returns this.changes = 1
         db.run.mockImplementationOnce((sql, params, cb) =>
@@ -53,11 +65,10 @@ describe('Avatar Routes', () => {
             .attach('avatar', Buffer.from(''), 'avatar.png');
 
         expect(res.status).toBe(200);
-        expect(res.body).toEqual({
-            success: true,
-            url: '/images/test-avatar.jpg',
-        });
+        expect(res.body).toEqual({ success: true, ...AVATAR });
         expect(db.run).toHaveBeenCalledTimes(1);
+        expect(db.run.mock.calls[0][1]).toEqual([AVATAR.url, 42]);
+        expect(avatarStore.discardUpload).toHaveBeenCalledWith({ path: '/tmp/upload', hash: 'abc', size: 10 });
     });
 
     it('should insert profile when update affects 0 rows', async () => {
@@ -74,13 +85,47 @@ describe('Avatar Routes', () => {
             .attach('avatar', Buffer.from(''), 'avatar.png');
 
         expect(res.status).toBe(200);
-        expect(res.body).toEqual({
-            success: true,
-            url: '/images/test-avatar.jpg',
-        });
+        expect(res.body).toEqual({ success: true, ...AVATAR });
         expect(db.run).toHaveBeenCalledTimes(2);
     });
 
+    it('releases the previous avatar once the new one is saved', async () => {
+        db.getAsync.mockResolvedValue({ profile_picture_url: '/avatars/old-256.webp' });
+        db.run.mockImplementationOnce((sql, params, cb) => cb.call({ changes: 1 }, null));
+
+        const res = await request(app)
+            .post('/api/profile/avatar')
+            .attach('avatar', Buffer.from(''), 'avatar.png');
+
+        expect(res.status).toBe(200);
+        expect(avatarStore.releaseAvatar).toHaveBeenCalledWith('/avatars/old-256.webp');
+    });
+
+    it('should return 400 when the upload is not a usable image', async () => {
+        avatarStore.storeAvatar.mockRejectedValue(Object.assign(new Error('bad'), { code: 'INVALID_IMAGE' }));
+
+        const res = await request(app)
+            .post('/api/profile/avatar')
+            .attach('avatar', Buffer.from(''), 'avatar.png');
+
+        expect(res.status).toBe(400);
+        expect(db.run).not.toHaveBeenCalled();
+        expect(avatarStore.discardUpload).toHaveBeenCalled();
+    });
+
+    it('should return 503 when avatars cannot be processed', async () => {
+        avatarStore.storeAvatar.mockRejectedValue(
+            Object.assign(new Error('no sharp'), { code: 'IMAGE_PROCESSING_UNAVAILABLE' })
+        );
+
+        const res = await request(app)
+            .post('/api/profile/avatar')
+            .attach('avatar', Buffer.from('img'), 'avatar.png');
+
+        expect(res.status).toBe(503);
+        expect(avatarStore.discardUpload).toHaveBeenCalled();
+    });
+
     it('should return 500 on database error', async () => {
         db.run.mockImplementationOnce((sql, params, cb) =>
             cb(new Error('failure'))
@@ -95,5 +140,6 @@ describe('Avatar Routes', () => {
             success: false,
             message: 'Database update failed',
         });
+        expect(avatarStore.releaseAvatar).not.toHaveBeenCalled();
     });
 });
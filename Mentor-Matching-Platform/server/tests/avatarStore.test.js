@@ -0,0 +1,120 @@
+// tests/avatarStore.test.js
+
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { Readable } = require('stream');
+
+jest.mock('../db');
+// sharp is loaded on first use and need not be installed
+jest.mock('sharp', () => jest.fn(), { virtual: true });
+
+const AVATAR_DIR = fs.mkdtempSync(path.join(os.tmpdir(), 'avatars-'));
+process.env.AVATAR_DIR = AVATAR_DIR;
+
+const db = require('../db');
+const sharp = require('sharp');
+const { AvatarUploadStorage, storeAvatar, releaseAvatar, discardUpload } = require('../utils/avatarStore');
+
+function upload(content) {
+    const storage = new AvatarUploadStorage();
+    return new Promise((resolve, reject) => {
+        storage._handleFile({}, { stream: Readable.from([Buffer.from(content)]) }, (err, info) =>
+            (err ? reject(err) : resolve(info))
+        );
+    });
+}
+
+describe('avatarStore', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+        const image = {
+            rotate: () => image,
+            metadata: async () => ({ width: 500, height: 400 }),
+            clone: () => image,
+            resize: () => image,
+            webp: () => image,
+            toFile: (file) => fs.promises.writeFile(file, 'webp'),
+        };
+        sharp.mockImplementation(() => image);
+    });
+
+    afterAll(() => {
+        delete process.env.AVATAR_DIR;
+        fs.rmSync(AVATAR_DIR, { recursive: true, force: true });
+    });
+
+    it('streams an upload to a temporary file and hashes its content', async () => {
+        const info = await upload('image bytes');
+
+        expect(fs.readFileSync(info.path, 'utf8')).toBe('image bytes');
+        expect(info.size).toBe(11);
+        expect(info.hash).toBe(crypto.createHash('sha256').update('image bytes').digest('hex').slice(0, 32));
+
+        await discardUpload(info);
+        expect(fs.existsSync(info.path)).toBe(false);
+    });
+
+    it('stores each image once, however often it is uploaded', async () => {
+        const first = await upload('same picture');
+        const save = jest.fn();
+        const avatar = await storeAvatar(first, save);
+
+        expect(avatar.url).toBe(`/avatars/${first.hash}-256.webp`);
+        expect(Object.keys(avatar.variants)).toEqual(['64', '128', '256']);
+        expect(save).toHaveBeenCalledWith(avatar);
+        for (const size of [64, 128, 256]) {
+            expect(fs.existsSync(path.join(AVATAR_DIR, `${first.hash}-${size}.webp`))).toBe(true);
+        }
+
+        const second = await upload('same picture');
+        await storeAvatar(second, jest.fn());
+        expect(sharp).toHaveBeenCalledTimes(1);
+    });
+
+    it('rejects an upload that does not decode', async () => {
+        sharp.mockImplementation(() => ({
+            rotate() { return this; },
+            metadata: async () => { throw new Error('unsupported image format'); },
+        }));
+        const info = await upload('not an image');
+        const save = jest.fn();
+
+        await expect(storeAvatar(info, save)).rejects.toMatchObject({ code: 'INVALID_IMAGE' });
+        expect(save).not.toHaveBeenCalled();
+    });
+
+    it('deletes a replaced avatar only when no profile still uses it', async () => {
+        const info = await upload('old picture');
+        const { url } = await storeAvatar(info, jest.fn());
+        const file = path.join(AVATAR_DIR, `${info.hash}-64.webp`);
+
+        db.getAsync.mockResolvedValueOnce({ 1: 1 });
+        expect(await releaseAvatar(url)).toBe(false);
+        expect(fs.existsSync(file)).toBe(true);
+
+        db.getAsync.mockResolvedValueOnce(undefined);
+        expect(await releaseAvatar(url)).toBe(true);
+        expect(fs.existsSync(file)).toBe(false);
+    });
+
+    it('leaves URLs it did not store alone', async () => {
+        expect(await releaseAvatar('/images/profile-123.jpg')).toBe(false);
+        expect(await releaseAvatar(null)).toBe(false);
+        expect(db.getAsync).not.toHaveBeenCalled();
+    });
+
+    it('reports image processing as unavailable without sharp', async () => {
+        jest.resetModules();
+        jest.doMock('sharp', () => {
+            throw Object.assign(new Error("Cannot find module 'sharp'"), { code: 'MODULE_NOT_FOUND' });
+        }, { virtual: true });
+        const store = require('../utils/avatarStore');
+        const info = await upload('no sharp');
+        const save = jest.fn();
+
+        await expect(store.storeAvatar(info, save)).rejects.toMatchObject({ code: 'IMAGE_PROCESSING_UNAVAILABLE' });
+        expect(save).not.toHaveBeenCalled();
+    });
+});
@@ -0,0 +1,73 @@
+// tests/batchLoader.test.js
+
+jest.mock('../db');
+
+const db = require('../db');
+const { BatchLoader, users } = require('../utils/batchLoader');
+
+describe('BatchLoader', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+    });
+
+    it('loads every key requested in the same tick with one call', async () => {
+        const loadMany = jest.fn(async (keys) => keys.map((id) => ({ id, name: `user ${id}` })));
+        const loader = new BatchLoader(loadMany);
+
+        const rows = await Promise.all([loader.load(1), loader.load(2), loader.load(1)]);
+
+        expect(loadMany).toHaveBeenCalledTimes(1);
+        expect(loadMany).toHaveBeenCalledWith([1, 2]);
+        expect(rows).toEqual([
+            { id: 1, name: 'user 1' },
+            { id: 2, name: 'user 2' },
+            { id: 1, name: 'user 1' },
+        ]);
+    });
+
+    it('matches string keys to numeric ids and resolves missing rows to null', async () => {
+        const loader = new BatchLoader(async () => [{ id: 42 }]);
+
+        await expect(Promise.all([loader.load('42'), loader.load(7)])).resolves.toEqual([{ id: 42 }, null]);
+    });
+
+    it('starts a new batch after the previous one was sent', async () => {
+        const loadMany = jest.fn(async (keys) => keys.map((id) => ({ id })));
+        const loader = new BatchLoader(loadMany);
+
+        await loader.load(1);
+        await loader.load(2);
+
+        expect(loadMany.mock.calls).toEqual([[[1]], [[2]]]);
+    });
+
+    it('splits large batches', async () => {
+        const loadMany = jest.fn(async (keys) => keys.map((id) => ({ id })));
+        const loader = new BatchLoader(loadMany, { maxBatchSize: 2 });
+
+        await Promise.all([1, 2, 3, 4, 5].map((id) => loader.load(id)));
+
+        expect(loadMany.mock.calls).toEqual([[[1, 2]], [[3, 4]], [[5]]]);
+    });
+
+    it('rejects every load in a failed batch', async () => {
+        const loader = new BatchLoader(async () => {
+            throw new Error('db down');
+        });
+
+        const results = await Promise.allSettled([loader.load(1), loader.load(2)]);
+
+        expect(results.map((r) => r.status)).toEqual(['rejected', 'rejected']);
+        expect(results[0].reason.message).toBe('db down');
+    });
+
+    it('looks users up by id with a json_each list', async () => {
+        db.allAsync.mockResolvedValue([{ id: 3, email: 'c@x.com', first_name: 'C', last_name: 'D' }]);
+
+        const [user, missing] = await Promise.all([users.load(3), users.load(4)]);
+
+        expect(user).toEqual({ id: 3, email: 'c@x.com', first_name: 'C', last_name: 'D' });
+        expect(missing).toBeNull();
+        expect(db.allAsync).toHaveBeenCalledWith(expect.stringContaining('json_each(?)'), ['[3,4]']);
+    });
+});
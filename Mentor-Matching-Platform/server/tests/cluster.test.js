@@ -0,0 +1,134 @@
+// tests/cluster.test.js
+
+const { EventEmitter } = require('events');
+
+jest.mock('cluster', () => {
+    const { EventEmitter } = require('events');
+    const cluster = new EventEmitter();
+    cluster.workers = {};
+    cluster.fork = jest.fn();
+    return cluster;
+});
+jest.mock('../db');
+jest.mock('../utils/jobQueue');
+jest.mock('../utils/matchPool');
+jest.mock('../routes/admin', () => ({}));
+jest.mock('../scripts/seedSessions', () => jest.fn());
+jest.mock('../scripts/seedAdmin', () => jest.fn());
+jest.mock('../scripts/seedTestUsers', () => jest.fn());
+
+const cluster = require('cluster');
+const db = require('../db');
+const jobQueue = require('../utils/jobQueue');
+const seedSessions = require('../scripts/seedSessions');
+const seedAdmin = require('../scripts/seedAdmin');
+const { startPrimary } = require('../cluster');
+
+let nextId = 1;
+
+// A forked worker that exits when told to shut down
+function fakeWorker() {
+    const worker = new EventEmitter();
+    worker.id = nextId++;
+    worker.process = { pid: 1000 + worker.id };
+    worker.dead = false;
+    worker.isDead = () => worker.dead;
+    worker.isConnected = () => !worker.dead;
+    worker.send = jest.fn((message) => {
+        if (message === 'shutdown') setImmediate(() => exit(worker, 0));
+    });
+    cluster.workers[worker.id] = worker;
+    return worker;
+}
+
+function exit(worker, code) {
+    worker.dead = true;
+    delete cluster.workers[worker.id];
+    worker.emit('exit', code, null);
+    cluster.emit('exit', worker, code, null);
+}
+
+describe('cluster primary', () => {
+    let logSpy;
+    let errorSpy;
+
+    beforeEach(() => {
+        jest.clearAllMocks();
+        cluster.removeAllListeners();
+        cluster.workers = {};
+        cluster.fork.mockImplementation(fakeWorker);
+        db.migrated = Promise.resolve([]);
+        db.serialize.mockImplementation((fn) => fn());
+        db.get.mockImplementation((sql, cb) => cb(null, {}));
+        seedAdmin.mockResolvedValue();
+        logSpy = jest.spyOn(console, 'log').mockImplementation(() => {});
+        errorSpy = jest.spyOn(console, 'error').mockImplementation(() => {});
+    });
+
+    afterEach(() => {
+        logSpy.mockRestore();
+        errorSpy.mockRestore();
+    });
+
+    it('seeds and starts the job queue once before forking workers', async () => {
+        const order = [];
+        seedSessions.mockImplementation(() => order.push('seed'));
+        jobQueue.start.mockImplementation(async () => order.push('jobs'));
+        cluster.fork.mockImplementation(() => {
+            order.push('fork');
+            return fakeWorker();
+        });
+
+        await startPrimary({ workers: 3 });
+
+        expect(order).toEqual(['seed', 'jobs', 'fork', 'fork', 'fork']);
+        expect(seedAdmin).toHaveBeenCalledTimes(1);
+    });
+
+    it('replaces a worker that crashes', async () => {
+        await startPrimary({ workers: 2 });
+        const crashed = Object.values(cluster.workers)[0];
+        // Long enough ago that it is respawned without a pause
+        crashed.startedAt = 0;
+        exit(crashed, 1);
+        await new Promise((resolve) => setTimeout(resolve, 10));
+
+        expect(cluster.fork).toHaveBeenCalledTimes(3);
+        expect(Object.keys(cluster.workers)).toHaveLength(2);
+    });
+
+    it('restarts workers one at a time, each replacement listening first', async () => {
+        const { rollingRestart } = await startPrimary({ workers: 2 });
+        const original = Object.values(cluster.workers);
+        cluster.fork.mockImplementation(() => {
+            const worker = fakeWorker();
+            // The old worker must still be up when its replacement starts
+            expect(original.filter(w => !w.dead).length).toBeGreaterThan(0);
+            setImmediate(() => worker.emit('listening'));
+            return worker;
+        });
+
+        await rollingRestart();
+
+        expect(original.every(w => w.dead)).toBe(true);
+        expect(original.every(w => w.send.mock.calls[0][0] === 'shutdown')).toBe(true);
+        expect(Object.keys(cluster.workers)).toHaveLength(2);
+        expect(cluster.fork).toHaveBeenCalledTimes(4);
+    });
+
+    it('drains every worker, then stops the job queue and closes the database', async () => {
+        const { shutdown } = await startPrimary({ workers: 2 });
+        const workers = Object.values(cluster.workers);
+        jest.spyOn(global, 'setTimeout').mockImplementation(() => ({ unref() {} }));
+        try {
+            await shutdown();
+        } finally {
+            global.setTimeout.mockRestore();
+        }
+
+        expect(workers.every(w => w.dead)).toBe(true);
+        expect(cluster.fork).toHaveBeenCalledTimes(2);
+        expect(jobQueue.stop).toHaveBeenCalled();
+        expect(db.closeAsync).toHaveBeenCalled();
+    });
+});
@@ -63,34 +63,25 @@ describe('Comments Routes', () => {
         });
 
         it('should 404 if target user not found', async () => {
-            db.getAsync = jest.fn().mockResolvedValue(null);
+            db.allAsync = jest.fn().mockResolvedValue([{ id: 7 }]);
             const res = await request(app).post(url).send(validBody);
-            expect(db.getAsync).toHaveBeenCalledWith(
-                'SELECT id FROM users WHERE id = ?',
-                ['42']
-            );
+            // Both users are looked up with one query
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][1]).toEqual([JSON.stringify(['42', 7])]);
             expect(res.status).toBe(404);
             expect(res.body).toEqual({ error: 'Target user not found' });
         });
 
         it('should 404 if commenter not found', async () => {
-            db.getAsync = jest
-                .fn()
-                .mockResolvedValueOnce({ id: 42 })   // target exists
-                .mockResolvedValueOnce(null);         // commenter missing
+            db.allAsync = jest.fn().mockResolvedValue([{ id: 42 }]);
 
             const res = await request(app).post(url).send(validBody);
-            expect(db.getAsync).toHaveBeenNthCalledWith(
-                2,
-                'SELECT id FROM users WHERE id = ?',
-                [7]
-            );
             expect(res.status).toBe(404);
             expect(res.body).toEqual({ error: 'Commenter not found' });
         });
 
         it('should 500 on insert error', async () => {
-            db.getAsync = jest.fn().mockResolvedValue({ id: 1 });
+            db.allAsync = jest.fn().mockResolvedValue([{ id: 42 }, { id: 7 }]);
             db.runAsync = jest.fn().mockRejectedValue(new Error('insert fail'));
 
             const res = await request(app).post(url).send(validBody);
@@ -106,22 +97,9 @@ describe('Comments Routes', () => {
                 commenter: 'Bob Jones',
             };
 
-            db.getAsync = jest
-                .fn()
-                .mockResolvedValueOnce({ id: 42 })           // target user exists
-                .mockResolvedValueOnce({ id: 7 });           // commenter exists
-
+            db.allAsync = jest.fn().mockResolvedValue([{ id: 42 }, { id: 7 }]);
             db.runAsync = jest.fn().mockResolvedValue({ lastID: 99 });
-
-            db.getAsync = db.getAsync
-                .mockResolvedValueOnce({ id: 42 })           // reused, irrelevant
-                .mockResolvedValueOnce({ id: 7 })            // reused, irrelevant
-            // final getAsync for inserted comment:
-            db.getAsync = jest
-                .fn()
-                .mockResolvedValueOnce({ id: 42 })            // target
-                .mockResolvedValueOnce({ id: 7 })             // commenter
-                .mockResolvedValueOnce(inserted);
+            db.getAsync = jest.fn().mockResolvedValue(inserted);
 
             const res = await request(app).post(url).send(validBody);
             expect(res.status).toBe(200);
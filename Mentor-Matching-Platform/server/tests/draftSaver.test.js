@@ -0,0 +1,91 @@
+// tests/draftSaver.test.js
+
+const { DraftSaver } = require('../utils/draftSaver');
+
+describe('DraftSaver', () => {
+    it('writes saves of one key that arrive together once, with the latest write', async () => {
+        const saver = new DraftSaver({ delay: 5 });
+        const first = jest.fn().mockResolvedValue('first');
+        const latest = jest.fn().mockResolvedValue('latest');
+
+        const results = await Promise.all([saver.save('a', first), saver.save('a', latest)]);
+
+        expect(first).not.toHaveBeenCalled();
+        expect(latest).toHaveBeenCalledTimes(1);
+        expect(results).toEqual(['latest', 'latest']);
+    });
+
+    it('writes different keys separately', async () => {
+        const saver = new DraftSaver({ delay: 5 });
+
+        const results = await Promise.all([saver.save('a', async () => 1), saver.save('b', async () => 2)]);
+
+        expect(results).toEqual([1, 2]);
+    });
+
+    it('writes a key saved continuously by maxWait', async () => {
+        const saver = new DraftSaver({ delay: 40, maxWait: 50 });
+        const write = jest.fn().mockResolvedValue('done');
+        const started = Date.now();
+
+        const saved = saver.save('a', write);
+        await new Promise((resolve) => setTimeout(resolve, 30));
+        saver.save('a', write);
+        await new Promise((resolve) => setTimeout(resolve, 15));
+        saver.save('a', write);
+
+        await saved;
+        expect(write).toHaveBeenCalledTimes(1);
+        expect(Date.now() - started).toBeLessThan(80);
+    });
+
+    it('rejects every save covered by a failed write', async () => {
+        const saver = new DraftSaver({ delay: 5 });
+        const write = async () => {
+            throw new Error('disk full');
+        };
+
+        const results = await Promise.allSettled([saver.save('a', write), saver.save('a', write)]);
+
+        expect(results.map((r) => r.status)).toEqual(['rejected', 'rejected']);
+        expect(results[0].reason.message).toBe('disk full');
+    });
+
+    it('does not start a write while the previous one for the key is running', async () => {
+        const saver = new DraftSaver({ delay: 1 });
+        const order = [];
+        const slow = async () => {
+            order.push('slow start');
+            await new Promise((resolve) => setTimeout(resolve, 20));
+            order.push('slow end');
+        };
+
+        const first = saver.save('a', slow);
+        await new Promise((resolve) => setTimeout(resolve, 5));
+        await Promise.all([first, saver.save('a', async () => order.push('next'))]);
+
+        expect(order).toEqual(['slow start', 'slow end', 'next']);
+    });
+
+    it('settle writes the unwritten save now and waits for it', async () => {
+        const saver = new DraftSaver({ delay: 1000 });
+        const write = jest.fn().mockResolvedValue('written');
+
+        const pending = saver.save('a', write);
+        await saver.settle('a');
+
+        expect(write).toHaveBeenCalledTimes(1);
+        await expect(pending).resolves.toBe('written');
+    });
+
+    it('supersede drops the unwritten save and waits for the one in flight', async () => {
+        const saver = new DraftSaver({ delay: 1000 });
+        const write = jest.fn().mockResolvedValue('written');
+
+        const dropped = saver.save('a', write);
+        await saver.supersede('a');
+
+        await expect(dropped).resolves.toBeUndefined();
+        expect(write).not.toHaveBeenCalled();
+    });
+});
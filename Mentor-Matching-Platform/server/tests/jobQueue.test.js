@@ -0,0 +1,92 @@
+// tests/jobQueue.test.js
+
+jest.mock('../db');
+
+const db = require('../db');
+const jobQueue = require('../utils/jobQueue');
+
+const jobRow = (overrides) => ({
+    id: 1, type: 'test', session_id: 4, params: '{"capacity":2}', status: 'queued', progress: 0,
+    result: null, error: null, attempts: 0, created_at: 'now', started_at: null, finished_at: null,
+    ...overrides,
+});
+
+describe('jobQueue', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+        jest.spyOn(console, 'log').mockImplementation(() => {});
+        jest.spyOn(console, 'error').mockImplementation(() => {});
+        db.runAsync = jest.fn().mockResolvedValue({ changes: 0 });
+    });
+
+    afterEach(async () => {
+        await jobQueue.stop();
+    });
+
+    describe('enqueue', () => {
+        it('inserts a new job and returns it', async () => {
+            db.runAsync = jest.fn().mockResolvedValue({ lastID: 1, changes: 1 });
+            db.getAsync = jest.fn().mockResolvedValue(jobRow());
+
+            const { job, deduplicated } = await jobQueue.enqueue('test', 4, { capacity: 2 }, 9);
+
+            expect(deduplicated).toBe(false);
+            expect(job).toMatchObject({ id: 1, sessionId: 4, status: 'queued', params: { capacity: 2 } });
+            expect(db.runAsync.mock.calls[0][1]).toEqual(['test', 4, '{"capacity":2}', 9]);
+        });
+
+        it('returns the active job for the session instead of queueing another', async () => {
+            db.runAsync = jest.fn().mockResolvedValue({ lastID: 0, changes: 0 });
+            db.getAsync = jest.fn().mockResolvedValue(jobRow({ id: 7, status: 'running', progress: 0.6 }));
+
+            const { job, deduplicated } = await jobQueue.enqueue('test', 4);
+
+            expect(deduplicated).toBe(true);
+            expect(job).toMatchObject({ id: 7, status: 'running', progress: 0.6 });
+            expect(db.getAsync.mock.calls[0][0]).toContain("status IN ('queued', 'running')");
+        });
+    });
+
+    describe('runner', () => {
+        // Hands out `rows` to the claim query one at a time
+        const mockClaims = (rows) => {
+            const queue = [...rows];
+            db.getAsync = jest.fn((sql) => Promise.resolve(sql.includes('RETURNING') ? queue.shift() : undefined));
+        };
+        const updatesTo = (status) => db.runAsync.mock.calls
+            .filter(([sql]) => sql.includes(`SET status = '${status}'`) && sql.includes('WHERE id = ?'));
+
+        it('re-queues interrupted jobs on start and runs queued jobs in order', async () => {
+            const seen = [];
+            jobQueue.registerJobType('test', async (job, onProgress) => {
+                seen.push(job.id);
+                await onProgress(0.5);
+                return { pairs: job.params.capacity };
+            });
+            mockClaims([jobRow({ id: 1, status: 'running' }), jobRow({ id: 2, status: 'running' })]);
+
+            await jobQueue.start();
+            await jobQueue.drain();
+
+            expect(db.runAsync.mock.calls[1][0]).toContain("SET status = 'queued'");
+            expect(seen).toEqual([1, 2]);
+            expect(updatesTo('succeeded').map(([, params]) => params)).toEqual([['{"pairs":2}', 1], ['{"pairs":2}', 2]]);
+            expect(db.runAsync.mock.calls.some(([sql, params]) => sql.includes('SET progress') && params[0] === 0.5)).toBe(true);
+        });
+
+        it('records the error when a job fails', async () => {
+            jobQueue.registerJobType('test', async () => { throw new Error('scoring failed'); });
+            mockClaims([jobRow({ status: 'running' })]);
+
+            await jobQueue.start();
+            await jobQueue.drain();
+
+            expect(updatesTo('failed').map(([, params]) => params)).toEqual([['scoring failed', 1]]);
+        });
+    });
+
+    it('getJob returns null for an unknown id', async () => {
+        db.getAsync = jest.fn().mockResolvedValue(undefined);
+        expect(await jobQueue.getJob(99)).toBeNull();
+    });
+});
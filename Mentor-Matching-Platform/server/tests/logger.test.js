@@ -0,0 +1,57 @@
+// tests/logger.test.js
+
+const logger = require('../utils/logger');
+
+describe('logger', () => {
+    let stdout;
+    let stderr;
+
+    beforeEach(() => {
+        stdout = jest.spyOn(process.stdout, 'write').mockImplementation(() => true);
+        stderr = jest.spyOn(process.stderr, 'write').mockImplementation(() => true);
+    });
+
+    afterEach(() => {
+        stdout.mockRestore();
+        stderr.mockRestore();
+        logger.setLevel('silent');
+    });
+
+    it('is silent under Jest by default', () => {
+        logger.error('not shown');
+        logger.flush();
+
+        expect(stdout).not.toHaveBeenCalled();
+        expect(stderr).not.toHaveBeenCalled();
+    });
+
+    it('writes the lines of one tick together, after the caller returns', async () => {
+        logger.setLevel('info');
+        logger.info('first', { id: 1 });
+        logger.info('second');
+        expect(stdout).not.toHaveBeenCalled();
+
+        await new Promise((resolve) => setImmediate(resolve));
+
+        expect(stdout).toHaveBeenCalledTimes(1);
+        const [text] = stdout.mock.calls[0];
+        expect(text).toMatch(/INFO first \{ id: 1 \}\n.*INFO second\n$/);
+    });
+
+    it('skips levels below the threshold without formatting their arguments', () => {
+        logger.setLevel('warn');
+        const payload = { toString: jest.fn(), [Symbol.for('nodejs.util.inspect.custom')]: jest.fn() };
+        logger.debug('payload', payload);
+        logger.info('saved');
+        logger.warn('slow');
+        logger.flush();
+
+        expect(payload[Symbol.for('nodejs.util.inspect.custom')]).not.toHaveBeenCalled();
+        expect(stdout).not.toHaveBeenCalled();
+        expect(stderr.mock.calls[0][0]).toMatch(/WARN slow\n$/);
+    });
+
+    it('rejects unknown levels', () => {
+        expect(() => logger.setLevel('verbose')).toThrow('Unknown log level: verbose');
+    });
+});
@@ -35,31 +35,24 @@ describe('match.js routes', () => {
 
     describe('GET /api/sessions/:sessionId/matches', () => {
         it('returns empty array if no pairs found', async () => {
-            db.all.mockImplementation((sql, params, cb) => cb(null, []));
+            db.allAsync = jest.fn().mockResolvedValue([]);
             const res = await request(app).get('/api/sessions/3/matches');
             expect(res.status).toBe(200);
             expect(res.body).toEqual([]);
         });
 
-        it('returns paired other user info', async () => {
-            const fakePair = [{
-                id: 55,
-                session_id: 3,
-                mentor_id: 99,
-                mentee_id: 42,
-                created_at: '2025-05-01 12:00:00'
-            }];
-            db.all.mockImplementation((sql, params, cb) => {
-                expect(params).toEqual([3, 99, 99]);
-                cb(null, fakePair);
-            });
-            db.get.mockImplementation((sql, params, cb) => {
-                expect(params).toEqual([42]);
-                cb(null, { id: 42, email: 'mentee@example.com' });
-            });
+        it('returns paired other user info from one query', async () => {
+            db.allAsync = jest.fn().mockResolvedValue([
+                { pairId: 55, sessionId: 3, role: 'mentor', otherId: 42, otherEmail: 'mentee@example.com', createdAt: '2025-05-01 12:00:00' },
+                { pairId: 56, sessionId: 3, role: 'mentor', otherId: 43, otherEmail: 'second@example.com', createdAt: '2025-05-02 12:00:00' }
+            ]);
 
             const res = await request(app).get('/api/sessions/3/matches');
             expect(res.status).toBe(200);
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][0]).toContain('JOIN users u');
+            expect(db.allAsync.mock.calls[0][1]).toEqual([3, 99, 3, 99]);
+            expect(db.get).not.toHaveBeenCalled();
             expect(res.body).toEqual([
                 {
                     pairId: 55,
@@ -67,27 +60,19 @@ describe('match.js routes', () => {
                     role: 'mentor',
                     other: { id: 42, email: 'mentee@example.com' },
                     createdAt: '2025-05-01 12:00:00'
+                },
+                {
+                    pairId: 56,
+                    sessionId: 3,
+                    role: 'mentor',
+                    other: { id: 43, email: 'second@example.com' },
+                    createdAt: '2025-05-02 12:00:00'
                 }
             ]);
         });
 
         it('returns 500 on db error fetching pairs', async () => {
-            db.all.mockImplementation((sql, params, cb) => cb(new Error('bad')));
-            const res = await request(app).get('/api/sessions/3/matches');
-            expect(res.status).toBe(500);
-            expect(res.body).toEqual({ error: 'Database error' });
-        });
-
-        it('returns 500 on db error fetching other user', async () => {
-            const fakePair = [{
-                id: 55,
-                session_id: 3,
-                mentor_id: 99,
-                mentee_id: 42,
-                created_at: '2025-05-01 12:00:00'
-            }];
-            db.all.mockImplementation((sql, params, cb) => cb(null, fakePair));
-            db.get.mockImplementation((sql, params, cb) => cb(new Error('oops')));
+            db.allAsync = jest.fn().mockRejectedValue(new Error('bad'));
             const res = await request(app).get('/api/sessions/3/matches');
             expect(res.status).toBe(500);
             expect(res.body).toEqual({ error: 'Database error' });
@@ -0,0 +1,172 @@
+// tests/matchAlgorithm.test.js
+
+jest.mock('../db');
+
+const db = require('../db');
+const matchMentorsForMentee = require('../utils/matchAlgorithm');
+const { preferenceCodes, enneagramCodes } = require('../utils/surveyCodes');
+const {
+    buildSessionFeatures,
+    scoreMatrix,
+    isEligible,
+    calculateSimilarity,
+    compareArrays,
+    transplantScore,
+    lifestyleVector,
+    parseEnneagramTypes,
+    LIFESTYLE_FIELDS,
+} = matchMentorsForMentee;
+
+const compatibility = {
+    1: [2, 4, 7], 2: [1, 4, 8], 3: [6, 7, 9], 4: [1, 2, 5], 5: [4, 8, 9],
+    6: [3, 8, 9], 7: [1, 3, 9], 8: [2, 5, 6], 9: [3, 5, 7],
+};
+
+// Per-pair reference implementation the batch kernel must agree with
+function referenceScore(mentee, mentor) {
+    const menteeTypes = parseEnneagramTypes(mentee.top_type);
+    const mentorType = parseEnneagramTypes(mentor.top_type)[0];
+    let enneagram = 20;
+    if (menteeTypes.includes(mentorType)) enneagram = 80;
+    else if (menteeTypes.some((t) => compatibility[t].includes(mentorType))) enneagram = 100;
+
+    return (
+        0.5 * (enneagram / 100) +
+        0.2 * calculateSimilarity(lifestyleVector(mentee), lifestyleVector(mentor)) +
+        0.15 * compareArrays(JSON.parse(mentee.sports_activities), JSON.parse(mentor.sports_activities)) +
+        0.1 * compareArrays(JSON.parse(mentee.goals), JSON.parse(mentor.goals)) +
+        0.05 * (transplantScore(JSON.parse(mentee.transplant_type)[0], JSON.parse(mentor.transplant_type)[0]) / 100)
+    );
+}
+
+function makeRows(count) {
+    const goals = ['Peer Support', 'Goal Setting', 'Sports Mentoring', 'Positive Community'];
+    const sports = ['Running', 'Cycling', 'Walking', 'Swimming', 'Board Games'];
+    const transplants = ['Kidney', 'Liver', 'Heart', 'Not Applicable'];
+    const rows = [];
+    for (let i = 0; i < count; i++) {
+        const row = {
+            user_id: i + 1,
+            application_id: i + 100,
+            role: i % 3 === 0 ? 'mentor' : 'mentee',
+            email: `user${i}@x.com`,
+            first_name: `First${i}`,
+            last_name: `Last${i}`,
+            has_profile: 1,
+            transplant_type: JSON.stringify([transplants[i % transplants.length]]),
+            goals: JSON.stringify(goals.filter((_, g) => (i >> g) & 1)),
+            sports_activities: JSON.stringify(sports.filter((_, s) => ((i * 7) >> s) & 1)),
+            top_type: i % 4 === 0 ? JSON.stringify([(i % 9) + 1, ((i + 4) % 9) + 1]) : String((i % 9) + 1),
+        };
+        LIFESTYLE_FIELDS.forEach((field, f) => { row[field] = ((i + f) * 13) % 5 + 1; });
+        rows.push(row);
+    }
+    return rows;
+}
+
+describe('matchAlgorithm', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+        jest.spyOn(console, 'log').mockImplementation(() => {});
+    });
+
+    describe('scoreMatrix', () => {
+        it('matches the per-pair reference score for every mentee/mentor pair', () => {
+            const rows = makeRows(60);
+            const features = buildSessionFeatures(rows);
+            const scores = scoreMatrix(features);
+            const mentees = rows.filter((r) => r.role === 'mentee');
+            const mentors = rows.filter((r) => r.role === 'mentor');
+
+            expect(scores).toHaveLength(mentees.length * mentors.length);
+            mentees.forEach((mentee, i) => {
+                mentors.forEach((mentor, j) => {
+                    expect(scores[i * mentors.length + j]).toBeCloseTo(referenceScore(mentee, mentor), 10);
+                });
+            });
+        });
+
+        it('scores rows saved with code columns the same as legacy JSON rows', () => {
+            const legacy = makeRows(30);
+            const coded = legacy.map((row) => ({
+                ...row,
+                ...preferenceCodes(JSON.parse(row.transplant_type), JSON.parse(row.goals), JSON.parse(row.sports_activities)),
+                ...enneagramCodes(parseEnneagramTypes(row.top_type)),
+                transplant_type: null,
+                goals: null,
+                sports_activities: null,
+                top_type: null,
+            }));
+            expect(Array.from(scoreMatrix(buildSessionFeatures(coded))))
+                .toEqual(Array.from(scoreMatrix(buildSessionFeatures(legacy))));
+        });
+
+        it('skips mentors without a profile', () => {
+            const rows = makeRows(6).map((r) => (r.role === 'mentor' ? { ...r, has_profile: 0 } : r));
+            const features = buildSessionFeatures(rows);
+            expect(features.mentors.size).toBe(0);
+            expect(scoreMatrix(features)).toHaveLength(0);
+        });
+    });
+
+    describe('isEligible', () => {
+        // One mentee (user 2) and three mentors (users 1, 4, 7)
+        function features(mentee, mentors) {
+            const rows = makeRows(7)
+                .filter((r) => r.role === 'mentor' || r.user_id === 2)
+                .map((r) => (r.role === 'mentee' ? { ...r, ...mentee } : { ...r, ...mentors[(r.user_id - 1) / 3] }));
+            return buildSessionFeatures(rows);
+        }
+
+        it('requires compatible meeting preferences', () => {
+            const f = features({ meeting_preference: 'Online' }, [
+                { meeting_preference: 'Online' },
+                { meeting_preference: 'Phone' },
+                { meeting_preference: 'Any' },
+            ]);
+            expect([0, 1, 2].map((j) => isEligible(f, 0, j))).toEqual([true, false, true]);
+
+            const any = features({ meeting_preference: 'Any' }, [
+                { meeting_preference: 'Online' },
+                { meeting_preference: 'Phone' },
+                {},
+            ]);
+            expect([0, 1, 2].map((j) => isEligible(any, 0, j))).toEqual([true, true, true]);
+        });
+
+        it('excludes mentors whose capacity is used up', () => {
+            const f = features({}, [
+                { mentee_capacity: 2, paired_count: 1 },
+                { mentee_capacity: 1, paired_count: 1 },
+                { mentee_capacity: null, paired_count: 5 },
+            ]);
+            expect([0, 1, 2].map((j) => isEligible(f, 0, j))).toEqual([true, false, true]);
+        });
+    });
+
+    describe('matchMentorsForMentee', () => {
+        it('loads the mentee and their candidate mentors in one query and returns the top 3', async () => {
+            const rows = makeRows(30);
+            db.allAsync.mockResolvedValue(rows);
+
+            const matches = await matchMentorsForMentee(2, 7);
+
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][0]).toContain('mentee_capacity >');
+            expect(db.allAsync.mock.calls[0][1]).toEqual([7, 2, 7, 2]);
+            expect(matches).toHaveLength(3);
+            const mentee = rows.find((r) => r.user_id === 2);
+            const expected = rows
+                .filter((r) => r.role === 'mentor')
+                .map((r) => parseFloat(referenceScore(mentee, r).toFixed(3)))
+                .sort((a, b) => b - a)
+                .slice(0, 3);
+            expect(matches.map((m) => m.finalScore)).toEqual(expected);
+        });
+
+        it('throws when the mentee has no survey data', async () => {
+            db.allAsync.mockResolvedValue(makeRows(6).filter((r) => r.role === 'mentor'));
+            await expect(matchMentorsForMentee(2, 7)).rejects.toThrow('Mentee not found or missing data');
+        });
+    });
+});
@@ -0,0 +1,51 @@
+// tests/matchPool.test.js
+
+// Send even small matrices to the workers
+process.env.MATCH_INLINE_PAIRS = '100';
+process.env.MATCH_WORKERS = '2';
+
+const { buildSessionFeatures, scoreMatrix, LIFESTYLE_FIELDS } = require('../utils/matchScoring');
+const { scoreMatrixAsync, closeMatchPool } = require('../utils/matchPool');
+
+function makeRows(count) {
+    const goals = ['Peer Support', 'Goal Setting', 'Sports Mentoring', 'Positive Community'];
+    const sports = ['Running', 'Cycling', 'Walking', 'Swimming', 'Board Games'];
+    return Array.from({ length: count }, (_, i) => {
+        const row = {
+            user_id: i + 1,
+            application_id: i + 100,
+            role: i % 3 === 0 ? 'mentor' : 'mentee',
+            has_profile: 1,
+            transplant_type: JSON.stringify([i % 2 ? 'Kidney' : 'Liver']),
+            goals: JSON.stringify(goals.filter((_, g) => (i >> g) & 1)),
+            sports_activities: JSON.stringify(sports.filter((_, s) => ((i * 7) >> s) & 1)),
+            top_type: String((i % 9) + 1),
+        };
+        LIFESTYLE_FIELDS.forEach((field, f) => { row[field] = ((i + f) * 13) % 5 + 1; });
+        return row;
+    });
+}
+
+describe('scoreMatrixAsync', () => {
+    afterAll(async () => {
+        await closeMatchPool();
+    });
+
+    it('scores shards on the worker pool with the same result as scoreMatrix', async () => {
+        const features = buildSessionFeatures(makeRows(150));
+        const scores = await scoreMatrixAsync(features);
+        expect(Array.from(scores)).toEqual(Array.from(scoreMatrix(features)));
+    });
+
+    it('scores small matrices inline', async () => {
+        const features = buildSessionFeatures(makeRows(12));
+        expect(Array.from(await scoreMatrixAsync(features))).toEqual(Array.from(scoreMatrix(features)));
+    });
+
+    it('stops when the caller cancels', async () => {
+        const controller = new AbortController();
+        controller.abort();
+        await expect(scoreMatrixAsync(buildSessionFeatures(makeRows(150)), { signal: controller.signal }))
+            .rejects.toMatchObject({ name: 'AbortError' });
+    });
+});
@@ -2,8 +2,10 @@
 
 // Mock the db module before loading the router
 jest.mock('../db');
+jest.mock('../utils/recommendationCache');
 
 const db = require('../db');
+const recommendationCache = require('../utils/recommendationCache');
 const request = require('supertest');
 const express = require('express');
 const matchingPairsRouter = require('../routes/matching-pairs');
@@ -53,6 +55,18 @@ describe('matching-pairs.js', () => {
             body,
             message: 'Matching pair created',
         });
+        expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(2, 1);
+    });
+
+    it('still succeeds when refreshing recommendations fails', async () => {
+        db.run.mockImplementation((sql, params, cb) => {
+            cb.call({ lastID: 5 }, null);
+        });
+        recommendationCache.invalidateApplicant.mockRejectedValueOnce(new Error('cache fail'));
+
+        const res = await request(app).post(url).send({ sessionId: 1, mentorId: 2, menteeId: 3 });
+        expect(res.status).toBe(200);
+        expect(res.body.success).toBe(true);
     });
 
     it('returns "already exists" when lastID is undefined', async () => {
@@ -24,43 +24,63 @@ describe('mentors.js routes', () => {
     });
 
     describe('GET /api/mentors', () => {
-        it('should return a list of mentors matching the search term', async () => {
-            const mockRows = [
-                { id: 1, name: 'Alice Smith', avatar: '/images/alice.png' },
-                { id: 2, name: 'Bob Jones', avatar: '/images/bob.jpg' },
-            ];
-            db.all.mockImplementation((sql, params, cb) => {
-                // expect the search parameter to be wrapped in %
-                expect(params).toEqual(['%ali%']);
-                cb(null, mockRows);
-            });
+        it('should return mentors matching the search term by prefix', async () => {
+            db.allAsync = jest.fn().mockResolvedValue([
+                { id: 1, name: 'Alice Smith', avatar: '/images/alice.png', rank: -2.5 },
+                { id: 2, name: 'Alina Jones', avatar: '/images/alina.jpg', rank: -1.5 },
+            ]);
 
             const res = await request(app)
                 .get('/api/mentors')
-                .query({ search: 'ali' });
+                .query({ search: 'ali smi' });
 
             expect(res.status).toBe(200);
-            expect(res.body).toEqual(mockRows);
+            expect(res.body).toEqual({
+                mentors: [
+                    { id: 1, name: 'Alice Smith', avatar: '/images/alice.png' },
+                    { id: 2, name: 'Alina Jones', avatar: '/images/alina.jpg' },
+                ],
+                nextCursor: null,
+            });
+            const [sql, params] = db.allAsync.mock.calls[0];
+            expect(sql).toContain('MATCH ?');
+            expect(sql).not.toContain('LIKE');
+            expect(params).toEqual(['"ali"* "smi"*', 21]);
         });
 
-        it('should default to empty search if none provided', async () => {
-            const mockRows = [{ id: 3, name: 'Carol White', avatar: null }];
-            db.all.mockImplementation((sql, params, cb) => {
-                // empty search wraps to %%
-                expect(params).toEqual(['%%']);
-                cb(null, mockRows);
-            });
+        it('should page with a cursor after the last ranked row', async () => {
+            db.allAsync = jest.fn().mockResolvedValue([
+                { id: 1, name: 'Alice Smith', avatar: null, rank: -2.5 },
+                { id: 2, name: 'Alina Jones', avatar: null, rank: -1.5 },
+            ]);
+
+            const first = await request(app).get('/api/mentors').query({ search: 'ali', limit: 1 });
+            expect(first.body.mentors).toHaveLength(1);
+            expect(first.body.nextCursor).toEqual(expect.any(String));
+
+            await request(app).get('/api/mentors').query({ search: 'ali', cursor: first.body.nextCursor });
+            const [sql, params] = db.allAsync.mock.calls[1];
+            expect(sql).toContain('(s.rank, s.rowid) > (?, ?)');
+            expect(params).toEqual(['"ali"*', -2.5, 1, 21]);
+        });
+
+        it('should return no mentors without a search term', async () => {
+            db.allAsync = jest.fn();
 
-            const res = await request(app).get('/api/mentors');
+            const res = await request(app).get('/api/mentors').query({ search: ' - ' });
 
             expect(res.status).toBe(200);
-            expect(res.body).toEqual(mockRows);
+            expect(res.body).toEqual({ mentors: [], nextCursor: null });
+            expect(db.allAsync).not.toHaveBeenCalled();
+        });
+
+        it('should reject a malformed cursor', async () => {
+            const res = await request(app).get('/api/mentors').query({ search: 'ali', cursor: 'nope' });
+            expect(res.status).toBe(400);
         });
 
         it('should return 500 if the database errors', async () => {
-            db.all.mockImplementation((sql, params, cb) => {
-                cb(new Error('db failure'));
-            });
+            db.allAsync = jest.fn().mockRejectedValue(new Error('db failure'));
 
             const res = await request(app)
                 .get('/api/mentors')
@@ -0,0 +1,78 @@
+// tests/metrics.test.js
+
+const { EventEmitter } = require('events');
+const { Gauge, Histogram, httpRequestDuration, httpRequestsInFlight, requestMetrics, render } = require('../utils/metrics');
+
+function fakeResponse(statusCode) {
+    const res = new EventEmitter();
+    res.statusCode = statusCode;
+    res.writableFinished = true;
+    return res;
+}
+
+describe('metrics', () => {
+    it('renders histograms with cumulative buckets, sum and count', () => {
+        const histogram = new Histogram('test_duration_seconds', 'Test timings.', ['op'], [0.1, 1]);
+        histogram.observe({ op: 'get' }, 0.05);
+        histogram.observe({ op: 'get' }, 0.5);
+        histogram.observe({ op: 'get' }, 3);
+
+        expect(histogram.render()).toBe([
+            '# HELP test_duration_seconds Test timings.',
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{op="get",le="0.1"} 1',
+            'test_duration_seconds_bucket{op="get",le="1"} 2',
+            'test_duration_seconds_bucket{op="get",le="+Inf"} 3',
+            'test_duration_seconds_sum{op="get"} 3.55',
+            'test_duration_seconds_count{op="get"} 3',
+        ].join('\n'));
+    });
+
+    it('times async work, including work that fails', async () => {
+        const histogram = new Histogram('test_work_seconds', 'Work.', ['kind']);
+
+        await expect(histogram.time({ kind: 'ok' }, async () => 'done')).resolves.toBe('done');
+        await expect(histogram.time({ kind: 'failed' }, async () => {
+            throw new Error('boom');
+        })).rejects.toThrow('boom');
+
+        expect(histogram.render()).toContain('test_work_seconds_count{kind="ok"} 1');
+        expect(histogram.render()).toContain('test_work_seconds_count{kind="failed"} 1');
+    });
+
+    it('escapes label values', () => {
+        const gauge = new Gauge('test_gauge', 'Gauge.', ['name']);
+        gauge.inc({ name: 'say "hi"\n' }, 2);
+
+        expect(gauge.render()).toContain('test_gauge{name="say \\"hi\\"\\n"} 2');
+    });
+
+    it('records requests by route pattern and tracks requests in flight', () => {
+        const req = { method: 'GET', baseUrl: '/api', route: { path: '/sessions/:id' } };
+        const res = fakeResponse(200);
+        const next = jest.fn();
+
+        requestMetrics(req, res, next);
+        expect(next).toHaveBeenCalled();
+        expect(httpRequestsInFlight.render()).toContain('http_requests_in_flight 1');
+
+        res.emit('close');
+        expect(httpRequestsInFlight.render()).toContain('http_requests_in_flight 0');
+        expect(httpRequestDuration.render()).toContain(
+            'http_request_duration_seconds_count{method="GET",route="/api/sessions/:id",status="200"} 1'
+        );
+    });
+
+    it('labels unrouted and abandoned requests without their path', () => {
+        const res = fakeResponse(200);
+        res.writableFinished = false;
+
+        requestMetrics({ method: 'POST', baseUrl: '', url: '/api/users/42' }, res, () => {});
+        res.emit('close');
+
+        expect(render()).toContain(
+            'http_request_duration_seconds_count{method="POST",route="other",status="aborted"} 1'
+        );
+        expect(render()).not.toContain('/api/users/42');
+    });
+});
@@ -0,0 +1,71 @@
+// tests/passwordHasher.test.js
+
+jest.mock('bcrypt');
+
+const { HashPool, needsRehash, COST } = require('../utils/passwordHasher');
+
+function deferred() {
+    let resolve;
+    const promise = new Promise((r) => { resolve = r; });
+    return { promise, resolve };
+}
+
+describe('HashPool', () => {
+    it('runs at most `concurrency` tasks at once, the rest in order', async () => {
+        const pool = new HashPool({ concurrency: 2, maxQueue: 10, queueTimeout: 0 });
+        const gates = [deferred(), deferred(), deferred()];
+        const started = [];
+        const results = gates.map((gate, i) => pool.run(() => {
+            started.push(i);
+            return gate.promise.then(() => i);
+        }));
+
+        expect(started).toEqual([0, 1]);
+        gates[0].resolve();
+        await results[0];
+        expect(started).toEqual([0, 1, 2]);
+
+        gates[1].resolve();
+        gates[2].resolve();
+        expect(await Promise.all(results)).toEqual([0, 1, 2]);
+        expect(pool.active).toBe(0);
+    });
+
+    it('refuses work straight away once the queue is full', async () => {
+        const pool = new HashPool({ concurrency: 1, maxQueue: 1, queueTimeout: 0 });
+        const gate = deferred();
+        const running = pool.run(() => gate.promise);
+        const queued = pool.run(async () => 'queued');
+
+        await expect(pool.run(async () => 'late')).rejects.toMatchObject({ code: 'POOL_QUEUE_FULL' });
+
+        gate.resolve();
+        await running;
+        expect(await queued).toBe('queued');
+    });
+
+    it('gives up on a task that waited longer than the queue timeout', async () => {
+        const pool = new HashPool({ concurrency: 1, maxQueue: 5, queueTimeout: 20 });
+        const gate = deferred();
+        pool.run(() => gate.promise);
+        const task = jest.fn();
+
+        await expect(pool.run(task)).rejects.toMatchObject({ code: 'POOL_QUEUE_FULL' });
+        gate.resolve();
+        await new Promise((resolve) => setImmediate(resolve));
+        expect(task).not.toHaveBeenCalled();
+        expect(pool.queue).toHaveLength(0);
+    });
+});
+
+describe('needsRehash', () => {
+    it('flags bcrypt hashes with another cost only', () => {
+        const cost = String(COST).padStart(2, '0');
+        const other = String(COST === 4 ? 5 : 4).padStart(2, '0');
+        expect(needsRehash(`$2b$${cost}$abcdefghijklmnopqrstuu`)).toBe(false);
+        expect(needsRehash(`$2b$${other}$abcdefghijklmnopqrstuu`)).toBe(true);
+        expect(needsRehash('$2a$' + other + '$abcdefghijklmnopqrstuu')).toBe(true);
+        expect(needsRehash('not-a-hash')).toBe(false);
+        expect(needsRehash(null)).toBe(false);
+    });
+});
@@ -0,0 +1,57 @@
+// tests/queryPlans.test.js
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+describe('query plans', () => {
+    const previousFile = process.env.SQLITE_FILE;
+    let dir;
+    let db;
+
+    beforeAll(async () => {
+        dir = fs.mkdtempSync(path.join(os.tmpdir(), 'query-plans-'));
+        process.env.SQLITE_FILE = path.join(dir, 'survey.db');
+        db = require('../db');
+        await db.migrated;
+    });
+
+    afterAll(async () => {
+        await db.closeAsync();
+        if (previousFile === undefined) delete process.env.SQLITE_FILE;
+        else process.env.SQLITE_FILE = previousFile;
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+
+    it('records each migration once', async () => {
+        const { runMigrations, MIGRATIONS } = require('../migrations');
+        expect(await runMigrations(db)).toEqual([]);
+
+        const rows = await db.allAsync('SELECT version FROM schema_migrations ORDER BY version');
+        expect(rows.map(row => row.version)).toEqual(MIGRATIONS.map(m => m.version));
+    });
+
+    it('finds every route query served by an index', async () => {
+        const { checkQueryPlans } = require('../scripts/checkQueryPlans');
+        const report = await checkQueryPlans(db);
+
+        expect(report.checked).toBeGreaterThan(50);
+        expect(report.scans).toEqual([]);
+        // Every interpolated statement has its variants in builtQueries().
+        // /account-save-preferences refers to mentorship_preferences.session_id,
+        // a column the schema does not have, so its statements can't be prepared.
+        expect(report.unchecked).toEqual([
+            { file: 'routes/survey.js', line: expect.any(Number), error: expect.stringContaining('session_id') },
+            { file: 'routes/survey.js', line: expect.any(Number), error: expect.stringContaining('session_id') },
+            { file: 'routes/survey.js', line: expect.any(Number), error: expect.stringContaining('session_id') },
+        ]);
+    });
+
+    it('checks interpolated statements through their real variants', () => {
+        const { isVariantOf } = require('../scripts/checkQueryPlans');
+        const text = 'SELECT * FROM t WHERE a = ?\n  ${conditions.map((c) => ';
+
+        expect(isVariantOf('SELECT * FROM t WHERE a = ? AND b = ? ORDER BY a', text)).toBe(true);
+        expect(isVariantOf('SELECT * FROM u WHERE a = ?', text)).toBe(false);
+    });
+});
@@ -0,0 +1,157 @@
+// tests/recommendationCache.test.js
+
+jest.mock('../db');
+jest.mock('../utils/matchAlgorithm');
+jest.mock('../utils/sessionScores');
+
+const db = require('../db');
+const matchAlgorithm = require('../utils/matchAlgorithm');
+const sessionScores = require('../utils/sessionScores');
+const recommendationCache = require('../utils/recommendationCache');
+
+describe('recommendationCache', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+        db.runAsync.mockResolvedValue({ changes: 1 });
+    });
+
+    describe('getRecommendations', () => {
+        it('serves cached rows without scoring', async () => {
+            const cached = [{ mentor_id: 2, first_name: 'A', last_name: 'B', email: 'ab@x.com', finalScore: 0.9 }];
+            db.allAsync.mockResolvedValueOnce(cached);
+
+            const result = await recommendationCache.getRecommendations(5, 1);
+
+            expect(result).toEqual(cached);
+            expect(db.allAsync).toHaveBeenCalledTimes(1);
+            expect(db.allAsync.mock.calls[0][1]).toEqual([5, 1]);
+            expect(matchAlgorithm).not.toHaveBeenCalled();
+        });
+
+        it('scores and stores on a miss, stamped with the session version', async () => {
+            const matches = [
+                { mentor_id: 2, first_name: 'A', last_name: 'B', email: 'ab@x.com', finalScore: 0.9 },
+                { mentor_id: 3, first_name: 'C', last_name: 'D', email: 'cd@x.com', finalScore: 0.7 },
+            ];
+            db.allAsync.mockResolvedValueOnce([]);
+            db.getAsync
+                .mockResolvedValueOnce({ version: 4 })
+                .mockResolvedValueOnce({ id: 77, role: 'mentee' });
+            matchAlgorithm.mockResolvedValueOnce(matches);
+
+            const result = await recommendationCache.getRecommendations(5, 1);
+
+            expect(result).toEqual(matches);
+            expect(matchAlgorithm).toHaveBeenCalledWith(5, 1);
+            expect(db.runAsync).toHaveBeenNthCalledWith(1, expect.stringContaining('DELETE FROM mentor_recommendations'), [77]);
+            expect(db.runAsync).toHaveBeenNthCalledWith(
+                2,
+                expect.stringContaining('INSERT INTO mentor_recommendations'),
+                [77, 4, 2, 0.9, 1, 3, 0.7, 2, 1, 4]
+            );
+        });
+    });
+
+    describe('invalidateApplicant', () => {
+        it('rewrites the lists the incremental rescoring changed', async () => {
+            db.getAsync
+                .mockResolvedValueOnce({ id: 77, role: 'mentor' })
+                .mockResolvedValueOnce({ version: 5 });
+            sessionScores.applyParticipantChange.mockImplementationOnce((userId, sessionId, persist, version) => persist([
+                { applicationId: 100, menteeId: 50, matches: [{ mentor_id: 9, finalScore: 0.8 }, { mentor_id: 2, finalScore: 0.7 }] },
+                { applicationId: 101, menteeId: 51, matches: [] },
+            ], version));
+
+            await recommendationCache.invalidateApplicant(9, 1);
+
+            expect(sessionScores.applyParticipantChange).toHaveBeenCalledWith(9, 1, expect.any(Function), 5);
+            expect(db.runAsync).toHaveBeenNthCalledWith(1, expect.stringContaining('recommendation_versions'), [1]);
+            expect(db.runAsync).toHaveBeenNthCalledWith(2, expect.stringContaining('DELETE FROM mentor_recommendations'), ['[100,101]']);
+            expect(db.runAsync).toHaveBeenNthCalledWith(
+                3,
+                expect.stringContaining('INSERT INTO mentor_recommendations'),
+                [5, '[[100,9,0.8,1],[100,2,0.7,2]]', 1, 5]
+            );
+            expect(db.runAsync.mock.calls[2][0]).toContain('FROM recommendation_versions WHERE session_id = ?');
+            expect(matchAlgorithm.scoreMentorForSession).not.toHaveBeenCalled();
+        });
+
+        describe('when incremental rescoring fails', () => {
+            beforeEach(() => {
+                jest.spyOn(console, 'error').mockImplementation(() => {});
+                sessionScores.applyParticipantChange.mockRejectedValue(new Error('fail'));
+            });
+
+            it('only clears the mentee\'s own list when a mentee changes answers', async () => {
+                db.getAsync.mockResolvedValueOnce({ id: 77, role: 'mentee' });
+
+                await recommendationCache.invalidateApplicant(5, 1);
+
+                expect(db.runAsync).toHaveBeenNthCalledWith(1, expect.stringContaining('recommendation_versions'), [1]);
+                expect(db.runAsync).toHaveBeenNthCalledWith(2, expect.stringContaining('DELETE FROM mentor_recommendations'), [77]);
+                expect(matchAlgorithm.scoreMentorForSession).not.toHaveBeenCalled();
+            });
+
+            it('clears only the lists a changed mentor can affect', async () => {
+                db.getAsync.mockResolvedValueOnce({ id: 10, role: 'mentor' });
+                db.allAsync.mockResolvedValueOnce([
+                    // list 100 contains the mentor
+                    { application_id: 100, mentee_id: 50, recommended_mentor_id: 9, score: 0.8 },
+                    { application_id: 100, mentee_id: 50, recommended_mentor_id: 2, score: 0.7 },
+                    { application_id: 100, mentee_id: 50, recommended_mentor_id: 3, score: 0.6 },
+                    // list 101: mentor's new score beats the lowest entry
+                    { application_id: 101, mentee_id: 51, recommended_mentor_id: 2, score: 0.9 },
+                    { application_id: 101, mentee_id: 51, recommended_mentor_id: 3, score: 0.8 },
+                    { application_id: 101, mentee_id: 51, recommended_mentor_id: 4, score: 0.5 },
+                    // list 102: mentor still ranks below every entry
+                    { application_id: 102, mentee_id: 52, recommended_mentor_id: 2, score: 0.9 },
+                    { application_id: 102, mentee_id: 52, recommended_mentor_id: 3, score: 0.8 },
+                    { application_id: 102, mentee_id: 52, recommended_mentor_id: 4, score: 0.7 },
+                ]);
+                matchAlgorithm.scoreMentorForSession.mockResolvedValueOnce(new Map([[50, 0.1], [51, 0.6], [52, 0.6]]));
+
+                await recommendationCache.invalidateApplicant(9, 1);
+
+                expect(matchAlgorithm.scoreMentorForSession).toHaveBeenCalledWith(9, 1);
+                expect(db.runAsync).toHaveBeenLastCalledWith(
+                    expect.stringContaining('DELETE FROM mentor_recommendations WHERE application_id IN'),
+                    [100, 101]
+                );
+            });
+        });
+
+        it('does nothing without an application', async () => {
+            db.getAsync.mockResolvedValueOnce(undefined);
+            await recommendationCache.invalidateApplicant(9, 1);
+            expect(db.runAsync).not.toHaveBeenCalled();
+        });
+    });
+
+    describe('invalidateCancelledApplication', () => {
+        let tx;
+
+        beforeEach(() => {
+            tx = { run: jest.fn().mockResolvedValue({ changes: 1 }) };
+        });
+
+        it('drops every whole list that recommends a cancelled mentor', async () => {
+            await recommendationCache.invalidateCancelledApplication(tx, { id: 10, user_id: 9, role: 'mentor' }, 1);
+
+            expect(tx.run).toHaveBeenCalledWith(expect.stringContaining('recommendation_versions'), [1]);
+            const [sql, params] = tx.run.mock.calls[1];
+            expect(sql).toMatch(/WHERE application_id IN \(\s*SELECT r\.application_id/);
+            expect(params).toEqual([9, 1]);
+            expect(sessionScores.forgetSession).toHaveBeenCalledWith(1);
+            expect(db.runAsync).not.toHaveBeenCalled();
+        });
+
+        it('drops only the list of a cancelled mentee', async () => {
+            await recommendationCache.invalidateCancelledApplication(tx, { id: 10, user_id: 9, role: 'mentee' }, 1);
+
+            expect(tx.run).toHaveBeenLastCalledWith(
+                'DELETE FROM mentor_recommendations WHERE application_id = ?',
+                [10]
+            );
+        });
+    });
+});
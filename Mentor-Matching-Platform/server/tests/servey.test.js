@@ -1,10 +1,10 @@
 // tests/survey.test.js
 
 jest.mock('../db');
-jest.mock('../utils/matchAlgorithm');
+jest.mock('../utils/recommendationCache');
 
 const db = require('../db');
-const matchAlgorithm = require('../utils/matchAlgorithm');
+const recommendationCache = require('../utils/recommendationCache');
 const request = require('supertest');
 const express = require('express');
 const surveyRouter = require('../routes/survey');
@@ -68,6 +68,53 @@ describe('survey.js routes', () => {
                 .send(valid);
             expect(db.ensureApplicationExists).toHaveBeenCalledWith(6, 1, 'mentor');
             expect(db.getApplicationIdForUser).toHaveBeenCalledWith(6, 1);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(6, 1);
+            expect(res.status).toBe(200);
+            expect(res.body).toEqual({ success: true });
+        });
+
+        it('stores integer codes for matching alongside the JSON answers', async () => {
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(42);
+            db.run.mockImplementation((sql, params, cb) => cb(null));
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '6')
+                .send({
+                    ...valid,
+                    transplantType: ['Liver'],
+                    goals: ['Peer Support', 'Positive Community'],
+                    sportsInterest: ['Running', 'Walking', 'Other'],
+                });
+            expect(res.status).toBe(200);
+            const params = db.run.mock.calls[0][1];
+            // goals_mask, goals_count, sports_mask, sports_count, transplant_code
+            expect(params.slice(9, 14)).toEqual([0b1001, 2, 0b10000001, 3, 3]);
+        });
+
+        it('writes a burst of saves once, with the latest answers', async () => {
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(43);
+            db.run.mockImplementation((sql, params, cb) => cb(null));
+            const [first, second] = await Promise.all([
+                request(app).post(url).set('X-Session-User', '16').send(valid),
+                request(app).post(url).set('X-Session-User', '16').send({ ...valid, transplantYear: 2021 }),
+            ]);
+            expect(first.body).toEqual({ success: true });
+            expect(second.body).toEqual({ success: true });
+            expect(db.run).toHaveBeenCalledTimes(1);
+            expect(db.run.mock.calls[0][1][5]).toBe(2021);
+        });
+
+        it('still succeeds when invalidating recommendations fails', async () => {
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(42);
+            db.run.mockImplementation((sql, params, cb) => cb(null));
+            recommendationCache.invalidateApplicant.mockRejectedValueOnce(new Error('stale'));
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '6')
+                .send(valid);
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ success: true });
         });
@@ -127,10 +174,36 @@ describe('survey.js routes', () => {
                 .post(url)
                 .set('X-Session-User', '9')
                 .send(valid);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(9, 2);
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ success: true });
         });
 
+        it('stores dropdowns left unset as null', async () => {
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(98);
+            db.run.mockImplementation((sql, params, cb) => cb(null));
+            const answers = {
+                physicalExerciseFrequency: 4,
+                likeAnimals: 5,
+                likeCooking: '',
+                travelImportance: null,
+                freeTimePreference: 1,
+                feelOverwhelmed: 3,
+                activityBarriers: 2,
+                longTermGoals: 4,
+                stressHandling: 3,
+                motivationLevel: 5,
+                hadMentor: 1,
+            };
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '11')
+                .send({ ...valid, answers });
+            expect(res.status).toBe(200);
+            expect(db.run.mock.calls[0][1]).toEqual([98, 11, 4, 5, null, null, 1, 3, 2, 4, 3, 5, 1]);
+        });
+
         it('500 on error saving', async () => {
             db.ensureApplicationExists.mockResolvedValue();
             db.getApplicationIdForUser.mockResolvedValue(100);
@@ -175,6 +248,9 @@ describe('survey.js routes', () => {
                 .post(url)
                 .set('X-Session-User', '12')
                 .send(valid);
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(12, 3);
+            // top_type_primary and top_type_mask for types 1 and 2
+            expect(db.run.mock.calls[0][1].slice(3, 5)).toEqual([1, 0b110]);
             expect(res.status).toBe(200);
             expect(res.body).toEqual({ success: true });
         });
@@ -213,11 +289,12 @@ describe('survey.js routes', () => {
             const raw = [
                 { mentor_id: 2, first_name: 'A', last_name: 'B', email: 'ab@x.com', finalScore: 0.5 }
             ];
-            matchAlgorithm.mockResolvedValue(raw);
+            recommendationCache.getRecommendations.mockResolvedValue(raw);
             const res = await request(app)
                 .get(url)
                 .set('X-Session-User', '15')
                 .query({ menteeId:'15', sessionId:'5' });
+            expect(recommendationCache.getRecommendations).toHaveBeenCalledWith('15', '5');
             expect(res.status).toBe(200);
             expect(res.body).toEqual({
                 success: true,
@@ -228,7 +305,7 @@ describe('survey.js routes', () => {
         });
 
         it('500 on error', async () => {
-            matchAlgorithm.mockRejectedValue(new Error('fail'));
+            recommendationCache.getRecommendations.mockRejectedValue(new Error('fail'));
             const res = await request(app)
                 .get(url)
                 .set('X-Session-User', '16')
@@ -238,6 +315,110 @@ describe('survey.js routes', () => {
         });
     });
 
+    describe('POST /api/submit-survey', () => {
+        const url = '/api/submit-survey';
+        const valid = {
+            sessionId: 4,
+            role: 'mentee',
+            enneagram: { topTypes: [1, 2], allScores: { 1: 9, 2: 9 }, answers: { 1: 3 } },
+        };
+        let tx;
+
+        beforeEach(() => {
+            tx = {
+                run: jest.fn().mockResolvedValue({ changes: 1 }),
+                get: jest.fn().mockResolvedValue({ id: 55, has_preferences: 1, has_lifestyle: 1 }),
+            };
+            db.transaction = jest.fn(async (work) => work(tx));
+        });
+
+        it('401 if not auth', async () => {
+            const res = await request(app).post(url).send(valid);
+            expect(res.status).toBe(401);
+        });
+
+        it('400 on an invalid Enneagram type', async () => {
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '20')
+                .send({ ...valid, enneagram: { ...valid.enneagram, topTypes: 12 } });
+            expect(res.status).toBe(400);
+            expect(res.body).toEqual({ success: false, error: 'enneagram.topTypes must be Enneagram types 1-9' });
+            expect(db.transaction).not.toHaveBeenCalled();
+        });
+
+        it('400 and writes nothing when an earlier step was never saved', async () => {
+            tx.get.mockResolvedValue({ id: 55, has_preferences: 1, has_lifestyle: 0 });
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '20')
+                .send(valid);
+            expect(res.status).toBe(400);
+            expect(res.body).toEqual({
+                success: false,
+                error: 'Save the preferences and lifestyle steps before submitting',
+            });
+            expect(tx.run).not.toHaveBeenCalled();
+            expect(recommendationCache.invalidateApplicant).not.toHaveBeenCalled();
+        });
+
+        it('writes only the Enneagram answers and the submitted flag, in one transaction', async () => {
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '21')
+                .send(valid);
+            expect(res.status).toBe(200);
+            expect(res.body).toEqual({ success: true, applicationId: 55 });
+            expect(db.transaction).toHaveBeenCalledTimes(1);
+            expect(tx.get).toHaveBeenCalledWith(expect.stringContaining('FROM applications'), [21, 4]);
+            expect(tx.run).toHaveBeenCalledTimes(2);
+            const [submitted, enneagram] = tx.run.mock.calls;
+            expect(submitted).toEqual([expect.stringContaining('SET submitted = 1'), [55]]);
+            expect(enneagram[0]).toContain('enneagram_answers');
+            expect(enneagram[1].slice(0, 5)).toEqual([55, 21, '[1,2]', 1, 0b110]);
+            expect(db.run).not.toHaveBeenCalled();
+            expect(recommendationCache.invalidateApplicant).toHaveBeenCalledWith(21, 4);
+        });
+
+        it('writes a pending preferences save before submitting', async () => {
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(55);
+            const order = [];
+            db.run.mockImplementation((sql, params, cb) => {
+                order.push('preferences');
+                cb(null);
+            });
+            db.transaction.mockImplementation(async (work) => {
+                order.push('submit');
+                return work(tx);
+            });
+
+            const [saved, submitted] = await Promise.all([
+                request(app)
+                    .post('/api/save-preferences')
+                    .set('X-Session-User', '23')
+                    .send({ sessionId: 4, role: 'mentee', transplantType: [], goals: [], sportsInterest: [] }),
+                new Promise((resolve) => setTimeout(resolve, 20)).then(() =>
+                    request(app).post(url).set('X-Session-User', '23').send(valid)
+                ),
+            ]);
+            expect(saved.status).toBe(200);
+            expect(submitted.status).toBe(200);
+            expect(order).toEqual(['preferences', 'submit']);
+        });
+
+        it('500 when the transaction fails', async () => {
+            db.transaction.mockRejectedValue(new Error('SQLITE_BUSY'));
+            const res = await request(app)
+                .post(url)
+                .set('X-Session-User', '22')
+                .send(valid);
+            expect(res.status).toBe(500);
+            expect(res.body).toEqual({ success: false, error: 'SQLITE_BUSY' });
+            expect(recommendationCache.invalidateApplicant).not.toHaveBeenCalled();
+        });
+    });
+
     describe('POST /api/mark-submitted', () => {
         const url = '/api/mark-submitted';
 
@@ -306,16 +487,17 @@ describe('survey.js routes', () => {
             expect(res.body).toEqual({ success: true, data: null });
         });
 
-        it('returns full survey data', async () => {
-            const appRow = { id:10, session_id:3 };
-            const prefs = { foo: 'bar' };
-            const life = { baz: 'qux' };
-            const enne = { quux: 'corge' };
-            db.getAsync
-                .mockResolvedValueOnce(appRow)
-                .mockResolvedValueOnce(prefs)
-                .mockResolvedValueOnce(life)
-                .mockResolvedValueOnce(enne);
+        it('returns all sections of the latest complete survey from one query', async () => {
+            const prefs = { application_id: 10, goals: '["Peer Support"]', submitted: 1 };
+            const life = { application_id: 10, likeAnimals: 5 };
+            const enne = { application_id: 10, top_type: '[1]', answers: '{"1":3}' };
+            db.getAsync.mockResolvedValueOnce({
+                id: 10,
+                session_id: 3,
+                preferences: JSON.stringify(prefs),
+                lifestyle: JSON.stringify(life),
+                enneagram: JSON.stringify(enne),
+            });
             const res = await request(app)
                 .get(url)
                 .set('X-Session-User','23');
@@ -329,6 +511,26 @@ describe('survey.js routes', () => {
                     enneagram: enne
                 }
             });
+            expect(db.getAsync).toHaveBeenCalledTimes(1);
+            expect(db.getAsync.mock.calls[0][0]).toContain('survey_sections = 7');
+            expect(db.getAsync.mock.calls[0][1]).toEqual([23]);
+        });
+
+        it('serves repeat reads from the cache until the user saves answers', async () => {
+            db.getAsync.mockResolvedValue(null);
+            await request(app).get(url).set('X-Session-User','27');
+            await request(app).get(url).set('X-Session-User','27');
+            expect(db.getAsync).toHaveBeenCalledTimes(1);
+
+            db.ensureApplicationExists.mockResolvedValue();
+            db.getApplicationIdForUser.mockResolvedValue(12);
+            db.run.mockImplementation((sql, params, cb) => cb(null));
+            await request(app)
+                .post('/api/save-lifestyle')
+                .set('X-Session-User','27')
+                .send({ sessionId: 5, role: 'mentee', answers: { likeAnimals: 4 } });
+            await request(app).get(url).set('X-Session-User','27');
+            expect(db.getAsync).toHaveBeenCalledTimes(2);
         });
 
         it('500 on error', async () => {
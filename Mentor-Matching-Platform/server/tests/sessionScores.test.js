@@ -0,0 +1,234 @@
+// tests/sessionScores.test.js
+
+jest.mock('../db');
+
+const db = require('../db');
+const {
+    buildSessionFeatures,
+    scoreMatrix,
+    eligibilityMatrix,
+    topMentorsForRow,
+    LIFESTYLE_FIELDS,
+} = require('../utils/matchAlgorithm');
+const sessionScores = require('../utils/sessionScores');
+
+const GOALS = ['Peer Support', 'Goal Setting', 'Sports Mentoring', 'Positive Community'];
+const SPORTS = ['Running', 'Cycling', 'Walking', 'Swimming', 'Board Games'];
+const TRANSPLANTS = ['Kidney', 'Liver', 'Heart', 'Not Applicable'];
+const MEETINGS = ['Any', 'In-person', 'Online', null];
+
+function makeRandom(seed) {
+    return () => {
+        seed = (seed * 1103515245 + 12345) & 0x7fffffff;
+        return seed / 0x7fffffff;
+    };
+}
+
+function randomAnswers(random) {
+    const answers = {
+        transplant_type: JSON.stringify([TRANSPLANTS[Math.floor(random() * TRANSPLANTS.length)]]),
+        goals: JSON.stringify(GOALS.filter(() => random() < 0.5)),
+        sports_activities: JSON.stringify(SPORTS.filter(() => random() < 0.5)),
+        top_type: String(Math.floor(random() * 9) + 1),
+        meeting_preference: MEETINGS[Math.floor(random() * MEETINGS.length)],
+        mentee_capacity: random() < 0.5 ? null : Math.floor(random() * 3),
+        paired_count: Math.floor(random() * 2),
+    };
+    LIFESTYLE_FIELDS.forEach((field) => { answers[field] = Math.floor(random() * 5) + 1; });
+    return answers;
+}
+
+function makeRows(count, random) {
+    return Array.from({ length: count }, (_, i) => ({
+        user_id: i + 1,
+        application_id: i + 100,
+        role: i % 3 === 0 ? 'mentor' : 'mentee',
+        email: `user${i}@x.com`,
+        first_name: `First${i}`,
+        last_name: `Last${i}`,
+        has_profile: 1,
+        ...randomAnswers(random),
+    }));
+}
+
+// Lists a full rescoring of the current rows would produce, keyed by application id
+function expectedLists(rows) {
+    const features = buildSessionFeatures(rows);
+    const result = {
+        mentors: features.mentors.meta,
+        scores: scoreMatrix(features),
+        eligible: eligibilityMatrix(features),
+    };
+    const lists = {};
+    features.mentees.meta.forEach((mentee, i) => { lists[mentee.application_id] = topMentorsForRow(result, i, 3); });
+    return lists;
+}
+
+function mockSession(rows) {
+    db.allAsync.mockImplementation(() => Promise.resolve(rows.map((r) => ({ ...r }))));
+    db.getAsync.mockImplementation((sql, params) => Promise.resolve(rows.find((r) => r.user_id === params[1])));
+}
+
+describe('sessionScores', () => {
+    beforeEach(() => {
+        jest.clearAllMocks();
+    });
+
+    it('builds the session once and returns every list on first use', async () => {
+        const rows = makeRows(30, makeRandom(1));
+        mockSession(rows);
+
+        const lists = await sessionScores.applyParticipantChange(2, 1);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+        expect(lists).toHaveLength(20);
+        const expected = expectedLists(rows);
+        lists.forEach((list) => expect(list.matches).toEqual(expected[list.applicationId]));
+    });
+
+    it('keeps every list equal to a full rescoring across single-participant changes', async () => {
+        const random = makeRandom(2);
+        const rows = makeRows(45, random);
+        mockSession(rows);
+
+        const cached = {};
+        const persist = jest.fn(async (lists) => lists.forEach((l) => { cached[l.applicationId] = l.matches; }));
+        await sessionScores.applyParticipantChange(1, 2, persist);
+
+        for (let step = 0; step < 40; step++) {
+            const row = rows[Math.floor(random() * rows.length)];
+            Object.assign(row, randomAnswers(random));
+            await sessionScores.applyParticipantChange(row.user_id, 2, persist);
+            expect(cached).toEqual(expectedLists(rows));
+        }
+
+        // Only the first change loaded the whole session
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+    });
+
+    it('rescores only the changed mentee\'s row', async () => {
+        const rows = makeRows(30, makeRandom(3));
+        mockSession(rows);
+        await sessionScores.applyParticipantChange(2, 3);
+
+        rows[1].top_type = '5';
+        const lists = await sessionScores.applyParticipantChange(2, 3);
+
+        expect(lists).toHaveLength(1);
+        expect(lists[0].menteeId).toBe(2);
+        expect(lists[0].matches).toEqual(expectedLists(rows)[101]);
+    });
+
+    it('leaves ineligible mentors out of the lists', async () => {
+        const rows = makeRows(30, makeRandom(6));
+        rows.forEach((row) => {
+            row.meeting_preference = row.role === 'mentor' ? 'Phone' : 'Any';
+            row.mentee_capacity = null;
+        });
+        rows[1].meeting_preference = 'Online';
+        rows[3].mentee_capacity = 1;
+        rows[3].paired_count = 1;
+        mockSession(rows);
+
+        const lists = await sessionScores.applyParticipantChange(2, 6);
+
+        const mentorIds = (id) => lists.find((l) => l.menteeId === id).matches.map((m) => m.mentor_id);
+        expect(mentorIds(2)).toEqual([]);
+        expect(mentorIds(3)).toHaveLength(3);
+        expect(mentorIds(3)).not.toContain(4);
+
+        // The full mentor gets room again and re-enters the lists
+        rows[3].mentee_capacity = 3;
+        const changed = await sessionScores.applyParticipantChange(4, 6);
+        const expected = expectedLists(rows);
+        expect(changed.length).toBeGreaterThan(0);
+        changed.forEach((list) => expect(list.matches).toEqual(expected[list.applicationId]));
+        expect(changed.some((list) => list.matches.some((m) => m.mentor_id === 4))).toBe(true);
+    });
+
+    it('adds a new mentor as a column without reloading the session', async () => {
+        const random = makeRandom(4);
+        const rows = makeRows(30, random);
+        mockSession(rows);
+        const cached = {};
+        const persist = jest.fn(async (lists) => lists.forEach((l) => { cached[l.applicationId] = l.matches; }));
+        await sessionScores.applyParticipantChange(2, 4, persist);
+
+        rows.push({ ...makeRows(31, random)[30], user_id: 99, application_id: 199, role: 'mentor', mentee_capacity: null });
+        const lists = await sessionScores.applyParticipantChange(99, 4, persist);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+        expect(lists.length).toBeLessThan(20);
+        expect(cached).toEqual(expectedLists(rows));
+    });
+
+    it('adds a new mentee as a row and returns only their list', async () => {
+        const random = makeRandom(8);
+        const rows = makeRows(30, random);
+        mockSession(rows);
+        const cached = {};
+        const persist = jest.fn(async (lists) => lists.forEach((l) => { cached[l.applicationId] = l.matches; }));
+        await sessionScores.applyParticipantChange(2, 8, persist);
+
+        rows.push({ ...makeRows(31, random)[30], user_id: 98, application_id: 198, role: 'mentee' });
+        const lists = await sessionScores.applyParticipantChange(98, 8, persist);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+        expect(lists.map((l) => l.applicationId)).toEqual([198]);
+        expect(cached).toEqual(expectedLists(rows));
+
+        // Later changes see the new row like any other
+        rows[30].top_type = '5';
+        await sessionScores.applyParticipantChange(98, 8, persist);
+        rows[0].top_type = '2';
+        await sessionScores.applyParticipantChange(1, 8, persist);
+        expect(cached).toEqual(expectedLists(rows));
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+    });
+
+    it('rebuilds the session when a participant stops being scoreable', async () => {
+        const rows = makeRows(30, makeRandom(9));
+        mockSession(rows);
+        await sessionScores.applyParticipantChange(2, 9);
+
+        rows[0].has_profile = 0;
+        const lists = await sessionScores.applyParticipantChange(1, 9);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(2);
+        expect(Object.fromEntries(lists.map((l) => [l.applicationId, l.matches]))).toEqual(expectedLists(rows));
+    });
+
+    it('rebuilds a state that missed a version bumped by another process', async () => {
+        const rows = makeRows(30, makeRandom(7));
+        mockSession(rows);
+        const persist = jest.fn();
+        await sessionScores.applyParticipantChange(2, 7, persist, 1);
+        await sessionScores.applyParticipantChange(2, 7, persist, 2);
+        expect(db.allAsync).toHaveBeenCalledTimes(1);
+
+        // Version 3 was another process's change
+        rows[1].top_type = '5';
+        rows[5].top_type = '8';
+        const lists = await sessionScores.applyParticipantChange(2, 7, persist, 4);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(2);
+        expect(Object.fromEntries(lists.map((l) => [l.applicationId, l.matches]))).toEqual(expectedLists(rows));
+        expect(persist).toHaveBeenLastCalledWith(lists, 4);
+
+        // A change the rebuild already read leaves the lists alone
+        expect(await sessionScores.applyParticipantChange(6, 7, persist, 3)).toEqual([]);
+        expect(persist).toHaveBeenCalledTimes(3);
+    });
+
+    it('reloads the session after a failed update', async () => {
+        const rows = makeRows(30, makeRandom(5));
+        mockSession(rows);
+        await sessionScores.applyParticipantChange(2, 5);
+
+        const persist = jest.fn().mockRejectedValueOnce(new Error('fail'));
+        await expect(sessionScores.applyParticipantChange(2, 5, persist)).rejects.toThrow('fail');
+        await sessionScores.applyParticipantChange(2, 5, persist);
+
+        expect(db.allAsync).toHaveBeenCalledTimes(2);
+    });
+});
@@ -0,0 +1,101 @@
+// tests/sessionStore.test.js
+
+jest.mock('../db');
+
+const db = require('../db');
+const { SqliteSessionStore } = require('../utils/sessionStore');
+
+const HOUR = 60 * 60 * 1000;
+
+function call(store, method, ...args) {
+    return new Promise((resolve, reject) => {
+        store[method](...args, (err, value) => (err ? reject(err) : resolve(value)));
+    });
+}
+
+function sessionExpiringIn(ms, user = { id: 5 }) {
+    return { cookie: { expires: new Date(Date.now() + ms).toISOString() }, user };
+}
+
+describe('SqliteSessionStore', () => {
+    let store;
+
+    beforeEach(() => {
+        jest.clearAllMocks();
+        db.runAsync.mockResolvedValue({ changes: 1 });
+        db.getAsync.mockResolvedValue(undefined);
+        store = new SqliteSessionStore({ sweepInterval: 0, touchInterval: 5 * 60 * 1000 });
+    });
+
+    it('serves a session it just saved from memory', async () => {
+        await call(store, 'set', 'abc', sessionExpiringIn(HOUR));
+        const sess = await call(store, 'get', 'abc');
+
+        expect(sess.user).toEqual({ id: 5 });
+        expect(db.runAsync).toHaveBeenCalledWith(
+            expect.stringContaining('INSERT INTO http_sessions'),
+            ['abc', expect.any(String), expect.any(Number)]
+        );
+        expect(db.getAsync).not.toHaveBeenCalled();
+    });
+
+    it('returns a copy, so changing a loaded session leaves the cache alone', async () => {
+        await call(store, 'set', 'abc', sessionExpiringIn(HOUR));
+        (await call(store, 'get', 'abc')).user.id = 99;
+
+        expect((await call(store, 'get', 'abc')).user.id).toBe(5);
+    });
+
+    it('reads the database on a miss and ignores expired rows', async () => {
+        db.getAsync.mockResolvedValueOnce({
+            sess: JSON.stringify(sessionExpiringIn(HOUR)),
+            expires: Date.now() + HOUR
+        });
+        expect((await call(store, 'get', 'abc')).user).toEqual({ id: 5 });
+
+        db.getAsync.mockResolvedValueOnce({ sess: '{}', expires: Date.now() - 1 });
+        expect(await call(store, 'get', 'old')).toBeNull();
+    });
+
+    it('only writes a touch once the expiry has moved by the touch interval', async () => {
+        await call(store, 'set', 'abc', sessionExpiringIn(HOUR));
+        db.runAsync.mockClear();
+
+        await call(store, 'touch', 'abc', sessionExpiringIn(HOUR + 60 * 1000));
+        expect(db.runAsync).not.toHaveBeenCalled();
+
+        await call(store, 'touch', 'abc', sessionExpiringIn(HOUR + 10 * 60 * 1000));
+        expect(db.runAsync).toHaveBeenCalledWith(
+            expect.stringContaining('UPDATE http_sessions SET expires'),
+            [expect.any(Number), 'abc']
+        );
+    });
+
+    it('forgets a destroyed session', async () => {
+        await call(store, 'set', 'abc', sessionExpiringIn(HOUR));
+        await call(store, 'destroy', 'abc');
+
+        expect(await call(store, 'get', 'abc')).toBeNull();
+        expect(db.getAsync).toHaveBeenCalledWith(expect.stringContaining('FROM http_sessions'), ['abc']);
+    });
+
+    it('sees another process\'s logout at once when cacheTtl is 0', async () => {
+        store = new SqliteSessionStore({ sweepInterval: 0, cacheTtl: 0 });
+        await call(store, 'set', 'abc', sessionExpiringIn(HOUR));
+
+        expect(await call(store, 'get', 'abc')).toBeNull();
+        expect(db.getAsync).toHaveBeenCalledWith(expect.stringContaining('FROM http_sessions'), ['abc']);
+    });
+
+    it('sweeps expired sessions in batches', async () => {
+        store = new SqliteSessionStore({ sweepInterval: 0, sweepBatch: 2 });
+        db.runAsync
+            .mockResolvedValueOnce({ changes: 2 })
+            .mockResolvedValueOnce({ changes: 2 })
+            .mockResolvedValueOnce({ changes: 1 });
+
+        expect(await store.sweep()).toBe(5);
+        expect(db.runAsync).toHaveBeenCalledTimes(3);
+        expect(db.runAsync.mock.calls[0][1]).toEqual([expect.any(Number), 2]);
+    });
+});
@@ -1,6 +1,7 @@
 // tests/sessions.test.js
 
 jest.mock('../db');
+jest.mock('../utils/recommendationCache');
 jest.mock('../middlewares/auth', () => ({
     ensureAuthenticated: (req, res, next) => {
         const uid = req.headers['x-session-user'];
@@ -10,6 +11,7 @@ jest.mock('../middlewares/auth', () => ({
 }));
 
 const db = require('../db');
+const recommendationCache = require('../utils/recommendationCache');
 const request = require('supertest');
 const express = require('express');
 const sessionsRouter = require('../routes/sessions');
@@ -184,11 +186,18 @@ describe('sessions.js routes', () => {
 
     describe('DELETE /api/sessions/:id/apply', () => {
         const url = '/api/sessions/20/apply';
-
-
+        let tx;
+
+        beforeEach(() => {
+            tx = {
+                run: jest.fn().mockResolvedValue({ changes: 1 }),
+                get: jest.fn().mockResolvedValue({ id: 31, user_id: 18, role: 'mentor' }),
+            };
+            db.transaction = jest.fn(async (work) => work(tx));
+        });
 
         it('500 on delete error', async () => {
-            db.run.mockImplementation((sql, params, cb) => cb(new Error('del')));
+            tx.run.mockRejectedValueOnce(new Error('del'));
             const res = await request(app)
                 .delete(url)
                 .set('X-Session-User','16');
@@ -196,20 +205,35 @@ describe('sessions.js routes', () => {
             expect(res.body).toEqual({ error: 'Internal Server Error' });
         });
 
-        it('404 if no rows deleted', async () => {
-            db.run.mockImplementation((sql, params, cb) => cb.call({ changes:0 }, null));
+        it('404 if not applied', async () => {
+            tx.get.mockResolvedValueOnce(undefined);
             const res = await request(app)
                 .delete(url)
                 .set('X-Session-User','17');
             expect(res.status).toBe(404);
             expect(res.body).toEqual({ error: 'Not applied or not found' });
+            expect(recommendationCache.invalidateCancelledApplication).not.toHaveBeenCalled();
+            expect(tx.run).not.toHaveBeenCalled();
+        });
+
+        it('500 if cached recommendations cannot be cleared', async () => {
+            recommendationCache.invalidateCancelledApplication.mockRejectedValueOnce(new Error('cache'));
+            const res = await request(app)
+                .delete(url)
+                .set('X-Session-User','19');
+            expect(res.status).toBe(500);
+            expect(tx.run).not.toHaveBeenCalled();
         });
 
-        it('200 on success', async () => {
-            db.run.mockImplementation((sql, params, cb) => cb.call({ changes:1 }, null));
+        it('200 on success, clearing cached lists in the same transaction', async () => {
             const res = await request(app)
                 .delete(url)
                 .set('X-Session-User','18');
+            expect(tx.get).toHaveBeenCalledWith(expect.stringContaining('FROM applications'), [18, '20']);
+            expect(recommendationCache.invalidateCancelledApplication).toHaveBeenCalledWith(
+                tx, { id: 31, user_id: 18, role: 'mentor' }, '20'
+            );
+            expect(tx.run).toHaveBeenCalledWith(expect.stringContaining('DELETE FROM applications'), [31]);
             expect(res.status).toBe(200);
             expect(res.body).toEqual({
                 message: 'Application cancelled successfully',
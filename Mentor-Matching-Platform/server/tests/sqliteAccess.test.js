@@ -0,0 +1,113 @@
+// tests/sqliteAccess.test.js
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const sqlite3 = require('sqlite3');
+const { SqliteAccess, isReadOnlySql } = require('../utils/sqliteAccess');
+
+const INSERT = 'INSERT INTO items (name) VALUES (?)';
+
+describe('SqliteAccess', () => {
+    let dir;
+    let file;
+    let writer;
+    let access;
+
+    beforeEach(async () => {
+        dir = fs.mkdtempSync(path.join(os.tmpdir(), 'sqlite-access-'));
+        file = path.join(dir, 'test.db');
+        writer = await new Promise((resolve, reject) => {
+            const connection = new sqlite3.Database(file, (err) => (err ? reject(err) : resolve(connection)));
+        });
+        access = new SqliteAccess(writer, { cacheSize: 2 });
+        await access.run('PRAGMA journal_mode = WAL');
+        await access.run('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)');
+        await access.openReaders(file, 2);
+    });
+
+    afterEach(async () => {
+        await access.close();
+        await new Promise((resolve) => writer.close(resolve));
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+
+    it('sends plain reads to the read connections and everything else to the writer', () => {
+        expect(isReadOnlySql('SELECT 1')).toBe(true);
+        expect(isReadOnlySql('\n  WITH t AS (SELECT 1) SELECT * FROM t')).toBe(true);
+        expect(isReadOnlySql('UPDATE jobs SET status = 1 RETURNING *')).toBe(false);
+        expect(isReadOnlySql('WITH t AS (SELECT 1) DELETE FROM items')).toBe(false);
+        expect(isReadOnlySql('PRAGMA table_info(items)')).toBe(false);
+        expect(access.connectionFor('SELECT 1')).not.toBe(access.writer);
+        expect(access.connectionFor(INSERT)).toBe(access.writer);
+    });
+
+    it('reads committed writes through the read connections', async () => {
+        expect(await access.run(INSERT, ['a'])).toEqual({ lastID: 1, changes: 1 });
+        expect(await access.get('SELECT name FROM items WHERE id = ?', [1])).toEqual({ name: 'a' });
+
+        // A reused get() statement must not keep its old snapshot
+        await access.run('UPDATE items SET name = ? WHERE id = ?', ['b', 1]);
+        expect(await access.get('SELECT name FROM items WHERE id = ?', [1])).toEqual({ name: 'b' });
+        expect(await access.all('SELECT name FROM items')).toEqual([{ name: 'b' }]);
+    });
+
+    it('returns the first row to every get() on a shared statement', async () => {
+        await access.run(INSERT, ['a']);
+        await access.run(INSERT, ['b']);
+        const { cache } = access.readers[0];
+        const rows = await Promise.all([
+            cache.execute('SELECT name FROM items ORDER BY id', 'get'),
+            cache.execute('SELECT name FROM items ORDER BY id', 'get'),
+        ]);
+        expect(rows).toEqual([{ name: 'a' }, { name: 'a' }]);
+    });
+
+    it('reuses prepared statements and evicts the least recently used', async () => {
+        const { cache } = access.writer;
+        await access.run(INSERT, ['a']);
+        const statement = cache.entries.get(INSERT).statement;
+        await access.run(INSERT, ['b']);
+        expect(cache.entries.get(INSERT).statement).toBe(statement);
+
+        await access.run('DELETE FROM items WHERE id = ?', [5]);
+        await access.run('UPDATE items SET name = ? WHERE id = ?', ['c', 1]);
+        expect(cache.entries.has(INSERT)).toBe(false);
+        expect(cache.entries.size).toBe(2);
+    });
+
+    it('prepares a failed statement again on next use', async () => {
+        await expect(access.all('SELECT * FROM later')).rejects.toThrow('no such table');
+        await access.run('CREATE TABLE later (id INTEGER)');
+        expect(await access.all('SELECT * FROM later')).toEqual([]);
+    });
+
+    it('commits a transaction, or rolls it back when the work throws', async () => {
+        await access.openTransactions(file);
+        await access.transaction(async (tx) => {
+            await tx.run(INSERT, ['a']);
+            await tx.run(INSERT, ['b']);
+        });
+        await expect(access.transaction(async (tx) => {
+            await tx.run(INSERT, ['c']);
+            throw new Error('stop');
+        })).rejects.toThrow('stop');
+
+        expect(await access.all('SELECT name FROM items ORDER BY id')).toEqual([{ name: 'a' }, { name: 'b' }]);
+    });
+
+    it('keeps writes from other callers out of a transaction', async () => {
+        writer.configure('busyTimeout', 5000);
+        await access.openTransactions(file);
+        let outside;
+        await expect(access.transaction(async (tx) => {
+            await tx.run(INSERT, ['inside']);
+            // Waits for the write lock instead of joining the transaction
+            outside = access.run(INSERT, ['outside']);
+            throw new Error('stop');
+        })).rejects.toThrow('stop');
+        await outside;
+
+        expect(await access.all('SELECT name FROM items')).toEqual([{ name: 'outside' }]);
+    });
+});
@@ -0,0 +1,34 @@
+// tests/topK.test.js
+
+const { TopK } = require('../utils/topK');
+
+describe('TopK', () => {
+    it('keeps the k best entries, best first', () => {
+        const top = new TopK(3);
+        [0.2, 0.9, 0.5, 0.1, 0.7, 0.3].forEach((score, item) => top.push(item, score));
+        expect(top.sorted()).toEqual([
+            { item: 1, score: 0.9 },
+            { item: 4, score: 0.7 },
+            { item: 2, score: 0.5 },
+        ]);
+    });
+
+    it('breaks ties by the lower item, like a stable sort', () => {
+        const scores = [0.5, 0.8, 0.5, 0.8, 0.5, 0.1];
+        const top = new TopK(4);
+        scores.forEach((score, item) => top.push(item, score));
+        const expected = scores
+            .map((score, item) => ({ item, score }))
+            .sort((a, b) => b.score - a.score)
+            .slice(0, 4);
+        expect(top.sorted()).toEqual(expected);
+    });
+
+    it('returns every entry when there are fewer than k', () => {
+        const top = new TopK(5);
+        top.push(3, 0.4);
+        top.push(1, 0.6);
+        expect(top.sorted()).toEqual([{ item: 1, score: 0.6 }, { item: 3, score: 0.4 }]);
+        expect(new TopK(0).sorted()).toEqual([]);
+    });
+});
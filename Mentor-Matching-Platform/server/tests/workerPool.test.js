@@ -0,0 +1,69 @@
+// tests/workerPool.test.js
+
+const path = require('path');
+const { WorkerPool } = require('../utils/workerPool');
+
+// Worker that doubles numbers, can spin for a while, or fail
+const WORKER = `
+const { handleJobs } = require(${JSON.stringify(path.join(__dirname, '../utils/workerPool'))});
+handleJobs(({ value, spinMs = 0, fail = false }) => {
+    const end = Date.now() + spinMs;
+    while (Date.now() < end);
+    if (fail) throw new Error('bad input');
+    return value * 2;
+});
+`;
+
+describe('WorkerPool', () => {
+    let pool;
+
+    const makePool = (options) => {
+        pool = new WorkerPool(WORKER, { workerOptions: { eval: true }, ...options });
+        return pool;
+    };
+
+    afterEach(async () => {
+        await pool.close();
+    });
+
+    it('runs jobs across workers and returns their results', async () => {
+        makePool({ size: 2 });
+        const results = await Promise.all([1, 2, 3, 4, 5].map((value) => pool.run({ value })));
+        expect(results).toEqual([2, 4, 6, 8, 10]);
+        expect(pool.workers.size).toBe(2);
+    });
+
+    it('reports errors thrown by the worker', async () => {
+        makePool();
+        await expect(pool.run({ value: 1, fail: true })).rejects.toThrow('bad input');
+        expect(await pool.run({ value: 1 })).toBe(2);
+    });
+
+    it('rejects new jobs once the queue is full', async () => {
+        makePool({ size: 1, maxQueue: 1 });
+        const running = pool.run({ value: 1, spinMs: 200 });
+        const queued = pool.run({ value: 2 });
+
+        await expect(pool.run({ value: 3 })).rejects.toMatchObject({ code: 'POOL_QUEUE_FULL' });
+        expect(await Promise.all([running, queued])).toEqual([2, 4]);
+    });
+
+    it('times out a stuck job and keeps serving later ones', async () => {
+        makePool({ size: 1, timeout: 50 });
+        await expect(pool.run({ value: 1, spinMs: 10000 })).rejects.toMatchObject({ code: 'JOB_TIMEOUT' });
+        expect(await pool.run({ value: 3 })).toBe(6);
+    });
+
+    it('cancels running and queued jobs', async () => {
+        makePool({ size: 1 });
+        const controller = new AbortController();
+        const running = pool.run({ value: 1, spinMs: 10000 }, { signal: controller.signal });
+        const queued = pool.run({ value: 2 }, { signal: controller.signal });
+        const other = pool.run({ value: 5 });
+
+        setTimeout(() => controller.abort(), 20);
+        await expect(running).rejects.toMatchObject({ name: 'AbortError' });
+        await expect(queued).rejects.toMatchObject({ name: 'AbortError' });
+        expect(await other).toBe(10);
+    });
+});
@@ -0,0 +1,110 @@
+// assignment.js
+// Globally optimal mentee -> mentor assignment with per-mentor capacities.
+
+/**
+ * Maximises the total score of a session's pairing.
+ *
+ * This is the Hungarian algorithm (shortest augmenting paths with row and
+ * column potentials) generalised to columns that take up to `capacities[j]`
+ * rows. A column only joins the search tree once it is full, so columns
+ * with spare room keep a zero potential and every augmenting path ends at
+ * the first one reached. An implicit "unassigned" column with unlimited
+ * room and score 0 keeps every row feasible when mentors run out of room.
+ *
+ * @param {Float64Array|number[]} scores row-major mentee x mentor scores
+ * @param {number} rows number of mentees
+ * @param {number} cols number of mentors
+ * @param {ArrayLike<number>} capacities max mentees per mentor
+ * @param {object} [options]
+ * @param {number} [options.minScore] pairs scoring below this are never made
+ * @returns {Int32Array} mentor column for each mentee row, or -1 if unassigned
+ */
+function solveAssignment(scores, rows, cols, capacities, { minScore = -Infinity } = {}) {
+  const dummy = cols;
+  const width = cols + 1;
+  const cap = new Int32Array(width);
+  for (let j = 0; j < cols; j++) cap[j] = Math.max(0, capacities[j] | 0);
+  cap[dummy] = rows;
+
+  // Minimising cost = -score; Infinity marks a forbidden pair
+  const cost = (i, j) => {
+    if (j === dummy) return 0;
+    const score = scores[i * cols + j];
+    return score < minScore ? Infinity : -score;
+  };
+
+  const u = new Float64Array(rows);
+  const v = new Float64Array(width);
+  const rowCol = new Int32Array(rows).fill(-1);
+  const members = Array.from({ length: width }, () => []);
+
+  const minv = new Float64Array(width);
+  const wayRow = new Int32Array(width);
+  const used = new Uint8Array(width);
+  const visited = new Int32Array(rows);
+
+  for (let r = 0; r < rows; r++) {
+    minv.fill(Infinity);
+    used.fill(0);
+    let visitedCount = 0;
+
+    const expand = (i) => {
+      visited[visitedCount++] = i;
+      const ui = u[i];
+      for (let j = 0; j < width; j++) {
+        if (used[j]) continue;
+        const cur = cost(i, j) - ui - v[j];
+        if (cur < minv[j]) {
+          minv[j] = cur;
+          wayRow[j] = i;
+        }
+      }
+    };
+    expand(r);
+
+    let end;
+    for (;;) {
+      let delta = Infinity;
+      let j1 = -1;
+      for (let j = 0; j < width; j++) {
+        if (!used[j] && minv[j] < delta) {
+          delta = minv[j];
+          j1 = j;
+        }
+      }
+
+      for (let k = 0; k < visitedCount; k++) u[visited[k]] += delta;
+      for (let j = 0; j < width; j++) {
+        if (used[j]) v[j] -= delta;
+        else minv[j] -= delta;
+      }
+
+      if (members[j1].length < cap[j1]) {
+        end = j1;
+        break;
+      }
+      used[j1] = 1;
+      for (const i of members[j1]) expand(i);
+    }
+
+    // Walk back along the augmenting path, moving each row one column over
+    let j = end;
+    for (;;) {
+      const i = wayRow[j];
+      const previous = rowCol[i];
+      rowCol[i] = j;
+      members[j].push(i);
+      if (previous === -1) break;
+      const list = members[previous];
+      list.splice(list.indexOf(i), 1);
+      j = previous;
+    }
+  }
+
+  for (let i = 0; i < rows; i++) {
+    if (rowCol[i] === dummy) rowCol[i] = -1;
+  }
+  return rowCol;
+}
+
+module.exports = { solveAssignment };
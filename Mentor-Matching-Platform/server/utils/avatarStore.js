@@ -0,0 +1,194 @@
+// avatarStore.js
+// Avatar uploads stored by content hash as small WebP variants. The same
+// image uploaded twice shares one set of files, and a file's URL never
+// changes meaning, so it can be cached forever. Files no profile points at
+// any more are deleted when the avatar is replaced.
+const crypto = require("crypto");
+const fs = require("fs");
+const path = require("path");
+const { pipeline } = require("stream");
+const db = require("../db");
+
+const AVATAR_DIR = process.env.AVATAR_DIR || path.join(__dirname, "..", "data", "avatars");
+const UPLOAD_DIR = path.join(AVATAR_DIR, "tmp");
+// Served by app.js under this path
+const AVATAR_URL_PREFIX = "/avatars";
+const AVATAR_SIZES = [64, 128, 256];
+// The size stored in profiles.profile_picture_url
+const PROFILE_SIZE = 256;
+const MAX_UPLOAD_BYTES = Number(process.env.AVATAR_MAX_BYTES) || 5 * 1024 * 1024;
+// Rejects decompression bombs: a small file that decodes to a huge bitmap
+const MAX_INPUT_PIXELS = 40 * 1000 * 1000;
+
+const AVATAR_URL = new RegExp(`^${AVATAR_URL_PREFIX}/([0-9a-f]{32})-\\d+\\.webp$`);
+
+function variantFile(hash, size) {
+  return path.join(AVATAR_DIR, `${hash}-${size}.webp`);
+}
+
+function variantUrl(hash, size) {
+  return `${AVATAR_URL_PREFIX}/${hash}-${size}.webp`;
+}
+
+/**
+ * multer storage engine: streams the upload to a temporary file while
+ * hashing it, so the upload is never held in memory. req.file gets
+ * `path`, `size` and `hash`.
+ */
+class AvatarUploadStorage {
+  _handleFile(req, file, cb) {
+    fs.mkdir(UPLOAD_DIR, { recursive: true }, (mkdirErr) => {
+      if (mkdirErr) return cb(mkdirErr);
+      const tempPath = path.join(UPLOAD_DIR, crypto.randomUUID());
+      const digest = crypto.createHash("sha256");
+      let size = 0;
+      file.stream.on("data", (chunk) => {
+        digest.update(chunk);
+        size += chunk.length;
+      });
+      pipeline(file.stream, fs.createWriteStream(tempPath), (err) => {
+        if (err) return fs.rm(tempPath, { force: true }, () => cb(err));
+        cb(null, { path: tempPath, size, hash: digest.digest("hex").slice(0, 32) });
+      });
+    });
+  }
+
+  _removeFile(req, file, cb) {
+    fs.rm(file.path, { force: true }, cb);
+  }
+}
+
+// Operations on one hash run one at a time, so a replaced avatar's files
+// cannot be deleted between another upload of the same image finding them
+// and that upload being saved to its profile
+const locks = new Map();
+
+function withHashLock(hash, task) {
+  const previous = locks.get(hash) || Promise.resolve();
+  const current = previous.then(task, task);
+  const tail = current.catch(() => {});
+  locks.set(hash, tail);
+  tail.then(() => {
+    if (locks.get(hash) === tail) locks.delete(hash);
+  });
+  return current;
+}
+
+// sharp is not in package.json until package-lock.json can be regenerated
+// with it, so it is loaded on first use: the server starts without it, and
+// uploads fail with code IMAGE_PROCESSING_UNAVAILABLE until
+// `npm install sharp` has been run
+let sharp;
+
+function loadSharp() {
+  if (sharp === undefined) {
+    try {
+      sharp = require("sharp");
+    } catch (err) {
+      if (err.code !== "MODULE_NOT_FOUND") throw err;
+      sharp = null;
+    }
+  }
+  if (!sharp) {
+    const err = new Error("sharp is not installed; run `npm install sharp` to process avatars");
+    err.code = "IMAGE_PROCESSING_UNAVAILABLE";
+    throw err;
+  }
+  return sharp;
+}
+
+function invalidImage(err) {
+  const wrapped = new Error(`Not a usable image: ${err.message}`);
+  wrapped.code = "INVALID_IMAGE";
+  return wrapped;
+}
+
+async function writeVariants(source, hash) {
+  const missing = [];
+  for (const size of AVATAR_SIZES) {
+    try {
+      await fs.promises.access(variantFile(hash, size));
+    } catch {
+      missing.push(size);
+    }
+  }
+  if (missing.length === 0) return;
+
+  const resize = loadSharp();
+  let image;
+  try {
+    image = resize(source, { limitInputPixels: MAX_INPUT_PIXELS }).rotate();
+    await image.metadata();
+  } catch (err) {
+    throw invalidImage(err);
+  }
+  await Promise.all(missing.map(async (size) => {
+    // Written under a temporary name and renamed, so a file at the final
+    // path is always complete
+    const target = variantFile(hash, size);
+    const partial = `${target}.${crypto.randomUUID()}.part`;
+    await image.clone().resize(size, size, { fit: "cover" }).webp({ quality: 80 }).toFile(partial);
+    await fs.promises.rename(partial, target);
+  }));
+}
+
+/**
+ * Turns an upload from AvatarUploadStorage into stored variants, then runs
+ * `save` with the avatar while no other upload or clean-up of the same
+ * image can interleave.
+ * @param {{path: string, hash: string}} upload
+ * @param {(avatar: {url: string, variants: object}) => Promise<void>} save
+ * @returns {Promise<{url: string, variants: object}>}
+ *   rejects with code INVALID_IMAGE when the upload can't be decoded, and
+ *   IMAGE_PROCESSING_UNAVAILABLE when sharp is not installed
+ */
+function storeAvatar(upload, save) {
+  const { hash } = upload;
+  return withHashLock(hash, async () => {
+    await fs.promises.mkdir(AVATAR_DIR, { recursive: true });
+    await writeVariants(upload.path, hash);
+    const variants = Object.fromEntries(AVATAR_SIZES.map((size) => [size, variantUrl(hash, size)]));
+    const avatar = { url: variants[PROFILE_SIZE], variants };
+    await save(avatar);
+    return avatar;
+  });
+}
+
+/**
+ * Deletes a stored avatar's files once no profile uses it. URLs that are
+ * not stored avatars (older uploads, defaults) are left alone.
+ * @returns {Promise<boolean>} whether files were deleted
+ */
+function releaseAvatar(url) {
+  const match = AVATAR_URL.exec(url || "");
+  if (!match) return Promise.resolve(false);
+  const hash = match[1];
+  return withHashLock(hash, async () => {
+    const inUse = await db.getAsync(
+      `SELECT 1 FROM profiles WHERE profile_picture_url = ? LIMIT 1`,
+      [variantUrl(hash, PROFILE_SIZE)]
+    );
+    if (inUse) return false;
+    await Promise.all(AVATAR_SIZES.map((size) => fs.promises.rm(variantFile(hash, size), { force: true })));
+    return true;
+  });
+}
+
+/**
+ * Removes an upload's temporary file.
+ */
+function discardUpload(upload) {
+  if (!upload || !upload.path) return Promise.resolve();
+  return fs.promises.rm(upload.path, { force: true });
+}
+
+module.exports = {
+  AvatarUploadStorage,
+  storeAvatar,
+  releaseAvatar,
+  discardUpload,
+  AVATAR_DIR,
+  AVATAR_URL_PREFIX,
+  AVATAR_SIZES,
+  MAX_UPLOAD_BYTES
+};
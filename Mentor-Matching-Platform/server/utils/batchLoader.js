@@ -0,0 +1,77 @@
+// batchLoader.js
+// Collects the keys requested during one tick and fetches them with a
+// single query, so code that looks rows up one at a time (per pair, per
+// comment, ...) makes one round trip instead of one per row. Nothing is
+// cached between batches; every batch reads current data.
+const db = require("../db");
+
+const MAX_BATCH_SIZE = 500;
+
+class BatchLoader {
+  /**
+   * @param {(keys: Array) => Promise<object[]>} loadMany returns the rows
+   *   for a list of distinct keys, in any order
+   * @param {object} [options]
+   * @param {(row: object) => *} [options.keyOf] a row's key (default row.id)
+   * @param {number} [options.maxBatchSize] keys sent to one loadMany call
+   */
+  constructor(loadMany, { keyOf = (row) => row.id, maxBatchSize = MAX_BATCH_SIZE } = {}) {
+    this.loadMany = loadMany;
+    this.keyOf = keyOf;
+    this.maxBatchSize = Math.max(1, maxBatchSize);
+    // String(key) -> { key, waiters }, for the batch not yet sent
+    this.pending = null;
+  }
+
+  /**
+   * @param {*} key compared as a string, so "42" and 42 are the same row
+   * @returns {Promise<object|null>} the row, or null when there is none
+   */
+  load(key) {
+    if (!this.pending) {
+      this.pending = new Map();
+      process.nextTick(() => this.dispatch());
+    }
+    return new Promise((resolve, reject) => {
+      const id = String(key);
+      if (!this.pending.has(id)) this.pending.set(id, { key, waiters: [] });
+      this.pending.get(id).waiters.push({ resolve, reject });
+    });
+  }
+
+  dispatch() {
+    const entries = Array.from(this.pending.values());
+    this.pending = null;
+    for (let i = 0; i < entries.length; i += this.maxBatchSize) {
+      this.run(entries.slice(i, i + this.maxBatchSize));
+    }
+  }
+
+  async run(entries) {
+    let rows;
+    try {
+      rows = (await this.loadMany(entries.map((entry) => entry.key))) || [];
+    } catch (err) {
+      for (const entry of entries) entry.waiters.forEach((waiter) => waiter.reject(err));
+      return;
+    }
+    const byKey = new Map(rows.map((row) => [String(this.keyOf(row)), row]));
+    for (const entry of entries) {
+      const row = byKey.get(String(entry.key)) || null;
+      entry.waiters.forEach((waiter) => waiter.resolve(row));
+    }
+  }
+}
+
+// Users with their profile name, by user id
+const users = new BatchLoader((ids) =>
+  db.allAsync(
+    `SELECT u.id, u.email, p.first_name, p.last_name
+     FROM users u
+     LEFT JOIN profiles p ON p.user_id = u.id
+     WHERE u.id IN (SELECT value FROM json_each(?))`,
+    [JSON.stringify(ids)]
+  )
+);
+
+module.exports = { BatchLoader, users };
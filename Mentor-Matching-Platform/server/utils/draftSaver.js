@@ -0,0 +1,94 @@
+// draftSaver.js
+// Debounced, coalesced writes for survey draft autosave. Saves under the
+// same key that arrive within the delay become one write of the latest
+// payload, and every caller waits for the write that covers its save.
+// Writes for one key never overlap, so an older payload cannot land last.
+
+const DELAY_MS = Number(process.env.DRAFT_SAVE_DELAY_MS) || 250;
+// A key saved continuously is still written at least this often
+const MAX_WAIT_MS = 2000;
+
+class DraftSaver {
+  /**
+   * @param {object} [options]
+   * @param {number} [options.delay] ms of quiet before a pending save is written
+   * @param {number} [options.maxWait] ms a pending save may be held at most
+   */
+  constructor({ delay = DELAY_MS, maxWait = MAX_WAIT_MS } = {}) {
+    this.delay = delay;
+    this.maxWait = Math.max(delay, maxWait);
+    // key -> { write, waiters, timer, firstAt } not written yet
+    this.pending = new Map();
+    // key -> promise of the write in flight
+    this.writing = new Map();
+  }
+
+  /**
+   * Queues `write` as the latest save for `key`, replacing one that has
+   * not been written yet.
+   * @param {string} key
+   * @param {() => Promise<*>} write
+   * @returns {Promise<*>} settles with the write that covers this save
+   */
+  save(key, write) {
+    let entry = this.pending.get(key);
+    if (!entry) {
+      entry = { write, waiters: [], timer: null, firstAt: Date.now() };
+      this.pending.set(key, entry);
+    }
+    entry.write = write;
+    clearTimeout(entry.timer);
+    const wait = Math.min(this.delay, entry.firstAt + this.maxWait - Date.now());
+    entry.timer = setTimeout(() => this.flush(key), Math.max(0, wait));
+    return new Promise((resolve, reject) => entry.waiters.push({ resolve, reject }));
+  }
+
+  flush(key) {
+    const entry = this.pending.get(key);
+    if (!entry) return;
+    this.pending.delete(key);
+    const previous = this.writing.get(key) || Promise.resolve();
+    const current = previous.then(() => entry.write());
+    const settled = current.catch(() => {});
+    this.writing.set(key, settled);
+    settled.then(() => {
+      if (this.writing.get(key) === settled) this.writing.delete(key);
+    });
+    current.then(
+      (value) => entry.waiters.forEach((waiter) => waiter.resolve(value)),
+      (err) => entry.waiters.forEach((waiter) => waiter.reject(err))
+    );
+  }
+
+  /**
+   * Writes the unwritten save for `key` now instead of after the delay, and
+   * waits until every save queued so far has been written or has failed.
+   * @returns {Promise<void>}
+   */
+  async settle(key) {
+    const entry = this.pending.get(key);
+    if (entry) {
+      clearTimeout(entry.timer);
+      this.flush(key);
+    }
+    await this.writing.get(key);
+  }
+
+  /**
+   * Drops the unwritten save for `key` because newer data is being written
+   * another way; its callers resolve with undefined. Waits for a write
+   * already in flight, so the caller's write lands after it.
+   * @returns {Promise<void>}
+   */
+  async supersede(key) {
+    const entry = this.pending.get(key);
+    if (entry) {
+      this.pending.delete(key);
+      clearTimeout(entry.timer);
+      entry.waiters.forEach((waiter) => waiter.resolve(undefined));
+    }
+    await this.writing.get(key);
+  }
+}
+
+module.exports = { DraftSaver };
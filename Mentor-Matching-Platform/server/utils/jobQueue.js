@@ -0,0 +1,194 @@
+// jobQueue.js
+// Background jobs persisted in the jobs table. Requests enqueue a job and
+// poll it by id; a runner in the server process claims queued jobs in
+// order, so queued work survives a restart.
+const db = require("../db");
+const logger = require("./logger");
+
+const POLL_INTERVAL_MS = 5000;
+// Progress writes are throttled to one per interval per job
+const PROGRESS_INTERVAL_MS = 500;
+// A job interrupted by this many restarts is failed instead of retried
+const MAX_ATTEMPTS = 3;
+const KEEP_FINISHED_DAYS = 7;
+
+const handlers = new Map();
+let started = false;
+let timer = null;
+let draining = null;
+let wake = false;
+
+/**
+ * @param {string} type
+ * @param {(job: {id: number, sessionId: number, params: object}, onProgress: (fraction: number) => Promise<void>) => Promise<*>} handler
+ *   resolves with the job's JSON-serialisable result
+ */
+function registerJobType(type, handler) {
+  handlers.set(type, handler);
+}
+
+function parseJson(value) {
+  if (value === null || value === undefined) return null;
+  try {
+    return JSON.parse(value);
+  } catch {
+    return null;
+  }
+}
+
+function toJob(row) {
+  if (!row) return null;
+  return {
+    id: row.id,
+    type: row.type,
+    sessionId: row.session_id,
+    params: parseJson(row.params),
+    status: row.status,
+    progress: row.progress,
+    result: parseJson(row.result),
+    error: row.error,
+    attempts: row.attempts,
+    createdAt: row.created_at,
+    startedAt: row.started_at,
+    finishedAt: row.finished_at
+  };
+}
+
+async function getJob(id) {
+  return toJob(await db.getAsync(`SELECT * FROM jobs WHERE id = ?`, [id]));
+}
+
+/**
+ * Queues a job unless the same type is already queued or running for the
+ * session, in which case that job is returned instead.
+ * @returns {Promise<{job: object, deduplicated: boolean}>}
+ */
+async function enqueue(type, sessionId, params = {}, createdBy = null) {
+  // The existing job can finish between the insert and the lookup; retry
+  for (let attempt = 0; attempt < 3; attempt++) {
+    const { lastID, changes } = await db.runAsync(
+      `INSERT OR IGNORE INTO jobs (type, session_id, params, created_by) VALUES (?, ?, ?, ?)`,
+      [type, sessionId, JSON.stringify(params), createdBy]
+    );
+    if (changes > 0) {
+      drain();
+      return { job: await getJob(lastID), deduplicated: false };
+    }
+
+    const existing = await db.getAsync(
+      `SELECT * FROM jobs WHERE type = ? AND session_id = ? AND status IN ('queued', 'running')`,
+      [type, sessionId]
+    );
+    if (existing) return { job: toJob(existing), deduplicated: true };
+  }
+  throw new Error(`Could not queue ${type} job for session ${sessionId}`);
+}
+
+// Marks the oldest queued job as running and returns it
+function claimNext() {
+  return db.getAsync(
+    `UPDATE jobs
+     SET status = 'running', started_at = CURRENT_TIMESTAMP, attempts = attempts + 1, progress = 0
+     WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1)
+     RETURNING *`
+  );
+}
+
+async function runJob(row) {
+  let lastWrite = 0;
+  const onProgress = async (fraction) => {
+    const now = Date.now();
+    if (now - lastWrite < PROGRESS_INTERVAL_MS) return;
+    lastWrite = now;
+    await db.runAsync(`UPDATE jobs SET progress = ? WHERE id = ?`, [fraction, row.id]);
+  };
+
+  try {
+    const handler = handlers.get(row.type);
+    if (!handler) throw new Error(`Unknown job type: ${row.type}`);
+    const result = await handler({ id: row.id, sessionId: row.session_id, params: parseJson(row.params) }, onProgress);
+    await db.runAsync(
+      `UPDATE jobs SET status = 'succeeded', progress = 1, result = ?, error = NULL,
+         finished_at = CURRENT_TIMESTAMP
+       WHERE id = ?`,
+      [JSON.stringify(result === undefined ? null : result), row.id]
+    );
+    logger.info(`✅ Job ${row.id} (${row.type}) finished`);
+  } catch (err) {
+    logger.error(`❌ Job ${row.id} (${row.type}) failed:`, err.message);
+    await db.runAsync(
+      `UPDATE jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?`,
+      [err.message, row.id]
+    );
+  }
+}
+
+/**
+ * Runs queued jobs one at a time until none are left. Calls made while a
+ * drain is in progress make it check the queue once more before stopping.
+ */
+function drain() {
+  wake = true;
+  if (!started || draining) return draining || Promise.resolve();
+  draining = (async () => {
+    try {
+      while (started && wake) {
+        wake = false;
+        let row;
+        while (started && (row = await claimNext())) await runJob(row);
+      }
+    } catch (err) {
+      logger.error("❌ Job runner error:", err.message);
+    } finally {
+      draining = null;
+    }
+  })();
+  return draining;
+}
+
+// Jobs still marked running were cut off by the previous process exiting
+async function recoverInterrupted() {
+  await db.runAsync(
+    `UPDATE jobs SET status = 'failed', error = 'Interrupted by a server restart', finished_at = CURRENT_TIMESTAMP
+     WHERE status = 'running' AND attempts >= ?`,
+    [MAX_ATTEMPTS]
+  );
+  const { changes } = await db.runAsync(`UPDATE jobs SET status = 'queued', progress = 0 WHERE status = 'running'`);
+  if (changes > 0) logger.info(`🔄 Re-queued ${changes} interrupted job(s)`);
+  await db.runAsync(
+    `DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < datetime('now', ?)`,
+    [`-${KEEP_FINISHED_DAYS} days`]
+  );
+}
+
+/**
+ * Starts the runner: re-queues interrupted jobs, then runs queued jobs now
+ * and on every poll.
+ */
+async function start({ pollInterval = POLL_INTERVAL_MS } = {}) {
+  if (started) return;
+  started = true;
+  await recoverInterrupted();
+  timer = setInterval(drain, pollInterval);
+  timer.unref();
+  drain();
+}
+
+/**
+ * Stops claiming new jobs and waits for the current one to finish.
+ */
+async function stop() {
+  started = false;
+  clearInterval(timer);
+  timer = null;
+  if (draining) await draining;
+}
+
+module.exports = {
+  registerJobType,
+  enqueue,
+  getJob,
+  drain,
+  start,
+  stop
+};
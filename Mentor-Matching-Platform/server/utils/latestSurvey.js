@@ -0,0 +1,101 @@
+// latestSurvey.js
+// A user's most recent complete survey (all three sections saved), read
+// with one indexed query and cached per user until their answers change.
+const cluster = require("cluster");
+const db = require("../db");
+const { LIFESTYLE_FIELDS } = require("./matchScoring");
+
+const MAX_CACHED_USERS = 1000;
+// Writers outside the survey routes (scripts, code backfills) don't
+// invalidate, so entries also expire
+const CACHE_TTL_MS = 5 * 60 * 1000;
+// Cluster workers (cluster.js) don't cache: a save handled by one worker
+// could not invalidate the copies held by the others
+const CACHE_ENABLED = !cluster.isWorker;
+
+// Columns returned for each section, as stored
+const SECTION_COLUMNS = {
+  preferences: [
+    "application_id", "user_id", "role", "transplant_type", "session_role", "transplant_year", "goals",
+    "meeting_preference", "sports_activities", "goals_mask", "goals_count", "sports_mask", "sports_count",
+    "transplant_code", "submitted", "updated_at"
+  ],
+  lifestyle: ["application_id", "user_id", ...LIFESTYLE_FIELDS, "updated_at"],
+  enneagram: [
+    "application_id", "user_id", "top_type", "top_type_primary", "top_type_mask", "scores", "answers", "updated_at"
+  ]
+};
+
+function sectionObject(alias, columns) {
+  return `json_object(${columns.map((column) => `'${column}', ${alias}.${column}`).join(", ")})`;
+}
+
+// survey_sections = 7: all three sections saved (see migration 5). The
+// literal 7 lets SQLite use the partial index.
+const LATEST_SURVEY_SQL = `
+  SELECT
+    a.id,
+    a.session_id,
+    ${sectionObject("p", SECTION_COLUMNS.preferences)} AS preferences,
+    ${sectionObject("l", SECTION_COLUMNS.lifestyle)} AS lifestyle,
+    ${sectionObject("e", SECTION_COLUMNS.enneagram)} AS enneagram
+  FROM applications a
+  JOIN mentorship_preferences p ON p.application_id = a.id
+  JOIN lifestyle_answers l ON l.application_id = a.id
+  JOIN enneagram_answers e ON e.application_id = a.id
+  WHERE a.user_id = ? AND a.survey_sections = 7
+  ORDER BY a.application_date DESC, a.id DESC
+  LIMIT 1
+`;
+
+// userId -> { survey, expires }, least recently used first
+const cache = new Map();
+// Bumped by every invalidation, so a read that overlapped a write is not
+// cached with the answers from before it
+let generation = 0;
+
+async function readLatestSurvey(userId) {
+  const row = await db.getAsync(LATEST_SURVEY_SQL, [userId]);
+  if (!row) return null;
+  return {
+    applicationId: row.id,
+    sessionId: row.session_id,
+    preferences: JSON.parse(row.preferences),
+    lifestyle: JSON.parse(row.lifestyle),
+    enneagram: JSON.parse(row.enneagram),
+  };
+}
+
+/**
+ * @returns {Promise<object|null>} { applicationId, sessionId, preferences,
+ *   lifestyle, enneagram }, or null when the user has no complete survey
+ */
+async function getLatestSurvey(userId) {
+  if (!CACHE_ENABLED) return readLatestSurvey(userId);
+  const key = String(userId);
+  const entry = cache.get(key);
+  if (entry && entry.expires > Date.now()) {
+    cache.delete(key);
+    cache.set(key, entry);
+    return entry.survey;
+  }
+  cache.delete(key);
+
+  const readAt = generation;
+  const survey = await readLatestSurvey(userId);
+  if (readAt === generation) {
+    cache.set(key, { survey, expires: Date.now() + CACHE_TTL_MS });
+    if (cache.size > MAX_CACHED_USERS) cache.delete(cache.keys().next().value);
+  }
+  return survey;
+}
+
+/**
+ * Drops a user's cached survey. Call after writing any of their answers.
+ */
+function invalidateLatestSurvey(userId) {
+  generation++;
+  cache.delete(String(userId));
+}
+
+module.exports = { getLatestSurvey, invalidateLatestSurvey, LATEST_SURVEY_SQL };
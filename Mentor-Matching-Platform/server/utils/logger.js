@@ -0,0 +1,73 @@
+// logger.js
+// Leveled server logging. Arguments are formatted only when their level is
+// enabled, and lines are buffered and written together once per event-loop
+// turn, so a request that logs does not wait on the terminal or log pipe.
+//
+// LOG_LEVEL is one of debug, info, warn, error or silent. It defaults to
+// error in production, silent under Jest and info otherwise.
+const util = require("util");
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40, silent: Infinity };
+// Lines waiting for the next write; more than this are dropped and counted
+const MAX_BUFFERED = 1000;
+
+function defaultLevel() {
+  if (process.env.NODE_ENV === "production") return "error";
+  if (process.env.NODE_ENV === "test") return "silent";
+  return "info";
+}
+
+let threshold = LEVELS[process.env.LOG_LEVEL] ?? LEVELS[defaultLevel()];
+let stdoutLines = [];
+let stderrLines = [];
+let dropped = 0;
+let scheduled = false;
+
+function flush() {
+  scheduled = false;
+  if (dropped > 0) {
+    stderrLines.push(`${new Date().toISOString()} WARN dropped ${dropped} log line(s)`);
+    dropped = 0;
+  }
+  if (stdoutLines.length > 0) {
+    process.stdout.write(`${stdoutLines.join("\n")}\n`);
+    stdoutLines = [];
+  }
+  if (stderrLines.length > 0) {
+    process.stderr.write(`${stderrLines.join("\n")}\n`);
+    stderrLines = [];
+  }
+}
+
+function write(level, args) {
+  if (LEVELS[level] < threshold) return;
+  if (stdoutLines.length + stderrLines.length >= MAX_BUFFERED) {
+    dropped++;
+    return;
+  }
+  const line = `${new Date().toISOString()} ${level.toUpperCase()} ${util.format(...args)}`;
+  (LEVELS[level] >= LEVELS.warn ? stderrLines : stdoutLines).push(line);
+  if (!scheduled) {
+    scheduled = true;
+    setImmediate(flush);
+  }
+}
+
+// Lines still buffered when the process exits
+process.on("exit", flush);
+
+module.exports = {
+  debug: (...args) => write("debug", args),
+  info: (...args) => write("info", args),
+  warn: (...args) => write("warn", args),
+  error: (...args) => write("error", args),
+  /**
+   * @param {string} level one of debug, info, warn, error, silent
+   */
+  setLevel(level) {
+    if (!(level in LEVELS)) throw new Error(`Unknown log level: ${level}`);
+    threshold = LEVELS[level];
+  },
+  isEnabled: (level) => LEVELS[level] >= threshold,
+  flush
+};
@@ -1,147 +1,258 @@
 // matchAlgorithm.js
 const db = require("../db");
+const {
+  MEETING_OPTIONS,
+  parseEnneagramTypes,
+  legacyPreferenceCodes,
+  legacyEnneagramCodes
+} = require("./surveyCodes");
+const {
+  LIFESTYLE_FIELDS,
+  WEIGHTS,
+  calculateSimilarity,
+  compareArrays,
+  transplantScore,
+  lifestyleVector,
+  isLegacyPreferences,
+  isLegacyEnneagram,
+  buildSessionFeatures,
+  reencodeParticipant,
+  appendParticipant,
+  scorePair,
+  isEligible,
+  eligibilityMatrix,
+  scoreMenteeRow,
+  scoreMentorColumn,
+  scoreMatrix,
+  roundScore,
+  topMentorsForRow
+} = require("./matchScoring");
+const { scoreMatrixAsync } = require("./matchPool");
+const { matchingRunDuration } = require("./metrics");
+const logger = require("./logger");
 
-const enneagramCompatibility = {
-  "1": ["2", "4", "7"],
-  "2": ["1", "4", "8"],
-  "3": ["6", "7", "9"],
-  "4": ["1", "2", "5"],
-  "5": ["4", "8", "9"],
-  "6": ["3", "8", "9"],
-  "7": ["1", "3", "9"],
-  "8": ["2", "5", "6"],
-  "9": ["3", "5", "7"]
-};
-
-function calculateSimilarity(a, b) {
-  if (!a || !b || a.length !== b.length) return 0;
-  const sum = a.reduce((acc, val, i) => acc + Math.pow(val - b[i], 2), 0);
-  return 1 / (1 + Math.sqrt(sum));
-}
+const PARTICIPANT_COLUMNS = `
+  a.user_id,
+  a.id AS application_id,
+  a.mentee_capacity,
+  CASE WHEN mp.role = 'mentor' THEN a.pair_count END AS paired_count,
+  mp.role,
+  mp.meeting_preference,
+  u.email,
+  p.first_name,
+  p.last_name,
+  p.user_id IS NOT NULL AS has_profile,
+  mp.goals_mask,
+  mp.goals_count,
+  mp.sports_mask,
+  mp.sports_count,
+  mp.transplant_code,
+  e.top_type_primary,
+  e.top_type_mask,
+  -- JSON answers are only needed for rows saved before the code columns
+  CASE WHEN mp.goals_mask IS NULL THEN mp.transplant_type END AS transplant_type,
+  CASE WHEN mp.goals_mask IS NULL THEN mp.goals END AS goals,
+  CASE WHEN mp.goals_mask IS NULL THEN mp.sports_activities END AS sports_activities,
+  CASE WHEN e.top_type_mask IS NULL THEN e.top_type END AS top_type,
+  ${LIFESTYLE_FIELDS.map(field => `l.${field}`).join(",\n  ")}`;
+
+const PARTICIPANT_JOINS = `
+JOIN users u ON u.id = a.user_id
+JOIN mentorship_preferences mp ON mp.application_id = a.id
+JOIN enneagram_answers e ON e.application_id = a.id
+JOIN lifestyle_answers l ON l.application_id = a.id
+LEFT JOIN profiles p ON p.user_id = a.user_id`;
+
+const PARTICIPANT_FEATURES_SQL = `
+SELECT ${PARTICIPANT_COLUMNS}
+FROM applications a ${PARTICIPANT_JOINS}
+WHERE a.session_id = ?`;
 
-function compareArrays(arr1, arr2) {
-  if (!arr1 || !arr2 || arr1.length === 0) return 0;
-  const common = arr1.filter(value => arr2.includes(value));
-  return common.length / arr1.length;
+const MEETING_LIST = MEETING_OPTIONS.map(option => `'${option}'`).join(", ");
+
+/**
+ * One mentee plus only the mentors that pass isEligible for them, so
+ * ineligible mentors are never read or scored. Params: session id, mentee
+ * id, session id, mentee id.
+ */
+const MENTOR_CANDIDATES_SQL = `
+WITH target AS (
+  SELECT COALESCE(tp.meeting_preference, '') AS meeting
+  FROM applications ta
+  JOIN mentorship_preferences tp ON tp.application_id = ta.id
+  WHERE ta.session_id = ? AND ta.user_id = ?
+)
+SELECT ${PARTICIPANT_COLUMNS}
+FROM applications a ${PARTICIPANT_JOINS}
+CROSS JOIN target t
+WHERE a.session_id = ?
+  AND (a.user_id = ? OR (
+    mp.role = 'mentor'
+    AND p.user_id IS NOT NULL
+    AND (t.meeting NOT IN (${MEETING_LIST})
+      OR COALESCE(mp.meeting_preference, '') NOT IN (${MEETING_LIST})
+      OR mp.meeting_preference = t.meeting)
+    AND (a.mentee_capacity IS NULL OR a.mentee_capacity > a.pair_count)
+  ))`;
+
+/**
+ * Writes the codes of rows saved before the code columns existed back to
+ * the database, so their JSON answers are parsed only once.
+ */
+async function storeLegacyCodes(rows) {
+  const preferences = [];
+  const enneagram = [];
+  for (const row of rows) {
+    if (isLegacyPreferences(row)) {
+      const c = legacyPreferenceCodes(row);
+      preferences.push([row.application_id, c.goals_mask, c.goals_count, c.sports_mask, c.sports_count, c.transplant_code]);
+    }
+    if (isLegacyEnneagram(row)) {
+      const c = legacyEnneagramCodes(row);
+      enneagram.push([row.application_id, c.top_type_primary, c.top_type_mask]);
+    }
+  }
+
+  try {
+    if (preferences.length > 0) {
+      await db.runAsync(
+        `UPDATE mentorship_preferences SET
+           goals_mask = json_extract(c.value, '$[1]'),
+           goals_count = json_extract(c.value, '$[2]'),
+           sports_mask = json_extract(c.value, '$[3]'),
+           sports_count = json_extract(c.value, '$[4]'),
+           transplant_code = json_extract(c.value, '$[5]')
+         FROM json_each(?) AS c
+         WHERE mentorship_preferences.application_id = json_extract(c.value, '$[0]')`,
+        [JSON.stringify(preferences)]
+      );
+    }
+    if (enneagram.length > 0) {
+      await db.runAsync(
+        `UPDATE enneagram_answers SET
+           top_type_primary = json_extract(c.value, '$[1]'),
+           top_type_mask = json_extract(c.value, '$[2]')
+         FROM json_each(?) AS c
+         WHERE enneagram_answers.application_id = json_extract(c.value, '$[0]')`,
+        [JSON.stringify(enneagram)]
+      );
+    }
+  } catch (err) {
+    // Matching still works from the JSON answers; try again next load
+    logger.warn("⚠️ Failed to store survey codes:", err.message);
+  }
 }
 
-function transplantScore(mentee, mentor) {
-  if (!mentee || !mentor) return 0;
-  if (mentee === mentor) return 100;
-  if (mentor !== "Not Applicable") return 50;
-  return 0;
+async function encodeRows(rows) {
+  const legacy = rows.filter(row => isLegacyPreferences(row) || isLegacyEnneagram(row));
+  if (legacy.length > 0) await storeLegacyCodes(legacy);
+  return buildSessionFeatures(rows);
 }
 
-function safeParseArray(val) {
-  try {
-    const parsed = JSON.parse(val);
-    return Array.isArray(parsed) ? parsed : [];
-  } catch {
-    return [];
+/**
+ * Loads every mentor and mentee of a session with one query and encodes
+ * them. Pass `mentorIds` to restrict the mentor side of the matrix; the
+ * mentees are always loaded in full.
+ */
+async function loadSessionFeatures(sessionId, { mentorIds } = {}) {
+  let sql = PARTICIPANT_FEATURES_SQL;
+  const params = [sessionId];
+  if (mentorIds) {
+    sql += ` AND (mp.role = 'mentee' OR a.user_id IN (${mentorIds.map(() => "?").join(", ")}))`;
+    params.push(...mentorIds);
   }
+  return encodeRows(await db.allAsync(sql, params));
+}
+
+/**
+ * Loads one mentee and the mentors eligible for them, with the hard
+ * filters applied in SQL.
+ */
+async function loadMentorCandidates(menteeId, sessionId) {
+  return encodeRows(await db.allAsync(MENTOR_CANDIDATES_SQL, [sessionId, menteeId, sessionId, menteeId]));
+}
+
+/**
+ * Loads one applicant's features row, or undefined if their survey is not
+ * complete yet.
+ */
+async function loadParticipantRow(userId, sessionId) {
+  const row = await db.getAsync(`${PARTICIPANT_FEATURES_SQL} AND a.user_id = ?`, [sessionId, userId]);
+  if (row && (isLegacyPreferences(row) || isLegacyEnneagram(row))) await storeLegacyCodes([row]);
+  return row;
+}
+
+async function scoredResult(sessionId, features, { signal } = {}) {
+  return {
+    sessionId,
+    mentees: features.mentees.meta,
+    mentors: features.mentors.meta,
+    scores: await scoreMatrixAsync(features, { signal }),
+    eligible: eligibilityMatrix(features)
+  };
 }
 
-function lifestyleVector(user) {
-  return [
-    user.physicalExerciseFrequency,
-    user.likeAnimals,
-    user.likeCooking,
-    user.travelImportance,
-    user.freeTimePreference,
-    user.feelOverwhelmed,
-    user.activityBarriers,
-    user.longTermGoals,
-    user.stressHandling,
-    user.motivationLevel,
-    user.hadMentor
-  ];
+/**
+ * Scores all mentees of a session against all of its mentors. Large
+ * sessions are scored on the matching worker pool; pass `signal` to cancel.
+ * @returns {Promise<{sessionId, mentees: object[], mentors: object[], scores: Float64Array, eligible: Uint8Array}>}
+ */
+async function scoreSession(sessionId, { signal, ...filters } = {}) {
+  return scoredResult(sessionId, await loadSessionFeatures(sessionId, filters), { signal });
+}
+
+/**
+ * Scores one mentor against every mentee of a session.
+ * @returns {Map<number, number>} mentee user id -> score (empty when the
+ *   mentor has no complete survey in the session)
+ */
+async function scoreMentorForSession(mentorId, sessionId) {
+  const features = await loadSessionFeatures(sessionId, { mentorIds: [mentorId] });
+  const scores = new Map();
+  const column = features.mentors.meta.findIndex(m => String(m.user_id) === String(mentorId));
+  if (column === -1) return scores;
+
+  const values = scoreMentorColumn(features, column);
+  features.mentees.meta.forEach((mentee, i) => scores.set(mentee.user_id, values[i]));
+  return scores;
 }
 
 async function matchMentorsForMentee(menteeId, sessionId) {
+  return matchingRunDuration.time({ kind: "mentee" }, async () => {
+    const result = await scoredResult(sessionId, await loadMentorCandidates(menteeId, sessionId));
+    const row = result.mentees.findIndex(m => String(m.user_id) === String(menteeId));
+    if (row === -1) throw new Error("Mentee not found or missing data");
 
-  const mentee = await db.getAsync(`
-    SELECT u.id, a.id as application_id, a.session_id,
-  mp.transplant_type, mp.goals, mp.sports_activities, e.top_type, l.*
-FROM users u
-JOIN applications a ON u.id = a.user_id
-JOIN mentorship_preferences mp ON a.id = mp.application_id
-JOIN enneagram_answers e ON a.id = e.application_id
-JOIN lifestyle_answers l ON a.id = l.application_id
-WHERE u.id = ? AND mp.role = 'mentee' AND a.session_id = ?
-  `, [menteeId, sessionId]);
-
-  if (!mentee) throw new Error("Mentee not found or missing data");
-
-  console.log(`🔎 Matching for mentee ${menteeId} in session ${mentee.session_id}`);
-
-  const mentors = await db.allAsync(`
- SELECT 
-  u.id AS mentor_id, 
-  p.first_name AS first_name, 
-  p.last_name AS last_name, 
-  u.email,
-  mp.transplant_type, 
-  mp.goals, 
-  mp.sports_activities, 
-  e.top_type, 
-  l.*
-FROM users u
-JOIN profiles p ON u.id = p.user_id
-JOIN applications a ON u.id = a.user_id
-JOIN mentorship_preferences mp ON a.id = mp.application_id
-JOIN enneagram_answers e ON a.id = e.application_id
-JOIN lifestyle_answers l ON a.id = l.application_id
-WHERE mp.role = 'mentor' AND a.session_id = ?
-`, [mentee.session_id]);
-
-  const menteeLifestyle = lifestyleVector(mentee);
-  const menteeEnneagram = mentee.top_type;
-  const menteeGoals = safeParseArray(mentee.goals);
-  const menteeSports = safeParseArray(mentee.sports_activities);
-  const menteeTransplant = safeParseArray(mentee.transplant_type)[0] || "Not Applicable";
-
-  const results = mentors.map((mentor) => {
-    try {
-      const mentorLifestyle = lifestyleVector(mentor);
-      const lifestyleScore = calculateSimilarity(menteeLifestyle, mentorLifestyle);
-
-      const menteeTypes = Array.isArray(menteeEnneagram) ? menteeEnneagram : [menteeEnneagram];
-      let enneagramScore = 20;
-      if (menteeTypes.includes(mentor.top_type)) {
-        enneagramScore = 80;
-      } else if (menteeTypes.some(type => enneagramCompatibility[type]?.includes(mentor.top_type))) {
-        enneagramScore = 100;
-      }
-      const normalizedEnneagramScore = enneagramScore / 100;
-
-      const sportsMatch = compareArrays(menteeSports, safeParseArray(mentor.sports_activities));
-      const goalsMatch = compareArrays(menteeGoals, safeParseArray(mentor.goals));
-      const mentorTransplant = safeParseArray(mentor.transplant_type)[0] || "Not Applicable";
-      const transplantMatch = transplantScore(menteeTransplant, mentorTransplant) / 100;
-
-      const finalScore = (
-        0.5 * normalizedEnneagramScore +
-        0.2 * lifestyleScore +
-        0.15 * sportsMatch +
-        0.1 * goalsMatch +
-        0.05 * transplantMatch
-      );
+    logger.debug(`🔎 Matching for mentee ${menteeId} in session ${sessionId}`);
 
-      return {
-        mentor_id: mentor.mentor_id,
-        first_name: mentor.first_name,
-        last_name: mentor.last_name,
-        email: mentor.email,
-        finalScore: parseFloat(finalScore.toFixed(3))
-      };
-      
-    } catch (err) {
-      console.error(`❌ Error processing mentor ID ${mentor.mentor_id}:`, err.message);
-      return null;
-    }
+    return topMentorsForRow(result, row, 3);
   });
-
-  return results.filter(Boolean).sort((a, b) => b.finalScore - a.finalScore).slice(0, 3);
 }
 
 module.exports = matchMentorsForMentee;
+module.exports.matchMentorsForMentee = matchMentorsForMentee;
+module.exports.scoreSession = scoreSession;
+module.exports.scoreMentorForSession = scoreMentorForSession;
+module.exports.loadSessionFeatures = loadSessionFeatures;
+module.exports.loadMentorCandidates = loadMentorCandidates;
+module.exports.loadParticipantRow = loadParticipantRow;
+module.exports.reencodeParticipant = reencodeParticipant;
+module.exports.appendParticipant = appendParticipant;
+module.exports.buildSessionFeatures = buildSessionFeatures;
+module.exports.scoreMatrix = scoreMatrix;
+module.exports.scorePair = scorePair;
+module.exports.isEligible = isEligible;
+module.exports.eligibilityMatrix = eligibilityMatrix;
+module.exports.scoreMenteeRow = scoreMenteeRow;
+module.exports.scoreMentorColumn = scoreMentorColumn;
+module.exports.topMentorsForRow = topMentorsForRow;
+module.exports.roundScore = roundScore;
+module.exports.calculateSimilarity = calculateSimilarity;
+module.exports.compareArrays = compareArrays;
+module.exports.transplantScore = transplantScore;
+module.exports.parseEnneagramTypes = parseEnneagramTypes;
+module.exports.lifestyleVector = lifestyleVector;
+module.exports.LIFESTYLE_FIELDS = LIFESTYLE_FIELDS;
+module.exports.WEIGHTS = WEIGHTS;
+module.exports.PARTICIPANT_FEATURES_SQL = PARTICIPANT_FEATURES_SQL;
+module.exports.MENTOR_CANDIDATES_SQL = MENTOR_CANDIDATES_SQL;
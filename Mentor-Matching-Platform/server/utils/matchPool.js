@@ -0,0 +1,106 @@
+// matchPool.js
+// Scores session matrices on worker threads so a large session does not
+// block logins, survey saves and every other request while it runs.
+const os = require("os");
+const path = require("path");
+const { WorkerPool } = require("./workerPool");
+const { scoreMatrix } = require("./matchScoring");
+const { matchingRunDuration } = require("./metrics");
+
+// Below this many mentee/mentor pairs a matrix is scored inline: the copy
+// to and from a worker costs more than the scoring itself
+const INLINE_PAIRS = Number(process.env.MATCH_INLINE_PAIRS) || 20000;
+const WORKERS = Number(process.env.MATCH_WORKERS) || Math.max(1, os.cpus().length - 1);
+const QUEUE_LIMIT = Number(process.env.MATCH_QUEUE_LIMIT) || 64;
+const JOB_TIMEOUT_MS = Number(process.env.MATCH_JOB_TIMEOUT_MS) || 30000;
+
+let pool = null;
+
+function getPool() {
+  if (!pool) {
+    pool = new WorkerPool(path.join(__dirname, "matchWorker.js"), {
+      size: WORKERS,
+      maxQueue: QUEUE_LIMIT,
+      timeout: JOB_TIMEOUT_MS
+    });
+  }
+  return pool;
+}
+
+// Typed arrays of one feature set, without the per-participant meta
+// objects the scoring loop never reads
+function packFeatures(set, start = 0, end = set.size) {
+  const packed = { size: end - start };
+  for (const [key, value] of Object.entries(set)) {
+    if (!ArrayBuffer.isView(value)) continue;
+    const width = value.length / set.size;
+    packed[key] = value.slice(start * width, end * width);
+  }
+  return packed;
+}
+
+/**
+ * Same result as scoreMatrix(features). Large matrices are split into row
+ * shards scored in parallel on the worker pool.
+ * @param {object} [options]
+ * @param {AbortSignal} [options.signal] stops the shards still running
+ * @param {number} [options.timeout] per-shard timeout in ms
+ * @returns {Promise<Float64Array>}
+ */
+async function scoreMatrixAsync(features, { signal, timeout } = {}) {
+  const rows = features.mentees.size;
+  const cols = features.mentors.size;
+  if (rows * cols < INLINE_PAIRS) {
+    return matchingRunDuration.time({ kind: "score_inline" }, async () => scoreMatrix(features));
+  }
+  return matchingRunDuration.time({ kind: "score_pool" }, () => scoreOnPool(features, { signal, timeout }));
+}
+
+async function scoreOnPool(features, { signal, timeout }) {
+  const rows = features.mentees.size;
+  const cols = features.mentors.size;
+  const workers = getPool();
+  const shardCount = Math.min(workers.size, Math.ceil((rows * cols) / INLINE_PAIRS));
+  const shardRows = Math.ceil(rows / shardCount);
+  const mentors = packFeatures(features.mentors);
+  const scores = new Float64Array(rows * cols);
+
+  // One failed shard cancels the others
+  const controller = new AbortController();
+  const onAbort = () => controller.abort();
+  if (signal) {
+    if (signal.aborted) controller.abort();
+    signal.addEventListener("abort", onAbort, { once: true });
+  }
+  try {
+    const shards = [];
+    for (let start = 0; start < rows; start += shardRows) {
+      const end = Math.min(rows, start + shardRows);
+      const mentees = packFeatures(features.mentees, start, end);
+      shards.push(
+        workers
+          .run({ mentees, mentors }, { signal: controller.signal, timeout })
+          .then((part) => scores.set(part, start * cols))
+      );
+    }
+    await Promise.all(shards);
+    return scores;
+  } catch (err) {
+    controller.abort();
+    throw err;
+  } finally {
+    if (signal) signal.removeEventListener("abort", onAbort);
+  }
+}
+
+/**
+ * Stops the worker threads, e.g. on shutdown or at the end of a test run.
+ */
+async function closeMatchPool() {
+  if (!pool) return;
+  const closing = pool;
+  pool = null;
+  await closing.close();
+}
+
+module.exports = { scoreMatrixAsync, closeMatchPool };
@@ -0,0 +1,370 @@
+// matchScoring.js
+// Encoding and scoring of participant features. Has no database access so
+// it can also run on worker threads (see matchWorker.js).
+const {
+  NOT_APPLICABLE_CODE,
+  UNKNOWN_CODE,
+  meetingCode,
+  legacyPreferenceCodes,
+  legacyEnneagramCodes
+} = require("./surveyCodes");
+const { TopK } = require("./topK");
+
+const enneagramCompatibility = {
+  "1": ["2", "4", "7"],
+  "2": ["1", "4", "8"],
+  "3": ["6", "7", "9"],
+  "4": ["1", "2", "5"],
+  "5": ["4", "8", "9"],
+  "6": ["3", "8", "9"],
+  "7": ["1", "3", "9"],
+  "8": ["2", "5", "6"],
+  "9": ["3", "5", "7"]
+};
+
+const LIFESTYLE_FIELDS = [
+  "physicalExerciseFrequency",
+  "likeAnimals",
+  "likeCooking",
+  "travelImportance",
+  "freeTimePreference",
+  "feelOverwhelmed",
+  "activityBarriers",
+  "longTermGoals",
+  "stressHandling",
+  "motivationLevel",
+  "hadMentor"
+];
+const LIFESTYLE_DIM = LIFESTYLE_FIELDS.length;
+
+const WEIGHTS = {
+  enneagram: 0.5,
+  lifestyle: 0.2,
+  sports: 0.15,
+  goals: 0.1,
+  transplant: 0.05
+};
+
+// Bit i set => enneagram type i is compatible (bit 0 unused)
+const COMPATIBILITY_MASKS = new Uint16Array(10);
+for (const [type, compatible] of Object.entries(enneagramCompatibility)) {
+  for (const other of compatible) COMPATIBILITY_MASKS[Number(type)] |= 1 << Number(other);
+}
+
+function calculateSimilarity(a, b) {
+  if (!a || !b || a.length !== b.length) return 0;
+  const sum = a.reduce((acc, val, i) => acc + Math.pow(val - b[i], 2), 0);
+  return 1 / (1 + Math.sqrt(sum));
+}
+
+function compareArrays(arr1, arr2) {
+  if (!arr1 || !arr2 || arr1.length === 0) return 0;
+  const common = arr1.filter(value => arr2.includes(value));
+  return common.length / arr1.length;
+}
+
+function transplantScore(mentee, mentor) {
+  if (!mentee || !mentor) return 0;
+  if (mentee === mentor) return 100;
+  if (mentor !== "Not Applicable") return 50;
+  return 0;
+}
+
+function lifestyleVector(user) {
+  return LIFESTYLE_FIELDS.map(field => user[field]);
+}
+
+function popcount(x) {
+  x -= (x >>> 1) & 0x55555555;
+  x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+  return (((x + (x >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+}
+
+function isLegacyPreferences(row) {
+  return row.goals_mask === null || row.goals_mask === undefined;
+}
+
+function isLegacyEnneagram(row) {
+  return row.top_type_mask === null || row.top_type_mask === undefined;
+}
+
+// Goal/sport masks, transplant code and enneagram types of a participant
+// row, falling back to the JSON answers for rows saved before the code
+// columns existed
+function participantCodes(row) {
+  const preferences = isLegacyPreferences(row) ? legacyPreferenceCodes(row) : row;
+  const enneagram = isLegacyEnneagram(row) ? legacyEnneagramCodes(row) : row;
+  return {
+    goalsMask: preferences.goals_mask,
+    goalsCount: preferences.goals_count,
+    sportsMask: preferences.sports_mask,
+    sportsCount: preferences.sports_count,
+    transplant: preferences.transplant_code,
+    enneagramPrimary: enneagram.top_type_primary,
+    enneagramMask: enneagram.top_type_mask
+  };
+}
+
+/**
+ * Writes one participant row into slot `i` of an encoded feature set.
+ */
+function encodeParticipant(features, i, row) {
+  const codes = participantCodes(row);
+
+  features.ids[i] = row.user_id;
+  features.applicationIds[i] = row.application_id;
+  features.meta[i] = {
+    user_id: row.user_id,
+    application_id: row.application_id,
+    first_name: row.first_name,
+    last_name: row.last_name,
+    email: row.email,
+    mentee_capacity: row.mentee_capacity ?? null
+  };
+
+  for (let d = 0; d < LIFESTYLE_DIM; d++) {
+    features.lifestyle[i * LIFESTYLE_DIM + d] = Number(row[LIFESTYLE_FIELDS[d]]) || 0;
+  }
+
+  features.enneagramPrimary[i] = codes.enneagramPrimary;
+  features.enneagramMask[i] = codes.enneagramMask;
+  let compatible = 0;
+  for (let type = 1; type <= 9; type++) {
+    if (codes.enneagramMask & (1 << type)) compatible |= COMPATIBILITY_MASKS[type];
+  }
+  features.compatibilityMask[i] = compatible;
+
+  features.goals[i] = codes.goalsMask;
+  features.goalCounts[i] = codes.goalsCount;
+  features.sports[i] = codes.sportsMask;
+  features.sportCounts[i] = codes.sportsCount;
+  features.transplant[i] = codes.transplant;
+
+  features.meeting[i] = meetingCode(row.meeting_preference);
+  // -1 = no capacity set; only meaningful for mentors
+  features.remaining[i] = row.mentee_capacity === null || row.mentee_capacity === undefined
+    ? -1
+    : Math.max(0, row.mentee_capacity - (row.paired_count || 0));
+}
+
+/**
+ * Packs participant rows into flat typed arrays so the scoring loop never
+ * touches JSON or per-row objects.
+ */
+function encodeParticipants(rows) {
+  const n = rows.length;
+  const features = {
+    size: n,
+    ids: new Int32Array(n),
+    applicationIds: new Int32Array(n),
+    meta: new Array(n),
+    lifestyle: new Float64Array(n * LIFESTYLE_DIM),
+    enneagramPrimary: new Uint8Array(n),
+    enneagramMask: new Uint16Array(n),
+    compatibilityMask: new Uint16Array(n),
+    goals: new Uint32Array(n),
+    goalCounts: new Uint16Array(n),
+    sports: new Uint32Array(n),
+    sportCounts: new Uint16Array(n),
+    transplant: new Int32Array(n),
+    meeting: new Uint8Array(n),
+    remaining: new Int32Array(n)
+  };
+
+  rows.forEach((row, i) => encodeParticipant(features, i, row));
+  return features;
+}
+
+/**
+ * Builds the mentee and mentor feature sets for one session from raw rows.
+ */
+function buildSessionFeatures(rows) {
+  const menteeRows = [];
+  const mentorRows = [];
+  for (const row of rows) {
+    if (row.role === "mentor") {
+      // Mentors without a profile have no name to show, as before
+      if (!row.has_profile) continue;
+      mentorRows.push(row);
+    } else if (row.role === "mentee") {
+      menteeRows.push(row);
+    }
+  }
+
+  return {
+    mentees: encodeParticipants(menteeRows),
+    mentors: encodeParticipants(mentorRows)
+  };
+}
+
+/**
+ * Re-encodes one participant of an already built session in place, e.g.
+ * after they change an answer. `row` is a participant features row for the
+ * same slot and role.
+ */
+function reencodeParticipant(features, role, i, row) {
+  encodeParticipant(role === "mentor" ? features.mentors : features.mentees, i, row);
+}
+
+/**
+ * Adds a participant to the end of an already built session, growing that
+ * role's arrays by one slot.
+ * @returns {number} the new participant's index
+ */
+function appendParticipant(features, role, row) {
+  const group = role === "mentor" ? features.mentors : features.mentees;
+  const i = group.size;
+  for (const [key, values] of Object.entries(group)) {
+    if (!ArrayBuffer.isView(values)) continue;
+    const grown = new values.constructor(values.length + (key === "lifestyle" ? LIFESTYLE_DIM : 1));
+    grown.set(values);
+    group[key] = grown;
+  }
+  group.size = i + 1;
+  encodeParticipant(group, i, row);
+  return i;
+}
+
+/**
+ * Scores mentee `i` against mentor `j` of an encoded session.
+ */
+function scorePair(features, i, j) {
+  const { mentees, mentors } = features;
+
+  const typeBit = 1 << mentors.enneagramPrimary[j];
+  let enneagram = 0.2;
+  if (mentees.enneagramMask[i] & typeBit) enneagram = 0.8;
+  else if (mentees.compatibilityMask[i] & typeBit) enneagram = 1;
+
+  let sum = 0;
+  const menteeLife = i * LIFESTYLE_DIM;
+  const mentorLife = j * LIFESTYLE_DIM;
+  for (let d = 0; d < LIFESTYLE_DIM; d++) {
+    const diff = mentees.lifestyle[menteeLife + d] - mentors.lifestyle[mentorLife + d];
+    sum += diff * diff;
+  }
+  const lifestyle = 1 / (1 + Math.sqrt(sum));
+
+  const goalCount = mentees.goalCounts[i];
+  const goals = goalCount ? popcount(mentees.goals[i] & mentors.goals[j]) / goalCount : 0;
+  const sportCount = mentees.sportCounts[i];
+  const sports = sportCount ? popcount(mentees.sports[i] & mentors.sports[j]) / sportCount : 0;
+
+  const menteeTransplant = mentees.transplant[i];
+  const mentorTransplant = mentors.transplant[j];
+  let transplant = 0;
+  if (menteeTransplant === mentorTransplant && menteeTransplant !== UNKNOWN_CODE) transplant = 1;
+  else if (mentorTransplant !== NOT_APPLICABLE_CODE) transplant = 0.5;
+
+  return (
+    WEIGHTS.enneagram * enneagram +
+    WEIGHTS.lifestyle * lifestyle +
+    WEIGHTS.sports * sports +
+    WEIGHTS.goals * goals +
+    WEIGHTS.transplant * transplant
+  );
+}
+
+/**
+ * Hard filters applied before ranking: mentee `i` and mentor `j` must have
+ * compatible meeting preferences and the mentor must have room left.
+ * Mirrors the candidate filter in MENTOR_CANDIDATES_SQL.
+ */
+function isEligible(features, i, j) {
+  const { mentees, mentors } = features;
+  const menteeMeeting = mentees.meeting[i];
+  const mentorMeeting = mentors.meeting[j];
+  if (menteeMeeting && mentorMeeting && menteeMeeting !== mentorMeeting) return false;
+  return mentors.remaining[j] !== 0;
+}
+
+/**
+ * Row-major mentee x mentor matrix of isEligible, 1 where the pair may be
+ * recommended.
+ */
+function eligibilityMatrix(features) {
+  const rows = features.mentees.size;
+  const cols = features.mentors.size;
+  const eligible = new Uint8Array(rows * cols);
+  for (let i = 0; i < rows; i++) {
+    for (let j = 0; j < cols; j++) eligible[i * cols + j] = isEligible(features, i, j) ? 1 : 0;
+  }
+  return eligible;
+}
+
+/**
+ * Scores mentee row `i` against every mentor and writes the results into
+ * `out` starting at `offset`.
+ */
+function scoreMenteeRow(features, i, out, offset = 0) {
+  for (let j = 0; j < features.mentors.size; j++) out[offset + j] = scorePair(features, i, j);
+  return out;
+}
+
+/**
+ * Scores mentor column `j` against every mentee.
+ */
+function scoreMentorColumn(features, j, out = new Float64Array(features.mentees.size)) {
+  for (let i = 0; i < features.mentees.size; i++) out[i] = scorePair(features, i, j);
+  return out;
+}
+
+/**
+ * Produces the full mentee x mentor score matrix (row-major, one row per
+ * mentee) in a single pass over the encoded features.
+ */
+function scoreMatrix(features) {
+  const rows = features.mentees.size;
+  const cols = features.mentors.size;
+  const scores = new Float64Array(rows * cols);
+  for (let i = 0; i < rows; i++) scoreMenteeRow(features, i, scores, i * cols);
+  return scores;
+}
+
+function roundScore(score) {
+  return parseFloat(score.toFixed(3));
+}
+
+/**
+ * Returns the k best eligible mentors for matrix row `row`, shaped like the
+ * historical matchMentorsForMentee output. Uses a bounded heap, so the cost
+ * grows with the mentor pool as O(m log k) rather than a full sort.
+ */
+function topMentorsForRow(result, row, k = 3) {
+  const cols = result.mentors.length;
+  const offset = row * cols;
+  const top = new TopK(k);
+  for (let j = 0; j < cols; j++) {
+    if (result.eligible && !result.eligible[offset + j]) continue;
+    top.push(j, result.scores[offset + j]);
+  }
+  return top.sorted().map(({ item: j, score }) => ({
+    mentor_id: result.mentors[j].user_id,
+    first_name: result.mentors[j].first_name,
+    last_name: result.mentors[j].last_name,
+    email: result.mentors[j].email,
+    finalScore: roundScore(score)
+  }));
+}
+
+module.exports = {
+  LIFESTYLE_FIELDS,
+  WEIGHTS,
+  calculateSimilarity,
+  compareArrays,
+  transplantScore,
+  lifestyleVector,
+  isLegacyPreferences,
+  isLegacyEnneagram,
+  buildSessionFeatures,
+  reencodeParticipant,
+  appendParticipant,
+  scorePair,
+  isEligible,
+  eligibilityMatrix,
+  scoreMenteeRow,
+  scoreMentorColumn,
+  scoreMatrix,
+  roundScore,
+  topMentorsForRow
+};
@@ -0,0 +1,7 @@
+// matchWorker.js
+// Worker thread entry for matchPool.js: scores one shard of mentee rows
+// against every mentor.
+const { handleJobs } = require("./workerPool");
+const { scoreMatrix } = require("./matchScoring");
+
+handleJobs((features) => scoreMatrix(features));
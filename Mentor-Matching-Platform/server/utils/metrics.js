@@ -0,0 +1,181 @@
+// metrics.js
+// In-process request, SQLite and matching timings, exposed in the
+// Prometheus text format by GET /metrics (see app.js). Every server
+// process keeps its own numbers; under cluster.js each worker reports for
+// itself.
+
+// Seconds; covers a cached read (~1 ms) up to a large matching run
+const DEFAULT_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+const registry = [];
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, "\\\\").replace(/"/g, '\\"').replace(/\n/g, "\\n");
+}
+
+function labelText(names, values, extra = "") {
+  const pairs = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+  if (extra) pairs.push(extra);
+  return pairs.length > 0 ? `{${pairs.join(",")}}` : "";
+}
+
+class Metric {
+  constructor(type, name, help, labelNames = []) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    // label values joined by \u0000 -> { values, ... }
+    this.series = new Map();
+    registry.push(this);
+  }
+
+  seriesFor(labels = {}, create) {
+    const values = this.labelNames.map((name) => (labels[name] === undefined ? "" : labels[name]));
+    const key = values.join("\u0000");
+    let entry = this.series.get(key);
+    if (!entry) {
+      entry = create(values);
+      this.series.set(key, entry);
+    }
+    return entry;
+  }
+
+  render() {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`];
+    for (const entry of this.series.values()) lines.push(...this.renderSeries(entry));
+    return lines.join("\n");
+  }
+}
+
+class Gauge extends Metric {
+  constructor(name, help, labelNames) {
+    super("gauge", name, help, labelNames);
+  }
+
+  inc(labels, amount = 1) {
+    this.seriesFor(labels, (values) => ({ values, value: 0 })).value += amount;
+  }
+
+  dec(labels, amount = 1) {
+    this.inc(labels, -amount);
+  }
+
+  renderSeries({ values, value }) {
+    return [`${this.name}${labelText(this.labelNames, values)} ${value}`];
+  }
+}
+
+class Histogram extends Metric {
+  constructor(name, help, labelNames, buckets = DEFAULT_BUCKETS) {
+    super("histogram", name, help, labelNames);
+    this.buckets = [...buckets].sort((a, b) => a - b);
+  }
+
+  /**
+   * @param {object} labels
+   * @param {number} seconds
+   */
+  observe(labels, seconds) {
+    const entry = this.seriesFor(labels, (values) => ({
+      values,
+      // per bucket, not cumulative; the last one is +Inf
+      counts: new Array(this.buckets.length + 1).fill(0),
+      sum: 0,
+      count: 0
+    }));
+    let i = 0;
+    while (i < this.buckets.length && seconds > this.buckets[i]) i++;
+    entry.counts[i]++;
+    entry.sum += seconds;
+    entry.count++;
+  }
+
+  /**
+   * Runs `work` and records how long it took, whether it succeeded or not.
+   * @param {object} labels
+   * @param {() => Promise<*>} work
+   * @returns {Promise<*>} what `work` returns
+   */
+  async time(labels, work) {
+    const start = process.hrtime.bigint();
+    try {
+      return await work();
+    } finally {
+      this.observe(labels, Number(process.hrtime.bigint() - start) / 1e9);
+    }
+  }
+
+  renderSeries({ values, counts, sum, count }) {
+    const lines = [];
+    let cumulative = 0;
+    this.buckets.forEach((bound, i) => {
+      cumulative += counts[i];
+      lines.push(`${this.name}_bucket${labelText(this.labelNames, values, `le="${bound}"`)} ${cumulative}`);
+    });
+    lines.push(`${this.name}_bucket${labelText(this.labelNames, values, 'le="+Inf"')} ${count}`);
+    lines.push(`${this.name}_sum${labelText(this.labelNames, values)} ${sum}`);
+    lines.push(`${this.name}_count${labelText(this.labelNames, values)} ${count}`);
+    return lines;
+  }
+}
+
+const httpRequestDuration = new Histogram(
+  "http_request_duration_seconds",
+  "Time from receiving a request to finishing its response.",
+  ["method", "route", "status"]
+);
+const httpRequestsInFlight = new Gauge(
+  "http_requests_in_flight",
+  "Requests received and not yet answered."
+);
+const sqliteQueryDuration = new Histogram(
+  "sqlite_query_duration_seconds",
+  "Time of SQLite statements run through the db.js helpers.",
+  ["op"]
+);
+const matchingRunDuration = new Histogram(
+  "matching_run_duration_seconds",
+  "Time of mentor matching runs.",
+  ["kind"]
+);
+
+/**
+ * Express middleware recording latency and in-flight requests. Routes are
+ * labelled by their pattern (/api/sessions/:id), so ids don't create new
+ * series; requests no route handled are labelled "other".
+ */
+function requestMetrics(req, res, next) {
+  const start = process.hrtime.bigint();
+  httpRequestsInFlight.inc();
+  res.once("close", () => {
+    httpRequestsInFlight.dec();
+    httpRequestDuration.observe(
+      {
+        method: req.method,
+        route: req.route ? `${req.baseUrl}${req.route.path}` : "other",
+        status: res.writableFinished ? res.statusCode : "aborted"
+      },
+      Number(process.hrtime.bigint() - start) / 1e9
+    );
+  });
+  next();
+}
+
+/**
+ * @returns {string} every metric in the Prometheus text exposition format
+ */
+function render() {
+  return `${registry.map((metric) => metric.render()).join("\n")}\n`;
+}
+
+module.exports = {
+  Gauge,
+  Histogram,
+  httpRequestDuration,
+  httpRequestsInFlight,
+  sqliteQueryDuration,
+  matchingRunDuration,
+  requestMetrics,
+  render
+};
@@ -0,0 +1,29 @@
+// pageCursor.js
+// Opaque cursors for keyset pagination. A cursor carries the last row's
+// sort key and id; the next page starts strictly after that pair, so rows
+// added or removed between requests never shift a page.
+
+/**
+ * @param {string|number|null} key the last row's sort key
+ * @param {number} id the last row's id, which breaks ties between keys
+ * @returns {string}
+ */
+function encodeCursor(key, id) {
+  return Buffer.from(JSON.stringify([key, id])).toString("base64url");
+}
+
+/**
+ * @param {string} cursor from encodeCursor
+ * @returns {Array|null} [key, id], or null when the cursor is malformed
+ */
+function decodeCursor(cursor) {
+  try {
+    const value = JSON.parse(Buffer.from(String(cursor), "base64url").toString("utf8"));
+    if (Array.isArray(value) && value.length === 2 && Number.isInteger(value[1])) return value;
+  } catch {
+    // not base64url JSON
+  }
+  return null;
+}
+
+module.exports = { encodeCursor, decodeCursor };
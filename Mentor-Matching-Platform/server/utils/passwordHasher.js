@@ -0,0 +1,115 @@
+// passwordHasher.js
+// bcrypt hashing and comparison with bounded concurrency. bcrypt runs on
+// libuv's thread pool, which SQLite queries and file I/O share; capping
+// the number of hashes in flight keeps threads free for them, and a burst
+// beyond the queue limit is refused straight away instead of piling up.
+const bcrypt = require("bcrypt");
+const logger = require("./logger");
+
+// Cost for new hashes. Stored hashes with another cost are upgraded on the
+// next successful login (see needsRehash).
+const COST = Number(process.env.BCRYPT_COST) || 10;
+// libuv's pool has 4 threads unless UV_THREADPOOL_SIZE says otherwise;
+// hashing gets all but two of them
+const THREADPOOL_SIZE = Number(process.env.UV_THREADPOOL_SIZE) || 4;
+const CONCURRENCY = Number(process.env.HASH_CONCURRENCY) || Math.max(1, THREADPOOL_SIZE - 2);
+const QUEUE_LIMIT = Number(process.env.HASH_QUEUE_LIMIT) || 32;
+// A request still waiting for a hashing slot after this long is refused
+const QUEUE_TIMEOUT_MS = Number(process.env.HASH_QUEUE_TIMEOUT_MS) || 5000;
+
+function overloadError(message) {
+  // Same code as a full worker pool, so routes answer both with a 503
+  const err = new Error(message);
+  err.code = "POOL_QUEUE_FULL";
+  return err;
+}
+
+class HashPool {
+  /**
+   * @param {object} [options]
+   * @param {number} [options.concurrency] hashes running at once
+   * @param {number} [options.maxQueue] hashes that may wait for a slot
+   * @param {number} [options.queueTimeout] ms a hash may wait, 0 for no limit
+   */
+  constructor({ concurrency = CONCURRENCY, maxQueue = QUEUE_LIMIT, queueTimeout = QUEUE_TIMEOUT_MS } = {}) {
+    this.concurrency = Math.max(1, concurrency);
+    this.maxQueue = maxQueue;
+    this.queueTimeout = queueTimeout;
+    this.active = 0;
+    this.queue = [];
+  }
+
+  /**
+   * Runs `task` once a slot is free.
+   * @param {() => Promise<*>} task
+   * @returns {Promise<*>} rejects with code POOL_QUEUE_FULL when the queue
+   *   is full or the wait times out
+   */
+  run(task) {
+    if (this.active < this.concurrency) return this.start(task);
+    if (this.queue.length >= this.maxQueue) {
+      return Promise.reject(overloadError("Password hashing queue is full"));
+    }
+    return new Promise((resolve, reject) => {
+      const waiter = { task, resolve, reject, timer: null };
+      if (this.queueTimeout > 0) {
+        waiter.timer = setTimeout(() => {
+          this.queue.splice(this.queue.indexOf(waiter), 1);
+          reject(overloadError(`Waited more than ${this.queueTimeout} ms to hash a password`));
+        }, this.queueTimeout);
+      }
+      this.queue.push(waiter);
+    });
+  }
+
+  async start(task) {
+    this.active++;
+    try {
+      return await task();
+    } finally {
+      this.active--;
+      this.next();
+    }
+  }
+
+  next() {
+    const waiter = this.queue.shift();
+    if (!waiter) return;
+    clearTimeout(waiter.timer);
+    this.start(waiter.task).then(waiter.resolve, waiter.reject);
+  }
+}
+
+const pool = new HashPool();
+
+function hash(value) {
+  return pool.run(() => bcrypt.hash(value, COST));
+}
+
+function compare(value, hashed) {
+  return pool.run(() => bcrypt.compare(value, hashed));
+}
+
+/**
+ * Whether a stored bcrypt hash uses a cost other than the configured one.
+ * Values that are not bcrypt hashes are left alone.
+ */
+function needsRehash(hashed) {
+  const match = /^\$2[abxy]?\$(\d{2})\$/.exec(hashed || "");
+  return Boolean(match) && Number(match[1]) !== COST;
+}
+
+/**
+ * Answers a failed hash or compare: 503 with Retry-After when hashing is
+ * overloaded, 500 for anything else.
+ */
+function sendHashError(res, err) {
+  if (err && err.code === "POOL_QUEUE_FULL") {
+    res.set("Retry-After", "1");
+    return res.status(503).json({ success: false, message: "Server is busy, please try again." });
+  }
+  logger.error("Hashing error:", err);
+  return res.status(500).json({ success: false, message: "Internal server error." });
+}
+
+module.exports = { HashPool, hash, compare, needsRehash, sendHashError, COST, pool };
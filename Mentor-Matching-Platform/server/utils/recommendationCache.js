@@ -0,0 +1,247 @@
+// recommendationCache.js
+// Top-N mentor recommendations per mentee, persisted in mentor_recommendations.
+const db = require("../db");
+const matchMentorsForMentee = require("./matchAlgorithm");
+const { scoreMentorForSession } = require("./matchAlgorithm");
+const sessionScores = require("./sessionScores");
+const logger = require("./logger");
+
+const RECOMMENDATION_LIMIT = 3;
+
+async function getApplication(userId, sessionId) {
+  return db.getAsync(
+    `SELECT id, role FROM applications WHERE user_id = ? AND session_id = ?`,
+    [userId, sessionId]
+  );
+}
+
+async function currentVersion(sessionId) {
+  const row = await db.getAsync(
+    `SELECT version FROM recommendation_versions WHERE session_id = ?`,
+    [sessionId]
+  );
+  return row ? row.version : 0;
+}
+
+const BUMP_VERSION_SQL = `
+  INSERT INTO recommendation_versions (session_id, version) VALUES (?, 1)
+  ON CONFLICT(session_id) DO UPDATE SET version = version + 1`;
+
+async function bumpVersion(sessionId) {
+  await db.runAsync(BUMP_VERSION_SQL, [sessionId]);
+}
+
+/**
+ * Reads a mentee's cached recommendations with one indexed lookup.
+ * @returns {Promise<object[]|null>} null on a cache miss
+ */
+async function readCached(menteeId, sessionId) {
+  const rows = await db.allAsync(
+    `SELECT
+       r.recommended_mentor_id AS mentor_id,
+       p.first_name,
+       p.last_name,
+       u.email,
+       r.score AS finalScore
+     FROM applications a
+     JOIN mentor_recommendations r ON r.application_id = a.id
+     JOIN users u ON u.id = r.recommended_mentor_id
+     LEFT JOIN profiles p ON p.user_id = r.recommended_mentor_id
+     WHERE a.user_id = ? AND a.session_id = ?
+     ORDER BY r.rank`,
+    [menteeId, sessionId]
+  );
+  return rows && rows.length > 0 ? rows : null;
+}
+
+/**
+ * Replaces an application's cached list. The insert only happens if the
+ * session version is still the one the list was computed against.
+ */
+async function storeRecommendations(applicationId, sessionId, matches, version) {
+  await db.runAsync(`DELETE FROM mentor_recommendations WHERE application_id = ?`, [applicationId]);
+  if (matches.length === 0) return;
+
+  const values = matches.map(() => "(?, ?, ?)").join(", ");
+  const params = [applicationId, version];
+  matches.forEach((m, i) => params.push(m.mentor_id, m.finalScore, i + 1));
+  params.push(sessionId, version);
+
+  await db.runAsync(
+    `INSERT INTO mentor_recommendations (application_id, version, recommended_mentor_id, score, rank)
+     SELECT ?, ?, column1, column2, column3 FROM (VALUES ${values})
+     WHERE COALESCE((SELECT version FROM recommendation_versions WHERE session_id = ?), 0) = ?`,
+    params
+  );
+}
+
+/**
+ * Replaces the cached lists of several applications at once, e.g. every
+ * list an incremental rescoring changed. The old lists are always dropped;
+ * the new ones are only inserted if the session version is still the one
+ * they were computed for, since another server process may have changed
+ * the session in the meantime.
+ */
+async function storeLists(sessionId, lists, version) {
+  await db.runAsync(
+    `DELETE FROM mentor_recommendations WHERE application_id IN (SELECT value FROM json_each(?))`,
+    [JSON.stringify(lists.map((l) => l.applicationId))]
+  );
+
+  const rows = [];
+  for (const list of lists) {
+    list.matches.forEach((m, i) => rows.push([list.applicationId, m.mentor_id, m.finalScore, i + 1]));
+  }
+  if (rows.length === 0) return;
+
+  await db.runAsync(
+    `INSERT INTO mentor_recommendations (application_id, version, recommended_mentor_id, score, rank)
+     SELECT json_extract(value, '$[0]'), ?, json_extract(value, '$[1]'), json_extract(value, '$[2]'), json_extract(value, '$[3]')
+     FROM json_each(?)
+     WHERE COALESCE((SELECT version FROM recommendation_versions WHERE session_id = ?), 0) = ?`,
+    [version, JSON.stringify(rows), sessionId, version]
+  );
+}
+
+/**
+ * Returns a mentee's top recommendations, serving them from
+ * mentor_recommendations when cached and scoring + storing them otherwise.
+ */
+async function getRecommendations(menteeId, sessionId) {
+  const cached = await readCached(menteeId, sessionId);
+  if (cached) return cached;
+
+  const version = await currentVersion(sessionId);
+  const matches = await matchMentorsForMentee(menteeId, sessionId);
+  const application = await getApplication(menteeId, sessionId);
+  if (application) {
+    await storeRecommendations(application.id, sessionId, matches, version);
+  }
+  return matches;
+}
+
+/**
+ * Drops the cached lists a mentor's new answers can change: lists that
+ * already contain the mentor, lists that are not full yet, and lists whose
+ * lowest score the mentor now beats.
+ */
+async function invalidateForMentor(mentorId, sessionId) {
+  const cached = await db.allAsync(
+    `SELECT r.application_id, a.user_id AS mentee_id, r.recommended_mentor_id, r.score
+     FROM mentor_recommendations r
+     JOIN applications a ON a.id = r.application_id
+     WHERE a.session_id = ?`,
+    [sessionId]
+  );
+  if (!cached || cached.length === 0) return;
+
+  const lists = new Map();
+  for (const row of cached) {
+    let list = lists.get(row.application_id);
+    if (!list) {
+      list = { menteeId: row.mentee_id, count: 0, minScore: Infinity, hasMentor: false };
+      lists.set(row.application_id, list);
+    }
+    list.count++;
+    list.minScore = Math.min(list.minScore, row.score);
+    if (String(row.recommended_mentor_id) === String(mentorId)) list.hasMentor = true;
+  }
+
+  const scores = await scoreMentorForSession(mentorId, sessionId);
+  const affected = [];
+  for (const [applicationId, list] of lists) {
+    const score = scores.get(list.menteeId);
+    if (
+      list.hasMentor ||
+      (score !== undefined && (list.count < RECOMMENDATION_LIMIT || score >= list.minScore))
+    ) {
+      affected.push(applicationId);
+    }
+  }
+  if (affected.length === 0) return;
+
+  await db.runAsync(
+    `DELETE FROM mentor_recommendations WHERE application_id IN (${affected.map(() => "?").join(", ")})`,
+    affected
+  );
+}
+
+/**
+ * Called after a participant's preferences, lifestyle or enneagram answers
+ * change. The session's score state is updated for just that participant
+ * and the lists it changed are rewritten. If that fails, a mentee drops
+ * their own list and a mentor drops the lists their new scores can affect.
+ */
+async function invalidateApplicant(userId, sessionId) {
+  const application = await getApplication(userId, sessionId);
+  if (!application) return;
+
+  await bumpVersion(sessionId);
+  try {
+    // Read after the bump: if another process bumped as well, the version
+    // skips one and the score state is rebuilt rather than trusted
+    const version = await currentVersion(sessionId);
+    await sessionScores.applyParticipantChange(
+      userId,
+      sessionId,
+      (lists, listVersion) => storeLists(sessionId, lists, listVersion),
+      version
+    );
+    return;
+  } catch (err) {
+    logger.warn("⚠️ Incremental rescoring failed, clearing cached lists:", err.message);
+  }
+
+  if (application.role === "mentee") {
+    await db.runAsync(`DELETE FROM mentor_recommendations WHERE application_id = ?`, [application.id]);
+  } else {
+    await invalidateForMentor(userId, sessionId);
+  }
+}
+
+/**
+ * Called inside the transaction `tx` that deletes a cancelled application.
+ * A mentee's own list goes, and so does every list that recommends a
+ * cancelled mentor: whole lists, since readCached serves any stored list
+ * and one left short of a mentor would never be refilled.
+ */
+async function invalidateCancelledApplication(tx, application, sessionId) {
+  await tx.run(BUMP_VERSION_SQL, [sessionId]);
+  if (application.role === "mentee") {
+    await tx.run(`DELETE FROM mentor_recommendations WHERE application_id = ?`, [application.id]);
+  } else {
+    await tx.run(
+      `DELETE FROM mentor_recommendations
+       WHERE application_id IN (
+         SELECT r.application_id
+         FROM mentor_recommendations r
+         JOIN applications a ON a.id = r.application_id
+         WHERE r.recommended_mentor_id = ? AND a.session_id = ?
+       )`,
+      [application.user_id, sessionId]
+    );
+  }
+  sessionScores.forgetSession(sessionId);
+}
+
+/**
+ * Called after changes that can affect every list in a session at once,
+ * such as a bulk mentor assignment using up mentor capacity.
+ */
+async function invalidateSession(sessionId) {
+  await bumpVersion(sessionId);
+  sessionScores.forgetSession(sessionId);
+  await db.runAsync(
+    `DELETE FROM mentor_recommendations
+     WHERE application_id IN (SELECT id FROM applications WHERE session_id = ?)`,
+    [sessionId]
+  );
+}
+
+module.exports = {
+  RECOMMENDATION_LIMIT,
+  getRecommendations,
+  invalidateApplicant,
+  invalidateCancelledApplication,
+  invalidateSession,
+};
@@ -0,0 +1,124 @@
+// sessionAssignment.js
+// Capacity-aware mentor assignment for a whole session, shared by the
+// assign-mentors route and background match jobs.
+const db = require("../db");
+const { scoreSession, roundScore } = require("./matchAlgorithm");
+const { solveAssignment } = require("./assignment");
+const { matchingRunDuration } = require("./metrics");
+const recommendationCache = require("./recommendationCache");
+
+/**
+ * Validates an assign-mentors request body.
+ * @returns {{options?: object, error?: string}}
+ */
+function parseAssignmentOptions(body) {
+  const { capacity = 1, capacities = {}, minScore = 0, dryRun = false } = body || {};
+  const defaultCapacity = parseInt(capacity, 10);
+  if (!Number.isInteger(defaultCapacity) || defaultCapacity < 0) {
+    return { error: "capacity must be a non-negative integer" };
+  }
+  return {
+    options: {
+      capacity: defaultCapacity,
+      capacities: capacities || {},
+      minScore: Number(minScore) || 0,
+      dryRun: Boolean(dryRun)
+    }
+  };
+}
+
+/**
+ * Pairs every unpaired mentee in the session with a mentor so that the
+ * total match score is as high as possible. Existing pairs are kept and
+ * count against their mentor's capacity; a capacity saved on the mentor's
+ * application takes precedence over `options.capacities` and
+ * `options.capacity`. Ineligible pairs (see isEligible) are never made.
+ * @param {object} options from parseAssignmentOptions
+ * @param {object} [hooks]
+ * @param {AbortSignal} [hooks.signal] cancels scoring
+ * @param {(fraction: number) => Promise<void>|void} [hooks.onProgress]
+ */
+async function assignSessionMentors(sessionId, options, { signal, onProgress = () => {} } = {}) {
+  return matchingRunDuration.time({ kind: "session_assignment" }, () =>
+    runAssignment(sessionId, options, { signal, onProgress })
+  );
+}
+
+async function runAssignment(sessionId, options, { signal, onProgress }) {
+  const { capacity, capacities, minScore, dryRun } = options;
+
+  const [result, existingPairs] = await Promise.all([
+    scoreSession(sessionId, { signal }),
+    db.allAsync(`SELECT mentor_id, mentee_id FROM matching_pairs WHERE session_id = ?`, [sessionId])
+  ]);
+  await onProgress(0.6);
+
+  const pairedMentees = new Set();
+  const mentorLoad = new Map();
+  for (const pair of existingPairs) {
+    pairedMentees.add(pair.mentee_id);
+    mentorLoad.set(pair.mentor_id, (mentorLoad.get(pair.mentor_id) || 0) + 1);
+  }
+
+  const cols = result.mentors.length;
+  const remaining = result.mentors.map(m => {
+    const override = parseInt(capacities[m.user_id], 10);
+    let limit = Number.isInteger(override) ? override : capacity;
+    if (m.mentee_capacity !== null && m.mentee_capacity !== undefined) limit = m.mentee_capacity;
+    return Math.max(0, limit - (mentorLoad.get(m.user_id) || 0));
+  });
+
+  // Solve only for the mentees that still need a mentor
+  const rows = [];
+  result.mentees.forEach((m, i) => {
+    if (!pairedMentees.has(m.user_id)) rows.push(i);
+  });
+  const scores = new Float64Array(rows.length * cols);
+  rows.forEach((row, r) => {
+    scores.set(result.scores.subarray(row * cols, (row + 1) * cols), r * cols);
+    for (let j = 0; j < cols; j++) {
+      if (!result.eligible[row * cols + j]) scores[r * cols + j] = -Infinity;
+    }
+  });
+
+  const assignment = solveAssignment(scores, rows.length, cols, remaining, { minScore });
+  await onProgress(0.9);
+
+  const pairs = [];
+  const unassigned = [];
+  let totalScore = 0;
+  rows.forEach((row, r) => {
+    const mentee = result.mentees[row];
+    const col = assignment[r];
+    if (col === -1) {
+      unassigned.push(mentee.user_id);
+      return;
+    }
+    const score = scores[r * cols + col];
+    totalScore += score;
+    pairs.push({ mentorId: result.mentors[col].user_id, menteeId: mentee.user_id, score: roundScore(score) });
+  });
+
+  let inserted = 0;
+  if (!dryRun && pairs.length > 0) {
+    // One statement, so the whole pairing is written in a single transaction
+    const { changes } = await db.runAsync(
+      `INSERT OR IGNORE INTO matching_pairs (session_id, mentor_id, mentee_id)
+       SELECT ?, json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)`,
+      [sessionId, JSON.stringify(pairs.map(p => [p.mentorId, p.menteeId]))]
+    );
+    inserted = changes;
+    // Mentors just used up capacity, which changes who can be recommended
+    if (inserted > 0) await recommendationCache.invalidateSession(sessionId);
+  }
+
+  return {
+    sessionId: Number(sessionId),
+    pairs,
+    unassigned,
+    totalScore: roundScore(totalScore),
+    inserted
+  };
+}
+
+module.exports = { parseAssignmentOptions, assignSessionMentors };
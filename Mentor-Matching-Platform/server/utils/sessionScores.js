@@ -0,0 +1,289 @@
+// sessionScores.js
+// In-memory score state per session, updated one row or column at a time
+// as participants change their answers.
+//
+// Each state carries the recommendation_versions value it is current for.
+// Every change bumps that version, so a state that missed a change made by
+// another server process (see cluster.js) is found out and rebuilt.
+const {
+  loadSessionFeatures,
+  loadParticipantRow,
+  reencodeParticipant,
+  appendParticipant,
+  scoreMenteeRow,
+  scoreMentorColumn,
+  isEligible,
+  roundScore
+} = require("./matchAlgorithm");
+const { TopK, ranksAbove } = require("./topK");
+const { scoreMatrixAsync } = require("./matchPool");
+
+const TOP_K = 3;
+const MAX_SESSIONS = 20;
+
+// sessionId -> state, least recently used first
+const states = new Map();
+// sessionId -> tail of that session's update queue
+const queues = new Map();
+
+/**
+ * Recomputes the top-K eligible columns of row `i` from the score matrix.
+ */
+function rebuildTop(state, i) {
+  const { features, scores, cols, top } = state;
+  const heap = new TopK(TOP_K);
+  for (let j = 0; j < cols; j++) {
+    if (isEligible(features, i, j)) heap.push(j, scores[i * cols + j]);
+  }
+  const best = heap.sorted();
+  best.forEach((entry, k) => { top[i * TOP_K + k] = entry.item; });
+  state.topCounts[i] = best.length;
+}
+
+/**
+ * Folds a changed score for column `j` into row `i`'s top-K.
+ * @returns {boolean} whether the row's list changed
+ */
+function updateTopForColumn(state, i, j) {
+  const { scores, cols, top, topCounts } = state;
+  const base = i * TOP_K;
+  const count = topCounts[i];
+  for (let k = 0; k < count; k++) {
+    if (top[base + k] === j) {
+      // The column's own score or eligibility moved; a rescan of the row is cheap
+      rebuildTop(state, i);
+      return true;
+    }
+  }
+
+  if (!isEligible(state.features, i, j)) return false;
+  const score = scores[i * cols + j];
+  if (count === TOP_K) {
+    const last = top[base + TOP_K - 1];
+    if (!ranksAbove(score, j, scores[i * cols + last], last)) return false;
+  }
+  rebuildTop(state, i);
+  return true;
+}
+
+function indexBy(meta) {
+  return new Map(meta.map((m, i) => [String(m.user_id), i]));
+}
+
+async function buildState(sessionId) {
+  const features = await loadSessionFeatures(sessionId);
+  const rows = features.mentees.size;
+  const cols = features.mentors.size;
+  const state = {
+    features,
+    rows,
+    cols,
+    scores: await scoreMatrixAsync(features),
+    menteeIndex: indexBy(features.mentees.meta),
+    mentorIndex: indexBy(features.mentors.meta),
+    top: new Int32Array(rows * TOP_K),
+    topCounts: new Uint8Array(rows)
+  };
+  for (let i = 0; i < rows; i++) rebuildTop(state, i);
+  return state;
+}
+
+function remember(sessionId, state, version) {
+  state.version = version;
+  states.delete(sessionId);
+  states.set(sessionId, state);
+  if (states.size > MAX_SESSIONS) states.delete(states.keys().next().value);
+}
+
+// Runs `task` after every earlier update of the same session has finished
+function enqueue(sessionId, task) {
+  const tail = queues.get(sessionId) || Promise.resolve();
+  const run = tail.then(task, task);
+  const settled = run.catch(() => {});
+  queues.set(sessionId, settled);
+  settled.then(() => {
+    if (queues.get(sessionId) === settled) queues.delete(sessionId);
+  });
+  return run;
+}
+
+/**
+ * Returns mentee row `i`'s recommendations, shaped like topMentorsForRow.
+ */
+function topMentors(state, i) {
+  const mentors = state.features.mentors.meta;
+  const list = [];
+  for (let k = 0; k < state.topCounts[i]; k++) {
+    const j = state.top[i * TOP_K + k];
+    list.push({
+      mentor_id: mentors[j].user_id,
+      first_name: mentors[j].first_name,
+      last_name: mentors[j].last_name,
+      email: mentors[j].email,
+      finalScore: roundScore(state.scores[i * state.cols + j])
+    });
+  }
+  return list;
+}
+
+function listsFor(state, rows) {
+  return rows.map(i => ({
+    applicationId: state.features.mentees.applicationIds[i],
+    menteeId: state.features.mentees.ids[i],
+    matches: topMentors(state, i)
+  }));
+}
+
+function grow(values, length) {
+  const grown = new values.constructor(length);
+  grown.set(values);
+  return grown;
+}
+
+/**
+ * Adds a mentee who just became scoreable as a new last row.
+ * @returns {number[]} the rows whose lists changed: just the new one
+ */
+function addMentee(state, row) {
+  const i = appendParticipant(state.features, "mentee", row);
+  state.rows++;
+  state.scores = grow(state.scores, state.rows * state.cols);
+  scoreMenteeRow(state.features, i, state.scores, i * state.cols);
+  state.top = grow(state.top, state.rows * TOP_K);
+  state.topCounts = grow(state.topCounts, state.rows);
+  state.menteeIndex.set(String(row.user_id), i);
+  rebuildTop(state, i);
+  return [i];
+}
+
+/**
+ * Adds a mentor who just became scoreable as a new last column. The
+ * matrix is copied row by row into its wider layout; only the new column
+ * is scored, and only the lists it enters are rebuilt.
+ * @returns {number[]} the rows whose lists changed
+ */
+function addMentor(state, row) {
+  const j = appendParticipant(state.features, "mentor", row);
+  const { rows, cols } = state;
+  const scores = new Float64Array(rows * (cols + 1));
+  for (let i = 0; i < rows; i++) {
+    scores.set(state.scores.subarray(i * cols, (i + 1) * cols), i * (cols + 1));
+  }
+  state.scores = scores;
+  state.cols = cols + 1;
+  state.mentorIndex.set(String(row.user_id), j);
+
+  const column = scoreMentorColumn(state.features, j);
+  const changed = [];
+  for (let i = 0; i < rows; i++) {
+    scores[i * state.cols + j] = column[i];
+    if (updateTopForColumn(state, i, j)) changed.push(i);
+  }
+  return changed;
+}
+
+function allRows(state) {
+  return Array.from({ length: state.rows }, (_, i) => i);
+}
+
+/**
+ * Applies one applicant's changed answers to the session state. A mentee
+ * rescores their row; a mentor rescores their column and only touches the
+ * top-K lists it can change. A participant who just became scoreable is
+ * added as a new row or column the same way. Participants who stopped
+ * being scoreable or changed role rebuild the session from the database,
+ * as does a state that missed a version.
+ * @param {number} [version] the session version this change bumped it to
+ * @returns {Promise<{state: object, rows: number[]}>} the state and the mentee
+ *   rows whose lists changed
+ */
+async function applyChange(sessionId, userId, version) {
+  let state = states.get(sessionId);
+  if (state && version !== undefined) {
+    // A rebuild since this change was made already read its answers
+    if (version <= state.version) return { state, rows: [] };
+    if (version !== state.version + 1) state = null;
+  }
+  if (!state) {
+    state = await buildState(sessionId);
+    remember(sessionId, state, version);
+    return { state, rows: allRows(state) };
+  }
+
+  const row = await loadParticipantRow(userId, sessionId);
+  const key = String(userId);
+  const menteeRow = state.menteeIndex.get(key);
+  const mentorCol = state.mentorIndex.get(key);
+
+  if (row && row.role === "mentee" && menteeRow !== undefined) {
+    reencodeParticipant(state.features, "mentee", menteeRow, row);
+    scoreMenteeRow(state.features, menteeRow, state.scores, menteeRow * state.cols);
+    rebuildTop(state, menteeRow);
+    remember(sessionId, state, version);
+    return { state, rows: [menteeRow] };
+  }
+
+  if (row && row.role === "mentor" && row.has_profile && mentorCol !== undefined) {
+    reencodeParticipant(state.features, "mentor", mentorCol, row);
+    const column = scoreMentorColumn(state.features, mentorCol);
+    const changed = [];
+    for (let i = 0; i < state.rows; i++) {
+      state.scores[i * state.cols + mentorCol] = column[i];
+      if (updateTopForColumn(state, i, mentorCol)) changed.push(i);
+    }
+    remember(sessionId, state, version);
+    return { state, rows: changed };
+  }
+
+  if (menteeRow === undefined && mentorCol === undefined) {
+    // New to the state: a mentee's first complete survey, a mentor's new
+    // profile. Someone not scoreable yet changes nothing.
+    let rows = [];
+    if (row && row.role === "mentee") rows = addMentee(state, row);
+    else if (row && row.role === "mentor" && row.has_profile) rows = addMentor(state, row);
+    remember(sessionId, state, version);
+    return { state, rows };
+  }
+
+  state = await buildState(sessionId);
+  remember(sessionId, state, version);
+  return { state, rows: allRows(state) };
+}
+
+/**
+ * Updates the session's score state for one applicant and hands the
+ * recommendation lists that changed to `persist`, in order with every
+ * other update of the same session, along with the session version the
+ * lists were computed for.
+ * @param {(lists: {applicationId: number, menteeId: number, matches: object[]}[], version: number) => Promise<void>} persist
+ * @param {number} [version] the session version after this change; without
+ *   it the state is trusted to have seen every earlier change
+ */
+function applyParticipantChange(userId, sessionId, persist, version) {
+  const key = String(sessionId);
+  return enqueue(key, async () => {
+    try {
+      const { state, rows } = await applyChange(key, userId, version);
+      const lists = listsFor(state, rows);
+      if (persist && lists.length > 0) await persist(lists, state.version);
+      return lists;
+    } catch (err) {
+      // The state may be half updated; the next change reloads it
+      states.delete(key);
+      throw err;
+    }
+  });
+}
+
+/**
+ * Drops a session's state, e.g. once an applicant leaves it.
+ */
+function forgetSession(sessionId) {
+  states.delete(String(sessionId));
+}
+
+module.exports = {
+  TOP_K,
+  applyParticipantChange,
+  forgetSession
+};
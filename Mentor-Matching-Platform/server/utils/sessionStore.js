@@ -0,0 +1,189 @@
+// sessionStore.js
+// express-session store backed by the http_sessions table, so logins
+// survive a restart and are shared by every server process on the same
+// database file.
+const cluster = require("cluster");
+const { Store } = require("express-session");
+const db = require("../db");
+const logger = require("./logger");
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Settles an express-session callback from a promise (or plain value)
+function reply(work, callback = () => {}) {
+  Promise.resolve(work).then(
+    (value) => callback(null, value),
+    (err) => callback(err)
+  );
+}
+
+class SqliteSessionStore extends Store {
+  /**
+   * @param {object} [options]
+   * @param {number} [options.ttl] ms a session lives when its cookie has no
+   *   expiry (default one day)
+   * @param {number} [options.touchInterval] touches only write once the
+   *   stored expiry is this many ms behind the cookie's (default 5 minutes)
+   * @param {number} [options.cacheSize] sessions kept in memory (default 1000)
+   * @param {number} [options.cacheTtl] ms a cached session is served before
+   *   it is read again, which bounds how long a logout or change made by
+   *   another process goes unseen (default 5 seconds; 0 in cluster workers,
+   *   which serve the same users and read every session from the table)
+   * @param {number} [options.sweepInterval] ms between expiry sweeps, 0 for
+   *   none (default 10 minutes)
+   * @param {number} [options.sweepBatch] rows deleted per sweep statement
+   */
+  constructor({
+    ttl = DAY_MS,
+    touchInterval = 5 * 60 * 1000,
+    cacheSize = 1000,
+    cacheTtl = cluster.isWorker ? 0 : 5000,
+    sweepInterval = 10 * 60 * 1000,
+    sweepBatch = 500
+  } = {}) {
+    super();
+    this.ttl = ttl;
+    this.touchInterval = touchInterval;
+    this.cacheSize = cacheSize;
+    this.cacheTtl = cacheTtl;
+    this.sweepBatch = sweepBatch;
+    // sid -> { json, expires, cachedAt }, least recently used first
+    this.cache = new Map();
+    this.sweeping = null;
+    this.timer = null;
+    if (sweepInterval > 0) {
+      this.timer = setInterval(() => this.sweep().catch((err) => {
+        logger.error("❌ Session sweep failed:", err.message);
+      }), sweepInterval);
+      this.timer.unref();
+    }
+  }
+
+  expiresAt(sess) {
+    const expires = sess && sess.cookie && sess.cookie.expires;
+    return expires ? new Date(expires).getTime() : Date.now() + this.ttl;
+  }
+
+  remember(sid, json, expires) {
+    this.cache.delete(sid);
+    this.cache.set(sid, { json, expires, cachedAt: Date.now() });
+    if (this.cache.size > this.cacheSize) this.cache.delete(this.cache.keys().next().value);
+  }
+
+  async load(sid) {
+    const now = Date.now();
+    const cached = this.cache.get(sid);
+    if (cached && now - cached.cachedAt < this.cacheTtl) {
+      this.cache.delete(sid);
+      this.cache.set(sid, cached);
+      return cached.expires > now ? cached : null;
+    }
+
+    const row = await db.getAsync(`SELECT sess, expires FROM http_sessions WHERE sid = ?`, [sid]);
+    if (!row || row.expires <= now) {
+      this.cache.delete(sid);
+      return null;
+    }
+    this.remember(sid, row.sess, row.expires);
+    return this.cache.get(sid);
+  }
+
+  get(sid, callback) {
+    // Parsed per request, so a route mutating req.session never touches the
+    // cached copy
+    reply(this.load(sid).then((entry) => (entry ? JSON.parse(entry.json) : null)), callback);
+  }
+
+  set(sid, sess, callback) {
+    reply(this.write(sid, sess), callback);
+  }
+
+  async write(sid, sess) {
+    const json = JSON.stringify(sess);
+    const expires = this.expiresAt(sess);
+    await db.runAsync(
+      `INSERT INTO http_sessions (sid, sess, expires) VALUES (?, ?, ?)
+       ON CONFLICT(sid) DO UPDATE SET sess = excluded.sess, expires = excluded.expires`,
+      [sid, json, expires]
+    );
+    this.remember(sid, json, expires);
+  }
+
+  /**
+   * Called by express-session on every request that did not change the
+   * session. The expiry is only written once it has moved by more than
+   * touchInterval, so a busy session costs one write per interval.
+   */
+  touch(sid, sess, callback) {
+    reply(this.extend(sid, sess), callback);
+  }
+
+  async extend(sid, sess) {
+    const expires = this.expiresAt(sess);
+    const cached = this.cache.get(sid);
+    if (cached && expires - cached.expires < this.touchInterval) return;
+    await db.runAsync(`UPDATE http_sessions SET expires = ? WHERE sid = ?`, [expires, sid]);
+    if (cached && this.cache.get(sid) === cached) cached.expires = expires;
+  }
+
+  destroy(sid, callback) {
+    this.cache.delete(sid);
+    reply(db.runAsync(`DELETE FROM http_sessions WHERE sid = ?`, [sid]), callback);
+  }
+
+  length(callback) {
+    reply(this.count(), callback);
+  }
+
+  async count() {
+    const row = await db.getAsync(`SELECT COUNT(*) AS count FROM http_sessions WHERE expires > ?`, [Date.now()]);
+    return row ? row.count : 0;
+  }
+
+  clear(callback) {
+    this.cache.clear();
+    reply(db.runAsync(`DELETE FROM http_sessions`), callback);
+  }
+
+  /**
+   * Deletes expired sessions in batches of sweepBatch rows, so the write
+   * lock is released between batches instead of held for one big delete.
+   * @returns {Promise<number>} sessions deleted
+   */
+  sweep() {
+    if (this.sweeping) return this.sweeping;
+    this.sweeping = (async () => {
+      const now = Date.now();
+      let deleted = 0;
+      for (;;) {
+        const result = await db.runAsync(
+          `DELETE FROM http_sessions WHERE sid IN (
+             SELECT sid FROM http_sessions WHERE expires <= ? LIMIT ?
+           )`,
+          [now, this.sweepBatch]
+        );
+        const changes = result ? result.changes : 0;
+        deleted += changes;
+        if (changes < this.sweepBatch) break;
+        await new Promise((resolve) => setImmediate(resolve));
+      }
+      for (const [sid, entry] of this.cache) {
+        if (entry.expires <= now) this.cache.delete(sid);
+      }
+      return deleted;
+    })().finally(() => {
+      this.sweeping = null;
+    });
+    return this.sweeping;
+  }
+
+  /**
+   * Stops the sweep timer, e.g. at the end of a test run.
+   */
+  close() {
+    clearInterval(this.timer);
+    this.timer = null;
+  }
+}
+
+module.exports = { SqliteSessionStore };
@@ -0,0 +1,215 @@
+// sqliteAccess.js
+// Promise query helpers over one writer connection and a small pool of
+// read-only connections, each with its own prepared-statement cache, plus
+// a second writable connection for multi-statement transactions.
+const sqlite3 = require("sqlite3");
+
+// Plain queries (SELECT or a CTE ending in SELECT) can go to a reader;
+// anything that may write, including UPDATE ... RETURNING, goes to the writer
+const READ_SQL = /^\s*(SELECT|WITH)\b/i;
+const WRITE_KEYWORDS = /\b(INSERT|UPDATE|DELETE|REPLACE)\b/i;
+
+function isReadOnlySql(sql) {
+  return READ_SQL.test(sql) && !WRITE_KEYWORDS.test(sql);
+}
+
+function bindArgs(params) {
+  return params === undefined ? [] : [params];
+}
+
+/**
+ * Prepared statements of one connection keyed by SQL text, least recently
+ * used first. Calls on the same statement are chained, so a get() is reset
+ * before the statement is used again.
+ */
+class StatementCache {
+  constructor(connection, size) {
+    this.connection = connection;
+    this.size = size;
+    this.entries = new Map();
+  }
+
+  entry(sql) {
+    let entry = this.entries.get(sql);
+    if (entry) {
+      this.entries.delete(sql);
+    } else {
+      // With a callback a failed prepare is reported to it and to every
+      // call on the statement instead of being emitted as an "error" event
+      entry = { statement: this.connection.prepare(sql, () => {}), tail: Promise.resolve() };
+    }
+    this.entries.set(sql, entry);
+    if (this.entries.size > this.size) this.evict(this.entries.keys().next().value);
+    return entry;
+  }
+
+  evict(sql) {
+    const entry = this.entries.get(sql);
+    if (!entry) return Promise.resolve();
+    this.entries.delete(sql);
+    return entry.tail.then(() => new Promise(resolve => entry.statement.finalize(() => resolve())));
+  }
+
+  execute(sql, method, params) {
+    const entry = this.entry(sql);
+    const result = entry.tail.then(() => new Promise((resolve, reject) => {
+      entry.statement[method](...bindArgs(params), function (err, rows) {
+        if (err) return reject(err);
+        if (method === "run") return resolve({ lastID: this.lastID, changes: this.changes });
+        // get() leaves the statement mid-query, holding its read snapshot
+        if (method === "get") return entry.statement.reset(() => resolve(rows));
+        resolve(rows);
+      });
+    }));
+    entry.tail = result.catch(() => {
+      // A statement that failed to prepare (e.g. its table did not exist
+      // yet) is prepared again on next use
+      if (this.entries.get(sql) === entry) this.evict(sql);
+    });
+    return result;
+  }
+
+  clear() {
+    return Promise.all(Array.from(this.entries.keys(), sql => this.evict(sql)));
+  }
+}
+
+class SqliteAccess {
+  /**
+   * @param {sqlite3.Database} writer the connection every write goes to
+   * @param {object} [options]
+   * @param {number} [options.cacheSize] prepared statements kept per connection
+   */
+  constructor(writer, { cacheSize = 100 } = {}) {
+    this.cacheSize = cacheSize;
+    this.writer = { connection: writer, cache: new StatementCache(writer, cacheSize), pending: 0 };
+    this.readers = [];
+    this.transactions = null;
+    this.transactionTail = Promise.resolve();
+  }
+
+  static open(filename, mode, busyTimeout) {
+    return new Promise((resolve, reject) => {
+      const connection = new sqlite3.Database(filename, mode, (err) => {
+        if (err) return reject(err);
+        connection.configure("busyTimeout", busyTimeout);
+        resolve(connection);
+      });
+    });
+  }
+
+  /**
+   * Opens `count` read-only connections to `filename`. Until they are open,
+   * reads use the writer. The database should be in WAL mode, so readers
+   * do not block the writer or each other.
+   */
+  async openReaders(filename, count, { busyTimeout = 5000 } = {}) {
+    const opened = await Promise.all(
+      Array.from({ length: count }, () => SqliteAccess.open(filename, sqlite3.OPEN_READONLY, busyTimeout))
+    );
+    this.readers = opened.map(connection => ({
+      connection,
+      cache: new StatementCache(connection, this.cacheSize),
+      pending: 0
+    }));
+  }
+
+  connectionFor(sql) {
+    if (this.readers.length === 0 || !isReadOnlySql(sql)) return this.writer;
+    let best = this.readers[0];
+    for (const reader of this.readers) {
+      if (reader.pending < best.pending) best = reader;
+    }
+    return best;
+  }
+
+  async query(target, sql, method, params) {
+    target.pending++;
+    try {
+      return await target.cache.execute(sql, method, params);
+    } finally {
+      target.pending--;
+    }
+  }
+
+  get(sql, params) {
+    return this.query(this.connectionFor(sql), sql, "get", params);
+  }
+
+  all(sql, params) {
+    return this.query(this.connectionFor(sql), sql, "all", params);
+  }
+
+  run(sql, params) {
+    return this.query(this.writer, sql, "run", params);
+  }
+
+  /**
+   * Opens the connection transaction() runs on. Transactions started
+   * before it is open wait for it.
+   */
+  openTransactions(filename, { busyTimeout = 5000 } = {}) {
+    this.transactions = SqliteAccess.open(
+      filename,
+      sqlite3.OPEN_READWRITE | sqlite3.OPEN_CREATE,
+      busyTimeout
+    ).then(connection => ({ connection, cache: new StatementCache(connection, this.cacheSize), pending: 0 }));
+    return this.transactions;
+  }
+
+  /**
+   * Runs `work` inside BEGIN IMMEDIATE ... COMMIT on the transaction
+   * connection. Statements other callers send to the writer meanwhile
+   * cannot end up inside the transaction; SQLite's write lock (and the
+   * busy timeout) orders the two connections. Transactions run one at a
+   * time. If `work` throws, the transaction is rolled back and the error
+   * rethrown.
+   * @param {(tx: {get: Function, all: Function, run: Function}) => Promise<*>} work
+   *   must send its statements through `tx` only
+   * @returns {Promise<*>} what `work` returned
+   */
+  transaction(work) {
+    const result = this.transactionTail.then(async () => {
+      if (!this.transactions) throw new Error("openTransactions() has not been called");
+      const target = await this.transactions;
+      const tx = {
+        get: (sql, params) => this.query(target, sql, "get", params),
+        all: (sql, params) => this.query(target, sql, "all", params),
+        run: (sql, params) => this.query(target, sql, "run", params)
+      };
+      await tx.run("BEGIN IMMEDIATE");
+      try {
+        const value = await work(tx);
+        await tx.run("COMMIT");
+        return value;
+      } catch (err) {
+        await tx.run("ROLLBACK").catch(() => {});
+        throw err;
+      }
+    });
+    this.transactionTail = result.catch(() => {});
+    return result;
+  }
+
+  /**
+   * Finalizes cached statements and closes the read-only and transaction
+   * connections once running transactions have finished. The writer is
+   * left to its owner.
+   */
+  async close() {
+    const readers = this.readers;
+    const transactions = this.transactions;
+    this.readers = [];
+    this.transactions = null;
+    await this.transactionTail;
+    await this.writer.cache.clear();
+    const owned = [...readers];
+    if (transactions) owned.push(await transactions.catch(() => null));
+    await Promise.all(owned.filter(Boolean).map(async ({ connection, cache }) => {
+      await cache.clear();
+      await new Promise(resolve => connection.close(() => resolve()));
+    }));
+  }
+}
+
+module.exports = { SqliteAccess, StatementCache, isReadOnlySql };
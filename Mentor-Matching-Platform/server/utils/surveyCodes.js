@@ -0,0 +1,163 @@
+// surveyCodes.js
+// Integer encodings of the matching survey answers, written next to the
+// JSON columns at save time so the matcher never has to parse them.
+
+// Option lists offered by client/src/components/Survey/MatchingPreferences.js.
+// Bit / code positions are stored in the database: only append new options.
+const GOAL_OPTIONS = [
+  "Peer Support",
+  "Goal Setting",
+  "Sports Mentoring",
+  "Positive Community",
+  "Return to Work/Study"
+];
+
+const SPORT_OPTIONS = [
+  "Running",
+  "Pilates/Yoga",
+  "Cycling",
+  "Triathlon",
+  "Swimming",
+  "Bowls/Petanque",
+  "Ball Sports",
+  "Walking",
+  "Board Games"
+];
+
+const TRANSPLANT_OPTIONS = [
+  "Bone Marrow",
+  "Pancreas",
+  "Kidney",
+  "Liver",
+  "Heart",
+  "Lung",
+  "Cornea",
+  "Other Tissue",
+  "Not Applicable"
+];
+
+// Meeting preferences other than "Any"; a participant with no specific
+// preference can meet anyone
+const MEETING_OPTIONS = ["In-person", "Phone", "Online"];
+
+const NOT_APPLICABLE = "Not Applicable";
+const NOT_APPLICABLE_CODE = TRANSPLANT_OPTIONS.indexOf(NOT_APPLICABLE);
+// Transplant types outside the option list
+const UNKNOWN_CODE = -1;
+
+const indexOf = (options) => new Map(options.map((option, i) => [option, i]));
+const GOAL_BITS = indexOf(GOAL_OPTIONS);
+const SPORT_BITS = indexOf(SPORT_OPTIONS);
+const TRANSPLANT_CODES = indexOf(TRANSPLANT_OPTIONS);
+const MEETING_CODES = indexOf(MEETING_OPTIONS);
+
+function asArray(val) {
+  return Array.isArray(val) ? val : [];
+}
+
+function safeParseArray(val) {
+  try {
+    return asArray(JSON.parse(val));
+  } catch {
+    return [];
+  }
+}
+
+/**
+ * Packs a list of options into a bitmask. `count` is the raw list length,
+ * duplicates and unknown options included, since that is what overlap
+ * scores divide by.
+ */
+function encodeOptions(list, bits) {
+  let mask = 0;
+  for (const value of list) {
+    const bit = bits.get(value);
+    if (bit !== undefined) mask |= 1 << bit;
+  }
+  return { mask, count: list.length };
+}
+
+/**
+ * top_type is saved as JSON.stringify(topTypes), which is either a single
+ * number ("3") or a list ("[1,4]"); seeded data uses "Type 3". Every digit
+ * 1-9 in the value is one of the participant's top types.
+ */
+function parseEnneagramTypes(val) {
+  if (val === null || val === undefined) return [];
+  return (String(val).match(/[1-9]/g) || []).map(Number);
+}
+
+/**
+ * Column values for mentorship_preferences, from the arrays the survey
+ * posts. Only the first transplant type is used for matching.
+ */
+function preferenceCodes(transplantType, goals, sportsInterest) {
+  const goalCodes = encodeOptions(asArray(goals), GOAL_BITS);
+  const sportCodes = encodeOptions(asArray(sportsInterest), SPORT_BITS);
+  const transplant = asArray(transplantType)[0];
+  let transplantCode = NOT_APPLICABLE_CODE;
+  if (transplant) {
+    transplantCode = TRANSPLANT_CODES.has(transplant) ? TRANSPLANT_CODES.get(transplant) : UNKNOWN_CODE;
+  }
+  return {
+    goals_mask: goalCodes.mask,
+    goals_count: goalCodes.count,
+    sports_mask: sportCodes.mask,
+    sports_count: sportCodes.count,
+    transplant_code: transplantCode
+  };
+}
+
+/**
+ * 0 for "Any" or no preference, otherwise 1 + the option's index. Two
+ * participants can meet if either code is 0 or both are equal.
+ */
+function meetingCode(meetingPref) {
+  const code = MEETING_CODES.get(meetingPref);
+  return code === undefined ? 0 : code + 1;
+}
+
+/**
+ * Column values for enneagram_answers: the primary type and a mask with
+ * bit t set for every top type t.
+ */
+function enneagramCodes(topTypes) {
+  const types = parseEnneagramTypes(JSON.stringify(topTypes));
+  let mask = 0;
+  for (const type of types) mask |= 1 << type;
+  return { top_type_primary: types[0] || 0, top_type_mask: mask };
+}
+
+/**
+ * Preference codes for a row saved before the code columns existed,
+ * computed from its JSON columns.
+ */
+function legacyPreferenceCodes(row) {
+  return preferenceCodes(
+    safeParseArray(row.transplant_type),
+    safeParseArray(row.goals),
+    safeParseArray(row.sports_activities)
+  );
+}
+
+/**
+ * Enneagram codes for a row saved before the code columns existed.
+ */
+function legacyEnneagramCodes(row) {
+  return enneagramCodes(parseEnneagramTypes(row.top_type));
+}
+
+module.exports = {
+  GOAL_OPTIONS,
+  SPORT_OPTIONS,
+  TRANSPLANT_OPTIONS,
+  MEETING_OPTIONS,
+  NOT_APPLICABLE_CODE,
+  UNKNOWN_CODE,
+  parseEnneagramTypes,
+  preferenceCodes,
+  meetingCode,
+  enneagramCodes,
+  legacyPreferenceCodes,
+  legacyEnneagramCodes
+};
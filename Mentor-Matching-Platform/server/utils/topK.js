@@ -0,0 +1,69 @@
+// topK.js
+// Bounded heap keeping the k best (score, item) pairs seen so far.
+
+// Higher score first; equal scores keep the lower item first, like a stable
+// descending sort over items in order
+function ranksAbove(score, item, otherScore, otherItem) {
+  return score > otherScore || (score === otherScore && item < otherItem);
+}
+
+/**
+ * Min-heap of at most k entries whose root is the worst entry kept, so
+ * each push is O(log k) and a full pass is O(n log k) instead of a sort.
+ */
+class TopK {
+  constructor(k) {
+    this.k = Math.max(0, k);
+    this.size = 0;
+    this.items = new Int32Array(this.k);
+    this.scores = new Float64Array(this.k);
+  }
+
+  push(item, score) {
+    if (this.size < this.k) {
+      this.siftUp(this.size++, item, score);
+    } else if (this.k > 0 && ranksAbove(score, item, this.scores[0], this.items[0])) {
+      this.siftDown(0, item, score);
+    }
+  }
+
+  siftUp(pos, item, score) {
+    while (pos > 0) {
+      const parent = (pos - 1) >> 1;
+      if (!ranksAbove(this.scores[parent], this.items[parent], score, item)) break;
+      this.items[pos] = this.items[parent];
+      this.scores[pos] = this.scores[parent];
+      pos = parent;
+    }
+    this.items[pos] = item;
+    this.scores[pos] = score;
+  }
+
+  siftDown(pos, item, score) {
+    for (;;) {
+      let child = 2 * pos + 1;
+      if (child >= this.size) break;
+      const right = child + 1;
+      if (right < this.size && ranksAbove(this.scores[child], this.items[child], this.scores[right], this.items[right])) {
+        child = right;
+      }
+      if (!ranksAbove(score, item, this.scores[child], this.items[child])) break;
+      this.items[pos] = this.items[child];
+      this.scores[pos] = this.scores[child];
+      pos = child;
+    }
+    this.items[pos] = item;
+    this.scores[pos] = score;
+  }
+
+  /**
+   * @returns {{item: number, score: number}[]} the kept entries, best first
+   */
+  sorted() {
+    const entries = [];
+    for (let i = 0; i < this.size; i++) entries.push({ item: this.items[i], score: this.scores[i] });
+    return entries.sort((a, b) => (ranksAbove(a.score, a.item, b.score, b.item) ? -1 : 1));
+  }
+}
+
+module.exports = { TopK, ranksAbove };
@@ -0,0 +1,200 @@
+// workerPool.js
+// Fixed-size pool of worker threads with a bounded queue, per-job timeouts
+// and cancellation, so CPU-heavy work stays off the event loop.
+const { Worker, parentPort } = require("worker_threads");
+
+function poolError(message, code) {
+  const err = new Error(message);
+  err.code = code;
+  return err;
+}
+
+function abortError() {
+  const err = poolError("Job was cancelled", "ABORT_ERR");
+  err.name = "AbortError";
+  return err;
+}
+
+class WorkerPool {
+  /**
+   * @param {string} filename worker script, which should call handleJobs
+   * @param {object} [options]
+   * @param {number} [options.size] number of worker threads (default 1)
+   * @param {number} [options.maxQueue] jobs that may wait for a free worker
+   *   before run() rejects with code POOL_QUEUE_FULL (default 64)
+   * @param {number} [options.timeout] default per-job timeout in ms, 0 for none
+   * @param {object} [options.workerOptions] passed to new Worker()
+   */
+  constructor(filename, { size = 1, maxQueue = 64, timeout = 0, workerOptions = {} } = {}) {
+    this.filename = filename;
+    this.size = Math.max(1, size);
+    this.maxQueue = maxQueue;
+    this.timeout = timeout;
+    this.workerOptions = workerOptions;
+    this.workers = new Set();
+    this.idle = [];
+    this.running = new Map();
+    this.queue = [];
+    this.nextId = 1;
+    this.closed = false;
+  }
+
+  /**
+   * Runs one job on the next free worker.
+   * @param {*} payload structured-cloneable job input
+   * @param {object} [options]
+   * @param {number} [options.timeout] ms before the job fails with code JOB_TIMEOUT
+   * @param {AbortSignal} [options.signal] cancels the job when aborted
+   * @param {Transferable[]} [options.transferList] buffers to move, not copy
+   * @returns {Promise<*>} the worker's result
+   */
+  run(payload, { timeout = this.timeout, signal, transferList } = {}) {
+    if (this.closed) return Promise.reject(poolError("Worker pool is closed", "POOL_CLOSED"));
+    if (signal && signal.aborted) return Promise.reject(abortError());
+    if (this.queue.length >= this.maxQueue) {
+      return Promise.reject(poolError("Worker pool queue is full", "POOL_QUEUE_FULL"));
+    }
+
+    return new Promise((resolve, reject) => {
+      const job = { id: this.nextId++, payload, transferList, timeout, signal, resolve, reject };
+      if (signal) {
+        job.onAbort = () => this.cancel(job, abortError());
+        signal.addEventListener("abort", job.onAbort, { once: true });
+      }
+      this.queue.push(job);
+      this.dispatch();
+    });
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      const worker = this.idle.pop() || (this.workers.size < this.size ? this.spawn() : null);
+      if (!worker) return;
+      this.start(worker, this.queue.shift());
+    }
+  }
+
+  spawn() {
+    const worker = new Worker(this.filename, this.workerOptions);
+    worker.on("message", (message) => this.onMessage(worker, message));
+    worker.on("error", (err) => this.onExit(worker, err));
+    worker.on("exit", (code) => this.onExit(worker, new Error(`Worker stopped with exit code ${code}`)));
+    this.workers.add(worker);
+    return worker;
+  }
+
+  start(worker, job) {
+    job.worker = worker;
+    this.running.set(worker, job);
+    // Only busy workers keep the process alive
+    worker.ref();
+    if (job.timeout > 0) {
+      job.timer = setTimeout(
+        () => this.cancel(job, poolError(`Job timed out after ${job.timeout} ms`, "JOB_TIMEOUT")),
+        job.timeout
+      );
+    }
+    worker.postMessage({ id: job.id, payload: job.payload }, job.transferList || []);
+  }
+
+  settle(job) {
+    if (job.settled) return false;
+    job.settled = true;
+    clearTimeout(job.timer);
+    if (job.onAbort) job.signal.removeEventListener("abort", job.onAbort);
+    return true;
+  }
+
+  onMessage(worker, { id, result, error }) {
+    const job = this.running.get(worker);
+    if (!job || job.id !== id) return;
+    this.running.delete(worker);
+    if (this.settle(job)) {
+      if (error) job.reject(new Error(error));
+      else job.resolve(result);
+    }
+    this.release(worker);
+  }
+
+  release(worker) {
+    if (this.closed) {
+      this.discard(worker);
+      return;
+    }
+    worker.unref();
+    this.idle.push(worker);
+    this.dispatch();
+  }
+
+  cancel(job, err) {
+    if (!this.settle(job)) return;
+    const index = this.queue.indexOf(job);
+    if (index !== -1) {
+      this.queue.splice(index, 1);
+    } else if (job.worker) {
+      // A running job is synchronous work; the only way to stop it is to
+      // stop its thread. A replacement is spawned on the next dispatch.
+      this.running.delete(job.worker);
+      this.discard(job.worker);
+      this.dispatch();
+    }
+    job.reject(err);
+  }
+
+  discard(worker) {
+    this.workers.delete(worker);
+    const index = this.idle.indexOf(worker);
+    if (index !== -1) this.idle.splice(index, 1);
+    worker.terminate();
+  }
+
+  onExit(worker, err) {
+    if (!this.workers.has(worker)) return;
+    this.workers.delete(worker);
+    const index = this.idle.indexOf(worker);
+    if (index !== -1) this.idle.splice(index, 1);
+
+    const job = this.running.get(worker);
+    if (job) {
+      this.running.delete(worker);
+      if (this.settle(job)) job.reject(err);
+    }
+    if (!this.closed) this.dispatch();
+  }
+
+  /**
+   * Rejects queued jobs and stops every worker.
+   */
+  async close() {
+    this.closed = true;
+    for (const job of this.queue.splice(0)) {
+      if (this.settle(job)) job.reject(poolError("Worker pool is closed", "POOL_CLOSED"));
+    }
+    const workers = Array.from(this.workers);
+    this.workers.clear();
+    this.idle = [];
+    for (const [, job] of this.running) {
+      if (this.settle(job)) job.reject(poolError("Worker pool is closed", "POOL_CLOSED"));
+    }
+    this.running.clear();
+    await Promise.all(workers.map((worker) => worker.terminate()));
+  }
+}
+
+/**
+ * Worker side of the pool: answers each job with `handler(payload)`.
+ * Typed array results are transferred instead of copied.
+ */
+function handleJobs(handler) {
+  parentPort.on("message", async ({ id, payload }) => {
+    try {
+      const result = await handler(payload);
+      const transferList = ArrayBuffer.isView(result) ? [result.buffer] : [];
+      parentPort.postMessage({ id, result }, transferList);
+    } catch (err) {
+      parentPort.postMessage({ id, error: err.message });
+    }
+  });
+}
+
+module.exports = { WorkerPool, handleJobs };
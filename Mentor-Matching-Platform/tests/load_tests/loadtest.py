@@ -0,0 +1,426 @@
+"""Load test for the survey and matching API.
+
+Simulated applicants go through the whole application, each as a new user:
+register, log in, apply to a session, save the three survey steps and mark
+the survey submitted. Meanwhile simulated admins poll the session's
+participant list and the mentor recommendations of a mentee who applied.
+
+Before the first stage the script files --seed applications and approves
+--approve-share of them through the admin API. The participant list only
+shows approved applicants, so without them every admin poll would come
+back empty.
+
+The number of concurrent applicants goes up in stages. After each stage the
+script prints throughput, p50/p95/p99 latency and error rate per endpoint.
+
+    pip install -r tests/load_tests/requirements.txt
+    python tests/load_tests/loadtest.py --levels 1,5,10,25,50 --duration 20
+
+Without --base-url the script starts the server itself (node server/index.js)
+on a free port, with a scratch SQLite file passed as SQLITE_FILE, and
+removes both afterwards. With --base-url it targets a running server, which
+keeps the users and approvals the run creates.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+
+import aiohttp
+
+SERVER_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "server"))
+PASSWORD = "LoadTest@123"
+# Seeded by server/scripts/seedAdmin.js
+ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@example.com")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "ChangeMe123!")
+REQUEST_TIMEOUT = 30
+MENTOR_SHARE = 0.3
+
+# Answer options, as offered by client/src/components/Survey
+SESSION_ROLES = ["Recipient", "Carer", "Living Donor", "Donor Family", "Waiting for Transplant", "Dialysis"]
+TRANSPLANTS = ["Bone Marrow", "Pancreas", "Kidney", "Liver", "Heart", "Lung", "Cornea", "Other Tissue"]
+GOALS = ["Peer Support", "Goal Setting", "Sports Mentoring", "Positive Community", "Return to Work/Study"]
+SPORTS = ["Running", "Pilates/Yoga", "Cycling", "Triathlon", "Swimming", "Bowls/Petanque", "Ball Sports", "Walking", "Board Games"]
+MEETINGS = ["In-person", "Phone", "Online", "Any"]
+LIFESTYLE_FIELDS = [
+    "physicalExerciseFrequency", "likeAnimals", "likeCooking", "travelImportance", "freeTimePreference",
+    "feelOverwhelmed", "activityBarriers", "longTermGoals", "stressHandling", "motivationLevel", "hadMentor",
+]
+ENNEAGRAM_QUESTIONS = 36
+
+
+class ScenarioError(Exception):
+    """A request failed; the simulated user gives up."""
+
+
+class Stats:
+    """Latencies and outcomes per endpoint for one stage."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.outcomes = defaultdict(Counter)
+        self.completed = 0
+        self.abandoned = 0
+
+    def record(self, endpoint, seconds, outcome, ok):
+        self.latencies[endpoint].append(seconds)
+        self.outcomes[endpoint][str(outcome)] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def rows(self, elapsed):
+        rows = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(values),
+                "per_second": len(values) / elapsed,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "error_rate": self.errors[endpoint] / len(values),
+                "outcomes": dict(self.outcomes[endpoint]),
+            })
+        return rows
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Client:
+    """One simulated user: its own cookies, over the shared connection pool."""
+
+    def __init__(self, base_url, connector, stats):
+        self.base_url = base_url
+        self.stats = stats
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=False,
+            # The session cookie comes from 127.0.0.1, which the default
+            # jar would refuse
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+    async def call(self, method, path, endpoint=None, expect=(200, 201), **kwargs):
+        """Sends a request and records it under `endpoint`; returns the JSON body."""
+        endpoint = endpoint or f"{method} {path}"
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as response:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            self.stats.record(endpoint, time.perf_counter() - started, type(error).__name__, ok=False)
+            raise ScenarioError(f"{endpoint}: {type(error).__name__}") from error
+        ok = status in expect
+        self.stats.record(endpoint, time.perf_counter() - started, status, ok)
+        if not ok:
+            raise ScenarioError(f"{endpoint} returned {status}")
+        return body
+
+    async def close(self):
+        await self.session.close()
+
+
+def preferences(session_id, role):
+    return {
+        "sessionId": session_id,
+        "role": role,
+        "session_role": random.choice(SESSION_ROLES),
+        "transplantType": random.sample(TRANSPLANTS, random.randint(1, 2)),
+        "transplantYear": str(random.randint(1990, 2024)),
+        "goals": random.sample(GOALS, random.randint(1, 3)),
+        "meetingPref": random.choice(MEETINGS),
+        "sportsInterest": random.sample(SPORTS, random.randint(1, 3)),
+    }
+
+
+def lifestyle(session_id, role):
+    return {
+        "sessionId": session_id,
+        "role": role,
+        "answers": {field: random.randint(1, 5) for field in LIFESTYLE_FIELDS},
+    }
+
+
+def enneagram(session_id, role):
+    scores = {str(type_): round(random.uniform(0, 40), 1) for type_ in range(1, 10)}
+    top = max(scores.values())
+    top_types = [int(type_) for type_, score in scores.items() if score == top]
+    return {
+        "sessionId": session_id,
+        "role": role,
+        "topTypes": top_types[0] if len(top_types) == 1 else top_types,
+        "allScores": scores,
+        "answers": {str(q): random.randint(1, 5) for q in range(1, ENNEAGRAM_QUESTIONS + 1)},
+    }
+
+
+async def applicant(client, session_id, mentees):
+    """One application, start to finish, by a new user."""
+    email = f"load-{uuid.uuid4().hex}@example.com"
+    role = "mentor" if random.random() < MENTOR_SHARE else "mentee"
+
+    registered = await client.call("POST", "/api/register", json={
+        "email": email,
+        "password": PASSWORD,
+        "securityQuestion": "What was the name of your first pet?",
+        "securityAnswer": "Sparky",
+    })
+    await client.call("POST", "/api/login", json={"email": email, "password": PASSWORD})
+    await client.call(
+        "POST", f"/api/sessions/{session_id}/apply", "POST /api/sessions/:id/apply", json={"role": role}
+    )
+    await client.call("POST", "/api/save-preferences", json=preferences(session_id, role))
+    await client.call("POST", "/api/save-lifestyle", json=lifestyle(session_id, role))
+    await client.call("POST", "/api/save-enneagram", json=enneagram(session_id, role))
+    await client.call("POST", "/api/mark-submitted", json={"sessionId": session_id})
+    if role == "mentee":
+        mentees.append(registered["userId"])
+
+
+async def admin_login(client, attempts=20):
+    # The server seeds the admin account in the background as it starts
+    for _ in range(attempts):
+        try:
+            await client.call("POST", "/api/login", "POST /api/login (admin)",
+                              json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            return
+        except ScenarioError:
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"❌ Could not log in as {ADMIN_EMAIL}; set ADMIN_EMAIL and ADMIN_PASSWORD")
+
+
+async def admin(client, session_id, interval, mentees, stop):
+    """Polls the participant list and a mentee's matches until `stop` is set."""
+    while not stop.is_set():
+        try:
+            await client.call(
+                "GET", f"/api/admin/sessions/{session_id}/participants?limit=50",
+                "GET /api/admin/sessions/:id/participants",
+            )
+            if mentees:
+                mentee = random.choice(mentees)
+                await client.call(
+                    "GET", f"/api/match-mentee?sessionId={session_id}&menteeId={mentee}", "GET /api/match-mentee"
+                )
+        except ScenarioError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def seed(args, connector, mentees, concurrency=10):
+    """Files applications before the first stage and approves a share of them."""
+    stats = Stats()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            client = Client(args.base_url, connector, stats)
+            try:
+                await applicant(client, args.session, mentees)
+                stats.completed += 1
+            except ScenarioError:
+                stats.abandoned += 1
+            finally:
+                await client.close()
+
+    await asyncio.gather(*(one() for _ in range(args.seed)))
+
+    admin_client = Client(args.base_url, connector, stats)
+    try:
+        await admin_login(admin_client)
+        applications = await admin_client.call("GET", f"/api/admin/sessions/{args.session}/applications")
+        pending = [application for application in applications if application["status"] == "pending"]
+        approved = random.sample(pending, round(len(pending) * args.approve_share))
+        for application in approved:
+            await admin_client.call(
+                "PATCH", f"/api/admin/sessions/{args.session}/applications/{application['id']}",
+                json={"status": "approved"},
+            )
+    finally:
+        await admin_client.close()
+    print(f"🟢 Filed {stats.completed} application(s) in session {args.session} ({stats.abandoned} failed), "
+          f"approved {len(approved)} of {len(pending)} pending")
+
+
+async def run_stage(level, args, connector, admins, mentees):
+    """Keeps `level` applicants going for the stage's duration.
+
+    Applications under way when the time is up are finished, so every
+    stage measures whole applications.
+    """
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    stop = asyncio.Event()
+
+    async def applicant_loop():
+        while time.monotonic() < deadline:
+            client = Client(args.base_url, connector, stats)
+            try:
+                await applicant(client, args.session, mentees)
+                stats.completed += 1
+            except ScenarioError:
+                stats.abandoned += 1
+            finally:
+                await client.close()
+
+    for client in admins:
+        client.stats = stats
+    started = time.monotonic()
+    pollers = [asyncio.ensure_future(admin(client, args.session, args.admin_interval, mentees, stop)) for client in admins]
+    await asyncio.gather(*(applicant_loop() for _ in range(level)))
+    stop.set()
+    await asyncio.gather(*pollers)
+    elapsed = time.monotonic() - started
+    return {
+        "applicants": level,
+        "admins": len(admins),
+        "seconds": elapsed,
+        "applications": stats.completed,
+        "applications_per_second": stats.completed / elapsed,
+        "abandoned": stats.abandoned,
+        "endpoints": stats.rows(elapsed),
+    }
+
+
+def print_stage(stage):
+    print(
+        f"\n── {stage['applicants']} applicant(s), {stage['admins']} admin(s): {stage['seconds']:.1f}s, "
+        f"{stage['applications']} application(s) ({stage['applications_per_second']:.2f}/s), "
+        f"{stage['abandoned']} abandoned"
+    )
+    print(f"{'endpoint':<44}{'reqs':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for row in stage["endpoints"]:
+        print(
+            f"{row['endpoint']:<44}{row['requests']:>7}{row['per_second']:>8.1f}"
+            f"{row['p50_ms']:>7.0f}ms{row['p95_ms']:>7.0f}ms{row['p99_ms']:>7.0f}ms{row['error_rate']:>8.1%}"
+        )
+        failures = {outcome: n for outcome, n in row["outcomes"].items() if not outcome.startswith("2")}
+        if failures:
+            print(f"{'':<44}{failures}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_file, port):
+    env = dict(os.environ, PORT=str(port), SQLITE_FILE=db_file)
+    env.setdefault("LOG_LEVEL", "error")
+    return subprocess.Popen(["node", "index.js"], cwd=SERVER_DIR, env=env)
+
+
+async def wait_until_up(base_url, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise SystemExit(f"❌ Server exited with code {server.returncode}")
+            try:
+                async with session.get(f"{base_url}/api/sessions") as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit(f"❌ Server at {base_url} did not come up in {timeout}s")
+
+
+async def main(args):
+    server = None
+    scratch = None
+    if not args.base_url:
+        scratch = tempfile.mkdtemp(prefix="load-test-")
+        port = free_port()
+        server = start_server(os.path.join(scratch, "load.db"), port)
+        args.base_url = f"http://127.0.0.1:{port}"
+        print(f"🟢 Started server on {args.base_url} with a scratch database in {scratch}")
+    args.base_url = args.base_url.rstrip("/")
+
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    admins = []
+    try:
+        await wait_until_up(args.base_url, server)
+        # Logged in once; their logins are not part of the stages
+        for _ in range(args.admins):
+            client = Client(args.base_url, connector, Stats())
+            admins.append(client)
+            await admin_login(client)
+
+        # Mentees who finished applying, for the admins' match lookups
+        mentees = deque(maxlen=1000)
+        await seed(args, connector, mentees)
+        stages = []
+        for level in args.levels:
+            stage = await run_stage(level, args, connector, admins, mentees)
+            print_stage(stage)
+            stages.append(stage)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"base_url": args.base_url, "session": args.session, "stages": stages}, f, indent=2)
+            print(f"\n📄 Results written to {args.json}")
+    finally:
+        for client in admins:
+            await client.close()
+        await connector.close()
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", help="a running server to test, e.g. http://localhost:3001 "
+                                           "(default: start one with a scratch database)")
+    parser.add_argument("--levels", default="1,5,10,25,50",
+                        type=lambda value: [int(level) for level in value.split(",")],
+                        help="concurrent applicants in each stage (default %(default)s)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per stage (default %(default)s)")
+    parser.add_argument("--admins", type=int, default=2, help="admins polling during each stage (default %(default)s)")
+    parser.add_argument("--admin-interval", type=float, default=1.0,
+                        help="seconds between an admin's polls (default %(default)s)")
+    parser.add_argument("--session", type=int, default=1, help="session to apply to (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=50,
+                        help="applications filed before the first stage (default %(default)s)")
+    parser.add_argument("--approve-share", type=float, default=0.5,
+                        help="share of the pending applications the admin approves before the first stage "
+                             "(default %(default)s)")
+    parser.add_argument("--connections", type=int, default=100,
+                        help="size of the shared HTTP connection pool (default %(default)s)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,292 @@
+"""Shared fixtures for the Selenium suite.
+
+The suite runs under pytest, spread over parallel workers by pytest-xdist:
+
+    pytest tests/selenium_tests -n auto --dist loadfile
+
+Each worker registers its own user through /api/register and /api/login and
+keeps one headless Chrome for all of its tests. Tests that need a signed-in
+browser get the worker's session cookie injected instead of typing into the
+login form, so no test depends on another having run first.
+
+Settings, all optional:
+    E2E_BASE_URL   address of the client (default http://localhost:3000)
+    CHROMEDRIVER   path to chromedriver (default: found by Selenium Manager)
+    E2E_HEADED=1   show the browser windows
+    E2E_TIMEOUT    seconds to wait for the app before failing (default 10)
+
+After the run pytest prints how long each test took. --timing-report PATH
+saves the timings as JSON, and --timing-baseline PATH compares them with an
+earlier report, showing the time saved or lost per test.
+
+Steps wrapped in perf.step() are measured in the browser (see perf.py).
+--perf-report PATH saves the measurements as JSON, plus a CSV next to it;
+--perf-baseline PATH fails the run when a step's load or interaction
+latency regresses past an earlier --perf-report.
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+import uuid
+from dataclasses import dataclass
+from http.cookiejar import CookieJar
+
+import pytest
+from selenium import webdriver
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+import perf as perf_capture
+from pages import install_network_tracker
+
+BASE_URL = os.environ.get("E2E_BASE_URL", "http://localhost:3000").rstrip("/")
+PASSWORD = "Password@123"
+SECURITY_QUESTION = "What was the name of your first pet?"
+SECURITY_ANSWER = "Sparky"
+SESSION_COOKIE = "connect.sid"
+
+
+@dataclass
+class TestUser:
+    email: str
+    password: str
+    security_answer: str
+    session_id: str
+
+    # Not a test class, whatever its name
+    __test__ = False
+
+
+class ApiClient:
+    """Minimal JSON client that keeps the cookies the server sets."""
+
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read() or b"{}")
+
+    def cookie(self, name):
+        return next((c.value for c in self.cookies if c.name == name), None)
+
+
+def worker_name():
+    """The xdist worker id (gw0, gw1, ...), or "main" without xdist."""
+    return os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+
+def create_user(label="user"):
+    """Registers a new user and signs it in through the API."""
+    email = f"selenium-{worker_name()}-{label}-{uuid.uuid4().hex[:10]}@example.com"
+    client = ApiClient()
+
+    status, body = client.post("/api/register", {
+        "email": email,
+        "password": PASSWORD,
+        "securityQuestion": SECURITY_QUESTION,
+        "securityAnswer": SECURITY_ANSWER,
+    })
+    if not body.get("success"):
+        raise RuntimeError(f"❌ Could not register {email} ({status}): {body.get('message')}")
+
+    status, body = client.post("/api/login", {"email": email, "password": PASSWORD})
+    session_id = client.cookie(SESSION_COOKIE)
+    if not body.get("success") or not session_id:
+        raise RuntimeError(f"❌ Could not log in as {email} ({status}): {body.get('message')}")
+
+    print(f"🟢 Created test user {email}")
+    return TestUser(email, PASSWORD, SECURITY_ANSWER, session_id)
+
+
+@pytest.fixture(scope="session")
+def base_url():
+    return BASE_URL
+
+
+@pytest.fixture(scope="session")
+def worker():
+    return worker_name()
+
+
+@pytest.fixture(scope="session")
+def user():
+    """The worker's own user, shared by the tests that run on it."""
+    return create_user()
+
+
+@pytest.fixture
+def user_factory():
+    """Creates extra users, for tests that change a user's password or the like."""
+    return create_user
+
+
+@pytest.fixture(scope="session")
+def browser():
+    """One headless Chrome per worker, reused across its tests."""
+    options = webdriver.ChromeOptions()
+    if os.environ.get("E2E_HEADED") != "1":
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1400,1000")
+    options.add_argument("--disable-dev-shm-usage")
+    # The performance log carries the CDP Network events perf.py reads
+    options.set_capability("goog:loggingPrefs", {"browser": "ALL", "performance": "ALL"})
+
+    chromedriver = os.environ.get("CHROMEDRIVER")
+    service = Service(executable_path=chromedriver) if chromedriver else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    # Tests wait explicitly, through pages.py; an implicit wait would add
+    # its full timeout to every check for an element that is not there
+    driver.implicitly_wait(0)
+    install_network_tracker(driver)
+    perf_capture.install(driver)
+    yield driver
+    driver.quit()
+
+
+@pytest.fixture
+def driver(browser):
+    """The worker's browser, signed out and with empty storage."""
+    try:
+        browser.switch_to.alert.accept()
+    except NoAlertPresentException:
+        pass
+    browser.delete_all_cookies()
+    try:
+        browser.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        # No storage on about:blank, before the first test has loaded a page
+        pass
+    return browser
+
+
+@pytest.fixture
+def logged_in_driver(driver, user):
+    """The worker's browser, signed in as the worker's user."""
+    # Cookies can only be set for the page's own origin; robots.txt is the
+    # cheapest page the client serves
+    driver.get(f"{BASE_URL}/robots.txt")
+    driver.add_cookie({"name": SESSION_COOKIE, "value": user.session_id, "path": "/"})
+    return driver
+
+
+@pytest.fixture
+def perf(browser, request):
+    """Measures the test's steps in the browser; see perf.py."""
+    recorder = perf_capture.PerfRecorder(browser, request.node.nodeid)
+    yield recorder
+    # User properties travel with the test's reports, from xdist workers too
+    request.node.user_properties.append(("perf", recorder.steps))
+
+
+# Per-test timings: setup (navigation and sign-in) plus the test itself.
+# Under xdist the workers' reports reach the controller, which prints them.
+_timings = {}
+# Steps measured by the perf fixture, and the ones slower than the baseline
+_perf_samples = []
+_perf_regressions = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("e2e timings")
+    group.addoption("--timing-report", metavar="PATH", help="save each test's duration to PATH as JSON")
+    group.addoption("--timing-baseline", metavar="PATH", help="compare durations with an earlier --timing-report")
+    group.addoption("--perf-report", metavar="PATH", help="save browser measurements to PATH (JSON) and a CSV next to it")
+    group.addoption("--perf-baseline", metavar="PATH", help="fail when steps regress past an earlier --perf-report")
+    group.addoption(
+        "--perf-tolerance", type=float, default=perf_capture.TOLERANCE,
+        help="how much slower than the baseline a step may get, as a fraction (default %(default)s)",
+    )
+
+
+def pytest_runtest_logreport(report):
+    if report.when in ("setup", "call"):
+        _timings[report.nodeid] = _timings.get(report.nodeid, 0.0) + report.duration
+    elif report.when == "teardown":
+        for name, value in report.user_properties:
+            if name == "perf":
+                _perf_samples.extend(value)
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if not _perf_samples or hasattr(config, "workerinput"):
+        return
+
+    report_path = config.getoption("--perf-report")
+    if report_path:
+        perf_capture.write_report(report_path, _perf_samples)
+
+    baseline_path = config.getoption("--perf-baseline")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["steps"]
+        summary = perf_capture.summarize(_perf_samples)
+        _perf_regressions.extend(
+            perf_capture.regressions(summary, baseline, config.getoption("--perf-tolerance"))
+        )
+        if _perf_regressions:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _timings or hasattr(config, "workerinput"):
+        return
+
+    baseline = {}
+    baseline_path = config.getoption("--timing-baseline")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["tests"]
+
+    terminalreporter.section("e2e timings")
+    for nodeid, seconds in sorted(_timings.items(), key=lambda item: -item[1]):
+        line = f"{seconds:8.2f}s  {nodeid}"
+        if nodeid in baseline:
+            line += f"  (was {baseline[nodeid]:.2f}s, saved {baseline[nodeid] - seconds:.2f}s)"
+        terminalreporter.write_line(line)
+
+    total = sum(_timings.values())
+    line = f"{total:8.2f}s  total"
+    compared = [nodeid for nodeid in _timings if nodeid in baseline]
+    if compared:
+        before = sum(baseline[nodeid] for nodeid in compared)
+        after = sum(_timings[nodeid] for nodeid in compared)
+        line += f"  (saved {before - after:.2f}s over {len(compared)} test(s) in the baseline)"
+    terminalreporter.write_line(line)
+
+    report_path = config.getoption("--timing-report")
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"tests": _timings, "total": total}, f, indent=2)
+
+    if _perf_samples:
+        terminalreporter.section("e2e page performance (medians)")
+        terminalreporter.write_line(
+            f"{'step':<28}{'interaction':>12}{'load':>9}{'api max':>9}{'long tasks':>12}"
+        )
+        for step, metrics in perf_capture.summarize(_perf_samples).items():
+            terminalreporter.write_line(
+                f"{step:<28}{_ms(metrics['interaction_ms']):>12}{_ms(metrics['load_ms']):>9}"
+                f"{_ms(metrics['api_ms_max']):>9}{_ms(metrics['long_task_ms']):>12}"
+            )
+        for step, metric, before, after in _perf_regressions:
+            terminalreporter.write_line(
+                f"❌ {step}: {metric} {after:.0f}ms, baseline {before:.0f}ms", red=True
+            )
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}ms"
@@ -0,0 +1,429 @@
+"""Page objects and explicit waits for the Selenium suite.
+
+Tests wait for what they need: the app's requests to finish, React to
+render, the URL to change or an alert to appear. There are no fixed sleeps,
+so each step takes as long as the app does and no longer.
+"""
+import os
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    NoAlertPresentException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+TIMEOUT = float(os.environ.get("E2E_TIMEOUT", "10"))
+# How long the page must go without a request before it counts as idle
+IDLE_MS = 250
+POLL = 0.05
+
+# Counts the fetch and XHR requests in flight. Installed in every new
+# document by install_network_tracker; running it again is a no-op.
+NETWORK_TRACKER = """
+(() => {
+  if (window.__e2eNetwork) return;
+  const state = window.__e2eNetwork = { pending: 0, last: performance.now() };
+  const start = () => { state.pending++; state.last = performance.now(); };
+  const end = () => { state.pending--; state.last = performance.now(); };
+  const fetch = window.fetch;
+  window.fetch = function (...args) {
+    start();
+    return fetch.apply(this, args).finally(end);
+  };
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    start();
+    this.addEventListener('loadend', end, { once: true });
+    return send.apply(this, args);
+  };
+})();
+"""
+
+NETWORK_IDLE = """
+const network = window.__e2eNetwork;
+return network.pending === 0 && performance.now() - network.last >= arguments[0];
+"""
+
+# React has mounted into #root and no page is showing its "Loading..."
+# placeholder
+RENDERED = """
+const root = document.getElementById('root');
+if (document.readyState !== 'complete' || !root || root.childElementCount === 0) return false;
+return !Array.from(root.querySelectorAll('div, p')).some(
+  (el) => el.childElementCount === 0 && /^Loading\\b/.test(el.textContent.trim())
+);
+"""
+
+
+def install_network_tracker(driver):
+    """Installs the request counter in every document the browser loads."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER})
+    except (AttributeError, WebDriverException):
+        # Not Chrome: wait_for_network_idle installs it on demand, after
+        # the page's first requests
+        pass
+
+
+def wait_for_network_idle(driver, timeout=TIMEOUT, idle_ms=IDLE_MS):
+    driver.execute_script(NETWORK_TRACKER)
+    WebDriverWait(driver, timeout, POLL).until(
+        lambda d: d.execute_script(NETWORK_IDLE, idle_ms),
+        f"requests still in flight after {timeout}s",
+    )
+
+
+def wait_for_render(driver, locator=None, timeout=TIMEOUT):
+    """Waits for React to render and the page's requests to finish.
+
+    Returns the element at `locator` once it is visible, if one is given.
+    """
+    WebDriverWait(driver, timeout, POLL).until(
+        lambda d: d.execute_script(RENDERED), f"page not rendered after {timeout}s"
+    )
+    wait_for_network_idle(driver, timeout)
+    if locator:
+        return WebDriverWait(driver, timeout, POLL).until(EC.visibility_of_element_located(locator))
+    return None
+
+
+def wait_for_url_change(driver, old_url, timeout=TIMEOUT):
+    WebDriverWait(driver, timeout, POLL).until(EC.url_changes(old_url), f"still on {old_url}")
+    return driver.current_url
+
+
+def wait_for_url_contains(driver, fragment, timeout=TIMEOUT):
+    WebDriverWait(driver, timeout, POLL).until(
+        EC.url_contains(fragment), f"URL does not contain {fragment!r}"
+    )
+    return driver.current_url
+
+
+def wait_for_alert(driver, timeout=TIMEOUT):
+    """Returns the alert once it is open, or None if none opens in time."""
+    try:
+        return WebDriverWait(driver, timeout, POLL).until(EC.alert_is_present())
+    except TimeoutException:
+        return None
+
+
+def accept_alert(driver, timeout=TIMEOUT):
+    """Accepts the next alert and returns its text, or None if none opens."""
+    alert = wait_for_alert(driver, timeout)
+    if alert is None:
+        return None
+    text = alert.text
+    alert.accept()
+    return text
+
+
+def open_alert_text(driver):
+    """Accepts an alert that is already open and returns its text."""
+    try:
+        alert = driver.switch_to.alert
+    except NoAlertPresentException:
+        return None
+    text = alert.text
+    alert.accept()
+    return text
+
+
+def wait_for_alert_or(driver, condition, message, timeout=TIMEOUT):
+    """Waits for an alert or for `condition`, whichever comes first.
+
+    Returns the alert's text (the alert is accepted), or None if
+    `condition` came true without one.
+    """
+    def settled(d):
+        try:
+            return d.switch_to.alert
+        except NoAlertPresentException:
+            return condition(d)
+
+    # The page may re-render between finding an element and checking it
+    WebDriverWait(driver, timeout, POLL, ignored_exceptions=[StaleElementReferenceException]).until(
+        settled, message
+    )
+    return open_alert_text(driver)
+
+
+def wait_for_alert_or_url_change(driver, old_url, timeout=TIMEOUT):
+    return wait_for_alert_or(
+        driver, lambda d: d.current_url != old_url, f"no alert and still on {old_url}", timeout
+    )
+
+
+def wait_for_alert_or_element(driver, locator, timeout=TIMEOUT):
+    return wait_for_alert_or(
+        driver,
+        lambda d: any(element.is_displayed() for element in d.find_elements(*locator)),
+        f"no alert and no {locator[1]}",
+        timeout,
+    )
+
+
+class Page:
+    """A page of the client, at `path` under the base URL."""
+
+    path = "/"
+
+    def __init__(self, driver, base_url):
+        self.driver = driver
+        self.base_url = base_url
+
+    def open(self, query=""):
+        self.driver.get(f"{self.base_url}{self.path}{query}")
+        self.wait_until_ready()
+        return self
+
+    def wait_until_ready(self, locator=None):
+        return wait_for_render(self.driver, locator)
+
+    @property
+    def url(self):
+        return self.driver.current_url
+
+    def find(self, by, value, timeout=TIMEOUT):
+        return WebDriverWait(self.driver, timeout, POLL).until(
+            EC.presence_of_element_located((by, value))
+        )
+
+    def find_all(self, by, value, timeout=TIMEOUT):
+        self.find(by, value, timeout)
+        return self.driver.find_elements(by, value)
+
+    def has(self, by, value):
+        return len(self.driver.find_elements(by, value)) > 0
+
+    def type(self, by, value, text):
+        field = self.find(by, value)
+        field.clear()
+        field.send_keys(text)
+        return field
+
+    def select(self, name, text):
+        Select(self.find(By.NAME, name)).select_by_visible_text(text)
+
+    def click(self, by, value, timeout=TIMEOUT):
+        button = WebDriverWait(self.driver, timeout, POLL).until(EC.element_to_be_clickable((by, value)))
+        self.driver.execute_script("arguments[0].scrollIntoView({ block: 'center' });", button)
+        try:
+            button.click()
+        except ElementClickInterceptedException:
+            self.driver.execute_script("arguments[0].click();", button)
+        return button
+
+    def click_button(self, label, timeout=TIMEOUT):
+        return self.click(By.XPATH, f"//button[contains(text(), '{label}')]", timeout)
+
+    def set_range(self, slider, value):
+        # React listens for input events; setting the value alone is not seen
+        self.driver.execute_script("""
+            arguments[0].value = arguments[1];
+            arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
+            arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
+        """, slider, value)
+
+    def submit_and_wait(self, label):
+        """Clicks `label` and waits for the resulting alert or navigation.
+
+        Returns the alert's text, or None if there was no alert.
+        """
+        before = self.url
+        self.click_button(label)
+        return wait_for_alert_or_url_change(self.driver, before)
+
+
+class LoginPage(Page):
+    path = "/login"
+
+    def sign_in(self, email, password):
+        """Returns the alert's text if signing in fails, else None."""
+        self.type(By.XPATH, "//input[@type='email']", email)
+        self.type(By.XPATH, "//input[@type='password']", password)
+        alert_text = self.submit_and_wait("Sign in")
+        if alert_text is None:
+            self.wait_until_ready()
+        return alert_text
+
+
+class RegisterPage(Page):
+    path = "/register"
+
+    def register(self, email, password, question, answer):
+        """Returns the text of the alert shown after submitting, if any."""
+        self.type(By.XPATH, "//input[@type='email']", email)
+        passwords = self.find_all(By.XPATH, "//input[@type='password']")
+        passwords[0].send_keys(password)
+        passwords[1].send_keys(password)
+        self.select_question(question)
+        self.type(By.XPATH, "//label[text()='Your Answer']/following-sibling::input", answer)
+        return self.submit_and_wait("Next")
+
+    def select_question(self, question):
+        Select(self.find(By.TAG_NAME, "select")).select_by_visible_text(question)
+
+
+class ForgotPasswordPage(Page):
+    path = "/forgot-password"
+
+    def reset(self, email, question, answer, new_password):
+        """Returns the text of the alert shown after submitting."""
+        self.type(By.XPATH, "//input[@type='email']", email)
+        Select(self.find(By.TAG_NAME, "select")).select_by_visible_text(question)
+        self.type(By.XPATH, "//input[@type='text']", answer)
+        passwords = self.find_all(By.XPATH, "//input[@type='password']")
+        passwords[0].send_keys(new_password)
+        passwords[1].send_keys(new_password)
+        self.click_button("Reset Password")
+        return accept_alert(self.driver)
+
+
+class SessionPage(Page):
+    def __init__(self, driver, base_url, session_id=1):
+        super().__init__(driver, base_url)
+        self.path = f"/sessions/{session_id}"
+
+    def apply(self, role):
+        """Applies as `role` and returns the alert's text, if any."""
+        self.click(By.XPATH, f"//input[@type='radio' and @value='{role}']")
+        return self.submit_and_wait("Apply")
+
+    def cancel_application(self):
+        """Cancels the user's application, if there is one.
+
+        Returns the alert's text, or None if there was nothing to cancel.
+        """
+        if not self.has(By.XPATH, "//button[contains(text(), 'Cancel Apply')]"):
+            return None
+        return self.submit_and_wait("Cancel Apply")
+
+
+class ProfileCreationPage(Page):
+    path = "/profile-creation"
+
+    def create(self, first_name="Selenium", last_name="Bot"):
+        """Fills in and submits the form; returns the alert's text, if any."""
+        self.type(By.NAME, "first_name", first_name)
+        self.type(By.NAME, "last_name", last_name)
+        # A date input ignores send_keys in some locales
+        self.driver.execute_script("""
+            const dob = document.getElementsByName('date_of_birth')[0];
+            dob.value = '1999-05-01';
+            dob.dispatchEvent(new Event('input', { bubbles: true }));
+            dob.dispatchEvent(new Event('change', { bubbles: true }));
+        """)
+        self.type(By.NAME, "address", "123 Test Street")
+        self.type(By.NAME, "city_suburb", "Testville")
+        self.type(By.NAME, "state", "Testonia")
+        self.type(By.NAME, "postal_code", "6000")
+        self.select("gender", "Other")
+        self.select("aboriginal_or_torres_strait_islander", "No")
+        self.type(By.NAME, "language_spoken_at_home", "English")
+        self.type(By.NAME, "living_situation", "With family")
+        alert_text = self.submit_and_wait("Create Account")
+        wait_for_network_idle(self.driver)
+        return alert_text
+
+
+class ProfilePage(Page):
+    path = "/profile"
+
+    TITLE = (By.XPATH, "//h2[contains(text(), 'My Profile')]")
+
+    def open(self, query=""):
+        """Opens the profile, creating it first if the user has none yet."""
+        self.driver.get(f"{self.base_url}{self.path}{query}")
+        # A user without a profile is sent to /profile-creation, after an
+        # alert
+        if wait_for_alert_or_element(self.driver, self.TITLE) is not None:
+            wait_for_url_contains(self.driver, "/profile-creation")
+            print("🔄 Auto-filling profile creation form...")
+            creation = ProfileCreationPage(self.driver, self.base_url)
+            creation.wait_until_ready()
+            alert_text = creation.create()
+            if not (alert_text or "").startswith("✅"):
+                raise AssertionError(f"❌ Profile submission failed: {alert_text}")
+            self.driver.get(f"{self.base_url}{self.path}{query}")
+        self.wait_until_ready(self.TITLE)
+        return self
+
+
+class SurveyPage(Page):
+    """The application survey; each step is a route under /survey."""
+
+    path = "/survey"
+
+    # The heading each step renders, to wait for after Next
+    HEADINGS = {
+        "SurveyStart": "Mentorship Application",
+        "MatchingPreferences": "Confirm Your Preferences",
+        "MatchingLifestyle": "Lifestyle & Matching Questions",
+        "MatchingEnneagram": "Enneagram Questionnaire",
+        "SubmitForm": "Application Submitted Successfully",
+    }
+    CONFIRM = (By.XPATH, "//input[@type='checkbox']")
+
+    @classmethod
+    def heading(cls, step):
+        return (By.XPATH, f"//h1[contains(text(), '{cls.HEADINGS[step]}')]")
+
+    def open(self, query=""):
+        self.driver.get(f"{self.base_url}{self.path}{query}")
+        self.wait_until_ready(self.heading("SurveyStart"))
+        return self
+
+    def fill_field(self, name, value):
+        """Fills in a field of the form, unless the form is locked.
+
+        Returns whether the field could be filled in.
+        """
+        field = self.find(By.XPATH, f"//form//*[@name='{name}']")
+        if not field.is_displayed() or field.get_attribute("disabled"):
+            print(f"⚠️ {name} is disabled or not displayed, skipping interaction")
+            return False
+        if field.tag_name == "select":
+            Select(field).select_by_value(value.lower())
+        else:
+            field.clear()
+            field.send_keys(value)
+        print(f"🟢 Filled {name} with {value}")
+        return True
+
+    def choose(self, name, values):
+        """Picks `values` in a react-select multi-select."""
+        # react-select keeps its value in a hidden input named after the
+        # field, next to the text input it reads typing from
+        container = self.find(By.XPATH, f"//input[@type='hidden' and @name='{name}']/..")
+        typing = container.find_element(By.XPATH, ".//input[not(@type='hidden')]")
+        for value in values:
+            typing.send_keys(value)
+            typing.send_keys(Keys.ENTER)
+
+    def set_ranges(self, value):
+        for slider in self.find_all(By.XPATH, "//input[@type='range']"):
+            self.set_range(slider, value)
+
+    def next_step(self, step_name, expected):
+        """Clicks Next and waits for the element at `expected` or an alert.
+
+        Returns the alert's text, or None once `expected` is showing.
+        """
+        self.click(By.XPATH, "//button[contains(., 'Next')]")
+        alert_text = wait_for_alert_or_element(self.driver, expected)
+        if alert_text is None:
+            self.wait_until_ready(expected)
+            print(f"🟢 {step_name} - done")
+        return alert_text
+
+    def submit(self):
+        self.click(*self.CONFIRM)
+        self.click_button("Submit")
+        wait_for_url_contains(self.driver, "/submitform")
+        return self.wait_until_ready(self.heading("SubmitForm"))
@@ -0,0 +1,216 @@
+"""Browser-side performance capture for the Selenium suite.
+
+Tests wrap the steps worth measuring in `perf.step(name)`. When the step
+ends the recorder collects, from the browser:
+
+- Navigation Timing for a page the step loaded (TTFB, DOMContentLoaded, load)
+- Resource Timing entries and long tasks since the step began
+- the API requests made during the step, with status and duration, read
+  from Chrome's performance log (CDP Network events)
+
+plus the step's own wall time, the latency the user sees. conftest.py saves
+the results as a JSON and a CSV report and compares them with a baseline.
+"""
+import csv
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+# Metrics a baseline gates on, and how much worse than the baseline a step
+# may get: TOLERANCE relative plus SLACK_MS absolute, so that noise on steps
+# of a few milliseconds does not fail the run
+GATED = ("load_ms", "interaction_ms", "api_ms_max", "long_task_ms")
+TOLERANCE = 0.25
+SLACK_MS = 50
+
+FIELDS = (
+    "test", "step", "interaction_ms", "ttfb_ms", "dom_content_loaded_ms", "load_ms",
+    "resources", "transfer_bytes", "long_tasks", "long_task_ms",
+    "api_calls", "api_errors", "api_ms_total", "api_ms_max",
+)
+
+# Records long tasks from the start of every document, and keeps more
+# resource entries than the default 250
+OBSERVERS = """
+(() => {
+  if (window.__e2eLongTasks) return;
+  window.__e2eLongTasks = [];
+  performance.setResourceTimingBufferSize(2000);
+  try {
+    new PerformanceObserver((list) => {
+      for (const entry of list.getEntries()) {
+        window.__e2eLongTasks.push(entry.duration);
+      }
+    }).observe({ type: 'longtask', buffered: true });
+  } catch (err) {
+    // No long task support in this browser
+  }
+})();
+"""
+
+# What the document recorded since the previous call. Navigation Timing
+# is returned once per document, once the load event has finished.
+COLLECT = """
+const state = window.__e2ePerf || (window.__e2ePerf = { resources: 0, longTasks: 0, navigation: false });
+const resources = performance.getEntriesByType('resource');
+const longTasks = window.__e2eLongTasks || [];
+const nav = performance.getEntriesByType('navigation')[0];
+const loaded = !!nav && nav.loadEventEnd > 0;
+const result = {
+  navigation: loaded && !state.navigation
+    ? { ttfb: nav.responseStart, domContentLoaded: nav.domContentLoadedEventEnd, load: nav.loadEventEnd }
+    : null,
+  resources: resources.slice(state.resources).map((r) => [r.duration, r.transferSize]),
+  longTasks: longTasks.slice(state.longTasks),
+};
+state.resources = resources.length;
+state.longTasks = longTasks.length;
+state.navigation = state.navigation || loaded;
+return result;
+"""
+
+
+def install(driver):
+    """Starts the observers in every document the browser loads."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": OBSERVERS})
+    except (AttributeError, WebDriverException):
+        pass
+
+
+class PerfRecorder:
+    """Collects the measurements of one test's steps."""
+
+    def __init__(self, driver, test_id):
+        self.driver = driver
+        self.test_id = test_id
+        self.steps = []
+        # API requests seen starting but not yet finishing, by CDP request id
+        self.in_flight = {}
+        self._read_api_calls()
+
+    @contextmanager
+    def step(self, name):
+        # Start from a clean slate: what happened before belongs to no step
+        self._read_api_calls()
+        self._collect()
+        started = time.perf_counter()
+        yield
+        interaction_ms = (time.perf_counter() - started) * 1000
+        self.steps.append(self._measure(name, interaction_ms))
+
+    def _measure(self, name, interaction_ms):
+        browser = self._collect() or {"navigation": None, "resources": [], "longTasks": []}
+        navigation = browser["navigation"] or {}
+        api = self._read_api_calls()
+        return {
+            "test": self.test_id,
+            "step": name,
+            "interaction_ms": round(interaction_ms, 1),
+            "ttfb_ms": _rounded(navigation.get("ttfb")),
+            "dom_content_loaded_ms": _rounded(navigation.get("domContentLoaded")),
+            "load_ms": _rounded(navigation.get("load")),
+            "resources": len(browser["resources"]),
+            "transfer_bytes": sum(size for _, size in browser["resources"]),
+            "long_tasks": len(browser["longTasks"]),
+            "long_task_ms": _rounded(sum(browser["longTasks"])),
+            "api_calls": len(api),
+            "api_errors": sum(1 for call in api if call["failed"] or (call["status"] or 0) >= 400),
+            "api_ms_total": _rounded(sum(call["ms"] for call in api)),
+            "api_ms_max": _rounded(max((call["ms"] for call in api), default=0)),
+            "api": api,
+        }
+
+    def _collect(self):
+        try:
+            return self.driver.execute_script(COLLECT)
+        except WebDriverException:
+            # An alert is open, or the page went away mid-step
+            return None
+
+    def _read_api_calls(self):
+        """Drains the performance log; returns the API calls that finished."""
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException:
+            return []
+        calls = []
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method, params = message["method"], message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.requestWillBeSent":
+                url = params["request"]["url"]
+                if "/api/" in url:
+                    self.in_flight[request_id] = {
+                        "method": params["request"]["method"],
+                        "path": urlsplit(url).path,
+                        "status": None,
+                        "start": params["timestamp"],
+                    }
+            elif method == "Network.responseReceived" and request_id in self.in_flight:
+                self.in_flight[request_id]["status"] = params["response"]["status"]
+            elif method in ("Network.loadingFinished", "Network.loadingFailed") and request_id in self.in_flight:
+                request = self.in_flight.pop(request_id)
+                calls.append({
+                    "method": request["method"],
+                    "path": request["path"],
+                    "status": request["status"],
+                    "failed": method == "Network.loadingFailed",
+                    # CDP timestamps are in seconds
+                    "ms": round((params["timestamp"] - request.pop("start")) * 1000, 1),
+                })
+        return calls
+
+
+def _rounded(value):
+    return None if value is None else round(value, 1)
+
+
+def summarize(samples):
+    """The median of each metric per step, over the samples that have it."""
+    by_step = {}
+    for sample in samples:
+        by_step.setdefault(sample["step"], []).append(sample)
+    summary = {}
+    for step, step_samples in sorted(by_step.items()):
+        summary[step] = {"samples": len(step_samples)}
+        for field in FIELDS[2:]:
+            values = [sample[field] for sample in step_samples if sample[field] is not None]
+            summary[step][field] = round(statistics.median(values), 1) if values else None
+    return summary
+
+
+def write_report(path, samples):
+    """Writes the summary and samples to `path` (JSON) and the samples,
+    one row per step, next to it as CSV."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"steps": summarize(samples), "samples": samples}, f, indent=2)
+    csv_path = path[:-5] + ".csv" if path.endswith(".json") else path + ".csv"
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(samples)
+    return csv_path
+
+
+def regressions(summary, baseline, tolerance=TOLERANCE, slack_ms=SLACK_MS):
+    """The gated metrics of steps that got slower than the baseline allows.
+
+    Returns (step, metric, baseline value, current value) tuples.
+    """
+    found = []
+    for step, metrics in summary.items():
+        before = baseline.get(step)
+        if before is None:
+            continue
+        for metric in GATED:
+            if metrics.get(metric) is None or before.get(metric) is None:
+                continue
+            if metrics[metric] > before[metric] * (1 + tolerance) + slack_ms:
+                found.append((step, metric, before[metric], metrics[metric]))
+    return found
@@ -104,12 +104,12 @@ create table
         created_at timestamp default current_timestamp
     );
 
-CREATE INDEX idx_applications_session_id ON applications (session_id);
+-- Lookups of applications by session use the unique (session_id, user_id) index
 
 CREATE INDEX idx_participants_application_id ON participants (application_id);
 
-CREATE INDEX idx_matching_pairs_mentor_id ON matching_pairs (mentor_id);
+CREATE INDEX idx_matching_pairs_mentor_id ON matching_pairs (mentor_id, session_id);
 
-CREATE INDEX idx_matching_pairs_mentee_id ON matching_pairs (mentee_id);
+CREATE INDEX idx_matching_pairs_mentee_id ON matching_pairs (mentee_id, session_id);
 
 CREATE INDEX idx_comments_commenter_id ON comments (commenter_id);
\ No newline at end of file
@@ -0,0 +1,134 @@
+const fs = require("fs");
+const path = require("path");
+
+// Survey responses stored as JSON Lines: one response per line, only ever
+// appended to. The whole file is read once, when the store opens; after
+// that submissions append a line and matching reads the in-memory index.
+//
+// Writes go through one queue, so concurrent submissions never interleave
+// or lose each other. Submissions that arrive while a write is in progress
+// are written together in the next one.
+class ResponseStore {
+    constructor(file) {
+        this.file = file;
+        // Every response in submission order, the mentors among them and
+        // the most recent mentee
+        this.responses = [];
+        this.mentors = [];
+        this.latestMentee = null;
+        this.handle = null;
+        // Writes and compactions run one at a time, in order
+        this.queue = Promise.resolve();
+        // Responses waiting for the next write, with their callers
+        this.pending = [];
+        this.writeQueued = false;
+        // Lines in the file that could not be read, e.g. a write cut short
+        // by a crash; compaction rewrites the file without them
+        this.deadLines = 0;
+    }
+
+    /**
+     * Loads the file into memory and opens it for appending. When there is
+     * no JSON Lines file yet, responses from `legacyFile` (a JSON array) are
+     * imported first.
+     */
+    async open(legacyFile) {
+        await fs.promises.mkdir(path.dirname(this.file), { recursive: true });
+        if (!fs.existsSync(this.file) && legacyFile && fs.existsSync(legacyFile)) {
+            const text = await fs.promises.readFile(legacyFile, "utf8");
+            await this.rewrite(text.trim() ? JSON.parse(text) : []);
+        }
+
+        const text = fs.existsSync(this.file) ? await fs.promises.readFile(this.file, "utf8") : "";
+        for (const line of text.split("\n")) {
+            if (!line.trim()) continue;
+            try {
+                this.index(JSON.parse(line));
+            } catch (err) {
+                this.deadLines++;
+            }
+        }
+        this.handle = await fs.promises.open(this.file, "a");
+
+        if (this.deadLines > 0 || (text && !text.endsWith("\n"))) {
+            setImmediate(() => {
+                this.compact().catch((err) => console.error("Compacting responses failed:", err.message));
+            });
+        }
+        return this;
+    }
+
+    index(entry) {
+        this.responses.push(entry);
+        if (entry.role === "mentor") this.mentors.push(entry);
+        else if (entry.role === "mentee") this.latestMentee = entry;
+    }
+
+    /**
+     * Appends one response. Resolves once it is written; from then on it
+     * is included in matching.
+     */
+    add(entry) {
+        return new Promise((resolve, reject) => {
+            this.pending.push({ entry, resolve, reject });
+            if (!this.writeQueued) {
+                this.writeQueued = true;
+                this.queue = this.queue.then(() => this.writeBatch());
+            }
+        });
+    }
+
+    async writeBatch() {
+        this.writeQueued = false;
+        const batch = this.pending;
+        this.pending = [];
+        const text = batch.map(({ entry }) => `${JSON.stringify(entry)}\n`).join("");
+        try {
+            // One write call per batch on a file opened with O_APPEND, so
+            // each batch lands whole at the end of the file
+            await this.handle.write(text);
+        } catch (err) {
+            batch.forEach(({ reject }) => reject(err));
+            return;
+        }
+        batch.forEach(({ entry, resolve }) => {
+            this.index(entry);
+            resolve();
+        });
+    }
+
+    /**
+     * Rewrites the file from memory, without the lines that could not be
+     * read. Runs after the writes already queued; responses submitted
+     * meanwhile are appended to the new file.
+     */
+    compact() {
+        const run = this.queue.then(async () => {
+            await this.handle.close();
+            try {
+                await this.rewrite(this.responses);
+                this.deadLines = 0;
+            } finally {
+                this.handle = await fs.promises.open(this.file, "a");
+            }
+        });
+        this.queue = run.catch(() => {});
+        return run;
+    }
+
+    // Writes `entries` to a temporary file and renames it over the store,
+    // so a crash leaves either the old file or the new one
+    async rewrite(entries) {
+        const temp = `${this.file}.tmp`;
+        const out = await fs.promises.open(temp, "w");
+        try {
+            await out.write(entries.map((entry) => `${JSON.stringify(entry)}\n`).join(""));
+            await out.sync();
+        } finally {
+            await out.close();
+        }
+        await fs.promises.rename(temp, this.file);
+    }
+}
+
+module.exports = { ResponseStore };
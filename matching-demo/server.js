@@ -2,10 +2,14 @@ const express = require("express");
 const fs = require("fs");
 const path = require("path");
 const cors = require("cors");
+const { ResponseStore } = require("./responseStore");
 
 const app = express();
 const PORT = process.env.PORT || 3000;
-const DATA_FILE = path.join(__dirname, "data", "responses.json");
+const DATA_FILE = path.join(__dirname, "data", "responses.jsonl");
+// Responses saved by earlier versions; imported once into DATA_FILE
+const LEGACY_DATA_FILE = path.join(__dirname, "data", "responses.json");
+const store = new ResponseStore(DATA_FILE);
 
 app.use(express.json()); // Parse JSON request bodies
 app.use(cors()); // Allow cross-origin requests
@@ -26,63 +30,45 @@ app.get("/api/questions", (req, res) => {
 });
 
 // Endpoint to submit survey responses
-app.post("/api/submit", (req, res) => {
+app.post("/api/submit", async (req, res) => {
     const { role, responses } = req.body; // role should be 'mentor' or 'mentee'
     
     if (!role || !['mentor', 'mentee'].includes(role)) {
         return res.status(400).json({ success: false, message: "Invalid role specified." });
     }
     
-    const userResponse = { role, responses };
-    
-    // Ensure data directory exists
-    if (!fs.existsSync("data")) {
-        fs.mkdirSync("data");
-    }
-    
-    // Read existing responses
-    let storedResponses = [];
-    if (fs.existsSync(DATA_FILE)) {
-        const fileData = fs.readFileSync(DATA_FILE, "utf8");
-        storedResponses = fileData ? JSON.parse(fileData) : [];
+    // Appended to the response log; nothing else is read or rewritten
+    try {
+        await store.add({ role, responses });
+    } catch (err) {
+        console.error("Saving response failed:", err.message);
+        return res.status(500).json({ success: false, message: "Could not save the response." });
     }
     
-    // Add new response and save to file
-    storedResponses.push(userResponse);
-    fs.writeFileSync(DATA_FILE, JSON.stringify(storedResponses, null, 2));
-    
     res.json({ success: true, message: "Response recorded successfully." });
 });
 
 // Endpoint to match latest mentee with all mentors
 app.get("/api/match-mentee", (req, res) => {
-    if (!fs.existsSync(DATA_FILE)) {
+    // Served from the store's in-memory index
+    const { mentors, latestMentee } = store;
+    
+    if (store.responses.length === 0) {
         return res.json({ success: false, message: "No responses available." });
     }
-    
-    const fileData = fs.readFileSync(DATA_FILE, "utf8");
-    const storedResponses = fileData ? JSON.parse(fileData) : [];
-    
-    // Separate mentors and mentees
-    const mentors = storedResponses.filter(user => user.role === "mentor");
-    const mentees = storedResponses.filter(user => user.role === "mentee");
-    
-    if (mentees.length === 0) {
+    if (!latestMentee) {
         return res.json({ success: false, message: "No mentees available for matching." });
     }
     if (mentors.length === 0) {
         return res.json({ success: false, message: "No mentors available for matching." });
     }
     
-    // Get the latest mentee
-    const latestMentee = mentees[mentees.length - 1].responses;
-    
     let matchScores = mentors.map(mentor => {
         let score = 0;
         let totalQuestions = questions.length;
         
         for (let i = 1; i <= totalQuestions; i++) {
-            if (latestMentee[`q${i}`] === mentor.responses[`q${i}`]) {
+            if (latestMentee.responses[`q${i}`] === mentor.responses[`q${i}`]) {
                 score += 1;
             }
         }
@@ -107,7 +93,12 @@ if (!fs.existsSync("public")) {
     fs.mkdirSync("public");
 }
 
-// Start the server
-app.listen(PORT, () => {
-    console.log(`Server running at http://localhost:${PORT}`);
+// Load the stored responses, then start the server
+store.open(LEGACY_DATA_FILE).then(() => {
+    app.listen(PORT, () => {
+        console.log(`Server running at http://localhost:${PORT}`);
+    });
+}).catch(err => {
+    console.error("Could not open the response store:", err.message);
+    process.exit(1);
 });